@@ -0,0 +1,4 @@
+"""Benchmarks for the hot paths of cads-adaptors.
+
+Run with ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,61 @@
+import argparse
+import logging
+import sys
+import warnings
+
+from . import cases, harness  # noqa: F401
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Run the cads-adaptors benchmarks.",
+    )
+    parser.add_argument(
+        "patterns", nargs="*", help="run only benchmarks matching these globs"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.1,
+        help="minimum duration of each repeat, in seconds",
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown/memory growth relative to the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    # Keep the report readable: library warnings and logs are not what is measured
+    warnings.simplefilter("ignore")
+    logging.getLogger("cfgrib").setLevel(logging.ERROR)
+
+    benchmarks = harness.select(args.patterns)
+    if args.list:
+        for benchmark in benchmarks:
+            print(f"{benchmark.name:<55} {benchmark.description}")
+        return 0
+
+    results = harness.run(benchmarks, repeat=args.repeat, min_time=args.min_time)
+    if args.output:
+        harness.dump(results, args.output)
+
+    if args.baseline:
+        regressions = harness.compare(
+            results, harness.load(args.baseline), tolerance=args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
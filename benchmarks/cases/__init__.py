@@ -0,0 +1,17 @@
+"""Benchmark cases, one module per adaptor family.
+
+Request-driven cases replay the recorded requests in ``data/requests.jsonl``: each
+line holds the adaptor entry point, form, configuration and request of a dataset.
+The other cases run on synthetic data written at setup time, against the local
+stand-ins of the remote services in ``benchmarks.stand_ins``.
+"""
+
+from . import (  # noqa: F401
+    cadsobs,
+    cams_solar_rad,
+    cds,
+    convertors,
+    mars,
+    roocs,
+    tools,
+)
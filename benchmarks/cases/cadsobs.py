@@ -0,0 +1,256 @@
+"""Observations: filtering of synthetic assets, local or served over HTTP."""
+
+import datetime
+import os
+import pathlib
+from typing import Any, Callable
+
+from ..fixtures import quiet_context
+from ..harness import register, register_variants
+from ..stand_ins import LatencyServer
+
+# Variables of the CDM lite layout retrieved by the cases
+VARIABLES = [
+    "primary_station_id",
+    "report_timestamp",
+    "observation_value",
+    "observed_variable",
+    "latitude",
+    "longitude",
+]
+
+
+def write_obs_asset(
+    path: pathlib.Path,
+    size: int,
+    stations: int = 1000,
+    chunk_size: int = 100_000,
+    seed: int = 0,
+    first_station: int = 0,
+) -> pathlib.Path:
+    """Write a synthetic observations asset (CDM lite layout) of ``size`` observations.
+
+    Observations are sorted by station, as in the repository, with random report
+    times in 2024, positions around each station and 4 observed variables. Stations
+    are numbered from ``first_station``.
+    """
+    import h5netcdf
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    station = np.sort(rng.integers(0, stations, size))
+    station_ids = np.array(
+        [f"S{i:05d}".encode() for i in range(first_station, first_station + stations)]
+    )
+    station_latitude = rng.uniform(-90, 90, stations)
+    station_longitude = rng.uniform(-180, 180, stations)
+    # Seconds since 1900-01-01 of 2024-01-01
+    start = 3913056000
+    variables = {
+        "primary_station_id": station_ids[station].view("S1").reshape(size, -1),
+        "report_timestamp": start + rng.integers(0, 366 * 86400, size),
+        "latitude|header_table": station_latitude[station].astype("float32"),
+        "longitude|header_table": station_longitude[station].astype("float32"),
+        "observed_variable": rng.integers(0, 4, size).astype("int32") * 10 + 85,
+        "observation_value": rng.normal(280, 10, size).astype("float32"),
+        "report_type": rng.integers(0, 3, size).astype("int32"),
+    }
+    with h5netcdf.File(path, "w") as f:
+        f.dimensions["observation_id"] = size
+        for name, values in variables.items():
+            dims: tuple[str, ...] = ("observation_id",)
+            chunks: tuple[int, ...] = (min(chunk_size, size),)
+            if values.ndim == 2:
+                f.dimensions[f"{name}_stringdim"] = values.shape[1]
+                dims += (f"{name}_stringdim",)
+                chunks += (values.shape[1],)
+            variable = f.create_variable(
+                name, dims, values.dtype, chunks=chunks, compression="gzip"
+            )
+            variable[...] = values
+        f.variables["report_timestamp"].attrs["units"] = (
+            "seconds since 1900-01-01 00:00:00"
+        )
+        observed_variable = f.variables["observed_variable"]
+        observed_variable.attrs["codes"] = np.array([85, 95, 105, 115], dtype="int32")
+        observed_variable.attrs["labels"] = np.array(
+            ["air_temperature", "humidity", "wind_speed", "pressure"], dtype=object
+        )
+    return path
+
+
+@register(
+    "cadsobs.filter.mask",
+    "Mask of a station, time, area, day and variable selection of a dense synthetic"
+    " observations asset",
+)
+def cadsobs_filter_mask(tmp_path: pathlib.Path) -> Callable[[], Any]:
+    import h5netcdf
+
+    from cads_adaptors.adaptors.cadsobs import filter
+    from cads_adaptors.adaptors.cadsobs.models import RetrieveParams
+
+    size = int(os.environ.get("CADS_ADAPTORS_BENCHMARK_OBS_SIZE", 10_000_000))
+    path = write_obs_asset(tmp_path / "asset.nc", size)
+    params = RetrieveParams(
+        dataset_source="synthetic",
+        stations=[f"S{i:05d}" for i in range(0, 1000, 3)],
+        variables=["air_temperature", "wind_speed"],
+        latitude_coverage=(-45, 45),
+        longitude_coverage=(-90, 90),
+        time_coverage=(datetime.datetime(2024, 2, 1), datetime.datetime(2024, 11, 1)),
+        day=list(range(1, 32, 2)),
+    )
+
+    def run() -> dict[str, float]:
+        with h5netcdf.File(path, "r") as incobj:
+            mask = filter._get_mask(incobj, params)
+        return {"selected": int(mask.sum())}
+
+    return run
+
+
+@register_variants(
+    {
+        "cadsobs.filter.http.stations": (
+            "Filter 5 stations of a synthetic asset served over HTTP with 20 ms"
+            " latency",
+            {"stations": [f"S{i:05d}" for i in (17, 345, 346, 700, 998)]},
+        ),
+        "cadsobs.filter.http.all": (
+            "Filter a variable of a synthetic asset served over HTTP with 20 ms"
+            " latency",
+            {"stations": None},
+        ),
+    }
+)
+def cadsobs_filter_http(
+    tmp_path: pathlib.Path, stations: list[str] | None
+) -> Callable[[], Any]:
+    import fsspec
+    import h5netcdf
+
+    from cads_adaptors.adaptors.cadsobs import filter
+    from cads_adaptors.adaptors.cadsobs.models import RetrieveArgs, RetrieveParams
+
+    size = int(os.environ.get("CADS_ADAPTORS_BENCHMARK_OBS_SIZE", 2_000_000))
+    write_obs_asset(tmp_path / "asset.nc", size, chunk_size=10_000)
+    server = LatencyServer(str(tmp_path), latency=0.02)
+    retrieve_args = RetrieveArgs(
+        dataset="synthetic",
+        params=RetrieveParams(
+            dataset_source="synthetic",
+            stations=stations,
+            variables=["air_temperature"],
+        ),
+    )
+    char_sizes = {"primary_station_id": 6, "observed_variable": 15}
+
+    def run() -> dict[str, float]:
+        server.reset_counts()
+        fs = fsspec.filesystem("http", cache_type="background", block_size=10 * 1024**2)
+        with h5netcdf.File(tmp_path / "output.nc", "w") as oncobj:
+            oncobj.dimensions["index"] = None
+            filter.filter_asset_and_save(
+                fs,
+                oncobj,
+                retrieve_args,
+                f"{server.url}/asset.nc",
+                char_sizes,
+                VARIABLES,
+            )
+            selected = oncobj.dimensions["index"].size
+        return {
+            "selected": selected,
+            "requests": server.requests,
+            "MiB_read": server.bytes_sent / 2**20,
+        }
+
+    return run
+
+
+def write_obs_network(
+    directory: pathlib.Path,
+    assets: int,
+    size: int,
+    stations: int = 100,
+    indexed: bool = True,
+) -> list[str]:
+    """Write the assets of a network of stations, each with its own stations.
+
+    With ``indexed``, the sidecar index of each asset is written next to it.
+    """
+    from cads_adaptors.adaptors.cadsobs.asset_index import write_asset_index
+
+    names = []
+    for i in range(assets):
+        path = write_obs_asset(
+            directory / f"asset_{i:03d}.nc",
+            size,
+            stations=stations,
+            chunk_size=10_000,
+            seed=i,
+            first_station=i * stations,
+        )
+        if indexed:
+            write_asset_index(path)
+        names.append(path.name)
+    return names
+
+
+@register_variants(
+    {
+        "cadsobs.retrieve.network.indexed": (
+            "Retrieve 4 stations of a network of 40 synthetic assets with sidecar"
+            " indices, served over HTTP with 20 ms latency",
+            {"indexed": True},
+        ),
+        "cadsobs.retrieve.network.unindexed": (
+            "Retrieve 4 stations of a network of 40 synthetic assets without sidecar"
+            " indices, served over HTTP with 20 ms latency",
+            {"indexed": False},
+        ),
+    }
+)
+def cadsobs_retrieve_network(
+    tmp_path: pathlib.Path, indexed: bool
+) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.cadsobs import asset_index
+    from cads_adaptors.adaptors.cadsobs.retrieve import retrieve_data
+
+    (tmp_path / "assets").mkdir()
+    names = write_obs_network(
+        tmp_path / "assets", assets=40, size=100_000, indexed=indexed
+    )
+    server = LatencyServer(str(tmp_path / "assets"), latency=0.02)
+    object_urls = [f"{server.url}/{name}" for name in names]
+    mapped_request = {
+        "dataset_source": "synthetic",
+        "stations": ["S00017", "S00345", "S00346", "S02998"],
+        "variables": ["air_temperature"],
+        "format": "netCDF",
+    }
+    context = quiet_context()
+
+    def run() -> dict[str, float]:
+        # The sidecars are loaded by each run
+        asset_index.clear_cache()
+        server.reset_counts()
+        output_path = retrieve_data(
+            "synthetic",
+            mapped_request,
+            tmp_path,
+            object_urls,
+            VARIABLES,
+            {},
+            {},
+            context,
+            use_asset_index=True,
+        )
+        output_path.unlink()
+        return {
+            "requests": server.requests,
+            "MiB_read": server.bytes_sent / 2**20,
+        }
+
+    return run
@@ -0,0 +1,117 @@
+"""CAMS solar radiation time series, from a local WPS stand-in."""
+
+import datetime
+import logging
+import os
+import pathlib
+import shutil
+from typing import Any, Callable
+
+from ..fixtures import quiet_context
+from ..harness import register_variants
+from ..stand_ins import SolarWpsServer
+
+
+def solar_wps_server() -> SolarWpsServer:
+    os.environ.setdefault("CAMS_SOLAR_SECRET_STRING", "benchmark")
+    return SolarWpsServer(row_time=1e-5)
+
+
+def solar_request(date: str, time_step: str) -> dict[str, Any]:
+    return {
+        "altitude": "-999",
+        "date": date,
+        "location": {"latitude": 45.0, "longitude": 8.0},
+        "sky_type": "get_cams_radiation",
+        "time_reference": "UT",
+        "time_step": time_step,
+        "data_format": "csv",
+    }
+
+
+@register_variants(
+    {
+        "cams_solar_rad.retrieve.sharded": (
+            "Retrieve six months of a one-minute solar radiation series from a local"
+            " WPS stand-in, in concurrent shards",
+            {"max_shards": 8},
+        ),
+        "cams_solar_rad.retrieve.unsharded": (
+            "Retrieve six months of a one-minute solar radiation series from a local"
+            " WPS stand-in, in one request",
+            {"max_shards": 1},
+        ),
+    }
+)
+def retrieve(tmp_path: pathlib.Path, max_shards: int) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.cams_solar_rad import functions
+
+    server = solar_wps_server()
+    request = solar_request("2023-01-01/2023-06-30", "PT01M")
+    outfile = str(tmp_path / "result.csv")
+
+    def run() -> dict[str, float]:
+        server.executions = 0
+        functions.solar_rad_retrieve(
+            request,
+            outfile,
+            ntries=1,
+            logger=logging.getLogger("benchmarks"),
+            urls=[server.url],
+            max_shards=max_shards,
+        )
+        return {"executions": server.executions}
+
+    return run
+
+
+@register_variants(
+    {
+        "cams_solar_rad.segment_cache": (
+            "Retrieve 10 weekly, overlapping 90-day windows of a 15-minute solar"
+            " radiation series from a local WPS stand-in, through the segment cache",
+            {"cached": True},
+        ),
+        "cams_solar_rad.segment_cache.uncached": (
+            "Retrieve 10 weekly, overlapping 90-day windows of a 15-minute solar"
+            " radiation series from a local WPS stand-in",
+            {"cached": False},
+        ),
+    }
+)
+def segment_cache(tmp_path: pathlib.Path, cached: bool) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.cams_solar_rad import functions
+    from cads_adaptors.adaptors.cams_solar_rad import segment_cache as cache_module
+
+    server = solar_wps_server()
+    # A dashboard showing the last 90 days of a 15-minute series, every week
+    first = datetime.date(2023, 1, 1)
+    requests = [
+        solar_request(
+            f"{first + datetime.timedelta(days=7 * week)}"
+            f"/{first + datetime.timedelta(days=7 * week + 89)}",
+            "PT15M",
+        )
+        for week in range(10)
+    ]
+    outfile = str(tmp_path / "result.csv")
+    logger = logging.getLogger("benchmarks")
+
+    def fetch(request: dict[str, Any], path: str) -> None:
+        functions.solar_rad_retrieve(
+            request, path, ntries=1, logger=logger, urls=[server.url]
+        )
+
+    def run() -> dict[str, float]:
+        server.executions = 0
+        cache = cache_module.SegmentCache(str(tmp_path / "segments"))
+        if os.path.exists(cache.directory):
+            shutil.rmtree(cache.directory)
+        for request in requests:
+            if cached:
+                cache.retrieve(request, outfile, fetch, quiet_context())
+            else:
+                fetch(request, outfile)
+        return {"requests": len(requests), "executions": server.executions}
+
+    return run
@@ -0,0 +1,80 @@
+"""Request pipeline of the CDS adaptors, on the recorded requests.
+
+Each line of ``data/requests.jsonl`` holds the adaptor entry point, form, configuration
+and request of a dataset.
+"""
+
+import copy
+from typing import Any, Callable
+
+from ..fixtures import load_requests, make_adaptor
+from ..harness import register
+
+
+def register_request_cases(record: dict[str, Any]) -> None:
+    from cads_adaptors.tools import hcube_tools
+
+    name = record["name"]
+    request = record["request"]
+
+    def case(
+        suffix: str, description: str
+    ) -> Callable[[Callable[[Any], Callable[[], Any]]], None]:
+        def decorator(factory: Callable[[Any], Callable[[], Any]]) -> None:
+            register(f"{suffix}[{name}]", description)(
+                lambda tmp_path: factory(make_adaptor(record))
+            )
+
+        return decorator
+
+    @case("normalise_request", "Schema enforcement of the raw request")
+    def normalise_request(adaptor):
+        return lambda: adaptor.normalise_request(request)
+
+    @case("estimate_costs", "Cost estimation as done by the broker")
+    def estimate_costs(adaptor):
+        return lambda: adaptor.estimate_costs(request)
+
+    @case("constraints.validate", "Constraints validation of the form selection")
+    def validate_constraints(adaptor):
+        return lambda: adaptor.apply_constraints(request)
+
+    @case("constraints.intersect", "Legacy intersection with the constraints")
+    def intersect_constraints(adaptor):
+        working_request = adaptor.normalise_request(request)
+        return lambda: adaptor.intersect_constraints(working_request)
+
+    @case("mapping.apply_mapping", "Mapping of the intersected requests")
+    def apply_mapping(adaptor):
+        normalised = adaptor.normalise_request(request)
+        intersected = adaptor.get_intersected_requests(normalised)
+        return lambda: [adaptor.apply_mapping(r) for r in intersected]
+
+    @case("get_caching_args", "Full request pipeline up to the cache key")
+    def get_caching_args(adaptor):
+        return lambda: adaptor._get_caching_args(request)
+
+    @case("get_caching_args.memoised", "Memoised caching args of a repeated request")
+    def get_caching_args_memoised(adaptor):
+        adaptor.get_caching_args(request)
+        return lambda: adaptor.get_caching_args(request)
+
+    @case("hcube_tools", "Field counting, merge and subtraction of mapped requests")
+    def hcubes(adaptor):
+        mapped = adaptor._get_caching_args(request).mapped_requests
+        mapped = [{k: v for k, v in r.items() if isinstance(v, list)} for r in mapped]
+        halves = [
+            {**r, "date": r["date"][: len(r["date"]) // 2 or 1]} if "date" in r else r
+            for r in mapped
+        ]
+
+        def run() -> None:
+            hcube_tools.count_fields(mapped)
+            hcube_tools.hcubes_merge(copy.deepcopy(mapped))
+            hcube_tools.hcubes_subtract(mapped, halves)
+
+        return run
+
+
+for _record in load_requests():
+    register_request_cases(_record)
@@ -0,0 +1,148 @@
+"""Format conversion, on synthetic GRIB files and datasets."""
+
+import os
+import pathlib
+from typing import Any, Callable
+
+from ..fixtures import quiet_context, synthetic_grib
+from ..harness import register, register_variants
+
+
+@register("convertors.open_grib", "Open a synthetic GRIB file with cfgrib")
+def open_grib(tmp_path: pathlib.Path) -> Callable[[], Any]:
+    from cads_adaptors.tools import convertors
+
+    grib_file = str(synthetic_grib(tmp_path))
+    context = quiet_context()
+
+    def run() -> None:
+        datasets = convertors.open_grib_file_as_xarray_dictionary(
+            grib_file, context=context
+        )
+        for dataset in datasets.values():
+            dataset.load()
+
+    return run
+
+
+@register("convertors.grib_to_netcdf", "Convert a synthetic GRIB file to netCDF")
+def grib_to_netcdf(tmp_path: pathlib.Path) -> Callable[[], Any]:
+    from cads_adaptors.tools import convertors
+
+    grib_file = str(synthetic_grib(tmp_path))
+    target_dir = tmp_path / "netcdf"
+    target_dir.mkdir()
+    context = quiet_context()
+
+    return lambda: convertors.grib_to_netcdf_files(
+        grib_file, context=context, target_dir=str(target_dir)
+    )
+
+
+@register(
+    "convertors.netcdf_legacy",
+    "Convert a synthetic GRIB file to netCDF3 with the in-process grib_to_netcdf",
+)
+def netcdf_legacy(tmp_path: pathlib.Path) -> Callable[[], Any]:
+    from cads_adaptors.tools import netcdf_legacy
+
+    grib_file = str(synthetic_grib(tmp_path))
+    out_fname = str(tmp_path / "legacy.nc")
+
+    return lambda: netcdf_legacy.grib_to_netcdf_legacy(grib_file, out_fname)
+
+
+def multi_variable_datasets(count: int = 8) -> dict[str, Any]:
+    """Independent datasets of four variables, 24 hourly 1 degree global fields each."""
+    import numpy as np
+    import xarray as xr
+
+    rng = np.random.default_rng(0)
+    coords = {
+        "time": np.arange(24),
+        "latitude": np.linspace(90, -90, 181),
+        "longitude": np.arange(0, 360, 1.0),
+    }
+    return {
+        f"data_{i}": xr.Dataset(
+            {
+                name: (
+                    ("time", "latitude", "longitude"),
+                    # Smooth fields compress like real data, unlike white noise
+                    (
+                        280
+                        + rng.standard_normal((24, 181, 360)).cumsum(axis=1) * 0.1
+                        + rng.standard_normal((24, 181, 360)).cumsum(axis=2) * 0.1
+                    ).astype("float32"),
+                )
+                for name in ["t2m", "msl", "u10", "v10"]
+            },
+            coords=coords,
+        )
+        for i in range(count)
+    }
+
+
+@register_variants(
+    {
+        "convertors.xarray_dict_to_netcdf.serial": (
+            "Write 8 multi-variable datasets to netCDF serially",
+            {"max_workers": 1},
+        ),
+        "convertors.xarray_dict_to_netcdf.parallel": (
+            "Write 8 multi-variable datasets to netCDF in a process pool",
+            {"max_workers": None},
+        ),
+    }
+)
+def netcdf_writing(
+    tmp_path: pathlib.Path, max_workers: int | None
+) -> Callable[[], Any]:
+    from cads_adaptors.tools import convertors
+
+    datasets = multi_variable_datasets()
+    context = quiet_context()
+    workers = max_workers or max(2, len(os.sched_getaffinity(0)))
+
+    return lambda: convertors.xarray_dict_to_netcdf(
+        datasets, context=context, target_dir=str(tmp_path), max_workers=workers
+    )
+
+
+def compression(tmp_path: pathlib.Path, preset: str) -> Callable[[], Any]:
+    from cads_adaptors.tools import convertors
+
+    datasets = multi_variable_datasets(count=2)
+    nbytes = sum(dataset.nbytes for dataset in datasets.values())
+    context = quiet_context()
+
+    def run() -> dict[str, float]:
+        paths = convertors.xarray_dict_to_netcdf(
+            datasets,
+            context=context,
+            compression_options=preset,
+            target_dir=str(tmp_path),
+            max_workers=1,
+        )
+        size = sum(os.path.getsize(path) for path in paths)
+        return {"size_mib": size / 2**20, "ratio": nbytes / size}
+
+    return run
+
+
+def register_compression_cases() -> None:
+    from cads_adaptors.tools import convertors
+
+    register_variants(
+        {
+            f"convertors.compression[{preset}]": (
+                f"Write synthetic fields to netCDF with the {preset} compression"
+                " preset",
+                {"preset": preset},
+            )
+            for preset in convertors.STANDARD_COMPRESSION_OPTIONS
+        }
+    )(compression)
+
+
+register_compression_cases()
@@ -0,0 +1,143 @@
+"""MARS adaptors: post-processing, request splitting and multi-adaptor planning."""
+
+import copy
+import datetime
+import pathlib
+from typing import Any, Callable
+
+from ..fixtures import quiet_context, synthetic_grib
+from ..harness import register, register_variants
+from ..stand_ins import SyntheticMars
+
+
+@register(
+    "adaptors.mars.post_process",
+    "Daily means and their monthly maximum of a synthetic GRIB file, written to netCDF",
+)
+def mars_post_process(tmp_path: pathlib.Path) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.mars import MarsCdsAdaptor
+
+    grib_file = str(synthetic_grib(tmp_path))
+    adaptor = MarsCdsAdaptor(
+        form=None, context=quiet_context(), cache_tmp_path=tmp_path
+    )
+    steps = [{"method": "daily_mean"}, {"method": "monthly_max"}]
+
+    def run() -> dict[str, float]:
+        adaptor.post_process_reports = []
+        result = adaptor.post_process(grib_file, copy.deepcopy(steps))
+        adaptor.convert_format(
+            result, "netcdf", context=adaptor.context, target_dir=str(tmp_path)
+        )
+        # Wall time of each step, most of it in convert_format, which computes
+        # the datasets
+        return {
+            f"{report.name}_s": report.wall_time
+            for report in adaptor.post_process_reports
+        }
+
+    return run
+
+
+def decade_hourly_requests() -> list[dict[str, Any]]:
+    """Mapped MARS requests of ten years of hourly data of two experiment versions."""
+    start = datetime.date(2010, 1, 1)
+    dates = [
+        (start + datetime.timedelta(days=i)).strftime("%Y-%m-%d") for i in range(3653)
+    ]
+    return [
+        {
+            "class": "ea",
+            "expver": ["0001", "0005"],
+            "stream": "oper",
+            "type": "an",
+            "levtype": levtype,
+            "param": [str(param) for param in range(130, 140)],
+            "date": dates,
+            "time": [f"{hour:02d}:00" for hour in range(24)],
+        }
+        for levtype in ["sfc", "pl"]
+    ]
+
+
+def split_requests_variant(split_on: list[str]) -> tuple[str, dict[str, Any]]:
+    return (
+        f"Split decade-long hourly MARS requests on ALWAYS_SPLIT_ON and {split_on}",
+        {"split_on": split_on},
+    )
+
+
+@register_variants(
+    {
+        "general.split_requests_on_keys.month": split_requests_variant(
+            ["date", "__split_by_month"]
+        ),
+        "general.split_requests_on_keys.date": split_requests_variant(["date"]),
+    }
+)
+def split_requests(tmp_path: pathlib.Path, split_on: list[str]) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.mars import ALWAYS_SPLIT_ON
+    from cads_adaptors.tools import general
+
+    requests = decade_hourly_requests()
+    mapping = {"options": {"wants_dates": True}}
+
+    def run() -> dict[str, float]:
+        split = general.split_requests_on_keys(
+            requests, ALWAYS_SPLIT_ON + split_on, mapping=mapping
+        )
+        return {"requests": len(split)}
+
+    return run
+
+
+@register_variants(
+    {
+        "multi_mars.retrieve": (
+            "Retrieve 3 parameters of 20 dates/times from 3 sub-adaptors sharing"
+            " parameters, with a synthetic MARS stand-in",
+            {"deduplicate": True},
+        ),
+        "multi_mars.retrieve.duplicated": (
+            "Retrieve 3 parameters of 20 dates/times from 3 sub-adaptors sharing"
+            " parameters, with a synthetic MARS stand-in, without deduplicating fields",
+            {"deduplicate": False},
+        ),
+    }
+)
+def multi_mars_retrieve(tmp_path: pathlib.Path, deduplicate: bool) -> Callable[[], Any]:
+    from cads_adaptors.adaptors import multi
+
+    # Three sub-adaptors of a dataset, which share parameters mapped to the same
+    # MARS fields
+    mapping = {"rename": {"variable": "param"}, "force": {"grid": ["1/1"]}}
+    products = {"all": ["2t", "msl", "10u"], "surface": ["2t", "msl"], "2t": ["2t"]}
+    config = {
+        "extract_subrequest_kwargs": {"dont_split_keys": ["date", "time"]},
+        "deduplicate_fields": deduplicate,
+        "adaptors": {
+            product: {
+                "entry_point": "cads_adaptors:MarsCdsAdaptor",
+                "values": {"variable": params},
+                "mapping": mapping,
+            }
+            for product, params in products.items()
+        },
+    }
+    request = {
+        "variable": ["2t", "msl", "10u"],
+        "date": ["2024-01-01/2024-01-10"],
+        "time": ["00:00", "12:00"],
+        "data_format": ["grib"],
+    }
+    processing_kwargs: Any = {"download_format": "as_source", "post_process_steps": []}
+
+    def run() -> dict[str, float]:
+        with SyntheticMars(tmp_path).patch() as mars:
+            adaptor = multi.MultiMarsCdsAdaptor(
+                {}, cache_tmp_path=tmp_path, context=quiet_context(), **config
+            )
+            adaptor.retrieve_list_of_results([dict(request)], processing_kwargs)
+        return {"fields": mars.fields}
+
+    return run
@@ -0,0 +1,91 @@
+"""ROOCS adaptors: facet search in a synthetic facet table."""
+
+import copy
+import json
+import pathlib
+import random
+from typing import Any, Callable
+
+from ..fixtures import quiet_context
+from ..harness import register_variants
+
+
+def synthetic_facets(rows: int = 100_000, seed: int = 0) -> list[dict[str, str]]:
+    """Facet table of ``rows`` CMIP-style datasets."""
+    rng = random.Random(seed)
+    sources = [f"model-{i:02d}" for i in range(40)]
+    experiments = ["historical", "ssp126", "ssp245", "ssp370", "ssp585", "piControl"]
+    tables = ["Amon", "Omon", "Lmon", "day", "3hr", "fx"]
+    variables = [f"var{i:02d}" for i in range(30)]
+    return [
+        {
+            "project": "c3s-cmip6",
+            "activity_id": "ScenarioMIP",
+            "institution_id": "institute",
+            "source_id": rng.choice(sources),
+            "experiment_id": rng.choice(experiments),
+            "member_id": f"r{rng.randint(1, 10)}i1p1f{rng.randint(1, 3)}",
+            "table_id": rng.choice(tables),
+            "variable_id": rng.choice(variables),
+            "grid_label": "gn",
+            "version": f"v2019{rng.randint(1, 12):02d}01",
+        }
+        for _ in range(rows)
+    ]
+
+
+@register_variants(
+    {
+        "roocs.find_facets": (
+            "Find the facets of 10 requests in a 100k-row synthetic facet table",
+            {"cached": True},
+        ),
+        "roocs.find_facets.cold": (
+            "Find the facets of 10 requests in a 100k-row synthetic facet table,"
+            " building its index",
+            {"cached": False},
+        ),
+    }
+)
+def find_facets(tmp_path: pathlib.Path, cached: bool) -> Callable[[], Any]:
+    from cads_adaptors.adaptors.roocs import RoocsCdsAdaptor, facet_index
+
+    facets = synthetic_facets()
+    monthly = ["Amon", "Omon", "Lmon"]
+    config = {
+        "facets": facets,
+        "facets_order": list(facets[0]),
+        "facet_groups": {"table_id": {"monthly": monthly, "daily": ["day"]}},
+        "facet_search": {"member_id": "^r{member_id}i1p1f\\d+$"},
+    }
+    requests = [
+        {
+            "source_id": facet["source_id"],
+            "experiment_id": facet["experiment_id"],
+            "member_id": facet["member_id"].split("i")[0][1:],
+            "table_id": "monthly",
+            "variable_id": facet["variable_id"],
+        }
+        for facet in facets
+        if facet["table_id"] in monthly
+    ][:10]
+    # Configs are parsed for each job, so the adaptors do not share their facets
+    if cached:
+        RoocsCdsAdaptor(form=[], context=quiet_context(), **config).find_facets(
+            requests[0]
+        )
+    config = json.loads(json.dumps(config))
+
+    def run() -> dict[str, float]:
+        if not cached:
+            facet_index.clear_facet_index_cache()
+        # A new adaptor for each request, as in the broker and the workers
+        found = 0
+        for request in requests:
+            adaptor = RoocsCdsAdaptor(
+                form=[], context=quiet_context(), **copy.copy(config)
+            )
+            found += len(adaptor.find_facets(request))
+        return {"requests": len(requests), "found": found}
+
+    return run
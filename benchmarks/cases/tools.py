@@ -0,0 +1,254 @@
+"""Area selection, GRIB streaming and temporal reductions, on synthetic data."""
+
+import datetime
+import os
+import pathlib
+from typing import Any, Callable
+
+from ..fixtures import quiet_context, write_synthetic_grib
+from ..harness import register_variants
+
+
+def identical_grid_datasets(count: int = 50) -> list[Any]:
+    """Datasets on the same global 0.25 degree grid, as found in multi-file requests."""
+    import numpy as np
+    import xarray as xr
+
+    latitude = np.linspace(90, -90, 721)
+    longitude = np.arange(0, 360, 0.25)
+    rng = np.random.default_rng(0)
+    return [
+        xr.Dataset(
+            {
+                "t2m": (
+                    ("time", "latitude", "longitude"),
+                    rng.random((1, latitude.size, longitude.size), dtype="float32"),
+                )
+            },
+            coords={"time": [i], "latitude": latitude, "longitude": longitude},
+        )
+        for i in range(count)
+    ]
+
+
+@register_variants(
+    {
+        "area_selector.identical_grids": (
+            "Select a dateline-crossing area from 50 datasets on an identical grid",
+            {"cached": True},
+        ),
+        "area_selector.identical_grids.cold": (
+            "Select a dateline-crossing area from 50 datasets on an identical grid,"
+            " recomputing the slice plan for each dataset",
+            {"cached": False},
+        ),
+    }
+)
+def area_selector_identical_grids(
+    tmp_path: pathlib.Path, cached: bool
+) -> Callable[[], Any]:
+    from cads_adaptors.tools import area_selector
+
+    datasets = identical_grid_datasets()
+    context = quiet_context()
+    area: list[float | int] = [60, -30, 20, 40]
+
+    def run() -> None:
+        for ds in datasets:
+            if not cached:
+                area_selector.clear_slice_plan_cache()
+            area_selector.area_selector(ds, context=context, area=area)
+
+    return run
+
+
+def unstructured_grid_datasets(count: int = 20, points: int = 1_000_000) -> list[Any]:
+    """Datasets sharing an unstructured grid of randomly distributed points."""
+    import numpy as np
+    import xarray as xr
+
+    rng = np.random.default_rng(0)
+    latitude = np.degrees(np.arcsin(rng.uniform(-1, 1, points)))
+    longitude = rng.uniform(0, 360, points)
+    return [
+        xr.Dataset(
+            {"t2m": (("time", "values"), rng.random((1, points), dtype="float32"))},
+            coords={
+                "time": [i],
+                "latitude": ("values", latitude),
+                "longitude": ("values", longitude),
+            },
+        )
+        for i in range(count)
+    ]
+
+
+@register_variants(
+    {
+        "area_selector.unstructured": (
+            "Select a dateline-crossing area from 20 datasets on a 1M point"
+            " unstructured grid",
+            {"cached": True},
+        ),
+        "area_selector.unstructured.cold": (
+            "Select a dateline-crossing area from 20 datasets on a 1M point"
+            " unstructured grid, rebuilding the spatial index for each dataset",
+            {"cached": False},
+        ),
+    }
+)
+def area_selector_unstructured(
+    tmp_path: pathlib.Path, cached: bool
+) -> Callable[[], Any]:
+    from cads_adaptors.tools import area_selector
+
+    datasets = unstructured_grid_datasets()
+    context = quiet_context()
+    areas: list[list[float | int]] = [[60, 150, 20, 210], [10, -10, -10, 10]]
+
+    def run() -> None:
+        for ds in datasets:
+            for area in areas:
+                if not cached:
+                    area_selector.clear_slice_plan_cache()
+                area_selector.area_selector(ds, context=context, area=area)
+
+    return run
+
+
+def write_large_grib(path: pathlib.Path, size: int) -> pathlib.Path:
+    """Write a GRIB file of at least ``size`` bytes, with one message per date and time.
+
+    The values are encoded once and the message is cloned with new dates and times,
+    so that multi-GB files are written in a reasonable time.
+    """
+    import eccodes
+
+    sample = write_synthetic_grib(
+        path.with_suffix(".sample.grib"), ["2t"], [20240101], [0], resolution=0.25
+    )
+    with open(sample, "rb") as f:
+        handle = eccodes.codes_grib_new_from_file(f)
+    written = 0
+    validity = datetime.datetime(2024, 1, 1)
+    try:
+        with open(path, "wb") as f:
+            while written < size:
+                clone = eccodes.codes_clone(handle)
+                try:
+                    eccodes.codes_set_key_vals(
+                        clone,
+                        {
+                            "dataDate": int(f"{validity:%Y%m%d}"),
+                            "dataTime": int(f"{validity:%H%M}"),
+                        },
+                    )
+                    message = eccodes.codes_get_message(clone)
+                finally:
+                    eccodes.codes_release(clone)
+                f.write(message)
+                written += len(message)
+                validity += datetime.timedelta(hours=1)
+    finally:
+        eccodes.codes_release(handle)
+    sample.unlink()
+    return path
+
+
+def grib_stream_variant(size_mib: int) -> tuple[str, dict[str, Any]]:
+    return (
+        f"Select, cut and reorder the messages of a {size_mib} MiB GRIB file"
+        " without decoding it into xarray",
+        {"size_mib": size_mib},
+    )
+
+
+# Peak memory is the same for both sizes: set CADS_ADAPTORS_BENCHMARK_GRIB_MIB
+# to a few thousands to check it with multi-GB files.
+@register_variants(
+    {
+        "grib_stream.process.small": grib_stream_variant(64),
+        "grib_stream.process.large": grib_stream_variant(
+            int(os.getenv("CADS_ADAPTORS_BENCHMARK_GRIB_MIB", "512"))
+        ),
+    }
+)
+def grib_stream_process(tmp_path: pathlib.Path, size_mib: int) -> Callable[[], Any]:
+    from cads_adaptors.tools import grib_stream
+
+    grib_file = write_large_grib(tmp_path / "large.grib", size_mib * 2**20)
+    context = quiet_context()
+
+    def run() -> dict[str, float]:
+        grib_stream.process_grib_file(
+            str(grib_file),
+            str(tmp_path / "ordered.grib"),
+            select={"shortName": "2t"},
+            order_by=["dataTime", "dataDate"],
+            context=context,
+        )
+        # Area selection of every 8th hour
+        grib_stream.process_grib_file(
+            str(grib_file),
+            str(tmp_path / "area.grib"),
+            select={"dataTime": [0, 800, 1600]},
+            area=[60, -30, 20, 40],
+            context=context,
+        )
+        return {"input_mib": grib_file.stat().st_size / 2**20}
+
+    return run
+
+
+def write_hourly_netcdf(path: pathlib.Path, days: int = 62) -> pathlib.Path:
+    """Write hourly fields on a global 1 degree grid to netCDF."""
+    import numpy as np
+    import pandas as pd
+    import xarray as xr
+
+    times = pd.date_range("2024-01-01", periods=days * 24, freq="h")
+    latitude = np.linspace(90, -90, 181)
+    longitude = np.arange(0, 360, 1.0)
+    rng = np.random.default_rng(0)
+    data = rng.normal(280, 10, size=(times.size, latitude.size, longitude.size))
+    ds = xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data.astype("float32"))},
+        coords={"time": times, "latitude": latitude, "longitude": longitude},
+    )
+    ds.to_netcdf(path)
+    return path
+
+
+@register_variants(
+    {
+        "post_processors.temporal_reduce": (
+            "Daily and monthly means of two months of hourly fields",
+            {"streaming": True},
+        ),
+        "post_processors.temporal_reduce.earthkit": (
+            "Daily and monthly means of two months of hourly fields, with the"
+            " earthkit.transforms reductions",
+            {"streaming": False},
+        ),
+    }
+)
+def temporal_reduce(tmp_path: pathlib.Path, streaming: bool) -> Callable[[], Any]:
+    import xarray as xr
+    from earthkit.transforms import temporal
+
+    from cads_adaptors.tools import post_processors
+
+    path = write_hourly_netcdf(tmp_path / "hourly.nc")
+    context = quiet_context()
+
+    def run() -> None:
+        # Not loaded, nor chunked with dask
+        with xr.open_dataset(path) as ds:
+            if streaming:
+                post_processors.daily_reduce({"hourly": ds}, context=context)
+                post_processors.monthly_reduce({"hourly": ds}, context=context)
+            else:
+                temporal.daily_reduce(ds, how="mean")
+                temporal.monthly_reduce(ds, how="mean")
+
+    return run
@@ -0,0 +1,86 @@
+"""Inputs shared by the benchmark cases of several modules."""
+
+import copy
+import json
+import logging
+import pathlib
+from typing import Any, Iterator
+
+REQUESTS_PATH = pathlib.Path(__file__).parent / "data" / "requests.jsonl"
+
+
+def load_requests(path: pathlib.Path = REQUESTS_PATH) -> Iterator[dict[str, Any]]:
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def quiet_context() -> Any:
+    from cads_adaptors import Context
+
+    logger = logging.getLogger("cads_adaptors.benchmarks")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return Context(logger=logger)
+
+
+def make_adaptor(record: dict[str, Any]) -> Any:
+    from cads_adaptors import get_adaptor_class
+
+    adaptor_class = get_adaptor_class(record["adaptor"])
+    return adaptor_class(
+        form=record["form"], context=quiet_context(), **copy.deepcopy(record["config"])
+    )
+
+
+def write_synthetic_grib(
+    path: pathlib.Path,
+    short_names: list[str],
+    dates: list[int],
+    times: list[int],
+    resolution: float = 1.0,
+) -> pathlib.Path:
+    """Write a GRIB2 file of random fields on a global regular lat-lon grid."""
+    import eccodes
+    import numpy as np
+
+    ni = int(360 / resolution)
+    nj = int(180 / resolution) + 1
+    rng = np.random.default_rng(0)
+    with open(path, "wb") as f:
+        for short_name in short_names:
+            for date in dates:
+                for time in times:
+                    handle = eccodes.codes_grib_new_from_samples("regular_ll_sfc_grib2")
+                    try:
+                        eccodes.codes_set_key_vals(
+                            handle,
+                            {
+                                "Ni": ni,
+                                "Nj": nj,
+                                "latitudeOfFirstGridPointInDegrees": 90.0,
+                                "longitudeOfFirstGridPointInDegrees": 0.0,
+                                "latitudeOfLastGridPointInDegrees": -90.0,
+                                "longitudeOfLastGridPointInDegrees": 360.0 - resolution,
+                                "iDirectionIncrementInDegrees": resolution,
+                                "jDirectionIncrementInDegrees": resolution,
+                                "dataDate": date,
+                                "dataTime": time,
+                                "shortName": short_name,
+                            },
+                        )
+                        eccodes.codes_set_values(handle, 280 + 10 * rng.random(ni * nj))
+                        eccodes.codes_write(handle, f)
+                    finally:
+                        eccodes.codes_release(handle)
+    return path
+
+
+def synthetic_grib(tmp_path: pathlib.Path) -> pathlib.Path:
+    return write_synthetic_grib(
+        tmp_path / "synthetic.grib",
+        short_names=["2t", "msl", "10u", "10v"],
+        dates=[20240101, 20240102],
+        times=[0, 600, 1200, 1800],
+    )
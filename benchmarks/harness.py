@@ -0,0 +1,184 @@
+"""Minimal benchmark harness: registry, measurement and baseline comparison."""
+
+import dataclasses
+import datetime
+import fnmatch
+import functools
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+# A benchmark is registered as a setup function: it receives a scratch directory and
+# returns the callable to be timed, so that preparing the inputs is not measured.
+# The callable may return a dictionary of numbers (e.g. output sizes), which is
+# recorded with the timings as "metrics".
+Setup = Callable[[pathlib.Path], Callable[[], Any]]
+
+
+@dataclasses.dataclass
+class Benchmark:
+    name: str
+    setup: Setup
+    description: str = ""
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def register(name: str, description: str = "") -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name!r} is already registered")
+        BENCHMARKS[name] = Benchmark(name, setup, description or (setup.__doc__ or ""))
+        return setup
+
+    return decorator
+
+
+def register_variants(
+    variants: dict[str, tuple[str, dict[str, Any]]],
+) -> Callable[[Callable[..., Callable[[], Any]]], None]:
+    """Register a setup function once per variant.
+
+    ``variants`` maps the names of the benchmarks to their description and to the
+    keyword arguments of the setup function, e.g. with and without a cache.
+    """
+
+    def decorator(setup: Callable[..., Callable[[], Any]]) -> None:
+        for name, (description, kwargs) in variants.items():
+            register(name, description)(functools.partial(setup, **kwargs))
+
+    return decorator
+
+
+def select(patterns: list[str] | None = None) -> list[Benchmark]:
+    if not patterns:
+        return list(BENCHMARKS.values())
+    return [
+        benchmark
+        for name, benchmark in BENCHMARKS.items()
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    ]
+
+
+def autorange(func: Callable[[], Any], min_time: float) -> int:
+    """Number of calls per repeat so that a repeat lasts at least ``min_time``."""
+    number = 1
+    while True:
+        tic = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - tic >= min_time:
+            return number
+        number *= 2
+
+
+def measure(
+    func: Callable[[], Any], repeat: int = 5, min_time: float = 0.1
+) -> dict[str, Any]:
+    """Time ``func`` and record the peak memory allocated by a single call.
+
+    Timings are seconds per call. Memory is traced in a separate call, as
+    tracemalloc slows down the interpreter.
+    """
+    number = autorange(func, min_time)
+    timings = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - tic) / number)
+
+    tracemalloc.start()
+    try:
+        returned = func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result: dict[str, Any] = {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+        "peak_memory": peak_memory,
+    }
+    if isinstance(returned, dict):
+        result["metrics"] = returned
+    return result
+
+
+def run(
+    benchmarks: list[Benchmark],
+    repeat: int = 5,
+    min_time: float = 0.1,
+    log: Callable[[str], Any] = print,
+) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for benchmark in benchmarks:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            func = benchmark.setup(pathlib.Path(tmpdir))
+            results[benchmark.name] = result = measure(func, repeat, min_time)
+        metrics = "".join(
+            f" {key}={value:.4g}" for key, value in result.get("metrics", {}).items()
+        )
+        log(
+            f"{benchmark.name:<55} {result['median'] * 1e3:10.3f} ms "
+            f"{result['peak_memory'] / 2**20:9.2f} MiB{metrics}"
+        )
+    return {"metadata": metadata(), "benchmarks": results}
+
+
+def metadata() -> dict[str, Any]:
+    try:
+        from cads_adaptors import __version__
+    except ImportError:
+        __version__ = "unknown"
+    return {
+        "cads_adaptors": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.25
+) -> list[str]:
+    """Compare results with a baseline and return the list of regressions.
+
+    A benchmark regresses when its median time or its peak memory exceed the
+    baseline by more than ``tolerance`` (a fraction of the baseline value).
+    """
+    regressions = []
+    current = results["benchmarks"]
+    for name, reference in baseline["benchmarks"].items():
+        if name not in current:
+            continue
+        for key in ("median", "peak_memory"):
+            if not reference[key]:
+                continue
+            ratio = current[name][key] / reference[key]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name}: {key} x{ratio:.2f} of baseline")
+    return regressions
+
+
+def load(path: str | pathlib.Path) -> dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def dump(results: dict[str, Any], path: str | pathlib.Path) -> None:
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
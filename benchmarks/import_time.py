@@ -0,0 +1,51 @@
+"""Measure the cold import time of cads_adaptors.
+
+Each measurement runs in a fresh interpreter so that nothing is already cached in
+``sys.modules``. Usage::
+
+    python benchmarks/import_time.py [--repeat N] [statement ...]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_STATEMENTS = [
+    "import cads_adaptors",
+    "from cads_adaptors import AbstractCdsAdaptor",
+    "from cads_adaptors import MarsCdsAdaptor",
+    "from cads_adaptors import MultiMarsCdsAdaptor",
+    "import cads_adaptors.mapping",
+]
+
+
+def time_statement(statement: str) -> float:
+    code = (
+        "import time\n"
+        "tic = time.perf_counter()\n"
+        f"{statement}\n"
+        "print(time.perf_counter() - tic)"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    return float(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("statements", nargs="*", default=DEFAULT_STATEMENTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Warm up the filesystem and bytecode caches
+    time_statement("import cads_adaptors")
+    for statement in args.statements:
+        timings = [time_statement(statement) for _ in range(args.repeat)]
+        print(
+            f"{statement:<50} median={statistics.median(timings) * 1000:8.1f} ms"
+            f"  min={min(timings) * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
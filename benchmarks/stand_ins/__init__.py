@@ -0,0 +1,7 @@
+"""Local stand-ins for the services the adaptors retrieve from, shared by the cases."""
+
+from .http_server import LatencyServer
+from .mars import SyntheticMars
+from .wps_server import SolarWpsServer
+
+__all__ = ["LatencyServer", "SolarWpsServer", "SyntheticMars"]
@@ -0,0 +1,76 @@
+"""Local HTTP server of the files of a directory, with simulated network latency.
+
+Byte ranges are served (as by object stores), and the requests and bytes served are
+counted, so that benchmarks can report the round trips and the bytes they read.
+"""
+
+import http.server
+import os
+import re
+import threading
+import time
+from typing import Any
+
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "LatencyServer"
+
+    def send_file(self, head: bool) -> None:
+        time.sleep(self.server.latency)
+        path = os.path.join(self.server.directory, self.path.lstrip("/"))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size
+        match = RANGE_PATTERN.fullmatch(self.headers.get("Range", ""))
+        if match:
+            start = int(match[1])
+            end = min(int(match[2]) + 1, size) if match[2] else size
+        with open(path, "rb") as f:
+            f.seek(start)
+            content = f.read(end - start) if not head else b""
+        self.send_response(206 if match else 200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.end_headers()
+        self.wfile.write(content)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes_sent += len(content)
+
+    def do_HEAD(self) -> None:
+        self.send_file(head=True)
+
+    def do_GET(self) -> None:
+        self.send_file(head=False)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class LatencyServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, directory: str, latency: float = 0.02) -> None:
+        super().__init__(("127.0.0.1", 0), RangeRequestHandler)
+        self.directory = directory
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def reset_counts(self) -> None:
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
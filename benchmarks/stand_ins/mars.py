@@ -0,0 +1,36 @@
+"""Stand-in for MARS, which writes synthetic GRIB fields of the requests it executes.
+
+Its time is proportional to the number of fields, as for MARS, and it counts the
+fields it is asked for.
+"""
+
+import contextlib
+import pathlib
+from typing import Any, Iterator
+
+
+class SyntheticMars:
+    def __init__(self, target_dir: pathlib.Path) -> None:
+        self.target = str(target_dir / "data.grib")
+        self.fields = 0
+
+    def execute(self, requests: list[dict[str, Any]], **kwargs: Any) -> str:
+        from cads_adaptors.tools import hcube_tools, synthetic_data
+
+        self.fields += hcube_tools.count_fields(requests, ignore=["grid", "area"])
+        for i, request in enumerate(requests):
+            spec = synthetic_data.SyntheticSpec.from_request(request)
+            synthetic_data.write_grib(spec, self.target, "ab" if i else "wb")
+        return self.target
+
+    @contextlib.contextmanager
+    def patch(self) -> Iterator["SyntheticMars"]:
+        """Replace mars.execute_mars with the stand-in."""
+        from cads_adaptors.adaptors import mars
+
+        original = mars.execute_mars
+        setattr(mars, "execute_mars", self.execute)
+        try:
+            yield self
+        finally:
+            setattr(mars, "execute_mars", original)
@@ -0,0 +1,85 @@
+"""Local stand-in for the WPS service of the CAMS solar radiation data.
+
+It answers the Execute requests of cams_solar_rad.functions.template_xml synchronously,
+with a CSV series whose production time is proportional to its number of rows, as
+for the real service, and counts the executions.
+"""
+
+import datetime
+import http.server
+import re
+import threading
+import time
+from typing import Any
+
+INPUT_PATTERN = re.compile(
+    r"<ows:Identifier>(\w+)</ows:Identifier>\s*<wps:Data>\s*"
+    r"<wps:LiteralData>\s*([^<]*?)\s*</wps:LiteralData>"
+)
+STEPS = {"PT01M": 1, "PT15M": 15, "PT01H": 60, "P01D": 1440}
+
+
+class SolarWpsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "SolarWpsServer"
+
+    def send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        inputs = dict(INPUT_PATTERN.findall(body))
+        begin = datetime.datetime.fromisoformat(inputs["date_begin"])
+        end = datetime.datetime.fromisoformat(inputs["date_end"])
+        end += datetime.timedelta(days=1)
+        step = datetime.timedelta(minutes=STEPS[inputs["summarization"]])
+        rows = int((end - begin) / step)
+        time.sleep(rows * self.server.row_time)
+        lines = [
+            "# Title: stand-in",
+            f"# Date begin (ISO 8601): {begin.isoformat()}.0",
+            f"# Date end (ISO 8601): {end.isoformat()}.0",
+            "# Observation period;GHI",
+        ]
+        lines.extend(f"{begin + step * row};0.0" for row in range(rows))
+        with self.server.lock:
+            self.server.executions += 1
+            job_id = str(self.server.executions)
+            self.server.outputs[job_id] = ("\n".join(lines) + "\n").encode()
+        self.send(
+            '<wps:ExecuteResponse xmlns:wps="http://www.opengis.net/wps/1.0.0"'
+            ' xmlns:ows="http://www.opengis.net/ows/1.1">'
+            "<wps:Status><wps:ProcessSucceeded/></wps:Status><wps:ProcessOutputs>"
+            "<wps:Output><ows:Identifier>irradiation</ows:Identifier>"
+            f'<wps:Reference href="{self.server.url}/{job_id}"/></wps:Output>'
+            "</wps:ProcessOutputs></wps:ExecuteResponse>".encode(),
+            "text/xml",
+        )
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            content = self.server.outputs.pop(self.path.lstrip("/"))
+        self.send(content, "text/csv")
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class SolarWpsServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, row_time: float = 1e-5) -> None:
+        super().__init__(("127.0.0.1", 0), SolarWpsHandler)
+        self.row_time = row_time
+        self.lock = threading.Lock()
+        self.executions = 0
+        self.outputs: dict[str, bytes] = {}
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
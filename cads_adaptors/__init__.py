@@ -22,23 +22,78 @@ except ImportError:  # pragma: no cover
     # Local copy or not installed with setuptools
     __version__ = "999"
 
-from cads_adaptors.adaptors import AbstractAdaptor, Context, DummyAdaptor
-from cads_adaptors.adaptors.arco import ArcoDataLakeCdsAdaptor
-from cads_adaptors.adaptors.cadsobs.adaptor import ObservationsAdaptor
-from cads_adaptors.adaptors.cams_regional_fc import (
-    CAMSEuropeAirQualityForecastsAdaptor,
-    CAMSEuropeAirQualityForecastsAdaptorForArchivedData,
-    CAMSEuropeAirQualityForecastsAdaptorForLatestData,
-)
-from cads_adaptors.adaptors.cams_solar_rad import CamsSolarRadiationTimeseriesAdaptor
-from cads_adaptors.adaptors.cds import AbstractCdsAdaptor, DummyCdsAdaptor
-from cads_adaptors.adaptors.daily_statistics import Era5DailyStatisticsCdsAdaptor
-from cads_adaptors.adaptors.mars import DirectMarsCdsAdaptor, MarsCdsAdaptor
-from cads_adaptors.adaptors.multi import MultiAdaptor, MultiMarsCdsAdaptor
-from cads_adaptors.adaptors.roocs import RoocsCdsAdaptor
-from cads_adaptors.adaptors.url import UrlCdsAdaptor
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from cads_adaptors.adaptors import AbstractAdaptor, Context, DummyAdaptor
+    from cads_adaptors.adaptors.arco import ArcoDataLakeCdsAdaptor
+    from cads_adaptors.adaptors.cadsobs.adaptor import ObservationsAdaptor
+    from cads_adaptors.adaptors.cams_regional_fc import (
+        CAMSEuropeAirQualityForecastsAdaptor,
+        CAMSEuropeAirQualityForecastsAdaptorForArchivedData,
+        CAMSEuropeAirQualityForecastsAdaptorForLatestData,
+    )
+    from cads_adaptors.adaptors.cams_solar_rad import (
+        CamsSolarRadiationTimeseriesAdaptor,
+    )
+    from cads_adaptors.adaptors.cds import AbstractCdsAdaptor, DummyCdsAdaptor
+    from cads_adaptors.adaptors.daily_statistics import Era5DailyStatisticsCdsAdaptor
+    from cads_adaptors.adaptors.mars import (
+        DirectMarsCdsAdaptor,
+        DummyMarsCdsAdaptor,
+        MarsCdsAdaptor,
+    )
+    from cads_adaptors.adaptors.multi import MultiAdaptor, MultiMarsCdsAdaptor
+    from cads_adaptors.adaptors.roocs import RoocsCdsAdaptor
+    from cads_adaptors.adaptors.url import UrlCdsAdaptor
+
+    from .tools.adaptor_tools import get_adaptor_class
+
+# The public names are imported on first access (PEP 562), so that processes that
+# only need a few adaptors (e.g. the broker, for costing and constraints) do not pay
+# for importing all of them.
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "get_adaptor_class": "cads_adaptors.tools.adaptor_tools",
+    "AbstractAdaptor": "cads_adaptors.adaptors",
+    "Context": "cads_adaptors.adaptors",
+    "DummyAdaptor": "cads_adaptors.adaptors",
+    "ArcoDataLakeCdsAdaptor": "cads_adaptors.adaptors.arco",
+    "ObservationsAdaptor": "cads_adaptors.adaptors.cadsobs.adaptor",
+    "CAMSEuropeAirQualityForecastsAdaptor": "cads_adaptors.adaptors.cams_regional_fc",
+    "CAMSEuropeAirQualityForecastsAdaptorForArchivedData": (
+        "cads_adaptors.adaptors.cams_regional_fc"
+    ),
+    "CAMSEuropeAirQualityForecastsAdaptorForLatestData": (
+        "cads_adaptors.adaptors.cams_regional_fc"
+    ),
+    "CamsSolarRadiationTimeseriesAdaptor": "cads_adaptors.adaptors.cams_solar_rad",
+    "AbstractCdsAdaptor": "cads_adaptors.adaptors.cds",
+    "DummyCdsAdaptor": "cads_adaptors.adaptors.cds",
+    "Era5DailyStatisticsCdsAdaptor": "cads_adaptors.adaptors.daily_statistics",
+    "DirectMarsCdsAdaptor": "cads_adaptors.adaptors.mars",
+    "DummyMarsCdsAdaptor": "cads_adaptors.adaptors.mars",
+    "MarsCdsAdaptor": "cads_adaptors.adaptors.mars",
+    "MultiAdaptor": "cads_adaptors.adaptors.multi",
+    "MultiMarsCdsAdaptor": "cads_adaptors.adaptors.multi",
+    "RoocsCdsAdaptor": "cads_adaptors.adaptors.roocs",
+    "UrlCdsAdaptor": "cads_adaptors.adaptors.url",
+}
+
+
+def __getattr__(name: str) -> Any:
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
-from .tools.adaptor_tools import get_adaptor_class
 
 __all__ = [
     "__version__",
@@ -49,6 +104,7 @@ __all__ = [
     "DirectMarsCdsAdaptor",
     "DummyAdaptor",
     "DummyCdsAdaptor",
+    "DummyMarsCdsAdaptor",
     "MarsCdsAdaptor",
     "UrlCdsAdaptor",
     "MultiAdaptor",
@@ -2,6 +2,7 @@ import abc
 import contextlib
 import datetime
 import itertools
+import json
 import pathlib
 import time
 import zipfile
@@ -9,6 +10,7 @@ from typing import Any, BinaryIO
 
 import cads_adaptors.models
 import cads_adaptors.tools.general
+import cads_adaptors.tools.instrumentation
 import cads_adaptors.tools.logger
 
 Request = dict[str, Any]
@@ -16,11 +18,21 @@ CHUNK_SIZE = 10240
 
 
 class Context:
+    # Class-level default, so that subclasses which do not call __init__ still work
+    instrumentation: cads_adaptors.tools.instrumentation.NullInstrumentation = (
+        cads_adaptors.tools.instrumentation.NULL_INSTRUMENTATION
+    )
+    # Number of user-visible logs and errors emitted. Subclasses overriding the
+    # add_user_visible_* methods call them through super() to be counted.
+    user_visible_messages: int = 0
+
     def __init__(
         self,
         job_id: str = "job_id",
         logger: Any | None = None,
         write_type: str = "stdout",
+        instrumentation: cads_adaptors.tools.instrumentation.NullInstrumentation
+        | None = None,
     ):
         self.job_id = job_id
         if not logger:
@@ -29,6 +41,11 @@ class Context:
             self.logger = logger
         self.write_type = write_type
         self.messages_buffer = ""
+        if instrumentation is None:
+            instrumentation = (
+                cads_adaptors.tools.instrumentation.instrumentation_from_env()
+            )
+        self.instrumentation = instrumentation
 
     def write(self, message: str) -> None:
         """Use the logger as a file-like object. Needed by tqdm progress bar."""
@@ -44,10 +61,10 @@ class Context:
             self.messages_buffer = ""
 
     def add_user_visible_log(self, message: str, session: Any | None = None) -> None:
-        pass
+        self.user_visible_messages += 1
 
     def add_user_visible_error(self, message: str, session: Any | None = None) -> None:
-        pass
+        self.user_visible_messages += 1
 
     def add_stdout(
         self, message: str, log_type: str = "info", session: Any | None = None, **kwargs
@@ -85,6 +102,26 @@ class Context:
     def exception(self, *args, **kwargs):
         self.add_stderr(*args, log_type="exception", **kwargs)
 
+    def span(self, name: str) -> contextlib.AbstractContextManager[None]:
+        """Time the enclosed block as a (possibly nested) stage of the job."""
+        return self.instrumentation.span(name)
+
+    def count(self, name: str, value: int | float = 1) -> None:
+        self.instrumentation.count(name, value)
+
+    def gauge_bytes(self, name: str, nbytes: int) -> None:
+        self.instrumentation.gauge_bytes(name, nbytes)
+
+    def log_instrumentation_summary(self) -> None:
+        """Log the spans, counters and gauges recorded so far, if instrumented."""
+        if not self.instrumentation.enabled:
+            return
+        summary = self.instrumentation.summary()
+        self.info(
+            f"Instrumentation summary:\n{json.dumps(summary, indent=2)}",
+            instrumentation=summary,
+        )
+
 
 class AbstractAdaptor(abc.ABC):
     resources: dict[str, int] = {}
@@ -335,12 +372,15 @@ class DummyAdaptor(AbstractAdaptor):
 
                 self.context.add_stdout(f"Writing {size} B to {dummy_file!s}")
                 tic = time.perf_counter()
-                with dummy_file.open("wb") as netcdf_fp:
-                    with open("/dev/urandom", "rb") as random:
-                        while size > 0:
-                            length = min(size, CHUNK_SIZE)
-                            netcdf_fp.write(random.read(length))
-                            size -= length
+                if "synthetic" in request:
+                    self.write_synthetic(request, dummy_file, "grib")
+                else:
+                    with dummy_file.open("wb") as netcdf_fp:
+                        with open("/dev/urandom", "rb") as random:
+                            while size > 0:
+                                length = min(size, CHUNK_SIZE)
+                                netcdf_fp.write(random.read(length))
+                                size -= length
                 toc = time.perf_counter()
                 self.context.add_stdout(
                     f"Elapsed time to write the file: {toc - tic} s"
@@ -348,6 +388,9 @@ class DummyAdaptor(AbstractAdaptor):
             case "netcdf":
                 # Retrieve cached grib and convert
                 dummy_file = self.cache_tmp_path / "dummy.nc"
+                if "synthetic" in request:
+                    self.write_synthetic(request, dummy_file, "netcdf")
+                    return dummy_file.open("rb")
                 with cacholote.config.set(return_cache_entry=False):
                     grib_fp = self.retrieve(request | {"format": "grib"})
                 with dummy_file.open("wb") as netcdf_fp:
@@ -384,6 +427,23 @@ class DummyAdaptor(AbstractAdaptor):
                 raise NotImplementedError(f"{format=}")
         return dummy_file.open("rb")
 
+    def write_synthetic(
+        self, request: Request, path: pathlib.Path, data_format: str
+    ) -> None:
+        """Write valid synthetic data of the "synthetic" spec of a request.
+
+        The spec is a MARS-like request (param, levelist, date, time, grid, area and
+        seed), and without a grid the data is about "size" bytes in GRIB.
+        """
+        from cads_adaptors.tools import synthetic_data
+
+        spec = synthetic_data.SyntheticSpec.from_request(
+            request["synthetic"], size=request["size"] or None
+        )
+        with self.context.span("synthetic_data"):
+            synthetic_data.write(spec, str(path), data_format)
+        self.context.gauge_bytes("synthetic_data", path.stat().st_size)
+
     def make_receipt(
         self,
         request: Request,
@@ -100,6 +100,7 @@ class ObservationsAdaptor(AbstractCdsAdaptor):
             field_attributes,
             global_attributes,
             self.context,
+            use_asset_index=self.config.get("asset_index", False),
         )
         return [str(output_path)]
 
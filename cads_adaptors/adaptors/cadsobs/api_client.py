@@ -1,10 +1,57 @@
-from typing import Literal
+import copy
+import os
+import threading
+from typing import Any, Literal
 
 from cads_adaptors import Context
 from cads_adaptors.exceptions import CadsObsConnectionError
+from cads_adaptors.tools.general import TTLCache
 
 RequestMethod = Literal["GET", "POST"]
 
+# Time-to-live (in seconds) of the cached responses of the metadata endpoints (service
+# definitions, CDM lite variables and disabled fields), which rarely change. It can be
+# overridden with the CADSOBS_API_CACHE_TTL env var. Once expired, the responses are
+# revalidated with their ETag, if the API sent one.
+CADSOBS_API_CACHE_TTL = 300.0
+# Time-to-live (in seconds) of the ETags of the cached responses
+CADSOBS_API_ETAG_TTL = 24 * 3600.0
+
+_RESPONSES = TTLCache(ttl=CADSOBS_API_CACHE_TTL, maxsize=256)
+_ETAGS = TTLCache(ttl=CADSOBS_API_ETAG_TTL, maxsize=256)
+
+# One keep-alive session per API base URL, shared by the clients of the process
+_SESSIONS: dict[str, Any] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _cache_ttl() -> float:
+    try:
+        return float(os.environ.get("CADSOBS_API_CACHE_TTL", CADSOBS_API_CACHE_TTL))
+    except ValueError:
+        return CADSOBS_API_CACHE_TTL
+
+
+def get_session(baseurl: str) -> Any:
+    """Get the (pooled) requests session of an API base URL."""
+    import requests
+
+    with _SESSIONS_LOCK:
+        if (session := _SESSIONS.get(baseurl)) is None:
+            session = _SESSIONS[baseurl] = requests.Session()
+    return session
+
+
+def clear_cache() -> None:
+    """Drop the cached responses and close the pooled sessions."""
+    _RESPONSES.clear()
+    _ETAGS.clear()
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
+
 
 class CadsobsApiClient:
     """API Client for the observations repository HTTP API."""
@@ -22,6 +69,16 @@ class CadsobsApiClient:
 
     def _send_request_and_capture_exceptions(
         self, method: RequestMethod, endpoint: str, payload: dict | None = None
+    ):
+        """Send a request and handle possible errors, returning the decoded JSON."""
+        return self._get_response(method, endpoint, payload).json()
+
+    def _get_response(
+        self,
+        method: RequestMethod,
+        endpoint: str,
+        payload: dict | None = None,
+        headers: dict[str, str] | None = None,
     ):
         """Send a request and handle possible errors.
 
@@ -34,7 +91,7 @@ class CadsobsApiClient:
         """
         requests = self.requests
         try:
-            response = self._send_request(endpoint, method, payload)
+            response = self._send_request(endpoint, method, payload, headers)
             response.raise_for_status()
         except (
             requests.ConnectionError,
@@ -54,15 +111,43 @@ class CadsobsApiClient:
                 f"Request to observations API failed: {message}",
                 CadsObsConnectionError,
             )
-        return response.json()
-
-    def _send_request(self, endpoint: str, method: RequestMethod, payload: dict | None):
-        with self.requests.Session() as session:
-            response = session.request(
-                method=method, url=f"{self.baseurl}/{endpoint}", json=payload
-            )
         return response
 
+    def _send_request(
+        self,
+        endpoint: str,
+        method: RequestMethod,
+        payload: dict | None,
+        headers: dict[str, str] | None = None,
+    ):
+        return get_session(self.baseurl).request(
+            method=method,
+            url=f"{self.baseurl}/{endpoint}",
+            json=payload,
+            headers=headers,
+        )
+
+    def _get_cached(self, endpoint: str) -> Any:
+        """GET a metadata endpoint, from the cache while fresh, revalidating by ETag."""
+        key = (self.baseurl, endpoint)
+        if (body := _RESPONSES.get(key)) is not None:
+            self.context.count("cadsobs_api.cache.hits")
+            return copy.deepcopy(body)
+        self.context.count("cadsobs_api.cache.misses")
+
+        etag = _ETAGS.get(key)
+        headers = {"If-None-Match": etag[0]} if etag is not None else None
+        response = self._get_response("GET", endpoint, headers=headers)
+        if response.status_code == 304 and etag is not None:
+            self.context.count("cadsobs_api.cache.revalidated")
+            body = etag[1]
+        else:
+            body = response.json()
+            if response.headers.get("ETag"):
+                _ETAGS.set(key, (response.headers["ETag"], body))
+        _RESPONSES.set(key, body, ttl=_cache_ttl())
+        return copy.deepcopy(body)
+
     def _get_error_message(self, response) -> tuple[str, str]:
         """Get information on the error from the request response."""
         try:
@@ -80,12 +165,10 @@ class CadsobsApiClient:
         return message, traceback
 
     def get_service_definition(self, dataset: str) -> dict:
-        return self._send_request_and_capture_exceptions(
-            "GET", f"{dataset}/service_definition"
-        )
+        return self._get_cached(f"{dataset}/service_definition")
 
     def get_cdm_lite_variables(self) -> dict:
-        return self._send_request_and_capture_exceptions("GET", "cdm/lite_variables")
+        return self._get_cached("cdm/lite_variables")
 
     def get_objects_to_retrieve(
         self, dataset_name: str, mapped_request: dict
@@ -122,8 +205,8 @@ class CadsobsApiClient:
     def get_disabled_fields(self, dataset_name: str, dataset_source: str) -> list[str]:
         """Get the list of fields that are disabled for the given dataset."""
         try:
-            response = self._send_request_and_capture_exceptions(
-                "GET", f"/{dataset_name}/{dataset_source}/disabled_fields"
+            response = self._get_cached(
+                f"/{dataset_name}/{dataset_source}/disabled_fields"
             )
         except CadsObsConnectionError as e:
             self.context.warning(
@@ -0,0 +1,212 @@
+"""Index of the stations, times and positions of the observations of each asset.
+
+The assets returned by the observations API match the time and space partition of the
+request, but may hold none of the requested stations. A sidecar JSON file next to each
+asset (its URL plus INDEX_SUFFIX) summarises the observations of the asset, so that the
+assets which can not match the request are dropped before they are opened. Sidecars
+are fetched concurrently, and cached in memory and optionally in a local directory
+(CADS_ADAPTORS_CADSOBS_ASSET_INDEX_DIR). Assets without a sidecar are always kept.
+Pruning is opt-in, per dataset (the asset_index flag of the adaptor configuration),
+as it costs a request per asset until the sidecars are written.
+
+A cached sidecar may be older than its asset, if the asset was rewritten since, and
+would then drop an asset which now matches the request. Sidecars are therefore only
+cached for a few minutes (CADS_ADAPTORS_CADSOBS_ASSET_INDEX_TTL), to spare the
+requests of retrievals of the same assets in a row. They are not revalidated: they
+are small, so that a conditional request would cost as much as fetching them again.
+Missing sidecars are cached for longer (ASSET_INDEX_MISSING_TTL), as a sidecar
+written since only lets more assets be dropped: keeping them is always correct.
+"""
+
+import dataclasses
+import json
+import logging
+import os
+from typing import Any
+
+import cftime
+import h5netcdf
+import numpy
+from fsspec import AbstractFileSystem
+
+from cads_adaptors import Context
+from cads_adaptors.adaptors.cadsobs.char_utils import concat_str_array
+from cads_adaptors.adaptors.cadsobs.models import RetrieveParams
+from cads_adaptors.adaptors.cadsobs.utils import get_param_name_in_data
+from cads_adaptors.tools import request_cache
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index.json"
+
+# Default time-to-live, in seconds, of the loaded sidecars
+ASSET_INDEX_CACHE_TTL = 300.0
+# Time-to-live, in seconds, of the missing or invalid sidecars
+ASSET_INDEX_MISSING_TTL = 24 * 3600.0
+_SUMMARIES = request_cache.RequestCache(ASSET_INDEX_CACHE_TTL, maxsize=100_000)
+
+Bounds = tuple[float, float]
+
+
+@dataclasses.dataclass
+class AssetSummary:
+    """Stations, and bounds of the raw times and positions, of an asset."""
+
+    stations: list[str]
+    time_bounds: Bounds | None = None
+    time_units: str | None = None
+    latitude_bounds: Bounds | None = None
+    longitude_bounds: Bounds | None = None
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> "AssetSummary":
+        summary = cls(**value)
+        for field in ["time_bounds", "latitude_bounds", "longitude_bounds"]:
+            bounds = getattr(summary, field)
+            if bounds is not None:
+                setattr(summary, field, tuple(bounds))
+        return summary
+
+
+def _cache_ttl() -> float:
+    try:
+        return float(
+            os.environ.get(
+                "CADS_ADAPTORS_CADSOBS_ASSET_INDEX_TTL", ASSET_INDEX_CACHE_TTL
+            )
+        )
+    except ValueError:
+        return ASSET_INDEX_CACHE_TTL
+
+
+def _bounds(values: numpy.ndarray) -> Bounds | None:
+    values = values[numpy.isfinite(values)]
+    if values.size == 0:
+        return None
+    return float(values.min()), float(values.max())
+
+
+def summarize_asset(incobj: h5netcdf.File) -> AssetSummary:
+    """Summarise the observations of an asset."""
+    stations = concat_str_array(incobj.variables["primary_station_id"][:])
+    summary = AssetSummary(
+        stations=[station.decode("utf-8") for station in numpy.unique(stations)]
+    )
+    timestamp = incobj.variables["report_timestamp"]
+    summary.time_bounds = _bounds(timestamp[:])
+    summary.time_units = timestamp.attrs["units"]
+    for coord in ["latitude", "longitude"]:
+        variable = get_param_name_in_data(incobj, f"{coord}_coverage")
+        if variable in incobj.variables:
+            bounds = _bounds(incobj.variables[variable][:])
+            setattr(summary, f"{coord}_bounds", bounds)
+    return summary
+
+
+def write_asset_index(path: str | os.PathLike[str]) -> str:
+    """Write the sidecar of the asset at a local path, and return its path."""
+    with h5netcdf.File(path, "r") as incobj:
+        summary = summarize_asset(incobj)
+    index_path = f"{os.fspath(path)}{INDEX_SUFFIX}"
+    with open(index_path, "w") as f:
+        json.dump(dataclasses.asdict(summary), f)
+    return index_path
+
+
+def _overlaps(bounds: Bounds | None, coverage: Bounds) -> bool:
+    """Whether values in bounds may be in start <= value < end, as in the masks."""
+    if bounds is None:
+        return True
+    return bounds[0] < coverage[1] and bounds[1] >= coverage[0]
+
+
+def matches(summary: AssetSummary, params: RetrieveParams) -> bool:
+    """Whether the asset may hold observations selected by the request."""
+    if params.stations is not None and not set(params.stations).intersection(
+        summary.stations
+    ):
+        return False
+    if (
+        params.time_coverage is not None
+        and summary.time_bounds is not None
+        and summary.time_units is not None
+    ):
+        coverage = cftime.date2num(params.time_coverage, units=summary.time_units)
+        if not _overlaps(summary.time_bounds, coverage):
+            return False
+    for coord in ["latitude", "longitude"]:
+        coverage = getattr(params, f"{coord}_coverage")
+        if coverage is not None and not _overlaps(
+            getattr(summary, f"{coord}_bounds"), coverage
+        ):
+            return False
+    return True
+
+
+def load_summaries(
+    fs: AbstractFileSystem, object_urls: list[str], context: Context
+) -> dict[str, AssetSummary | None]:
+    """Summaries of the assets, or None for the assets without a sidecar."""
+    directory = os.getenv("CADS_ADAPTORS_CADSOBS_ASSET_INDEX_DIR")
+    cached: dict[str, dict[str, Any] | None] = {}
+    for url in object_urls:
+        cached[url] = _SUMMARIES.get(request_cache.canonical_digest(url), directory)
+    missing = [url for url, value in cached.items() if value is None]
+    if len(missing) < len(object_urls):
+        context.count("cadsobs.asset_index.hits", len(object_urls) - len(missing))
+    if missing:
+        context.count("cadsobs.asset_index.misses", len(missing))
+        index_urls = [url + INDEX_SUFFIX for url in missing]
+        contents = fs.cat(index_urls, on_error="return")
+        for url, index_url in zip(missing, index_urls):
+            content = contents.get(index_url)
+            try:
+                value = json.loads(content)  # type: ignore[arg-type]
+            except (TypeError, ValueError):
+                # Missing or invalid sidecars are cached too, as an empty summary
+                logger.debug(f"No valid index of {url}: {content!r:.200}")
+                value = {}
+            _SUMMARIES.set(
+                request_cache.canonical_digest(url),
+                value,
+                ttl=_cache_ttl() if value else ASSET_INDEX_MISSING_TTL,
+                directory=directory,
+            )
+            cached[url] = value
+    return {
+        url: AssetSummary.from_dict(value) if value else None
+        for url, value in cached.items()
+    }
+
+
+def prune_assets(
+    fs: AbstractFileSystem,
+    object_urls: list[str],
+    params: RetrieveParams,
+    context: Context,
+) -> list[str]:
+    """Drop the assets which, according to their sidecar, can not match the request."""
+    if not object_urls or (
+        params.stations is None
+        and params.time_coverage is None
+        and params.latitude_coverage is None
+        and params.longitude_coverage is None
+    ):
+        return object_urls
+    summaries = load_summaries(fs, object_urls, context)
+    kept = [
+        url
+        for url in object_urls
+        if (summary := summaries[url]) is None or matches(summary, params)
+    ]
+    if len(kept) < len(object_urls):
+        context.count("cadsobs.assets.pruned", len(object_urls) - len(kept))
+        context.debug(
+            f"{len(object_urls) - len(kept)} of {len(object_urls)} objects can not "
+            f"match the request and are not filtered"
+        )
+    return kept
+
+
+def clear_cache() -> None:
+    _SUMMARIES.clear()
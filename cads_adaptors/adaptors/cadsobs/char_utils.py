@@ -5,6 +5,7 @@ import numpy
 from fsspec.implementations.http import HTTPFileSystem
 
 from cads_adaptors.adaptors.cadsobs.codes import get_code_mapping
+from cads_adaptors.adaptors.cadsobs.read_planner import read_rows
 from cads_adaptors.adaptors.cadsobs.utils import get_url_ncobj
 
 
@@ -61,21 +62,15 @@ def dump_char_variable(
     mask: numpy.typing.NDArray,
     new_size: int,
     ovar: h5netcdf.Variable,
-    download_all_chunk: bool,
+    row_spans: list[tuple[int, int]],
 ):
     if ivar != "observed_variable":
         actual_str_dim_size = ivarobj.shape[-1]
-        if download_all_chunk:
-            data = ivarobj[:, 0:actual_str_dim_size][mask, :]
-        else:
-            data = ivarobj[mask, 0:actual_str_dim_size]
+        data = read_rows(ivarobj, mask, row_spans, slice(0, actual_str_dim_size))
         ovar[current_size:new_size, 0:actual_str_dim_size] = data
     else:
         # For observed variable, we use the attributes to decode the integers.
-        if download_all_chunk:
-            data = ivarobj[:][mask]
-        else:
-            data = ivarobj[mask]
+        data = read_rows(ivarobj, mask, row_spans)
         code2var = get_code_mapping(incobj, inverse=True)
         codes_in_data, inverse = numpy.unique(data, return_inverse=True)
         variables_in_data = numpy.array(
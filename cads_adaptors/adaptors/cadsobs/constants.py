@@ -1,3 +1,2 @@
-MAX_NUMBER_OF_GROUPS = 10
 TIME_UNITS_REFERENCE_DATE = "1900-01-01 00:00:00"
 SPATIAL_COORDINATES = ["latitude", "longitude"]
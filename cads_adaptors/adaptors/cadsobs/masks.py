@@ -0,0 +1,221 @@
+"""Masks of the requested observations of an asset, computed in one pass over chunks.
+
+The request is turned once into predicates on the raw (encoded) values of the asset
+variables: the time bounds are converted to the units of the timestamps, and the days
+of the month are looked up from the timestamps without decoding them to dates. The
+predicates are then evaluated chunk by chunk, combining them in place. The most
+selective predicates are evaluated first, and the variables of the other predicates
+are not read for the chunks with no observation left.
+"""
+
+import dataclasses
+import logging
+import math
+from typing import Any, Callable
+
+import cftime
+import h5netcdf
+import numpy
+
+from cads_adaptors.adaptors.cadsobs.char_utils import concat_str_array
+from cads_adaptors.adaptors.cadsobs.codes import get_code_mapping
+from cads_adaptors.adaptors.cadsobs.constants import TIME_UNITS_REFERENCE_DATE
+from cads_adaptors.adaptors.cadsobs.models import RetrieveParams
+from cads_adaptors.adaptors.cadsobs.utils import get_param_name_in_data
+from cads_adaptors.exceptions import CadsObsRuntimeError
+
+logger = logging.getLogger(__name__)
+
+# Number of observations read and masked at once
+MASK_CHUNK_SIZE = 2**20
+
+# Average length of the runs of equal strings under which they are compared one by one
+MIN_RUN_LENGTH = 4
+
+SECONDS_PER_DAY = 86400
+REFERENCE_DAY = numpy.datetime64(TIME_UNITS_REFERENCE_DATE, "D")
+
+
+@dataclasses.dataclass
+class Predicate:
+    """Condition on the values of a variable, which are read a chunk at a time."""
+
+    name: str
+    variable: str
+    test: Callable[[numpy.ndarray], numpy.ndarray]
+    # Observations which the predicate was evaluated for, and which it selected
+    evaluated: int = 0
+    selected: int = 0
+
+    @property
+    def selectivity(self) -> float:
+        return self.selected / self.evaluated if self.evaluated else 1.0
+
+
+def isin(values: Any) -> Callable[[numpy.ndarray], numpy.ndarray]:
+    """Test for data in values.
+
+    Strings (e.g. station ids) are sorted to be compared, so they are compared once per
+    run of equal values, as the observations of a station are stored together.
+    """
+
+    def test(data: numpy.ndarray) -> numpy.ndarray:
+        if data.dtype.kind not in "SU" or data.size == 0:
+            return numpy.isin(data, values)
+        starts = numpy.flatnonzero(data[1:] != data[:-1]) + 1
+        if starts.size > data.size // MIN_RUN_LENGTH:
+            return numpy.isin(data, values)
+        starts = numpy.concatenate([[0], starts])
+        return numpy.repeat(
+            numpy.isin(data[starts], values), numpy.diff(starts, append=data.size)
+        )
+
+    return test
+
+
+def equal(value: Any) -> Callable[[numpy.ndarray], numpy.ndarray]:
+    return lambda data: data == value
+
+
+def between(
+    start: float, end: float, dtype: numpy.dtype
+) -> Callable[[numpy.ndarray], numpy.ndarray]:
+    """Test for start <= data < end, comparing integers to integer bounds."""
+    if numpy.issubdtype(dtype, numpy.integer):
+        # Same selection, without casting the data to floats
+        start, end = math.ceil(start), math.ceil(end)
+    return lambda data: (data >= start) & (data < end)
+
+
+def day_of_month(days: numpy.ndarray) -> numpy.ndarray:
+    """Day of the month of days since TIME_UNITS_REFERENCE_DATE."""
+    dates = REFERENCE_DAY + days.astype("timedelta64[D]")
+    return (dates - dates.astype("datetime64[M]")).astype("int64") + 1
+
+
+def in_days(days_asked: list[int]) -> Callable[[numpy.ndarray], numpy.ndarray]:
+    """Test whether timestamps in seconds since the reference date are in some days."""
+
+    def test(seconds: numpy.ndarray) -> numpy.ndarray:
+        result = numpy.zeros(seconds.shape, dtype="bool")
+        valid = numpy.isfinite(seconds)
+        days = numpy.floor_divide(seconds[valid], SECONDS_PER_DAY).astype("int64")
+        if days.size == 0:
+            return result
+        # Look the days up in a table of the days of the chunk
+        first = days.min()
+        table = numpy.isin(
+            day_of_month(numpy.arange(first, days.max() + 1)), days_asked
+        )
+        result[valid] = table[days - first]
+        return result
+
+    return test
+
+
+def get_predicates(
+    incobj: h5netcdf.File, retrieve_params: RetrieveParams
+) -> list[Predicate]:
+    """Predicates of the observations of an asset selected by the request."""
+    predicates = []
+    if retrieve_params.stations is not None:
+        stations_asked = [s.encode("utf-8") for s in retrieve_params.stations]
+        predicates.append(
+            Predicate("stations", "primary_station_id", isin(stations_asked))
+        )
+
+    for param_name in ["time_coverage", "longitude_coverage", "latitude_coverage"]:
+        coverage_range = getattr(retrieve_params, param_name)
+        if coverage_range is None:
+            continue
+        param_name_in_data = get_param_name_in_data(incobj, param_name)
+        variable = incobj.variables[param_name_in_data]
+        if param_name == "time_coverage":
+            # Turn dates into numbers with the same units
+            units = variable.attrs["units"]
+            coverage_range = cftime.date2num(coverage_range, units=units)
+        predicates.append(
+            Predicate(
+                param_name,
+                param_name_in_data,
+                between(coverage_range[0], coverage_range[1], variable.dtype),
+            )
+        )
+
+    # Filter days (month and year not needed)
+    if retrieve_params.day is not None:
+        predicates.append(
+            Predicate("day", "report_timestamp", in_days(retrieve_params.day))
+        )
+
+    if retrieve_params.variables is not None:
+        #  Map to codes
+        var2code = get_code_mapping(incobj)
+        codes_asked = [var2code[v] for v in retrieve_params.variables if v in var2code]
+        predicates.append(
+            Predicate("variables", "observed_variable", isin(codes_asked))
+        )
+
+    # The filter supports single values (text or numeric) and also lists with "isin".
+    for field, filter_values in (retrieve_params.extra_filters or {}).items():
+        if field not in incobj.variables:
+            raise CadsObsRuntimeError(
+                f"Field '{field}' in extra_filters not found in the dataset."
+            )
+        test = (
+            isin(filter_values)
+            if isinstance(filter_values, list)
+            else equal(filter_values)
+        )
+        predicates.append(Predicate(f"extra_filters.{field}", field, test))
+    return predicates
+
+
+def read_chunk(incobj: h5netcdf.File, variable: str, start: int, stop: int):
+    data = incobj.variables[variable][start:stop]
+    # Strings need to be concatenated
+    if data.dtype.kind == "S":
+        data = concat_str_array(data)
+    return data
+
+
+def compute_mask(
+    incobj: h5netcdf.File,
+    predicates: list[Predicate],
+    chunk_size: int = MASK_CHUNK_SIZE,
+) -> numpy.ndarray:
+    """Mask of the observations of an asset which satisfy all the predicates.
+
+    The predicates are reordered by their selectivity as the chunks are masked.
+    """
+    size = incobj.dimensions["observation_id"].size
+    mask = numpy.ones(shape=(size,), dtype="bool")
+    for start in range(0, size, chunk_size):
+        stop = min(start + chunk_size, size)
+        chunk_mask = mask[start:stop]
+        selected = stop - start
+        # Variables read in the chunk, e.g. report_timestamp for time and day
+        data: dict[str, numpy.ndarray] = {}
+        for predicate in predicates:
+            if not selected:
+                break
+            if predicate.variable not in data:
+                data[predicate.variable] = read_chunk(
+                    incobj, predicate.variable, start, stop
+                )
+            numpy.logical_and(
+                chunk_mask, predicate.test(data[predicate.variable]), out=chunk_mask
+            )
+            predicate.evaluated += selected
+            selected = int(numpy.count_nonzero(chunk_mask))
+            predicate.selected += selected
+        predicates.sort(key=lambda predicate: predicate.selectivity)
+    return mask
+
+
+def log_selectivity(predicates: list[Predicate]) -> None:
+    for predicate in predicates:
+        logger.debug(
+            f"Filter {predicate.name} selected {predicate.selected} of "
+            f"{predicate.evaluated} observations ({predicate.selectivity:.1%})"
+        )
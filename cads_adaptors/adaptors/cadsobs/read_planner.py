@@ -0,0 +1,242 @@
+"""Plans of the byte ranges to read from remote observation assets.
+
+The HDF5 chunk index of a variable maps the selected observations to the byte ranges
+of the chunks that hold them. Nearby ranges are merged when reading the bytes between
+them costs less than another request (see ReadCostModel), and the merged ranges are
+fetched concurrently before the variable is read. The reads of the variable are then
+served from the fetched ranges, falling back to the file's own cache for the other
+reads (e.g. of the HDF5 metadata).
+
+The chunk index is read with the low-level API of h5py, through the h5py dataset of
+the h5netcdf variable. Where either is not available, the selected rows are read with
+a plain masked read of the variable.
+"""
+
+import bisect
+import dataclasses
+import logging
+from typing import Any
+
+import h5netcdf
+import h5py
+import numpy
+from fsspec.caching import BaseCache
+from fsspec.implementations.http import HTTPFileSystem
+
+logger = logging.getLogger(__name__)
+
+# Above this size, the ranges are not fetched in advance, to bound the memory used
+MAX_PREFETCH_BYTES = 512 * 1024**2
+
+ByteRange = tuple[int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class ReadCostModel:
+    """Cost of reading byte ranges: a latency per request and a bandwidth."""
+
+    latency: float = 0.05
+    bandwidth: float = 50e6
+    # Merged ranges are kept under this size, so that they are fetched concurrently
+    max_range_size: int = 16 * 1024**2
+    # Variables with a larger fraction of their chunks selected are read sequentially,
+    # with the read-ahead of the file, as walking their chunk index (whose nodes are
+    # spread between the chunks) would read most of them already
+    max_chunk_fraction: float = 0.5
+
+    @property
+    def max_gap(self) -> int:
+        """Gap under which reading the bytes between two ranges costs less than a request."""
+        return int(self.latency * self.bandwidth)
+
+
+DEFAULT_COST_MODEL = ReadCostModel()
+
+
+@dataclasses.dataclass
+class ReadPlan:
+    """Rows of a variable to read, and the byte ranges of the chunks that hold them."""
+
+    # Chunk-aligned [start, stop) spans of the first dimension
+    row_spans: list[tuple[int, int]]
+    byte_ranges: list[ByteRange]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(end - start for start, end in self.byte_ranges)
+
+
+def h5py_dataset(variable: h5netcdf.Variable) -> h5py.Dataset | None:
+    """The h5py dataset of an h5netcdf variable, if h5netcdf exposes it."""
+    dataset = getattr(variable, "_h5ds", None)
+    return dataset if isinstance(dataset, h5py.Dataset) else None
+
+
+def chunk_index(dataset: h5py.Dataset) -> dict[int, list[ByteRange]] | None:
+    """Byte ranges of the stored chunks of a dataset, by chunk of its first dimension.
+
+    None if the chunk index cannot be read (HDF5 before 1.10.5).
+    """
+    index: dict[int, list[ByteRange]] = {}
+    chunk_rows = dataset.chunks[0]
+
+    def add(info: Any) -> None:
+        start = info.byte_offset
+        index.setdefault(info.chunk_offset[0] // chunk_rows, []).append(
+            (start, start + info.size)
+        )
+
+    dsid = dataset.id
+    if hasattr(dsid, "chunk_iter"):
+        dsid.chunk_iter(add)
+    elif hasattr(dsid, "get_chunk_info"):
+        for i in range(dsid.get_num_chunks()):
+            add(dsid.get_chunk_info(i))
+    else:
+        return None
+    return index
+
+
+def runs(selected: numpy.ndarray) -> list[tuple[int, int]]:
+    """[start, stop) runs of the True values of a boolean array."""
+    edges = numpy.flatnonzero(numpy.diff(selected.astype("int8"), prepend=0, append=0))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def plan_reads(
+    variable: h5netcdf.Variable,
+    mask: numpy.ndarray,
+    cost_model: ReadCostModel = DEFAULT_COST_MODEL,
+) -> ReadPlan:
+    """Plan the reads of the selected rows of a variable."""
+    dataset = h5py_dataset(variable)
+    size = variable.shape[0]
+    if dataset is None:
+        return ReadPlan([(0, size)], [])
+    if dataset.chunks is None:
+        # Contiguous datasets are read in spans of the selected rows
+        offset = dataset.id.get_offset()
+        row_bytes = dataset.dtype.itemsize * int(numpy.prod(dataset.shape[1:]))
+        max_gap_rows = cost_model.max_gap // max(row_bytes, 1)
+        row_spans = merge_ranges(runs(mask), max_gap_rows, size)
+        byte_ranges = (
+            []
+            if offset is None
+            else [
+                (offset + a * row_bytes, offset + b * row_bytes) for a, b in row_spans
+            ]
+        )
+        return ReadPlan(row_spans, byte_ranges)
+
+    chunk_rows = dataset.chunks[0]
+    n_chunks = -(-size // chunk_rows)
+    padded = numpy.zeros(n_chunks * chunk_rows, dtype="bool")
+    padded[:size] = mask
+    selected_chunks = numpy.any(padded.reshape(n_chunks, chunk_rows), axis=1)
+    if selected_chunks.mean() > cost_model.max_chunk_fraction:
+        return ReadPlan([(0, size)], [])
+    row_spans = [
+        (a * chunk_rows, min(b * chunk_rows, size)) for a, b in runs(selected_chunks)
+    ]
+    index = chunk_index(dataset)
+    if index is None:
+        return ReadPlan(row_spans, [])
+    # Chunks which were never written are not stored, and read as fill values
+    byte_ranges = sorted(
+        byte_range
+        for chunk in numpy.flatnonzero(selected_chunks).tolist()
+        for byte_range in index.get(chunk, [])
+    )
+    return ReadPlan(row_spans, byte_ranges)
+
+
+def merge_ranges(
+    ranges: list[ByteRange], max_gap: int, max_size: int
+) -> list[ByteRange]:
+    """Merge the ranges (sorted) separated by at most max_gap, up to max_size."""
+    merged: list[ByteRange] = []
+    for start, end in ranges:
+        if merged and (
+            start - merged[-1][1] <= max_gap and end - merged[-1][0] <= max_size
+        ):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def read_rows(
+    variable: h5netcdf.Variable,
+    mask: numpy.ndarray,
+    row_spans: list[tuple[int, int]],
+    *index: slice,
+) -> numpy.ndarray:
+    """Read the rows of the mask in the spans of a plan (and the index of other dims)."""
+    return numpy.concatenate(
+        [variable[(slice(a, b), *index)][mask[a:b]] for a, b in row_spans]
+    )
+
+
+class PrefetchedCache(BaseCache):
+    """Serve reads from fetched byte ranges, or from another cache."""
+
+    name = "prefetched"
+
+    def __init__(self, parts: dict[ByteRange, bytes], cache: BaseCache) -> None:
+        super().__init__(cache.blocksize, cache.fetcher, cache.size)
+        self.cache = cache
+        self.ranges = sorted(parts)
+        self.starts = [start for start, _ in self.ranges]
+        self.parts = parts
+
+    def _fetch(self, start: int | None, stop: int | None) -> bytes:
+        start = 0 if start is None else start
+        stop = self.size if stop is None else stop
+        i = bisect.bisect_right(self.starts, start) - 1
+        if i >= 0 and stop <= self.ranges[i][1]:
+            self.hit_count += 1
+            part_start = self.ranges[i][0]
+            return self.parts[self.ranges[i]][start - part_start : stop - part_start]
+        self.miss_count += 1
+        return self.cache._fetch(start, stop)
+
+
+class RangeReader:
+    """Fetch the planned byte ranges of a remote file, for the reads of its HDF5 file."""
+
+    def __init__(
+        self,
+        fs: HTTPFileSystem,
+        url: str,
+        fobj: Any,
+        cost_model: ReadCostModel = DEFAULT_COST_MODEL,
+    ) -> None:
+        self.fs = fs
+        self.url = url
+        self.fobj = fobj
+        self.cost_model = cost_model
+        # e.g. local files have no cache, and are not worth fetching in advance
+        self.cache = getattr(fobj, "cache", None)
+
+    def prefetch(self, plans: list[ReadPlan]) -> None:
+        """Fetch the byte ranges of plans concurrently, replacing the previous ones."""
+        if self.cache is None:
+            return
+        self.fobj.cache = self.cache
+        ranges = sorted(byte_range for plan in plans for byte_range in plan.byte_ranges)
+        nbytes = sum(end - start for start, end in ranges)
+        if not ranges or nbytes > MAX_PREFETCH_BYTES:
+            return
+        merged = merge_ranges(
+            ranges, self.cost_model.max_gap, self.cost_model.max_range_size
+        )
+        logger.debug(
+            f"Fetching {nbytes} bytes in {len(ranges)} chunks of {self.url} "
+            f"with {len(merged)} requests"
+        )
+        data = self.fs.cat_ranges(
+            [self.url] * len(merged),
+            [start for start, _ in merged],
+            [end for _, end in merged],
+        )
+        self.fobj.cache = PrefetchedCache(dict(zip(merged, data)), self.cache)
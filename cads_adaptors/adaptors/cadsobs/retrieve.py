@@ -3,6 +3,7 @@ from pathlib import Path
 import fsspec
 
 from cads_adaptors import Context
+from cads_adaptors.adaptors.cadsobs.asset_index import prune_assets
 from cads_adaptors.adaptors.cadsobs.char_utils import get_char_sizes
 from cads_adaptors.adaptors.cadsobs.csv import to_csv, to_zip
 from cads_adaptors.adaptors.cadsobs.filter import filter_asset_and_save
@@ -23,12 +24,14 @@ def retrieve_data(
     field_attributes: dict,
     global_attributes: dict,
     context: Context,
+    use_asset_index: bool = False,
 ) -> Path:
     """Loop over the netCDFs in the storage, open and filter the requested data.
 
     The requested data is saved to the output file. The index dimension is resized each
     time to append the new data found in each file. Finally, the data is converted to
-    CSV if that format is requested.
+    CSV if that format is requested. With use_asset_index, the assets which can not
+    match the request according to their sidecar index are dropped first.
     """
     import h5netcdf
 
@@ -40,15 +43,18 @@ def retrieve_data(
     # background cache will download blocks in the background ahead of time using a
     # thread.
     fs = fsspec.filesystem("https", cache_type="background", block_size=10 * (1024**2))
+    retrieve_args = RetrieveArgs(
+        dataset=dataset_name, params=RetrieveParams(**mapped_request)
+    )
+    # Drop the assets which can not match the request before opening any of them
+    if use_asset_index:
+        object_urls = prune_assets(fs, object_urls, retrieve_args.params, context)
     # Silence fsspec log as background cache does print unformatted log lines.
     # Get the maximum size of the character arrays
     char_sizes = get_char_sizes(fs, object_urls)
     variables = mapped_request["variables"]
     char_sizes["observed_variable"] = max([len(v) for v in variables])
     # Open the output file and dump the data from each input file.
-    retrieve_args = RetrieveArgs(
-        dataset=dataset_name, params=RetrieveParams(**mapped_request)
-    )
     with h5netcdf.File(output_path_netcdf, "w") as oncobj:
         oncobj.dimensions["index"] = None
         for url in object_urls:
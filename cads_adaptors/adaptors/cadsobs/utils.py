@@ -139,36 +139,6 @@ def get_vars_in_cdm_lite(
     return vars_in_cdm_lite
 
 
-def ezclump(mask) -> list[slice]:
-    """
-    Find the clumps (groups of data with the same values) for a 1D bool array.
-
-    Internal function from numpy.ma.extras
-
-    Returns a series of slices.
-    """
-    if mask.ndim > 1:
-        mask = mask.ravel()
-    idx = (mask[1:] ^ mask[:-1]).nonzero()
-    idx = idx[0] + 1
-
-    if mask[0]:
-        if len(idx) == 0:
-            return [slice(0, mask.size)]
-
-        r = [slice(0, idx[0])]
-        r.extend((slice(left, right) for left, right in zip(idx[1:-1:2], idx[2::2])))
-    else:
-        if len(idx) == 0:
-            return []
-
-        r = [slice(left, right) for left, right in zip(idx[:-1:2], idx[1::2])]
-
-    if mask[-1]:
-        r.append(slice(idx[-1], mask.size))
-    return r
-
-
 def get_url_ncobj(fs: HTTPFileSystem, url: str) -> h5netcdf.File:
     """Open an URL as a netCDF file object with h5netcdf."""
     fobj = fs.open(url)
@@ -1,10 +1,12 @@
 from typing import Any
 
+from cads_adaptors.adaptors.cams_solar_rad import sharding
 from cads_adaptors.adaptors.cams_solar_rad.functions import (
     BadRequest,
     NoData,
     solar_rad_retrieve,
 )
+from cads_adaptors.adaptors.cams_solar_rad.segment_cache import SegmentCache
 from cads_adaptors.adaptors.cds import (
     AbstractCdsAdaptor,
     CachingArgs,
@@ -106,14 +108,28 @@ class CamsSolarRadiationTimeseriesAdaptor(AbstractCdsAdaptor):
 
         outfile = self._result_filename(mreq)
 
-        try:
+        user_id = self._user_id(mreq)
+
+        def retrieve(request: Request, path: str) -> None:
             solar_rad_retrieve(
-                mreq,
-                user_id=self._user_id(mreq),
-                outfile=outfile,
+                request,
+                user_id=user_id,
+                outfile=path,
                 logger=self.context,
+                wps_async=self.config.get("wps_async", False),
+                max_shards=self.config.get("max_shards", sharding.MAX_SHARDS),
+                max_concurrent_shards=self.config.get(
+                    "max_concurrent_shards", sharding.MAX_CONCURRENT_SHARDS
+                ),
             )
 
+        try:
+            cache = SegmentCache.from_config(self.config)
+            if cache is None:
+                retrieve(mreq, outfile)
+            else:
+                cache.retrieve(mreq, outfile, retrieve, self.context)
+
         except (BadRequest, NoData) as e:
             msg = e.args[0]
             self.context.add_user_visible_error(msg)
@@ -1,3 +1,4 @@
+import concurrent.futures
 import hashlib
 import logging
 import os
@@ -5,6 +6,25 @@ import re
 import time
 import traceback
 
+import requests
+
+from cads_adaptors.adaptors.cams_solar_rad import sharding
+from cads_adaptors.tools import wps
+
+# Nowadays the only supported server is the load-balancing server:
+# api.soda-solardata.com.
+WPS_URLS = ["https://api.soda-solardata.com/service/wps"]
+
+# Delays between the status requests of asynchronous executions, and between the
+# retries of failed executions, in seconds
+POLLING = wps.PollingPolicy(initial=1, factor=2, maximum=30)
+RETRY_DELAY = 3
+MAX_RETRY_DELAY = 60
+
+# Timeout of the Execute requests, which last as long as the execution when the
+# service answers synchronously
+EXECUTE_TIMEOUT = 3600
+
 
 class BadRequest(Exception):
     pass
@@ -15,9 +35,23 @@ class NoData(Exception):
 
 
 def solar_rad_retrieve(
-    request, outfile=None, user_id="0", ntries=10, logger=logging.getLogger(__name__)
+    request,
+    outfile=None,
+    user_id="0",
+    ntries=10,
+    logger=logging.getLogger(__name__),
+    urls=WPS_URLS,
+    wps_async=False,
+    max_shards=sharding.MAX_SHARDS,
+    min_shard_rows=sharding.MIN_SHARD_ROWS,
+    max_concurrent_shards=sharding.MAX_CONCURRENT_SHARDS,
 ):
-    """Execute a CAMS solar radiation data retrieval."""
+    """Execute a CAMS solar radiation data retrieval.
+
+    Long time ranges are split into shards, which are retrieved concurrently and
+    merged into outfile (see sharding). With wps_async, executions are asynchronous
+    and their status is polled.
+    """
     # Hash the user ID just in case it contains anything private. Then encode it so
     # the data provider can verify it's from us.
     user_id_hash = hashlib.md5(str(user_id).encode()).hexdigest()
@@ -38,10 +72,50 @@ def solar_rad_retrieve(
     else:
         raise BadRequest(f'Unrecognised format: "{req["data_format"]}"')
 
+    req["store_execute_response"] = "true" if wps_async else "false"
+
     # We could use the URL API or the WPS API. Only WPS has the option for
     # NetCDF and it has better error handling.
     # retrieve_by_url(req, outfile, logger)
-    retrieve_by_wps(req, outfile, ntries, logger)
+    shards = sharding.shard_date_range(
+        req["date"], req["time_step"], max_shards, min_shard_rows
+    )
+    if outfile is not None and len(shards) > 1:
+        try:
+            retrieve_shards(
+                req, shards, outfile, ntries, logger, urls, max_concurrent_shards
+            )
+            return
+        except NoData as e:
+            # Shards may be outside of the period of the data, which the whole
+            # time range is not
+            logger.info(f"Retrieving the whole time range, as a shard failed: {e}")
+    retrieve_by_wps(req, outfile, ntries, logger, urls)
+
+
+def retrieve_shards(req, shards, outfile, ntries, logger, urls, max_workers):
+    """Retrieve the shards of a time range concurrently, and merge them in order."""
+    logger.info(f"Retrieving {req['date']} in {len(shards)} shards")
+    paths = [f"{outfile}.{index}.part" for index in range(len(shards))]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                retrieve_by_wps, {**req, "date": shard}, path, ntries, logger, urls
+            )
+            for shard, path in zip(shards, paths)
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            concurrent.futures.wait(futures)
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+    sharding.merge_shards(paths, outfile, req["data_format"])
 
 
 def encode(user_id):
@@ -66,7 +140,7 @@ def verify(encoded):
     return encode(user_id) == encoded
 
 
-def retrieve_by_wps(req, outfile, ntries, logger):
+def retrieve_by_wps(req, outfile, ntries, logger, urls=WPS_URLS):
     """Execute a CAMS solar radiation data retrieval through the WPS API."""
     # Construct the XML to pass
     import jinja2
@@ -77,9 +151,7 @@ def retrieve_by_wps(req, outfile, ntries, logger):
     xml = xml.replace("\n", "")
 
     # Execute WPS requests in a retry-loop, cycling through available servers.
-    # Nowadays the only supported server is the load-balancing server:
-    # api.soda-solardata.com.
-    servers = ["api.soda-solardata.com"]
+    session = requests.Session()
     attempt = 0
     exc_txt = ""
     while attempt < ntries:
@@ -88,11 +160,10 @@ def retrieve_by_wps(req, outfile, ntries, logger):
             logger.info(f"Attempt #{attempt}...")
 
         # Cycle through available servers on each attempt
-        server = servers[(attempt - 1) % len(servers)]
-        url = f"https://{server}/service/wps"
+        url = urls[(attempt - 1) % len(urls)]
 
         try:
-            wps_execute(url, xml, outfile, logger)
+            wps_execute(url, xml, outfile, logger, session)
 
         except (BadRequest, NoData):
             # Do not retry
@@ -102,12 +173,13 @@ def retrieve_by_wps(req, outfile, ntries, logger):
             exc_txt = ": " + repr(ex)
             tbstr = "".join(traceback.format_tb(ex.__traceback__))
             logger.error(
-                f"Execution attempt #{attempt} from {server} "
+                f"Execution attempt #{attempt} from {url} "
                 f"failed: {ex!r}    \n" + "    \n".join(tbstr.split("\n"))
             )
-            # Only start sleeping when we've tried all servers
-            if attempt >= len(servers):
-                time.sleep(3)
+            # Only start sleeping when we've tried all servers, then back off
+            if attempt >= len(urls) and attempt < ntries:
+                retries = attempt - len(urls)
+                time.sleep(min(RETRY_DELAY * 2**retries, MAX_RETRY_DELAY))
             logger.debug("Retrying...")
 
         else:
@@ -121,23 +193,30 @@ def retrieve_by_wps(req, outfile, ntries, logger):
         logger.info(f"Succeeded after {attempt} attempts")
 
 
-def wps_execute(url, xml, outfile, logger):
+def wps_execute(url, xml, outfile, logger, session=None, policy=None):
     # Execute WPS. This can throw an immediate exception if the service is
     # down
-    from owslib.wps import WebProcessingService
-
-    wps = WebProcessingService(url, skip_caps=True, timeout=3600)
-    execution = wps.execute(None, [], request=bytes(xml, encoding="utf-8"))
+    session = session or requests.Session()
+    response = session.post(
+        url,
+        data=xml.encode(),
+        headers={"Content-Type": "text/xml"},
+        timeout=EXECUTE_TIMEOUT,
+    )
+    try:
+        execution = wps.parse_execute_response(response.content)
+    except ValueError:
+        response.raise_for_status()
+        raise
 
     # Wait for completion
-    while not execution.isComplete():
-        execution.checkStatus(sleepSecs=1)
+    for execution in wps.poll(execution, session, policy or POLLING):
         logger.debug("Execution status: %s" % execution.status)
 
     # Save the output if succeeded
-    if execution.isSucceded():
+    if execution.succeeded:
         if outfile is not None:
-            execution.getOutput(outfile)
+            download_output(session, execution.outputs[0], outfile)
 
     else:
         # Certain types of error are due to bad requests. Distinguish these
@@ -176,6 +255,19 @@ def wps_execute(url, xml, outfile, logger):
             raise Exception("Unspecified WPS error")
 
 
+def download_output(session, output, outfile):
+    """Write an output of an execution, given by reference or by value, to outfile."""
+    if not re.match(r"^https?://", output):
+        with open(outfile, "w") as f:
+            f.write(output)
+        return
+    with session.get(output, stream=True, timeout=EXECUTE_TIMEOUT) as response:
+        response.raise_for_status()
+        with open(outfile, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+
+
 def tidy_error(text):
     lines = [line.strip() for line in text.split("\n")]
     text = "; ".join([line for line in lines if line])
@@ -252,7 +344,9 @@ def template_xml():
             </wps:Input>
     </wps:DataInputs>
     <wps:ResponseForm>
-            <wps:ResponseDocument storeExecuteResponse="false">
+            <wps:ResponseDocument
+                storeExecuteResponse="{{ store_execute_response|default("false") }}"
+                status="{{ store_execute_response|default("false") }}">
                 <wps:Output mimeType="{{ mimetype }}" asReference="true">
                         <ows:Identifier>irradiation</ows:Identifier>
                 </wps:Output>
@@ -0,0 +1,326 @@
+"""Cache of the segments of solar radiation time series.
+
+Requests of dashboards overlap (e.g. the last months of the series of a location), and
+were retrieved from scratch each time. Series are cached in segments of one day, or of
+one month for daily and monthly series, keyed on the location, altitude, sky type,
+time step, time reference and format of the request. The cached segments of a request
+are answered locally, and only the gaps between them are retrieved from the service,
+then split into segments and cached. Segments are merged with the header of the first
+one, whose date lines are rewritten to the bounds of each segment.
+
+Only CSV series are cached, in a local directory shared by the workers of a host.
+Segments of the last MIN_SEGMENT_AGE days are not cached, as the data of the service
+is not final yet.
+"""
+
+import datetime
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Any, Callable
+
+from cads_adaptors.adaptors import Context
+from cads_adaptors.adaptors.cams_solar_rad import sharding
+from cads_adaptors.adaptors.cams_solar_rad.functions import NoData
+from cads_adaptors.tools import request_cache
+
+# Default time-to-live of the segments, in seconds, as the series are reprocessed
+SEGMENT_CACHE_TTL = 30 * 86400.0
+# Age, in days, of the last day of the segments which are cached
+MIN_SEGMENT_AGE = 7
+# Number of gaps above which the range from the first to the last gap is retrieved, to
+# save requests from the daily quota of the user
+MAX_GAPS = 4
+
+KEY_FIELDS = ["altitude", "sky_type", "time_step", "time_reference", "data_format"]
+CSV_FORMATS = {"csv", "csv_expert"}
+
+_DATE_HEADER = re.compile(rb"^(#\s*date (begin|end)[^:]*:\s*)(\d{4}-\d{2}-\d{2})", re.I)
+_ROW_DATE = re.compile(rb"^(\d{4}-\d{2}-\d{2})")
+
+Fetch = Callable[[dict[str, Any], str], None]
+DateRange = tuple[datetime.date, datetime.date]
+
+
+class Unit:
+    """Segments of one day, or of one month (identified by their first day)."""
+
+    def __init__(self, monthly: bool) -> None:
+        self.monthly = monthly
+
+    def start(self, day: datetime.date) -> datetime.date:
+        return day.replace(day=1) if self.monthly else day
+
+    def next(self, start: datetime.date) -> datetime.date:
+        if not self.monthly:
+            return start + datetime.timedelta(days=1)
+        return (start + datetime.timedelta(days=32)).replace(day=1)
+
+    def segments(self, begin: datetime.date, end: datetime.date) -> list[datetime.date]:
+        """Segments overlapping a date range."""
+        segments = []
+        start = self.start(begin)
+        while start <= end:
+            segments.append(start)
+            start = self.next(start)
+        return segments
+
+    def last_day(self, start: datetime.date) -> datetime.date:
+        return self.next(start) - datetime.timedelta(days=1)
+
+    def name(self, start: datetime.date) -> str:
+        return start.isoformat()[: 7 if self.monthly else 10]
+
+
+def date_range(date: str) -> tuple[datetime.date, datetime.date]:
+    begin = datetime.date.fromisoformat(date[:10])
+    end = datetime.date.fromisoformat(date[11:] if len(date) > 10 else date[:10])
+    return begin, end
+
+
+def segment_unit(request: dict[str, Any]) -> Unit | None:
+    """Unit of the segments of the series of a request, if it can be cached."""
+    steps = sharding.steps_per_day(request["time_step"])
+    if request["data_format"] not in CSV_FORMATS or steps is None:
+        return None
+    unit = Unit(monthly=steps <= 1)
+    begin, end = date_range(request["date"])
+    # Monthly series of partial months can not be cut from the cached months
+    if steps < 1 and (begin.day != 1 or (end + datetime.timedelta(days=1)).day != 1):
+        return None
+    return unit
+
+
+def rewrite_dates(header: list[bytes], old: DateRange, new: DateRange) -> list[bytes]:
+    """Shift the dates of the begin and end lines of a header to a new date range."""
+    lines = []
+    for line in header:
+        match = _DATE_HEADER.match(line)
+        if match:
+            index = 0 if match[2].lower() == b"begin" else 1
+            day = datetime.date.fromisoformat(match[3].decode())
+            day += new[index] - old[index]
+            line = match[1] + day.isoformat().encode() + line[match.end() :]
+        lines.append(line)
+    return lines
+
+
+def split_rows(
+    path: str, unit: Unit
+) -> tuple[list[bytes], dict[datetime.date, list[bytes]]] | None:
+    """Header and rows of each segment of a CSV series, or None if not recognised."""
+    header: list[bytes] = []
+    rows: dict[datetime.date, list[bytes]] = {}
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(b"#"):
+                if rows:
+                    return None
+                header.append(line)
+                continue
+            if not line.strip():
+                continue
+            match = _ROW_DATE.match(line)
+            if match is None:
+                return None
+            day = datetime.date.fromisoformat(match[1].decode())
+            rows.setdefault(unit.start(day), []).append(line)
+    return header, rows
+
+
+class SegmentCache:
+    def __init__(
+        self,
+        directory: str,
+        ttl: float = SEGMENT_CACHE_TTL,
+        min_age: int = MIN_SEGMENT_AGE,
+    ) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.min_age = min_age
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "SegmentCache | None":
+        """Cache of the directory of the config or of the environment, if any."""
+        directory = config.get(
+            "segment_cache_dir", os.getenv("CADS_ADAPTORS_CAMS_SOLAR_RAD_CACHE_DIR")
+        )
+        if not directory:
+            return None
+        return cls(directory, ttl=config.get("segment_cache_ttl", SEGMENT_CACHE_TTL))
+
+    def series_directory(self, request: dict[str, Any]) -> str:
+        location = request["location"]
+        key = {field: str(request[field]) for field in KEY_FIELDS}
+        key["location"] = "{0:.5f},{1:.5f}".format(
+            location["latitude"], location["longitude"]
+        )
+        return os.path.join(self.directory, request_cache.canonical_digest(key))
+
+    def load(self, directory: str, unit: Unit, start: datetime.date) -> str | None:
+        """Path of a cached segment, if any and not expired."""
+        path = os.path.join(directory, f"{unit.name(start)}.csv")
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def store(
+        self, directory: str, unit: Unit, start: datetime.date, content: list[bytes]
+    ) -> None:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(content)
+        os.replace(tmp_path, os.path.join(directory, f"{unit.name(start)}.csv"))
+
+    def retrieve(
+        self,
+        request: dict[str, Any],
+        outfile: str,
+        fetch: Fetch,
+        context: Context,
+    ) -> None:
+        """Write the series of a request to outfile, fetching only uncached segments."""
+        unit = segment_unit(request)
+        if unit is None:
+            fetch(request, outfile)
+            return
+        begin, end = date_range(request["date"])
+        directory = self.series_directory(request)
+        segments = unit.segments(begin, end)
+        # Files of the segments, with the date range of their rows
+        files: dict[datetime.date, tuple[str, DateRange] | None] = {}
+        for start in segments:
+            path = self.load(directory, unit, start)
+            files[start] = (
+                None if path is None else (path, (start, unit.last_day(start)))
+            )
+        missing = [start for start, file in files.items() if file is None]
+        if len(missing) < len(segments):
+            context.count("cams_solar_rad.segments.hits", len(segments) - len(missing))
+        if missing:
+            context.count("cams_solar_rad.segments.misses", len(missing))
+        workdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(outfile)))
+        try:
+            for gap in self.gaps(missing, segments, unit, end):
+                gap_files = self.fetch_gap(
+                    request, gap, unit, directory, workdir, fetch, context
+                )
+                if gap_files is None:
+                    # Unrecognised series, which are not cached
+                    fetch(request, outfile)
+                    return
+                files.update(gap_files)
+            self.merge(files, (begin, end), outfile, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def final_day(self) -> datetime.date:
+        """Last day of the segments which are cached."""
+        return datetime.date.today() - datetime.timedelta(days=self.min_age)
+
+    def gaps(
+        self,
+        missing: list[datetime.date],
+        segments: list[datetime.date],
+        unit: Unit,
+        end: datetime.date,
+    ) -> list[DateRange]:
+        """Date ranges of the runs of consecutive missing segments.
+
+        Segments which are not final are only fetched up to the end of the request.
+        """
+        positions = {start: position for position, start in enumerate(segments)}
+        runs: list[list[datetime.date]] = []
+        for start in missing:
+            if runs and positions[start] == positions[runs[-1][-1]] + 1:
+                runs[-1].append(start)
+            else:
+                runs.append([start])
+        if len(runs) > MAX_GAPS:
+            runs = [segments[positions[missing[0]] : positions[missing[-1]] + 1]]
+        gaps = []
+        for run in runs:
+            last_day = unit.last_day(run[-1])
+            if last_day > self.final_day():
+                last_day = min(last_day, end)
+            gaps.append((run[0], last_day))
+        return gaps
+
+    def fetch_gap(
+        self,
+        request: dict[str, Any],
+        gap: DateRange,
+        unit: Unit,
+        directory: str,
+        workdir: str,
+        fetch: Fetch,
+        context: Context,
+    ) -> dict[datetime.date, tuple[str, DateRange] | None] | None:
+        """Fetch the segments of a gap, and cache those which are final."""
+        path = os.path.join(workdir, f"{gap[0]}.fetched")
+        date = f"{gap[0].isoformat()}/{gap[1].isoformat()}"
+        context.debug(f"Fetching the segments of {date}")
+        try:
+            fetch({**request, "date": date}, path)
+        except NoData as exc:
+            # The data may start or end within the requested range
+            context.debug(f"No data in {date}: {exc}")
+            return {start: None for start in unit.segments(*gap)}
+        split = split_rows(path, unit)
+        if split is None:
+            return None
+        header, rows = split
+        files: dict[datetime.date, tuple[str, DateRange] | None] = {}
+        for start in unit.segments(*gap):
+            if start not in rows:
+                files[start] = None
+                continue
+            last_day = min(unit.last_day(start), gap[1])
+            content = rewrite_dates(header, gap, (start, last_day)) + rows[start]
+            if last_day == unit.last_day(start) and last_day <= self.final_day():
+                self.store(directory, unit, start, content)
+            segment_path = os.path.join(workdir, f"{unit.name(start)}.csv")
+            with open(segment_path, "wb") as f:
+                f.writelines(content)
+            files[start] = (segment_path, (start, last_day))
+        return files
+
+    def merge(
+        self,
+        files: dict[datetime.date, tuple[str, DateRange] | None],
+        request_range: DateRange,
+        outfile: str,
+        workdir: str,
+    ) -> None:
+        """Merge the segments of the date range of a request, cutting partial ones."""
+        begin, end = request_range
+        paths = []
+        for start, file in sorted(files.items()):
+            if file is None:
+                continue
+            path, (first, last) = file
+            if first < begin or last > end:
+                cut = split_rows(path, Unit(monthly=False))
+                assert cut is not None
+                header, rows = cut
+                cut_range = (max(first, begin), min(last, end))
+                days = [
+                    day for day in sorted(rows) if cut_range[0] <= day <= cut_range[1]
+                ]
+                if not days:
+                    continue
+                path = os.path.join(workdir, f"{start}.cut")
+                with open(path, "wb") as f:
+                    f.writelines(rewrite_dates(header, (first, last), cut_range))
+                    for day in days:
+                        f.writelines(rows[day])
+            paths.append(path)
+        if not paths:
+            raise NoData(f"No data available for the period {begin}/{end}")
+        sharding.merge_csv(paths, outfile)
@@ -0,0 +1,124 @@
+"""Sharding of the time range of solar radiation requests.
+
+The service produces time series at up to one minute resolution, and the time to
+produce a series grows with its number of rows, so that multi-year, high-frequency
+series are the slowest requests sent to it. Their time range is split into shards of
+whole days, which are retrieved concurrently and merged in order. Shards have at least
+min_shard_rows rows, so that short or low-frequency series are retrieved in one
+request, and there are at most max_shards shards. As each shard counts towards the
+daily quota of requests of the user, series are not sharded unless max_shards is set
+in the config of the dataset.
+"""
+
+import datetime
+import math
+import os
+import re
+
+import xarray as xr
+
+MAX_SHARDS = 1
+MAX_CONCURRENT_SHARDS = 4
+MIN_SHARD_ROWS = 50_000
+
+# Comment lines of the CSV header which describe the end of the time range
+_END_HEADER = re.compile(rb"^#\s*date end", re.IGNORECASE)
+
+
+def steps_per_day(time_step: str) -> float | None:
+    """Number of rows per day of a summarization (e.g. PT15M), if known."""
+    match = re.fullmatch(r"P(?:(\d+)([DM]))?(?:T(\d+)([HM]))?", time_step)
+    if match is None or not any(match.groups()):
+        return None
+    days, day_unit, time, time_unit = match.groups()
+    if days is not None:
+        return 1 / (int(days) * (1 if day_unit == "D" else 30))
+    minutes = int(time) * (60 if time_unit == "H" else 1)
+    return 24 * 60 / minutes if minutes else None
+
+
+def shard_date_range(
+    date: str,
+    time_step: str,
+    max_shards: int = MAX_SHARDS,
+    min_shard_rows: int = MIN_SHARD_ROWS,
+) -> list[str]:
+    """Split a date range (YYYY-MM-DD[/YYYY-MM-DD]) into consecutive date ranges."""
+    steps = steps_per_day(time_step)
+    # Monthly series are short, and can only be split at month boundaries
+    if steps is None or steps < 1 or max_shards <= 1:
+        return [date]
+    begin = datetime.date.fromisoformat(date[:10])
+    end = datetime.date.fromisoformat(date[11:] if len(date) > 10 else date[:10])
+    days = (end - begin).days + 1
+    shard_days = max(math.ceil(days / max_shards), math.ceil(min_shard_rows / steps))
+    if shard_days >= days:
+        return [date]
+    shards = []
+    while begin <= end:
+        shard_end = min(begin + datetime.timedelta(days=shard_days - 1), end)
+        shards.append(f"{begin.isoformat()}/{shard_end.isoformat()}")
+        begin = shard_end + datetime.timedelta(days=1)
+    return shards
+
+
+def _read_header(path: str) -> list[bytes]:
+    """Leading comment lines of a CSV file."""
+    header = []
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.startswith(b"#"):
+                break
+            header.append(line)
+    return header
+
+
+def merge_csv(paths: list[str], outfile: str) -> None:
+    """Concatenate the rows of CSV shards, under the header of the first one.
+
+    The lines of the header which describe the end of the time range are taken from
+    the header of the last shard.
+    """
+    header = _read_header(paths[0])
+    last_header = _read_header(paths[-1])
+    if len(last_header) == len(header):
+        header = [
+            last if _END_HEADER.match(last) else line
+            for line, last in zip(header, last_header)
+        ]
+    with open(outfile, "wb") as f:
+        f.writelines(header)
+        for path in paths:
+            with open(path, "rb") as shard:
+                f.writelines(
+                    line for line in shard if not line.startswith(b"#") and line.strip()
+                )
+
+
+def merge_netcdf(paths: list[str], outfile: str) -> None:
+    """Concatenate netCDF shards along their time dimension."""
+    datasets = [xr.open_dataset(path) for path in paths]
+    try:
+        dims = datasets[0].dims
+        if "time" in dims:
+            dim = "time"
+        else:
+            unlimited = datasets[0].encoding.get("unlimited_dims") or list(dims)
+            dim = next(iter(unlimited))
+        merged = xr.concat(
+            datasets, dim=dim, data_vars="minimal", coords="minimal", compat="override"
+        )
+        merged.to_netcdf(outfile)
+    finally:
+        for dataset in datasets:
+            dataset.close()
+
+
+def merge_shards(paths: list[str], outfile: str, data_format: str) -> None:
+    """Merge the files of consecutive shards in order, and remove them."""
+    if data_format == "netcdf":
+        merge_netcdf(paths, outfile)
+    else:
+        merge_csv(paths, outfile)
+    for path in paths:
+        os.remove(path)
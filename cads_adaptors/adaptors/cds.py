@@ -15,6 +15,7 @@ from cads_adaptors.exceptions import (
     InvalidRequest,
 )
 from cads_adaptors.models import CollectionMetadata, JobMetadata, ResultsMetadata
+from cads_adaptors.tools import request_cache
 from cads_adaptors.tools.general import ensure_list
 from cads_adaptors.tools.hcube_tools import hcubes_intdiff2
 from cads_adaptors.validation import enforce
@@ -48,9 +49,28 @@ class CachingArgs:
         return random.randint(1, 2**128) if self.avoid_cache else 0
 
 
+# Default time-to-live, in seconds, of memoised caching args
+CACHING_ARGS_CACHE_TTL = 300.0
+_CACHING_ARGS = request_cache.RequestCache(CACHING_ARGS_CACHE_TTL, maxsize=1024)
+
+
+def _ttl_from_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def clear_caching_args_cache() -> None:
+    _CACHING_ARGS.clear()
+
+
 class AbstractCdsAdaptor(AbstractAdaptor):
     resources = {"CADS_ADAPTORS": 1}
     adaptor_schema: dict[str, Any] = {}
+    # Post-processors that work on the retrieved files, which are only opened as
+    # xarray for the first post-processor that is not in this list
+    file_post_processors: tuple[str, ...] = ()
 
     def __init__(
         self,
@@ -72,6 +92,9 @@ class AbstractCdsAdaptor(AbstractAdaptor):
             "intersect_constraints", False
         )
         self.embargo: dict[str, int] | None = config.get("embargo", None)
+        self._caching_args_config_digest: str | None = None
+        # Time and memory of the post-process steps, see tools.pipeline.StepReport
+        self.post_process_reports: list[Any] = []
 
     def retrieve_list_of_results(
         self,
@@ -92,13 +115,17 @@ class AbstractCdsAdaptor(AbstractAdaptor):
         mapped_requests: list[Request],
         processing_kwargs: ProcessingKwargs,
     ) -> BinaryIO:
-        result = self.retrieve_list_of_results(
-            mapped_requests=mapped_requests,
-            processing_kwargs=processing_kwargs,
-        )
-        return self.make_download_object(
-            result, download_format=processing_kwargs["download_format"]
-        )
+        try:
+            with self.context.span("retrieve"):
+                result = self.retrieve_list_of_results(
+                    mapped_requests=mapped_requests,
+                    processing_kwargs=processing_kwargs,
+                )
+                return self.make_download_object(
+                    result, download_format=processing_kwargs["download_format"]
+                )
+        finally:
+            self.context.log_instrumentation_summary()
 
     def retrieve(self, request: Request) -> BinaryIO:
         import cacholote
@@ -325,20 +352,21 @@ class AbstractCdsAdaptor(AbstractAdaptor):
         The returned request needs to be compatible with the web-portal, it is currently what is used
         on the "Your requests" page, hence it should not be modified to much from the user's request.
         """
-        # Make a copy of the original request for debugging purposes
-        request = deepcopy(request)
-        self.context.debug(f"Input request:\n{request}")
-
-        # Enforce the schema on the input request
-        schemas = self.schemas
-        if not isinstance(schemas, list):
-            schemas = [schemas]
-        # Apply first dataset schemas, then adaptor schema
-        if adaptor_schema := self.adaptor_schema:
-            schemas = schemas + [adaptor_schema]
-        for schema in schemas:
-            request = enforce.enforce(request, schema, self.context.logger)
-        return dict(sorted(request.items()))
+        with self.context.span("normalise_request"):
+            # Make a copy of the original request for debugging purposes
+            request = deepcopy(request)
+            self.context.debug(f"Input request:\n{request}")
+
+            # Enforce the schema on the input request
+            schemas = self.schemas
+            if not isinstance(schemas, list):
+                schemas = [schemas]
+            # Apply first dataset schemas, then adaptor schema
+            if adaptor_schema := self.adaptor_schema:
+                schemas = schemas + [adaptor_schema]
+            for schema in schemas:
+                request = enforce.enforce(request, schema, self.context.logger)
+            return dict(sorted(request.items()))
 
     def get_intersected_requests(self, request: Request) -> list[Request]:
         """
@@ -381,7 +409,82 @@ class AbstractCdsAdaptor(AbstractAdaptor):
         tags = self.get_request_tags_from_intersected_requests(intersected_requests)
         return tags
 
+    def caching_args_key(self, request: Request) -> str:
+        """Digest of the raw request and of everything that affects its caching args."""
+        if self._caching_args_config_digest is None:
+            from cads_adaptors import __version__
+
+            self._caching_args_config_digest = request_cache.canonical_digest(
+                {
+                    "version": __version__,
+                    "adaptor": f"{type(self).__module__}.{type(self).__qualname__}",
+                    "form": self.form,
+                    "config": self.config,
+                    "constraints": self.constraints,
+                    "mapping": self.mapping,
+                    "schemas": self.schemas,
+                    "adaptor_schema": self.adaptor_schema,
+                    "embargo": self.embargo,
+                }
+            )
+        return request_cache.canonical_digest(
+            {
+                "config": self._caching_args_config_digest,
+                "intersect_constraints": self.intersect_constraints_bool,
+                "download_format": self.download_format,
+                "request": request,
+            }
+        )
+
     def get_caching_args(self, request: Request) -> CachingArgs:
+        """
+        Normalise, intersect, map and embargo the request.
+
+        Results are memoised (see CACHING_ARGS_CACHE_TTL), so that repeated requests are
+        only processed once per process, or once per host if
+        CADS_ADAPTORS_CACHING_ARGS_CACHE_DIR is set. Embargoed results expire when the
+        embargo moves on, results of relative dates at the next UTC midnight, and
+        results which produced user-visible messages are not cached.
+        """
+        ttl = _ttl_from_env("CADS_ADAPTORS_CACHING_ARGS_TTL", CACHING_ARGS_CACHE_TTL)
+        if ttl <= 0:
+            return self._get_caching_args(request)
+
+        directory = os.getenv("CADS_ADAPTORS_CACHING_ARGS_CACHE_DIR")
+        key = self.caching_args_key(request)
+        cached = _CACHING_ARGS.get(key, directory=directory)
+        if cached is not None:
+            self.context.count("caching_args_cache.hits")
+            with self.context.span("apply_mapping"):
+                caching_args = CachingArgs(**cached)
+            self._log_mapped_requests(caching_args.mapped_requests)
+            return caching_args
+        self.context.count("caching_args_cache.misses")
+
+        user_visible_messages = self.context.user_visible_messages
+        caching_args = self._get_caching_args(request)
+        if self.context.user_visible_messages == user_visible_messages:
+            from cads_adaptors.tools import date_tools
+
+            if self.embargo is not None:
+                ttl = min(ttl, date_tools.seconds_until_embargo_changes(self.embargo))
+            if any(
+                date_tools.has_relative_dates(r)
+                for r in [request, *caching_args.mapped_requests]
+            ):
+                ttl = min(ttl, date_tools.seconds_until_next_utc_midnight())
+            _CACHING_ARGS.set(
+                key, dataclasses.asdict(caching_args), ttl=ttl, directory=directory
+            )
+        return caching_args
+
+    def _log_mapped_requests(self, mapped_requests: list[Request]) -> None:
+        self.context.count("mapped_requests", len(mapped_requests))
+        self.context.info(
+            f"Request mapped to (collection_id={self.collection_id}):\n{mapped_requests}"
+        )
+
+    def _get_caching_args(self, request: Request) -> CachingArgs:
         avoid_cache = self.config.get("avoid_cache", False)
         request = self.normalise_request(request)
 
@@ -395,9 +498,10 @@ class AbstractCdsAdaptor(AbstractAdaptor):
         intersected_requests = self.get_intersected_requests(working_request)
 
         # Map the list of requests
-        mapped_requests = [
-            self.apply_mapping(i_request) for i_request in intersected_requests
-        ]
+        with self.context.span("apply_mapping"):
+            mapped_requests = [
+                self.apply_mapping(i_request) for i_request in intersected_requests
+            ]
 
         # Implement embargo if specified
         if self.embargo is not None:
@@ -414,9 +518,7 @@ class AbstractCdsAdaptor(AbstractAdaptor):
             if not cacheable_embargo:
                 avoid_cache = True
 
-        self.context.info(
-            f"Request mapped to (collection_id={self.collection_id}):\n{mapped_requests}"
-        )
+        self._log_mapped_requests(mapped_requests)
 
         return CachingArgs(
             mapped_requests=mapped_requests,
@@ -468,7 +570,14 @@ class AbstractCdsAdaptor(AbstractAdaptor):
     def post_process(
         self, result: Any, post_process_steps: list[dict[str, Any]]
     ) -> dict[str, Any]:
-        """Perform post-process steps on the retrieved data."""
+        """Perform post-process steps on the retrieved data.
+
+        Datasets are opened lazily (dask-backed) and are only computed when the result
+        is written, unless a step computes them (see tools.pipeline).
+        """
+        from cads_adaptors.tools import pipeline
+
+        opened_as_xarray = False
         for i, pp_step in enumerate(self.pp_mapping(post_process_steps)):
             self.context.info(
                 f"Performing post-process step {i + 1} of {len(post_process_steps)}: {pp_step}"
@@ -490,36 +599,51 @@ class AbstractCdsAdaptor(AbstractAdaptor):
                 continue
             method = getattr(self, method_name)
 
-            # post processing is done on xarray objects,
-            # so on first pass we ensure result is opened as xarray
-            if i == 0:
-                from cads_adaptors.tools.convertors import (
-                    open_result_as_xarray_dictionary,
+            # post processing is done on xarray objects, so before the first step
+            # that does not work on files we ensure result is opened as xarray
+            if not opened_as_xarray and method_name not in self.file_post_processors:
+                opened_as_xarray = True
+                result, report = pipeline.run_step(
+                    "open_result", self.open_result_as_xarray, result, self.context
                 )
+                pipeline.log_report(report, self.context)
+                self.post_process_reports.append(report)
+
+            result, report = pipeline.run_step(
+                method_name,
+                lambda result: method(result, **pp_step),
+                result,
+                self.context,
+            )
+            if opened_as_xarray:
+                report.computed = pipeline.computed_datasets(result)
+            pipeline.log_report(report, self.context)
+            self.post_process_reports.append(report)
 
-                post_processing_kwargs = self.config.get("post_processing_kwargs", {})
+        if opened_as_xarray:
+            result = pipeline.fuse(result)
+        return result
 
-                open_datasets_kwargs = post_processing_kwargs.get(
-                    "open_datasets_kwargs", {}
-                )
-                post_open_datasets_kwargs = post_processing_kwargs.get(
-                    "post_open_datasets_kwargs", {}
-                )
-                self.context.debug(
-                    f"Opening result: {result} as xarray dictionary with kwargs:\n"
-                    f"open_dataset_kwargs: {open_datasets_kwargs}\n"
-                    f"post_open_datasets_kwargs: {post_open_datasets_kwargs}"
-                )
-                result = open_result_as_xarray_dictionary(
-                    result,
-                    context=self.context,
-                    open_datasets_kwargs=open_datasets_kwargs,
-                    post_open_datasets_kwargs=post_open_datasets_kwargs,
-                )
+    def open_result_as_xarray(self, result: Any) -> dict[str, Any]:
+        from cads_adaptors.tools.convertors import open_result_as_xarray_dictionary
 
-            result = method(result, **pp_step)
+        post_processing_kwargs = self.config.get("post_processing_kwargs", {})
 
-        return result
+        open_datasets_kwargs = post_processing_kwargs.get("open_datasets_kwargs", {})
+        post_open_datasets_kwargs = post_processing_kwargs.get(
+            "post_open_datasets_kwargs", {}
+        )
+        self.context.debug(
+            f"Opening result: {result} as xarray dictionary with kwargs:\n"
+            f"open_dataset_kwargs: {open_datasets_kwargs}\n"
+            f"post_open_datasets_kwargs: {post_open_datasets_kwargs}"
+        )
+        return open_result_as_xarray_dictionary(
+            result,
+            context=self.context,
+            open_datasets_kwargs=open_datasets_kwargs,
+            post_open_datasets_kwargs=post_open_datasets_kwargs,
+        )
 
     def make_download_object(
         self,
@@ -550,15 +674,17 @@ class AbstractCdsAdaptor(AbstractAdaptor):
         # )
         try:
             time0 = time.time()
-            download_object = download_tools.DOWNLOAD_FORMATS[download_format](
-                paths, **kwargs
-            )
+            with self.context.span("make_download_object"):
+                download_object = download_tools.DOWNLOAD_FORMATS[download_format](
+                    paths, **kwargs
+                )
             delta_time = time.time() - time0
             try:
                 filesize = os.path.getsize(download_object.name)
             except AttributeError:
                 self.context.warning(f"Unexpected download object: {download_object}")
                 filesize = 0
+            self.context.gauge_bytes("download_object", filesize)
 
             self.context.info(
                 f"Download object created. Filesize={filesize * 1e-6} Mb, "
@@ -101,11 +101,14 @@ def execute_mars(
     env["username"] = str(env["namespace"]) + ":" + str(env["user_id"]).split("-")[-1]
     time0 = time.time()
     context.info(f"Request sent to proxy MARS client: {requests}")
-    reply = cluster.execute(requests, env, target)
+    context.count("mars.requests", len(requests))
+    with context.span("mars.execute"):
+        reply = cluster.execute(requests, env, target)
     reply_message = str(reply.message)
     delta_time = time.time() - time0
     if os.path.exists(target):
         filesize = os.path.getsize(target)
+        context.gauge_bytes("mars.target", filesize)
         context.info(
             f"The MARS Request produced a target "
             f"(filesize={filesize * 1e-6} Mb, delta_time= {delta_time:.2f} seconds).",
@@ -249,16 +252,36 @@ class DirectMarsCdsAdaptor(AbstractCdsAdaptor):
 
 
 class MarsCdsAdaptor(AbstractCdsAdaptor):
+    file_post_processors = ("process_grib_messages",)
+
     def __init__(self, *args, **config) -> None:
         super().__init__(*args, **config)
         schema_options = config.get("schema_options", {})
         if not schema_options.get("disable_adaptor_schema"):
             self.adaptor_schema = minimal_mars_schema(**schema_options)
 
-    def convert_format(self, *args, **kwargs):
+    def convert_format(self, result, *args, **kwargs):
+        from cads_adaptors.tools import pipeline
         from cads_adaptors.tools.convertors import convert_format
 
-        return convert_format(*args, **kwargs)
+        # The lazy results of the post-process steps are computed when written
+        paths, report = pipeline.run_step(
+            "convert_format",
+            lambda result: convert_format(result, *args, **kwargs),
+            result,
+            self.context,
+        )
+        pipeline.log_report(report, self.context)
+        self.post_process_reports.append(report)
+        return paths
+
+    def process_grib_messages(self, *args, **kwargs) -> dict[str, str]:
+        """Filter, subset and reorder GRIB messages without opening them as xarray."""
+        from cads_adaptors.tools.grib_stream import process_grib_files
+
+        kwargs.setdefault("context", self.context)
+        kwargs.setdefault("target_dir", str(self.cache_tmp_path))
+        return process_grib_files(*args, **kwargs)
 
     def daily_reduce(self, *args, **kwargs) -> dict[str, Any]:
         from cads_adaptors.tools.post_processors import daily_reduce
@@ -313,6 +336,16 @@ class MarsCdsAdaptor(AbstractCdsAdaptor):
 
         return request, kwargs
 
+    def retrieve_grib(self, mapped_requests: list[Request]) -> str:
+        """Retrieve the GRIB data of the mapped requests to a file, and return its path."""
+        return execute_mars(
+            mapped_requests,
+            context=self.context,
+            config=self.config,
+            mapping=self.mapping,
+            target_dir=self.cache_tmp_path,
+        )
+
     def retrieve_list_of_results(
         self,
         mapped_requests: list[Request],
@@ -325,13 +358,7 @@ class MarsCdsAdaptor(AbstractCdsAdaptor):
             adaptor_tools.get_data_format_from_mapped_requests(mapped_requests)
         )
 
-        result = execute_mars(
-            mapped_requests,
-            context=self.context,
-            config=self.config,
-            mapping=self.mapping,
-            target_dir=self.cache_tmp_path,
-        )
+        result = self.retrieve_grib(mapped_requests)
 
         results_dict = self.post_process(
             result, processing_kwargs["post_process_steps"]
@@ -347,3 +374,27 @@ class MarsCdsAdaptor(AbstractCdsAdaptor):
         )
 
         return paths
+
+
+class DummyMarsCdsAdaptor(MarsCdsAdaptor):
+    """MARS adaptor with synthetic GRIB data of the mapped requests, for load tests.
+
+    The "synthetic" config holds the defaults of the requests (e.g. the grid, the seed
+    or the target "size" in bytes of the data of each mapped request). The data go
+    through the post-processing and format conversion of the MARS adaptor.
+    """
+
+    def retrieve_grib(self, mapped_requests: list[Request]) -> str:
+        from cads_adaptors.tools import synthetic_data
+
+        path = str(self.cache_tmp_path / "dummy.grib")
+        defaults = dict(self.config.get("synthetic", {}))
+        size = defaults.pop("size", None)
+        with self.context.span("synthetic_data"):
+            for i, request in enumerate(mapped_requests):
+                spec = synthetic_data.SyntheticSpec.from_request(
+                    {**defaults, **request}, size=size
+                )
+                synthetic_data.write_grib(spec, path, "ab" if i else "wb")
+        self.context.gauge_bytes("synthetic_data", os.path.getsize(path))
+        return path
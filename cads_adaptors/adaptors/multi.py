@@ -1,3 +1,4 @@
+import dataclasses
 from typing import Any
 
 from cads_adaptors import AbstractCdsAdaptor, mapping
@@ -8,11 +9,39 @@ from cads_adaptors.exceptions import (
     InvalidRequest,
     MultiAdaptorNoDataError,
 )
-from cads_adaptors.tools import adaptor_tools
-from cads_adaptors.tools.general import ensure_list
-from cads_adaptors.tools.hcube_tools import merge_requests
+from cads_adaptors.tools import adaptor_tools, request_cache
+from cads_adaptors.tools.general import TTLCache, ensure_list
+from cads_adaptors.tools.hcube_tools import hcubes_deduplicate, merge_requests
 from cads_adaptors.tools.simulate_preinterpolation import simulate_preinterpolation
 
+# Sub-adaptor plans only depend on the configs, which change on dataset deployments
+SUB_ADAPTOR_PLAN_TTL = 3600.0
+_SUB_ADAPTOR_PLANS = TTLCache(SUB_ADAPTOR_PLAN_TTL, maxsize=256)
+
+# MARS keywords which do not index the fields but describe their processing: fields are
+# only deduplicated between requests with the same values of these keywords
+NON_FIELD_KEYS = [
+    "area",
+    "grid",
+    "rotation",
+    "frame",
+    "bbox",
+    "resol",
+    "accuracy",
+    "packing",
+    "interpolation",
+    "format",
+]
+
+
+@dataclasses.dataclass
+class SubAdaptorPlan:
+    """What is needed to extract and map the requests of a sub-adaptor."""
+
+    values: dict[str, Any]
+    mapping: dict[str, Any]
+    extract_subrequest_kwargs: dict[str, Any]
+
 
 class MultiAdaptor(AbstractCdsAdaptor):
     @property
@@ -253,6 +282,52 @@ class MultiMarsCdsAdaptor(MultiAdaptor):
 
         return convert_format(*args, **kwargs)
 
+    def get_sub_adaptor_plan(self, adaptor_desc: dict[str, Any]) -> SubAdaptorPlan:
+        """Plan of a sub-adaptor, cached on its config to avoid instantiating it."""
+        key = request_cache.canonical_digest(
+            {
+                "adaptor": adaptor_desc,
+                "form": self.form,
+                "extract_subrequest_kwargs": self.config.get(
+                    "extract_subrequest_kwargs", {}
+                ),
+            }
+        )
+        plan = _SUB_ADAPTOR_PLANS.get(key)
+        if plan is None:
+            this_adaptor = adaptor_tools.get_adaptor(adaptor_desc, self.form)
+            plan = SubAdaptorPlan(
+                values=adaptor_desc.get("values", {}),
+                mapping=this_adaptor.mapping,
+                extract_subrequest_kwargs=self.get_extract_subrequest_kwargs(
+                    this_adaptor.config
+                ),
+            )
+            _SUB_ADAPTOR_PLANS.set(key, plan)
+        return plan
+
+    def deduplicate_fields(self, requests: list[Request]) -> list[Request]:
+        """Remove the fields requested more than once, e.g. by several sub-adaptors."""
+        if len(requests) < 2 or not self.config.get("deduplicate_fields", True):
+            return requests
+        try:
+            with self.context.span("multi_mars.deduplicate_fields"):
+                deduplicated, nfields = hcubes_deduplicate(
+                    requests, group_keys=NON_FIELD_KEYS
+                )
+        except Exception as err:
+            # Requests which can not be compared (e.g. unexpected date syntax) are
+            # sent as they are
+            self.context.warning(f"MultiMarsCdsAdaptor, fields not deduplicated: {err}")
+            return requests
+        if nfields:
+            self.context.count("multi_mars.fields.deduplicated", nfields)
+            self.context.info(
+                f"MultiMarsCdsAdaptor, {nfields} duplicate fields removed: "
+                f"{deduplicated}"
+            )
+        return deduplicated
+
     def pre_mapping_modifications(
         self, request: dict[str, Any]
     ) -> tuple[Request, ProcessingKwargs]:
@@ -310,19 +385,17 @@ class MultiMarsCdsAdaptor(MultiAdaptor):
         # We now split the mapped_request into sub-adaptors
         new_mapped_requests = []
         for adaptor_tag, adaptor_desc in self.config["adaptors"].items():
-            this_adaptor = adaptor_tools.get_adaptor(adaptor_desc, self.form)
-            this_values = adaptor_desc.get("values", {})
-            extract_subrequest_kwargs = self.get_extract_subrequest_kwargs(
-                this_adaptor.config
-            )
+            plan = self.get_sub_adaptor_plan(adaptor_desc)
             for mapped_request_piece in mapped_requests:
                 this_request = self.extract_subrequest(
-                    mapped_request_piece, this_values, **extract_subrequest_kwargs
+                    mapped_request_piece,
+                    plan.values,
+                    **plan.extract_subrequest_kwargs,
                 )
                 if len(this_request) > 0:
                     new_mapped_requests.append(
                         mapping.apply_mapping(
-                            this_request, this_adaptor.mapping, context=self.context
+                            this_request, plan.mapping, context=self.context
                         )
                     )
 
@@ -333,6 +406,7 @@ class MultiMarsCdsAdaptor(MultiAdaptor):
         self.context.debug(
             f"MultiMarsCdsAdaptor, mapped and split requests: {new_mapped_requests}"
         )
+        new_mapped_requests = self.deduplicate_fields(new_mapped_requests)
         result = execute_mars(
             new_mapped_requests,
             context=self.context,
@@ -1,5 +1,5 @@
+import json
 import os
-import re
 
 from cads_adaptors.adaptors.cds import (
     AbstractCdsAdaptor,
@@ -7,11 +7,16 @@ from cads_adaptors.adaptors.cds import (
     ProcessingKwargs,
     Request,
 )
-from cads_adaptors.exceptions import RoocsRuntimeError, RoocsValueError
+from cads_adaptors.exceptions import RoocsValueError
 
 ROOK_URL = "http://compute.mips.climate.copernicus.eu/wps"
 ROOK_MODE = "async"
 
+# Operators which combine the datasets of a workflow, which can not be split
+COMBINING_OPERATORS = {"Concat", "Diff"}
+# Default number of the workflows of a request which run concurrently
+MAX_CONCURRENT_WORKFLOWS = 4
+
 
 class RoocsCdsAdaptor(AbstractCdsAdaptor):
     def __init__(self, *args, **kwargs):
@@ -21,6 +26,16 @@ class RoocsCdsAdaptor(AbstractCdsAdaptor):
         self.facets_order = self.config.get("facets_order", [])
         self.facet_search = self.config.get("facet_search", dict())
         self.operators = self.config.get("operators", dict())
+        self._facet_index = None
+
+    @property
+    def facet_index(self):
+        """Index of the facets, shared by the adaptors with the same facets."""
+        if self._facet_index is None:
+            from cads_adaptors.adaptors.roocs.facet_index import get_facet_index
+
+            self._facet_index = get_facet_index(self.facets, self.facet_groups)
+        return self._facet_index
 
     def get_caching_args(self, request: Request) -> CachingArgs:
         args = super().get_caching_args(request)
@@ -47,33 +62,63 @@ class RoocsCdsAdaptor(AbstractCdsAdaptor):
 
         (request,) = mapped_requests
 
-        workflow = self.construct_workflow(request)
-        try:
-            response = workflow.orchestrate()
-        except Exception as err:
-            raise RoocsRuntimeError(str(err))
-
-        try:
-            urls = response.download_urls()
-        except Exception:
-            raise RoocsRuntimeError(response.status)
-        urls += [response.provenance(), response.provenance_image()]
+        from cads_adaptors.adaptors.roocs import orchestration
 
+        workflows = self.construct_workflows(request)
         self.context.debug(f"DOWNLOAD KWARGS: {download_kwargs}")
-        return url_tools.try_download(urls, context=self.context, **download_kwargs)
+        return orchestration.orchestrate(
+            os.environ["ROOK_URL"],
+            [workflow._serialise() for workflow in workflows],
+            lambda urls: url_tools.try_download(
+                urls, context=self.context, **download_kwargs
+            ),
+            self.context,
+            policy=orchestration.PollingPolicy(**self.config.get("polling", dict())),
+            max_workers=self.config.get(
+                "max_concurrent_workflows", MAX_CONCURRENT_WORKFLOWS
+            ),
+        )
+
+    def construct_workflows(self, request):
+        """Construct the workflows of a request (see split_datasets)."""
+        variable_id, dataset_ids = self.find_datasets(request)
+        return [
+            self._construct_workflow(request, variable_id, group)
+            for group in self.split_datasets(dataset_ids)
+        ]
 
-    def construct_workflow(self, request):
-        os.environ["ROOK_URL"] = self.config.get("ROOK_URL", ROOK_URL)
-        import rooki.operators as rookops
+    def split_datasets(self, dataset_ids):
+        """
+        Split the datasets of a request between workflows.
 
-        from cads_adaptors.adaptors.roocs import operators
+        The outputs of a workflow are only listed once it has completed. With
+        split_workflows in the config, each dataset is processed by its own workflow
+        (these run concurrently, and the outputs of each one are downloaded as soon
+        as it completes), unless the operators of the config combine the datasets.
+        The results then hold a provenance document per dataset.
+        """
+        split = self.config.get("split_workflows", False)
+        if not split or COMBINING_OPERATORS.intersection(self.operators):
+            return [dataset_ids]
+        return [[dataset_id] for dataset_id in dataset_ids]
+
+    def construct_workflow(self, request):
+        return self._construct_workflow(request, *self.find_datasets(request))
 
+    def find_datasets(self, request):
+        """Variable and dataset ids of the request."""
         facets = self.find_facets(request)
         dataset_ids = [
             ".".join(facet for facet in sub_facets.values() if facet is not None)
             for sub_facets in facets
         ]
-        variable_id = facets[0].get("variable", "")
+        return facets[0].get("variable", ""), dataset_ids
+
+    def _construct_workflow(self, request, variable_id, dataset_ids):
+        os.environ["ROOK_URL"] = self.config.get("ROOK_URL", ROOK_URL)
+        import rooki.operators as rookops
+
+        from cads_adaptors.adaptors.roocs import operators
 
         workflow = rookops.Input(variable_id, dataset_ids)
 
@@ -100,7 +145,7 @@ class RoocsCdsAdaptor(AbstractCdsAdaptor):
             if kwargs:
                 workflow = getattr(rookops, operator.ROOKI)(workflow, **kwargs)
 
-        if list(eval(workflow._serialise())) == ["inputs", "doc"]:
+        if list(json.loads(workflow._serialise())) == ["inputs", "doc"]:
             workflow = rookops.Subset(workflow)
 
         return workflow
@@ -141,28 +186,14 @@ class RoocsCdsAdaptor(AbstractCdsAdaptor):
 
         request = {k: v for k, v in request.items() if k in self.facets[0]}
 
-        matched_facets = []
         regex_facets = {
             key: self.facet_search[key].format(**{key: request.pop(key)})
             for key in self.facet_search
         }
-
-        for raw_candidate in self.facets:
-            candidate = raw_candidate.copy()
-            tmp_request = request.copy()
-
-            for key, groups in self.facet_groups.items():
-                if key in candidate:
-                    for group in groups:
-                        if candidate[key] in groups[group]:
-                            candidate[key] = group
-
-            if candidate.items() >= tmp_request.items():
-                for key, value in regex_facets.items():
-                    if not re.search(value, candidate[key]):
-                        break
-                else:
-                    matched_facets.append(raw_candidate)
+        matched_facets = [
+            self.facets[row_id]
+            for row_id in self.facet_index.search(request, regex_facets)
+        ]
 
         if not matched_facets:
             raise RoocsValueError(f"No data found for request {request}")
@@ -0,0 +1,134 @@
+"""Inverted index of the facets of a ROOCS dataset.
+
+Facet tables (e.g. of CMIP datasets) have tens of thousands of rows, which were scanned
+for each request. The index maps each value of each facet (after the facet groups are
+applied) to the ids of the rows with that value, so that the rows of a request are
+found by intersecting the rows of its values. Facets are indexed when they are first
+searched. The regular expressions of facet_search
+are compiled once, and tested once per distinct value of their facet.
+
+Indexes are built once per facet table and cached, so that they are shared by the
+adaptors with the same facets and facet groups in their config.
+"""
+
+import re
+from typing import Any
+
+from cads_adaptors.tools import request_cache
+from cads_adaptors.tools.general import TTLCache
+
+FACET_INDEX_CACHE_TTL = 3600.0
+_FACET_INDEXES = TTLCache(FACET_INDEX_CACHE_TTL, maxsize=16)
+
+# Number of regular expressions whose rows are kept by an index
+MAX_PATTERNS = 256
+# Number of rows digested to look up the index of a facet table
+FINGERPRINT_ROWS = 64
+
+
+def group_value(groups: dict[str, list[Any]], value: Any) -> Any:
+    """Replace a facet value by the name of its group, in the order of the groups."""
+    for group, members in groups.items():
+        if value in members:
+            value = group
+    return value
+
+
+class FacetIndex:
+    def __init__(
+        self,
+        facets: list[dict[str, Any]],
+        facet_groups: dict[str, dict[str, list[Any]]] | None = None,
+    ) -> None:
+        self.facets = facets
+        self.facet_groups = facet_groups or {}
+        # Rows of each value of each facet, indexed when the facet is first searched
+        self._rows: dict[str, dict[Any, list[int]]] = {}
+        self._pattern_rows: dict[tuple[str, str], set[int]] = {}
+
+    def rows(self, key: str) -> dict[Any, list[int]]:
+        """Ids of the rows with each value of a facet, after grouping the values."""
+        if key not in self._rows:
+            groups = self.facet_groups.get(key)
+            # Values are grouped once per distinct value
+            grouped: dict[Any, Any] = {}
+            rows: dict[Any, list[int]] = {}
+            for row_id, facet in enumerate(self.facets):
+                if key not in facet:
+                    continue
+                value = facet[key]
+                if groups is not None:
+                    if value not in grouped:
+                        grouped[value] = group_value(groups, value)
+                    value = grouped[value]
+                rows.setdefault(value, []).append(row_id)
+            self._rows[key] = rows
+        return self._rows[key]
+
+    def pattern_rows(self, key: str, pattern: str) -> set[int]:
+        """Rows whose value of a facet matches a regular expression (re.search)."""
+        if (key, pattern) not in self._pattern_rows:
+            if len(self._pattern_rows) >= MAX_PATTERNS:
+                self._pattern_rows.clear()
+            regex = re.compile(pattern)
+            self._pattern_rows[key, pattern] = {
+                row_id
+                for value, row_ids in self.rows(key).items()
+                if isinstance(value, str) and regex.search(value)
+                for row_id in row_ids
+            }
+        return self._pattern_rows[key, pattern]
+
+    def search(
+        self, request: dict[str, Any], patterns: dict[str, str] | None = None
+    ) -> list[int]:
+        """Sorted ids of the rows with the values of request, matching patterns."""
+        selections: list[Any] = []
+        for key, value in request.items():
+            try:
+                row_ids = self.rows(key).get(value)
+            except TypeError:
+                # Unhashable values are not facet values
+                row_ids = None
+            if not row_ids:
+                return []
+            selections.append(row_ids)
+        for key, pattern in (patterns or {}).items():
+            selections.append(self.pattern_rows(key, pattern))
+        if not selections:
+            return list(range(len(self.facets)))
+        # Intersect from the smallest selection
+        selections.sort(key=len)
+        selected = set(selections[0])
+        for row_ids in selections[1:]:
+            selected.intersection_update(row_ids)
+        return sorted(selected)
+
+
+def get_facet_index(
+    facets: list[dict[str, Any]],
+    facet_groups: dict[str, dict[str, list[Any]]] | None = None,
+) -> FacetIndex:
+    """Cached index of a facet table.
+
+    Indexes are looked up by a digest of a sample of the rows, and compared to the
+    facets (which is much faster than digesting them all) before they are reused.
+    """
+    facet_groups = facet_groups or {}
+    step = max(len(facets) // FINGERPRINT_ROWS, 1)
+    key = request_cache.canonical_digest(
+        {
+            "size": len(facets),
+            "sample": facets[::step],
+            "facet_groups": facet_groups,
+        }
+    )
+    index = _FACET_INDEXES.get(key)
+    if index is None or index.facets != facets or index.facet_groups != facet_groups:
+        index = FacetIndex(facets, facet_groups)
+        _FACET_INDEXES.set(key, index)
+    return index
+
+
+def clear_facet_index_cache() -> None:
+    _FACET_INDEXES.clear()
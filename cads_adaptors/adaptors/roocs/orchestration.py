@@ -0,0 +1,188 @@
+"""Orchestration of rook workflows on its WPS service.
+
+Workflows are submitted to the "orchestrate" process of the service in asynchronous
+mode, and their status is polled with the adaptive delay of tools.wps. Several
+workflows (e.g. one per dataset of a request) run concurrently, and the outputs of
+each workflow are downloaded as soon as it succeeds, while the others are still
+running.
+
+The orchestrate process only lists its outputs (the metalink of the results) in the
+status document of a completed workflow, so the files of a workflow can not be
+downloaded while it runs: datasets may be configured (split_workflows) to split
+their requests into a workflow per dataset, to start their downloads earlier.
+"""
+
+import concurrent.futures
+import os
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Iterator
+from xml.sax.saxutils import escape
+
+import requests
+
+from cads_adaptors.adaptors import Context
+from cads_adaptors.exceptions import RoocsRuntimeError
+from cads_adaptors.tools.general import strtobool
+from cads_adaptors.tools.wps import (
+    OWS_NAMESPACE,
+    WPS_NAMESPACE,
+    JobStatus,
+    PollingPolicy,
+    parse_execute_response,
+    poll,
+)
+
+ORCHESTRATE_PROCESS = "orchestrate"
+# Outputs of the orchestrate process: the metalink of the results, and the provenance
+# document and image
+ORCHESTRATE_OUTPUTS = ["output", "prov", "prov_plot"]
+
+
+def execute_request(workflow: str, outputs: list[str] = ORCHESTRATE_OUTPUTS) -> str:
+    """WPS 1.0.0 Execute request of the orchestrate process, in asynchronous mode."""
+    output_elements = "".join(
+        f'<wps:Output asReference="true"><ows:Identifier>{output}</ows:Identifier>'
+        "</wps:Output>"
+        for output in outputs
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<wps:Execute service="WPS" version="1.0.0" xmlns:wps="{WPS_NAMESPACE}"'
+        f' xmlns:ows="{OWS_NAMESPACE}">'
+        f"<ows:Identifier>{ORCHESTRATE_PROCESS}</ows:Identifier>"
+        "<wps:DataInputs><wps:Input><ows:Identifier>workflow</ows:Identifier>"
+        '<wps:Data><wps:ComplexData mimeType="application/json">'
+        f"{escape(workflow)}</wps:ComplexData></wps:Data></wps:Input></wps:DataInputs>"
+        '<wps:ResponseForm><wps:ResponseDocument storeExecuteResponse="true"'
+        f' status="true" lineage="true">{output_elements}</wps:ResponseDocument>'
+        "</wps:ResponseForm></wps:Execute>"
+    )
+
+
+def metalink_urls(content: bytes) -> list[str]:
+    """URLs of the files of a metalink document (in its metaurl elements)."""
+    return [
+        (element.text or "").strip()
+        for element in ET.fromstring(content).iter()
+        if element.tag.split("}")[-1] == "metaurl"
+    ]
+
+
+def default_session() -> requests.Session:
+    """Session with the authentication and verification settings of rooki."""
+    session = requests.Session()
+    session.verify = strtobool(os.getenv("ROOK_SSL_VERIFY", "false"))
+    if "ACCESS_TOKEN" in os.environ:
+        session.headers["Authorization"] = f"Bearer {os.environ['ACCESS_TOKEN']}"
+    return session
+
+
+class WorkflowJob:
+    """A workflow running on the orchestrate process of a WPS service."""
+
+    def __init__(
+        self,
+        url: str,
+        workflow: str,
+        session: requests.Session,
+        context: Context,
+        policy: PollingPolicy = PollingPolicy(),
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.url = url
+        self.workflow = workflow
+        self.session = session
+        self.context = context
+        self.policy = policy
+        self.sleep = sleep
+        self.polls = 0
+
+    def request(self, method: str, url: str, **kwargs: Any) -> bytes:
+        try:
+            response = self.session.request(method, url, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            raise RoocsRuntimeError(f"Request to the WPS service failed: {exc}")
+        return response.content
+
+    def statuses(self) -> Iterator[JobStatus]:
+        """Submit the workflow, and yield its statuses until it completes."""
+        try:
+            job_status = parse_execute_response(
+                self.request(
+                    "POST",
+                    self.url,
+                    data=execute_request(self.workflow).encode(),
+                    headers={"Content-Type": "text/xml"},
+                )
+            )
+            yield job_status
+            for job_status in poll(job_status, self.session, self.policy, self.sleep):
+                self.polls += 1
+                self.context.count("roocs.orchestration.polls")
+                yield job_status
+        except TimeoutError:
+            raise RoocsRuntimeError(
+                f"Workflow not completed after {self.policy.timeout} seconds"
+            )
+        except (requests.RequestException, ValueError) as exc:
+            raise RoocsRuntimeError(f"Request to the WPS service failed: {exc}")
+
+    def run(self) -> list[str]:
+        """Run the workflow, and return the references of its outputs."""
+        for job_status in self.statuses():
+            self.context.debug(
+                f"Workflow status: {job_status.status} [{job_status.percent}/100] "
+                f"{job_status.message[:50]}"
+            )
+        if job_status.status != "ProcessSucceeded":
+            raise RoocsRuntimeError(
+                "; ".join(error.text for error in job_status.errors)
+                or f"Workflow {job_status.status}"
+            )
+        return job_status.outputs
+
+
+def orchestrate(
+    url: str,
+    workflows: list[str],
+    download: Callable[[list[str]], list[str]],
+    context: Context,
+    policy: PollingPolicy = PollingPolicy(),
+    max_workers: int | None = None,
+    session: requests.Session | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> list[str]:
+    """Run workflows concurrently, and download the files of each one when it succeeds.
+
+    download is called with the URLs of the files and of the provenance of each
+    workflow, and returns the paths of the downloaded files.
+    """
+    session = session or default_session()
+    max_workers = max(1, min(max_workers or len(workflows), len(workflows)))
+
+    def run_and_download(workflow: str) -> list[str]:
+        outputs = WorkflowJob(url, workflow, session, context, policy, sleep).run()
+        metalink, *provenance = outputs
+        try:
+            response = session.get(metalink)
+            response.raise_for_status()
+            urls = metalink_urls(response.content)
+        except (requests.RequestException, ET.ParseError) as exc:
+            raise RoocsRuntimeError(f"Could not download metalink document. {exc}")
+        context.debug(f"Downloading {len(urls)} files of {metalink}")
+        return download(urls + provenance)
+
+    if max_workers == 1:
+        return [path for workflow in workflows for path in run_and_download(workflow)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(run_and_download, workflow) for workflow in workflows
+        ]
+        try:
+            return [path for future in futures for path in future.result()]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
@@ -4,13 +4,10 @@ import copy
 import datetime
 import json
 import os
-from typing import Any
-
-import owslib.util
-import owslib.wms
+from typing import Any, Literal
 
 from cads_adaptors import Context, exceptions
-from cads_adaptors.tools.general import ensure_list
+from cads_adaptors.tools.general import TTLCache, ensure_list
 
 DATE_KEYWORD_CONFIGS = [
     {
@@ -31,6 +28,15 @@ DATE_KEYWORD_CONFIGS = [
 
 Request = dict[str, Any]
 
+# Time-to-live (in seconds) of the GeoServer service objects (and therefore of their
+# capabilities documents) and of the features retrieved from them. Both can be
+# overridden with the GEOSERVER_CAPABILITIES_TTL and GEOSERVER_FEATURES_TTL env vars.
+GEOSERVER_CAPABILITIES_TTL = 3600.0
+GEOSERVER_FEATURES_TTL = 600.0
+
+_GEOSERVER_SERVICES = TTLCache(ttl=GEOSERVER_CAPABILITIES_TTL, maxsize=16)
+_GEOSERVER_FEATURES = TTLCache(ttl=GEOSERVER_FEATURES_TTL, maxsize=4096)
+
 
 def julian_to_ymd(jdate):
     # only integer julian dates are supported for now, as inherited
@@ -342,6 +348,90 @@ def make_bbox_centered_in_point(
     return bbox
 
 
+def _ttl_from_env(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _geoserver_service_key(service: str) -> tuple[str, str | None, str | None]:
+    return (
+        service,
+        os.environ.get("GEOSERVER_URL"),
+        os.environ.get(f"GEOSERVER_{service.upper()}_VERSION"),
+    )
+
+
+def clear_geoserver_cache() -> None:
+    """Drop the cached GeoServer service objects and features."""
+    _GEOSERVER_SERVICES.clear()
+    _GEOSERVER_FEATURES.clear()
+
+
+def get_geoserver_service(
+    service: Literal["wms", "wfs"],
+    context: Context = Context(),
+) -> Any:
+    """
+    Get a (cached) owslib service object for the GeoServer.
+
+    Instantiating an owslib service downloads and parses the capabilities document,
+    so the service objects are kept for GEOSERVER_CAPABILITIES_TTL seconds and
+    reused by all the feature lookups.
+
+    Parameters
+    ----------
+    service : str
+        The service type, either "wms" or "wfs".
+    context : Context
+        The context for logging and error handling.
+
+    Returns
+    -------
+    owslib.wms.WebMapService or owslib.wfs.WebFeatureService
+        The service object.
+
+    Raises
+    ------
+    exceptions.GeoServerError
+        If there is an error connecting to the service.
+    """
+    key = _geoserver_service_key(service)
+    if (ows_service := _GEOSERVER_SERVICES.get(key)) is not None:
+        return ows_service
+
+    # owslib (and requests) are only needed for geoserver-layer validation, so they are
+    # imported here to keep them out of the package import time.
+    import owslib.util
+
+    _, url, version = key
+    try:
+        if service == "wms":
+            from owslib.wms import WebMapService
+
+            ows_service = WebMapService(
+                url, version=version, auth=owslib.util.Authentication()
+            )
+        else:
+            from owslib.wfs import WebFeatureService
+
+            ows_service = WebFeatureService(
+                url, version=version, auth=owslib.util.Authentication()
+            )
+    except Exception as e:
+        context.error(f"Error connecting to {service.upper()} service: {e}")
+        raise exceptions.GeoServerError(
+            f"Could not connect to {service.upper()} service"
+        ) from e
+    _GEOSERVER_SERVICES.set(
+        key,
+        ows_service,
+        ttl=_ttl_from_env("GEOSERVER_CAPABILITIES_TTL", GEOSERVER_CAPABILITIES_TTL),
+    )
+    return ows_service
+
+
 def get_features_at_point(
     point: tuple[float, float],
     layer: str,
@@ -375,15 +465,18 @@ def get_features_at_point(
     exceptions.GeoServerError
         If there is an error connecting to or retrieving features from the WFS service.
     """
-    try:
-        wms = owslib.wms.WebMapService(
-            os.environ.get("GEOSERVER_URL"),
-            version=os.environ.get("GEOSERVER_WMS_VERSION"),
-            auth=owslib.util.Authentication(),
-        )
-    except Exception as e:
-        context.error(f"Error connecting to WMS service: {e}")
-        raise exceptions.GeoServerError("Could not connect to WMS service") from e
+    cache_key = (
+        "point",
+        os.environ.get("GEOSERVER_URL"),
+        layer,
+        tuple(point),
+        spatial_reference_system,
+        max_features,
+    )
+    if (features := _GEOSERVER_FEATURES.get(cache_key)) is not None:
+        return copy.deepcopy(features)
+
+    wms = get_geoserver_service("wms", context=context)
     bbox = make_bbox_centered_in_point(point_lat=point[0], point_lon=point[1])
     try:
         response = wms.getfeatureinfo(
@@ -397,12 +490,18 @@ def get_features_at_point(
             feature_count=max_features,
         )
     except Exception as e:
+        _GEOSERVER_SERVICES.pop(_geoserver_service_key("wms"))
         context.error(f"Error retrieving features from WMS service: {e}")
         raise exceptions.GeoServerError(
             "Could not retrieve features from WMS service"
         ) from e
     feature_collection = json.loads(response.read())
     features = feature_collection["features"]
+    _GEOSERVER_FEATURES.set(
+        cache_key,
+        copy.deepcopy(features),
+        ttl=_ttl_from_env("GEOSERVER_FEATURES_TTL", GEOSERVER_FEATURES_TTL),
+    )
     return features
 
 
@@ -439,17 +538,18 @@ def get_features_in_area(
     exceptions.GeoServerError
         If there is an error connecting to or retrieving data from the WFS service.
     """
-    import owslib.wfs
+    cache_key = (
+        "area",
+        os.environ.get("GEOSERVER_URL"),
+        layer,
+        tuple(area),
+        spatial_reference_system,
+        max_features,
+    )
+    if (features := _GEOSERVER_FEATURES.get(cache_key)) is not None:
+        return copy.deepcopy(features)
 
-    try:
-        wfs = owslib.wfs.WebFeatureService(
-            os.environ.get("GEOSERVER_URL"),
-            version=os.environ.get("GEOSERVER_WFS_VERSION"),
-            auth=owslib.util.Authentication(),
-        )
-    except Exception as e:
-        context.error(f"Error connecting to WFS service: {e}")
-        raise exceptions.GeoServerError("Could not connect to WFS service") from e
+    wfs = get_geoserver_service("wfs", context=context)
     try:
         bbox = (area[1], area[2], area[3], area[0])
         response = wfs.getfeature(
@@ -460,12 +560,18 @@ def get_features_in_area(
             maxfeatures=max_features,
         )
     except Exception as e:
+        _GEOSERVER_SERVICES.pop(_geoserver_service_key("wfs"))
         context.error(f"Error retrieving features from WFS service: {e}")
         raise exceptions.GeoServerError(
             "Could not retrieve features from WFS service"
         ) from e
     feature_collection = json.loads(response.getvalue())
     features = feature_collection["features"]
+    _GEOSERVER_FEATURES.set(
+        cache_key,
+        copy.deepcopy(features),
+        ttl=_ttl_from_env("GEOSERVER_FEATURES_TTL", GEOSERVER_FEATURES_TTL),
+    )
     return features
 
 
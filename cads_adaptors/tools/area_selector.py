@@ -1,7 +1,9 @@
+import dataclasses
+import hashlib
 import os
 import time
 from copy import deepcopy
-from typing import Any, Callable, Type
+from typing import Any, Callable, Hashable, Type
 
 import numpy as np
 import xarray as xr
@@ -10,6 +12,8 @@ from earthkit.transforms import tools as eka_tools
 from cads_adaptors.adaptors import Context
 from cads_adaptors.exceptions import CdsFormatConversionError, InvalidRequest
 from cads_adaptors.tools import adaptor_tools, convertors
+from cads_adaptors.tools.general import TTLCache
+from cads_adaptors.tools.spatial_index import GridIndex
 
 
 def area_to_checked_dictionary(area: list[float | int]) -> dict[str, float | int]:
@@ -140,6 +144,222 @@ def get_dim_slices(
     return [slice(start, end)]
 
 
+@dataclasses.dataclass(frozen=True)
+class SlicePlan:
+    """Positional selection of an area on a regular grid.
+
+    The longitude selection is a slice, or an array of indices when the area wraps
+    around the edge of the grid, which replaces a concatenation of two selections.
+    """
+
+    lat_key: str
+    lon_key: str
+    lat_index: slice
+    lon_index: slice | np.ndarray
+
+    def apply(self, ds: xr.Dataset) -> xr.Dataset:
+        return ds.isel({self.lat_key: self.lat_index, self.lon_key: self.lon_index})
+
+
+@dataclasses.dataclass(frozen=True)
+class IndexPlan:
+    """Positional selection of an area on a curvilinear or unstructured grid.
+
+    Curvilinear grids are cut to the smallest window of their two spatial dimensions
+    containing the area, unstructured grids keep the points inside the area.
+    """
+
+    indexers: dict[Hashable, slice | np.ndarray]
+
+    def apply(self, ds: xr.Dataset) -> xr.Dataset:
+        return ds.isel(self.indexers)
+
+
+# Slice plans are keyed on the spatial coordinates and the area, so that files which
+# share a grid (e.g. a series of daily files) are only scanned once.
+SLICE_PLAN_CACHE_TTL = 3600.0
+_SLICE_PLANS = TTLCache(SLICE_PLAN_CACHE_TTL, maxsize=256)
+_SPATIAL_INFO = TTLCache(SLICE_PLAN_CACHE_TTL, maxsize=256)
+# Spatial indexes are larger than the plans, keep fewer of them
+_GRID_INDEXES = TTLCache(SLICE_PLAN_CACHE_TTL, maxsize=16)
+
+
+def clear_slice_plan_cache() -> None:
+    _SLICE_PLANS.clear()
+    _SPATIAL_INFO.clear()
+    _GRID_INDEXES.clear()
+
+
+def coordinate_fingerprint(da: xr.DataArray) -> str:
+    values = np.ascontiguousarray(da.values)
+    digest = hashlib.blake2b(values.tobytes(), digest_size=16)
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    return digest.hexdigest()
+
+
+def get_spatial_info(ds: xr.Dataset, **kwargs: Any) -> dict[str, Any]:
+    """Cached earthkit.transforms get_spatial_info, keyed on the coordinates' metadata."""
+    key = (
+        tuple(
+            (name, coord.dims, repr(sorted(coord.attrs.items())))
+            for name, coord in ds.coords.items()
+        ),
+        tuple(sorted(kwargs.items())),
+    )
+    spatial_info = _SPATIAL_INFO.get(key)
+    if spatial_info is None:
+        # earthkit.transforms only searches dimensions for the spatial keys, the
+        # coordinates of curvilinear and unstructured grids are not dimensions.
+        for axis, names in (("lat_key", LATITUDE_NAMES), ("lon_key", LONGITUDE_NAMES)):
+            if kwargs.get(axis) is None:
+                coord_key = find_coordinate_key(ds, names)
+                if coord_key is not None and coord_key not in ds.dims:
+                    kwargs[axis] = coord_key
+        spatial_info = eka_tools.get_spatial_info(ds, **kwargs)
+        _SPATIAL_INFO.set(key, spatial_info)
+    return spatial_info
+
+
+LATITUDE_NAMES = ("latitude", "lat")
+LONGITUDE_NAMES = ("longitude", "lon", "long")
+
+
+def find_coordinate_key(ds: xr.Dataset, names: tuple[str, ...]) -> str | None:
+    """Key of the coordinate with one of the names as key or standard_name."""
+    for name in names:
+        if name in ds.coords:
+            return name
+    for key, coord in ds.coords.items():
+        if coord.attrs.get("standard_name") in names:
+            return str(key)
+    return None
+
+
+def label_slice_to_index(index: Any, label_slice: slice) -> slice:
+    """Integer slice equivalent to selecting label_slice with .sel."""
+    return index.slice_indexer(label_slice.start, label_slice.stop, label_slice.step)
+
+
+def get_slice_plan(
+    ds: xr.Dataset,
+    lat_key: str,
+    lon_key: str,
+    area: dict[str, float | int],
+    context: Context = Context(),
+    **kwargs: Any,
+) -> SlicePlan:
+    key = (
+        lat_key,
+        lon_key,
+        coordinate_fingerprint(ds[lat_key]),
+        coordinate_fingerprint(ds[lon_key]),
+        tuple(sorted(area.items())),
+        tuple(sorted(kwargs.items())),
+    )
+    plan = _SLICE_PLANS.get(key)
+    if plan is not None:
+        return plan
+
+    # Longitudes could return multiple slice in cases where the area wraps the "other side"
+    lon_slices = get_dim_slices(
+        ds, lon_key, area["east"], area["west"], context, longitude=True, **kwargs
+    )
+    # We assume that latitudes won't be wrapped
+    lat_slice = get_dim_slices(
+        ds, lat_key, area["south"], area["north"], context, **kwargs
+    )[0]
+    context.debug(f"lat_slice: {lat_slice}\nlon_slices: {lon_slices}")
+
+    lon_index_slices = [
+        label_slice_to_index(ds.indexes[lon_key], lon_slice) for lon_slice in lon_slices
+    ]
+    lon_index: slice | np.ndarray
+    if len(lon_index_slices) == 1:
+        lon_index = lon_index_slices[0]
+    else:
+        size = ds.sizes[lon_key]
+        lon_index = np.concatenate(
+            [np.arange(size)[index_slice] for index_slice in lon_index_slices]
+        )
+    plan = SlicePlan(
+        lat_key=lat_key,
+        lon_key=lon_key,
+        lat_index=label_slice_to_index(ds.indexes[lat_key], lat_slice),
+        lon_index=lon_index,
+    )
+    _SLICE_PLANS.set(key, plan)
+    return plan
+
+
+def get_grid_index(ds: xr.Dataset, lat_key: str, lon_key: str) -> GridIndex:
+    """Cached spatial index of a curvilinear or unstructured grid."""
+    key = (coordinate_fingerprint(ds[lat_key]), coordinate_fingerprint(ds[lon_key]))
+    grid_index = _GRID_INDEXES.get(key)
+    if grid_index is None:
+        grid_index = GridIndex(ds[lat_key].values, ds[lon_key].values)
+        _GRID_INDEXES.set(key, grid_index)
+    return grid_index
+
+
+def get_index_plan(
+    ds: xr.Dataset,
+    lat_key: str,
+    lon_key: str,
+    area: dict[str, float | int],
+    context: Context = Context(),
+) -> IndexPlan:
+    spatial_dims = ds[lat_key].dims
+    if len(spatial_dims) not in (1, 2):
+        context.add_user_visible_error(
+            "Area selection not available for data projection"
+        )
+        raise NotImplementedError("Area selection not available for data projection")
+
+    key = (
+        "irregular",
+        lat_key,
+        lon_key,
+        coordinate_fingerprint(ds[lat_key]),
+        coordinate_fingerprint(ds[lon_key]),
+        tuple(sorted(area.items())),
+    )
+    plan = _SLICE_PLANS.get(key)
+    if plan is not None:
+        return plan
+
+    grid_index = get_grid_index(ds, lat_key, lon_key)
+    # NOTE: area["east"] and area["west"] hold the western and eastern bounds
+    bounds = {
+        "north": area["north"],
+        "west": area["east"],
+        "south": area["south"],
+        "east": area["west"],
+    }
+    indexer: tuple[slice, ...] | np.ndarray | None
+    if len(spatial_dims) == 1:
+        indexer = grid_index.query(**bounds)
+        if indexer.size == 0:
+            indexer = None
+    else:
+        indexer = grid_index.window(**bounds)
+    if indexer is None:
+        message = (
+            "Area selection resulted in a dataset with no points.\n"
+            "Please ensure that your area selection covers at least one point in the data."
+        )
+        context.add_user_visible_error(message)
+        raise InvalidRequest(message)
+
+    if isinstance(indexer, tuple):
+        plan = IndexPlan(dict(zip(spatial_dims, indexer)))
+        context.debug(f"index window: {plan.indexers}")
+    else:
+        plan = IndexPlan({spatial_dims[0]: indexer})
+        context.debug(f"index points: {indexer.size}")
+    _SLICE_PLANS.set(key, plan)
+    return plan
+
+
 def area_selector(
     ds: xr.Dataset,
     area: list[float | int] | dict[str, float | int],
@@ -152,7 +372,7 @@ def area_selector(
     # Take a copy as they will be updated herein
     copied_kwargs = deepcopy(kwargs)
 
-    spatial_info = eka_tools.get_spatial_info(
+    spatial_info = get_spatial_info(
         ds,
         **{
             k: copied_kwargs.pop(k)
@@ -168,40 +388,14 @@ def area_selector(
         extra_kwargs: dict[str, Any] = {
             k: copied_kwargs.pop(k) for k in ["precision"] if k in copied_kwargs
         }
-        # Longitudes could return multiple slice in cases where the area wraps the "other side"
-        lon_slices = get_dim_slices(
-            ds,
-            lon_key,
-            area["east"],
-            area["west"],
-            context,
-            longitude=True,
-            **extra_kwargs,
-        )
-        # We assume that latitudes won't be wrapped
-        lat_slice = get_dim_slices(
-            ds, lat_key, area["south"], area["north"], context, **extra_kwargs
-        )[0]
-
-        context.debug(f"lat_slice: {lat_slice}\nlon_slices: {lon_slices}")
-
-        sub_selections = []
-        for lon_slice in lon_slices:
-            sel_kwargs: dict[str, Any] = {
-                **copied_kwargs,  # Any remaining copied_kwargs are for the sel command
-                spatial_info["lat_key"]: lat_slice,
-                spatial_info["lon_key"]: lon_slice,
-            }
-            sub_selections.append(
-                ds.sel(
-                    **sel_kwargs,
-                )
-            )
-        context.debug(f"selections: {sub_selections}")
-
-        ds_area = xr.concat(
-            sub_selections, dim=lon_key, data_vars="minimal", coords="minimal"
+        plan: SlicePlan | IndexPlan = get_slice_plan(
+            ds, lat_key, lon_key, area, context, **extra_kwargs
         )
+        ds_area = plan.apply(ds)
+        # Any remaining copied_kwargs are for the sel command
+        if copied_kwargs:
+            sel_kwargs: dict[str, Any] = dict(copied_kwargs)
+            ds_area = ds_area.sel(**sel_kwargs)
         context.debug(f"ds_area: {ds_area}")
 
         # Ensure that there are no length zero dimensions
@@ -217,10 +411,15 @@ def area_selector(
         return ds_area
 
     else:
-        context.add_user_visible_error(
-            "Area selection not available for data projection"
-        )
-        raise NotImplementedError("Area selection not available for data projection")
+        # Curvilinear (2-D) and unstructured (1-D) grids
+        copied_kwargs.pop("precision", None)
+        plan = get_index_plan(ds, lat_key, lon_key, area, context)
+        ds_area = plan.apply(ds)
+        if copied_kwargs:
+            sel_kwargs = dict(copied_kwargs)
+            ds_area = ds_area.sel(**sel_kwargs)
+        context.debug(f"ds_area: {ds_area}")
+        return ds_area
 
 
 def area_selector_path(
@@ -247,6 +446,11 @@ def area_selector_path(
     # Preserve the original area_selector_kwargs and extract precompute
     _area_selector_kwargs = deepcopy(area_selector_kwargs)
     precompute: bool = _area_selector_kwargs.pop("precompute", True)
+    # If set, write the subset in chunks of at most this many bytes instead of
+    # loading it in full, to bound the memory used per file
+    stream_chunk_bytes: int | None = _area_selector_kwargs.pop(
+        "stream_chunk_bytes", None
+    )
 
     # Deduce input format from infile
     in_ext = infile.split(".")[-1]
@@ -259,14 +463,16 @@ def area_selector_path(
         target_dir = os.path.dirname(infile)
 
     # Set decode_times to False to avoid any unnecessary issues with decoding time coordinates
-    # Also set some auto-chunking
+    # Also set some auto-chunking, unless streaming, where the dataset is opened lazily
+    # and chunked below
+    default_chunks = None if stream_chunk_bytes else -1
     if isinstance(open_datasets_kwargs, list):
         for _open_dataset_kwargs in open_datasets_kwargs:
             _open_dataset_kwargs.setdefault("decode_times", False)
-            _open_dataset_kwargs.setdefault("chunks", -1)
+            _open_dataset_kwargs.setdefault("chunks", default_chunks)
     else:
         open_datasets_kwargs.setdefault("decode_times", False)
-        open_datasets_kwargs.setdefault("chunks", -1)
+        open_datasets_kwargs.setdefault("chunks", default_chunks)
 
     # open_kwargs =
     ds_dict = convertors.open_file_as_xarray_dictionary(
@@ -278,6 +484,12 @@ def area_selector_path(
         },
     )
 
+    if stream_chunk_bytes:
+        ds_dict = {
+            fname_tag: ds.chunk(streaming_chunks(ds, stream_chunk_bytes))
+            for fname_tag, ds in ds_dict.items()
+        }
+
     ds_area_dict = {
         ".".join(
             [fname_tag, "area-subset"]
@@ -287,52 +499,185 @@ def area_selector_path(
     }
 
     # TODO: Consider using the write to file methods in convertors sub-module
-    out_paths = []
-    if out_format in ["nc", "netcdf"]:
-        for fname_tag, ds_area in ds_area_dict.items():
-            out_path = os.path.join(target_dir, f"{fname_tag}.nc")
-            for var in ds_area.variables:
-                ds_area[var].encoding.setdefault("_FillValue", None)
-            # Need to compute before writing to disk as dask loses too many jobs
-            if precompute:
-                ds_area = ds_area.compute()
-            ds_area.to_netcdf(out_path)
-            out_paths.append(out_path)
-    else:
+    if out_format not in ["nc", "netcdf"]:
         context.add_user_visible_error(
             f"Cannot write area selected data to {out_format}, writing to netcdf."
         )
-        for fname_tag, ds_area in ds_area_dict.items():
-            out_path = os.path.join(target_dir, f"{fname_tag}.nc")
-            for var in ds_area.variables:
-                ds_area[var].encoding.setdefault("_FillValue", None)
+    out_paths = []
+    for fname_tag, ds_area in ds_area_dict.items():
+        out_path = os.path.join(target_dir, f"{fname_tag}.nc")
+        for var in ds_area.variables:
+            ds_area[var].encoding.setdefault("_FillValue", None)
+        if stream_chunk_bytes:
+            write_netcdf_in_chunks(ds_area, out_path)
+        else:
+            # Need to compute before writing to disk as dask loses too many jobs
             if precompute:
                 ds_area = ds_area.compute()
             ds_area.to_netcdf(out_path)
-            out_paths.append(out_path)
+        out_paths.append(out_path)
 
     return out_paths
 
 
+def streaming_chunks(ds: xr.Dataset, max_bytes: int) -> dict[Hashable, int]:
+    """
+    Chunk sizes which keep every chunk of every variable below max_bytes, splitting
+    the outer dimensions first (e.g. time before latitude and longitude), so that
+    each chunk is a contiguous block of the file.
+    """
+    chunks: dict[Hashable, int] = {}
+    for da in ds.data_vars.values():
+        nbytes = da.dtype.itemsize
+        for dim, size in reversed(list(zip(da.dims, da.shape))):
+            size = min(size, chunks.get(dim, size))
+            if nbytes * size <= max_bytes:
+                nbytes *= size
+            else:
+                size = max(1, max_bytes // nbytes)
+                nbytes *= size
+            chunks[dim] = size
+    return chunks
+
+
+def write_netcdf_in_chunks(ds: xr.Dataset, out_path: str) -> None:
+    """Write a dask-backed dataset one chunk at a time, so that it is never fully loaded."""
+    import dask
+
+    for var in ds.variables.values():
+        # Chunk encodings inherited from the input file may not match the dask chunks
+        var.encoding.pop("chunksizes", None)
+        var.encoding.pop("preferred_chunks", None)
+    with dask.config.set(scheduler="synchronous"):
+        ds.to_netcdf(out_path)
+
+
+def _select_area_of_path(
+    path: str,
+    area: list[float | int] | dict[str, float | int],
+    context: Context,
+    **kwargs: Any,
+) -> tuple[list[str], int]:
+    try:
+        out_paths = area_selector_path(path, area=area, context=context, **kwargs)
+    except (NotImplementedError, CdsFormatConversionError):
+        context.logger.debug(
+            f"could not convert {path} to xarray; returning the original data"
+        )
+        return [path], 0
+    return out_paths, os.path.getsize(path)
+
+
+class _RecordingContext(Context):
+    """Context used in worker processes, its messages are replayed by the parent."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    def add_user_visible_log(self, *args: Any, **kwargs: Any) -> None:
+        self.records.append(("add_user_visible_log", args, kwargs))
+
+    def add_user_visible_error(self, *args: Any, **kwargs: Any) -> None:
+        self.records.append(("add_user_visible_error", args, kwargs))
+
+    def add_stdout(self, *args: Any, **kwargs: Any) -> None:
+        self.records.append(("add_stdout", args, kwargs))
+
+    def add_stderr(self, *args: Any, **kwargs: Any) -> None:
+        self.records.append(("add_stderr", args, kwargs))
+
+    def replay(self, context: Context) -> None:
+        for method, args, kwargs in self.records:
+            getattr(context, method)(*args, **kwargs)
+
+
+def _select_area_of_path_in_worker(
+    path: str,
+    area: list[float | int] | dict[str, float | int],
+    kwargs: dict[str, Any],
+) -> tuple[list[str] | BaseException, int, _RecordingContext]:
+    import dask
+
+    context = _RecordingContext()
+    # One file per process: avoid oversubscribing the cores with dask threads
+    with dask.config.set(scheduler="synchronous"):
+        try:
+            out_paths, filesize = _select_area_of_path(path, area, context, **kwargs)
+        except Exception as err:
+            return err, 0, context
+    return out_paths, filesize, context
+
+
+def default_max_workers() -> int:
+    """Number of processes selecting the areas of files, 1 (serial) by default.
+
+    Pools are opt-in (CADS_ADAPTORS_AREA_SELECTOR_MAX_WORKERS), as each pool pays the
+    start-up of its processes.
+    """
+    return int(os.getenv("CADS_ADAPTORS_AREA_SELECTOR_MAX_WORKERS", 1))
+
+
 def area_selector_paths(
     paths: list[str],
     area: list[float | int] | dict[str, float | int],
     context: Context = Context(),
+    max_workers: int | None = None,
     **kwargs: Any,
 ) -> list[str]:
+    """
+    Select the area of each path, returning the list of output paths in the same order.
+
+    With max_workers (by default CADS_ADAPTORS_AREA_SELECTOR_MAX_WORKERS, or 1) above
+    1, files are processed in a pool of processes, with the same area_selector_kwargs
+    as serially (e.g. "stream_chunk_bytes" to bound the memory used per file).
+    """
     time0 = time.time()
     total_filesize = 0
+    if max_workers is None:
+        max_workers = default_max_workers()
+    max_workers = max(1, min(max_workers, len(paths)))
+
     # We try to select the area for all paths, if any fail we return the original paths
     out_paths = []
-    for path in paths:
-        try:
-            out_paths += area_selector_path(path, area=area, context=context, **kwargs)
-            total_filesize += os.path.getsize(path)
-        except (NotImplementedError, CdsFormatConversionError):
-            context.logger.debug(
-                f"could not convert {path} to xarray; returning the original data"
+    if max_workers == 1:
+        for path in paths:
+            path_out_paths, filesize = _select_area_of_path(
+                path, area, context, **kwargs
             )
-            out_paths.append(path)
+            out_paths += path_out_paths
+            total_filesize += filesize
+    else:
+        import concurrent.futures
+        import multiprocessing
+
+        # Do not fork: the parent may hold HDF5/netCDF state that is not fork-safe
+        mp_context = multiprocessing.get_context(
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context
+        ) as executor:
+            futures = [
+                executor.submit(_select_area_of_path_in_worker, path, area, kwargs)
+                for path in paths
+            ]
+            try:
+                # Results are collected in submission order to preserve the ordering
+                for future in futures:
+                    result, filesize, worker_context = future.result()
+                    worker_context.replay(context)
+                    if isinstance(result, BaseException):
+                        raise result
+                    out_paths += result
+                    total_filesize += filesize
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
     context.info(
         f"Area selection for {len(paths)} files complete"
         f"Total filesize: {total_filesize}, subset time: {time.time() - time0:.2f} seconds",
@@ -1,4 +1,5 @@
 import itertools
+import math
 import os
 import time
 from typing import Any, Callable, NoReturn
@@ -11,17 +12,98 @@ from cads_adaptors.exceptions import CdsFormatConversionError
 from cads_adaptors.tools import adaptor_tools
 from cads_adaptors.tools.general import ensure_list
 
-STANDARD_COMPRESSION_OPTIONS = {
+# Compression presets, which can be selected by name in compression_options
+STANDARD_COMPRESSION_OPTIONS: dict[str, dict[str, Any]] = {
     "default": {
         "zlib": True,
         "complevel": 1,
         "shuffle": True,
         "engine": "netcdf4",
-    }
+    },
+    "uncompressed": {
+        "engine": "netcdf4",
+    },
+    "zlib-6": {
+        "zlib": True,
+        "complevel": 6,
+        "shuffle": True,
+        "engine": "netcdf4",
+    },
+    "zstd": {
+        "compression": "zstd",
+        "complevel": 3,
+        "shuffle": True,
+        "engine": "netcdf4",
+    },
+    "blosc-lz4": {
+        "compression": "blosc_lz4",
+        "complevel": 5,
+        "blosc_shuffle": 1,
+        "engine": "netcdf4",
+    },
+    # Lossy: floats are quantised to 4 significant digits before compression
+    "default-lossy": {
+        "zlib": True,
+        "complevel": 1,
+        "shuffle": True,
+        "significant_digits": 4,
+        "quantize_mode": "BitGroom",
+        "engine": "netcdf4",
+    },
+    "zstd-lossy": {
+        "compression": "zstd",
+        "complevel": 3,
+        "shuffle": True,
+        "significant_digits": 4,
+        "quantize_mode": "BitGroom",
+        "engine": "netcdf4",
+    },
+}
+
+# Encoding options that quantise the data, only applied to floating point variables
+LOSSY_COMPRESSION_OPTIONS = {
+    "least_significant_digit",
+    "significant_digits",
+    "quantize_mode",
+}
+
+# netCDF4 attributes telling whether the library was built with a compression filter
+COMPRESSION_FILTER_SUPPORT = {
+    "zstd": "__has_zstandard_support__",
+    "blosc": "__has_blosc_support__",
+    "bzip2": "__has_bzip2_support__",
+    "szip": "__has_szip_support__",
 }
 
 DEFAULT_OPEN_ENGINE = "cfgrib"
 
+# Dimensions read in full by each access pattern of the netCDF output
+ACCESS_PATTERN_DIMS = {
+    "spatial": {
+        "latitude",
+        "longitude",
+        "lat",
+        "lon",
+        "x",
+        "y",
+        "rlat",
+        "rlon",
+        "values",
+    },
+    "timeseries": {
+        "time",
+        "valid_time",
+        "forecast_reference_time",
+        "step",
+        "leadtime",
+        "date",
+    },
+}
+# None leaves the chunking to the netCDF library. Datasets opt in through their config:
+# post_processing_kwargs: {"to_netcdf_kwargs": {"access_pattern": "spatial"}}
+DEFAULT_ACCESS_PATTERN: str | None = None
+DEFAULT_TARGET_CHUNK_BYTES = 4 * 2**20
+
 DEFAULT_CHUNKS = {
     "time": 12,
     "step": 1,
@@ -65,7 +147,16 @@ def convert_format(
     convertor: None | Callable = CONVERTORS.get(target_format, None)
 
     if convertor is not None:
-        return convertor(result, context=context, **post_processing_kwargs)
+        with context.span(f"convert_format.{target_format}"):
+            converted = convertor(result, context=context, **post_processing_kwargs)
+        if context.instrumentation.enabled:
+            context.gauge_bytes(
+                f"convert_format.{target_format}",
+                sum(
+                    os.path.getsize(path) for path in converted if os.path.isfile(path)
+                ),
+            )
+        return converted
 
     else:
         message = (
@@ -187,6 +278,10 @@ def result_to_netcdf_legacy_files(
     Legacy grib_to_netcdf convertor, which will be marked as deprecated.
     Can only accept a grib file, or list/dict of grib files as input.
     Converts to netCDF3 only.
+
+    With to_netcdf_legacy_kwargs["in_process"], the files are converted by
+    tools.netcdf_legacy instead of the grib_to_netcdf command, with the
+    to_netcdf_legacy_kwargs["data_type"] of the packed values.
     """
     if to_netcdf_legacy_kwargs is None:
         to_netcdf_legacy_kwargs = {}
@@ -194,6 +289,7 @@ def result_to_netcdf_legacy_files(
     command: str | list[str] = to_netcdf_legacy_kwargs.get(
         "command", ["grib_to_netcdf", "-S", "param"]
     )
+    in_process: bool = to_netcdf_legacy_kwargs.get("in_process", False)
     filter_rules: str | None = to_netcdf_legacy_kwargs.get("filter_rules", None)
 
     context.add_user_visible_log(
@@ -229,10 +325,11 @@ def result_to_netcdf_legacy_files(
         # (This may not be necessary, but it probably implies something is wrong)
         result_types = list(set([type(r) for r in result.values()]))
         result_type = result_types[0]
+        first_result = next(iter(result.values()))
         assert (
             len(result_types) == 1
             and result_type is str
-            and (result[0].endswith(".grib") or result[0].endswith(".grib2"))
+            and (first_result.endswith(".grib") or first_result.endswith(".grib2"))
         ), (
             f"The 'netcdf_legacy' format can only accept grib files as input. Types received: {result_types}"
         )
@@ -245,21 +342,26 @@ def result_to_netcdf_legacy_files(
 
     if filter_rules:
         # Filter the grib files to netCDFable chunks (in replacement of split_on in legacy system)
-        here = os.getcwd()
-        with open(f"{here}/filter_rules", "w") as f:
-            f.write(filter_rules)
+        import glob
+        import subprocess
+
         filtered_results = {}
         for out_fname_base, grib_file in result.items():
-            import glob
-
             full_grib_path = os.path.realpath(grib_file)
             temp_filter_folder = (
                 f"{os.path.dirname(full_grib_path)}/{out_fname_base}.filtered"
             )
             os.makedirs(temp_filter_folder, exist_ok=True)
-            os.chdir(temp_filter_folder)
-            os.system(f"grib_filter {here}/filter_rules {full_grib_path}")
-            os.chdir(here)
+            rules_file = os.path.join(temp_filter_folder, "filter_rules")
+            with open(rules_file, "w") as f:
+                f.write(filter_rules)
+            # grib_filter writes relative to its working directory, which is set for the
+            # subprocess only, so that conversions can run concurrently
+            subprocess.run(
+                ["grib_filter", rules_file, full_grib_path],
+                cwd=temp_filter_folder,
+                check=True,
+            )
             for filter_file in glob.glob(f"{temp_filter_folder}/*.grib*"):
                 filter_base = os.path.splitext(os.path.basename(filter_file))[0]
                 filtered_results[f"{out_fname_base}_{filter_base}"] = filter_file
@@ -268,9 +370,32 @@ def result_to_netcdf_legacy_files(
     nc_files = []
     for out_fname_base, grib_file in result.items():
         out_fname = os.path.join(target_dir, f"{out_fname_base}.nc")
+        if in_process:
+            from cads_adaptors.tools import netcdf_legacy
+
+            netcdf_legacy.grib_to_netcdf_legacy(
+                grib_file,
+                out_fname,
+                data_type=to_netcdf_legacy_kwargs.get("data_type", "NC_SHORT"),
+            )
+        else:
+            import shlex
+            import subprocess
+
+            if isinstance(command, str):
+                command = shlex.split(command)
+            try:
+                returncode = subprocess.run(
+                    command + ["-o", out_fname, grib_file]
+                ).returncode
+            except FileNotFoundError:
+                returncode = None
+            if returncode != 0:
+                add_user_log_and_raise_error(
+                    f"Failed to convert {grib_file} to netCDF with {command}",
+                    context=context,
+                )
         nc_files.append(out_fname)
-        command = ensure_list(command)
-        os.system(" ".join(command + ["-o", out_fname, grib_file]))
 
     if len(nc_files) == 0:
         message = (
@@ -365,11 +490,18 @@ def xarray_dict_to_netcdf(
     to_netcdf_kwargs: None | dict[str, Any] = None,
     out_fname_prefix: str = "",
     target_dir: str = ".",
+    access_pattern: str | None = DEFAULT_ACCESS_PATTERN,
+    max_workers: int | None = None,
     **kwargs,
 ) -> list[str]:
     """
     Convert a dictionary of xarray datasets to netCDF files, where the key of the dictionary
     is used in the filename.
+
+    The chunk shape of each variable is chosen for the access_pattern (see
+    access_pattern_chunksizes), None leaves the chunking to the netCDF library.
+    Datasets are written concurrently in a pool of max_workers processes (by default,
+    CADS_ADAPTORS_NETCDF_MAX_WORKERS or 1).
     """
     if to_netcdf_kwargs is None:
         to_netcdf_kwargs = {}
@@ -381,26 +513,71 @@ def xarray_dict_to_netcdf(
         "compression_options", compression_options
     )
     out_fname_prefix = to_netcdf_kwargs.pop("out_fname_prefix", out_fname_prefix)
+    access_pattern = to_netcdf_kwargs.pop("access_pattern", access_pattern)
+    max_workers = to_netcdf_kwargs.pop("max_workers", max_workers)
 
-    # Fetch any preset compression options
-    if isinstance(compression_options, str):
-        compression_options = STANDARD_COMPRESSION_OPTIONS.get(compression_options, {})
+    base_options, variable_options = resolve_compression_options(
+        compression_options, context=context
+    )
+    to_netcdf_kwargs.setdefault("engine", base_options.pop("engine", "netcdf4"))
+    if to_netcdf_kwargs["engine"] != "netcdf4":
+        access_pattern = None
+
+    jobs = []
+    for out_fname_base, dataset in datasets.items():
+        encoding = {}
+        for var in dataset:
+            encoding[var] = variable_compression_encoding(
+                variable_options.get(str(var), base_options), dataset[var]
+            )
+            chunksizes = access_pattern_chunksizes(dataset[var], access_pattern)
+            if chunksizes is not None:
+                encoding[var]["chunksizes"] = chunksizes
+        out_fname = os.path.join(target_dir, f"{out_fname_prefix}{out_fname_base}.nc")
+        job_kwargs = {**to_netcdf_kwargs, "encoding": encoding}
+        context.debug(f"Writing {out_fname} with kwargs:\n{job_kwargs}")
+        jobs.append((dataset, out_fname, job_kwargs))
+
+    if max_workers is None:
+        max_workers = default_netcdf_max_workers()
+    max_workers = max(1, min(max_workers, len(jobs)))
 
-    to_netcdf_kwargs.setdefault("engine", compression_options.pop("engine", "netcdf4"))
-    out_nc_files = []
     time0 = time.time()
+    if max_workers == 1:
+        stats = [write_netcdf(*job) for job in jobs]
+    else:
+        import concurrent.futures
+        import multiprocessing
+
+        # Do not fork: the parent may hold HDF5/netCDF state that is not fork-safe
+        mp_context = multiprocessing.get_context(
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=mp_context
+        ) as executor:
+            futures = [executor.submit(write_netcdf, *job) for job in jobs]
+            try:
+                stats = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    out_nc_files = []
     total_filesize = 0
-    for out_fname_base, dataset in datasets.items():
-        to_netcdf_kwargs.update(
-            {
-                "encoding": {var: compression_options for var in dataset},
-            }
+    for (dataset, out_fname, _), (filesize, delta_time) in zip(jobs, stats):
+        context.info(
+            f"Wrote {out_fname}: filesize={filesize * 1e-6:.2f} Mb, "
+            f"compression ratio={compression_ratio(dataset.nbytes, filesize):.2f}, "
+            f"throughput={throughput(dataset.nbytes, delta_time) * 1e-6:.2f} Mb/s.",
+            delta_time=delta_time,
+            filesize=filesize,
         )
-        out_fname = os.path.join(target_dir, f"{out_fname_prefix}{out_fname_base}.nc")
-        context.debug(f"Writing {out_fname} with kwargs:\n{to_netcdf_kwargs}")
-        dataset.to_netcdf(out_fname, **to_netcdf_kwargs)
         out_nc_files.append(out_fname)
-        total_filesize += os.path.getsize(out_fname)
+        total_filesize += filesize
     context.info(
         f"Converted {len(datasets)} datasets to netCDF. "
         f"Total filesize={total_filesize * 1e-6:.2f} Mb, delta_time={time.time() - time0:.2f} seconds.",
@@ -411,6 +588,173 @@ def xarray_dict_to_netcdf(
     return out_nc_files
 
 
+def get_compression_preset(name: str, context: Context = Context()) -> dict[str, Any]:
+    if name not in STANDARD_COMPRESSION_OPTIONS:
+        context.warning(
+            f"Unknown compression preset: {name}, writing uncompressed netCDF. "
+            f"Valid presets are: {list(STANDARD_COMPRESSION_OPTIONS)}"
+        )
+    # Copy, so that the presets are not modified
+    return dict(STANDARD_COMPRESSION_OPTIONS.get(name, {}))
+
+
+def compression_filter(options: dict[str, Any]) -> str | None:
+    """Name of the HDF5 filter, other than zlib, used by compression options."""
+    compression = options.get("compression")
+    if isinstance(compression, str):
+        compression = compression.split("_")[0]
+        return None if compression == "zlib" else compression
+    for name in COMPRESSION_FILTER_SUPPORT:
+        if options.get(name):
+            return name
+    return None
+
+
+def with_available_filter(
+    options: dict[str, Any], context: Context = Context()
+) -> dict[str, Any]:
+    """Replace a compression filter that netCDF4 does not support with the default."""
+    name = compression_filter(options)
+    if name is None:
+        return options
+
+    import netCDF4
+
+    if getattr(netCDF4, COMPRESSION_FILTER_SUPPORT.get(name, ""), False):
+        return options
+    context.warning(
+        f"The {name} compression filter is not available, using the default compression."
+    )
+    fallback = {
+        key: value
+        for key, value in options.items()
+        if key not in {"compression", "complevel", "shuffle", "blosc_shuffle"}
+        and key not in COMPRESSION_FILTER_SUPPORT
+    }
+    return {**fallback, **get_compression_preset("default", context)}
+
+
+def resolve_compression_options(
+    compression_options: str | dict[str, Any], context: Context = Context()
+) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """
+    Split a compression policy into the options for all variables and per variable.
+
+    The policy is the name of a preset in STANDARD_COMPRESSION_OPTIONS, or a
+    dictionary of encoding options, which may start from a "preset" and can set
+    options of some "variables", e.g.::
+
+        {
+            "preset": "zstd",
+            "variables": {"tp": "default-lossy", "t2m": {"significant_digits": 3}},
+        }
+
+    Variables set to a preset use the preset only, other options update those for
+    all variables.
+    """
+    if isinstance(compression_options, str):
+        compression_options = {"preset": compression_options}
+    options = dict(compression_options)
+    variables = options.pop("variables", {})
+    base_options = {}
+    if "preset" in options:
+        base_options.update(get_compression_preset(options.pop("preset"), context))
+    base_options.update(options)
+    base_options = with_available_filter(base_options, context)
+
+    variable_options = {}
+    for var, var_options in variables.items():
+        if isinstance(var_options, str):
+            var_options = get_compression_preset(var_options, context)
+        else:
+            var_options = {**base_options, **var_options}
+        # The engine is set once for the whole file
+        var_options.pop("engine", None)
+        variable_options[var] = with_available_filter(var_options, context)
+    return base_options, variable_options
+
+
+def variable_compression_encoding(
+    options: dict[str, Any], variable: xr.DataArray
+) -> dict[str, Any]:
+    """Encoding of a variable, without lossy options for non floating point data."""
+    encoding = {k: v for k, v in options.items() if k != "engine"}
+    if variable.dtype.kind != "f":
+        for key in LOSSY_COMPRESSION_OPTIONS:
+            encoding.pop(key, None)
+    return encoding
+
+
+def write_netcdf(
+    dataset: xr.Dataset, out_fname: str, to_netcdf_kwargs: dict[str, Any]
+) -> tuple[int, float]:
+    """Write a dataset to netCDF, returning the filesize and the time taken."""
+    time0 = time.perf_counter()
+    dataset.to_netcdf(out_fname, **to_netcdf_kwargs)
+    return os.path.getsize(out_fname), time.perf_counter() - time0
+
+
+def default_netcdf_max_workers() -> int:
+    return int(os.getenv("CADS_ADAPTORS_NETCDF_MAX_WORKERS", 1))
+
+
+def compression_ratio(nbytes: int, filesize: int) -> float:
+    return nbytes / filesize if filesize else float("nan")
+
+
+def throughput(nbytes: int, delta_time: float) -> float:
+    return nbytes / delta_time if delta_time else float("nan")
+
+
+def access_pattern_chunksizes(
+    variable: xr.DataArray,
+    access_pattern: str | None = DEFAULT_ACCESS_PATTERN,
+    target_chunk_bytes: int = DEFAULT_TARGET_CHUNK_BYTES,
+) -> tuple[int, ...] | None:
+    """
+    Chunk shape of a variable for reading it according to an access pattern.
+
+    "spatial": chunks hold complete (or tiled, if larger than target_chunk_bytes) maps,
+    stacking several maps along the other dimensions up to target_chunk_bytes.
+    "timeseries": chunks hold complete time series of a spatial tile.
+    Returns None for scalar variables and when access_pattern is None.
+    """
+    if access_pattern is None or variable.ndim == 0 or variable.dtype.kind in "OSU":
+        return None
+    if access_pattern not in ACCESS_PATTERN_DIMS:
+        raise ValueError(
+            f"Unknown access_pattern: {access_pattern}. "
+            f"Valid options are: {list(ACCESS_PATTERN_DIMS)} or None."
+        )
+
+    dims = [str(dim) for dim in variable.dims]
+    shape = [max(size, 1) for size in variable.shape]
+    contiguous = [dim in ACCESS_PATTERN_DIMS[access_pattern] for dim in dims]
+    if access_pattern == "spatial" and not any(contiguous):
+        # Unknown spatial dimensions, assume they are the last two
+        contiguous = [i >= len(dims) - 2 for i in range(len(dims))]
+    chunks = [size if keep else 1 for size, keep in zip(shape, contiguous)]
+
+    def chunk_bytes() -> int:
+        return variable.dtype.itemsize * math.prod(chunks)
+
+    # Tile the contiguous dimensions if a chunk is too large
+    while chunk_bytes() > target_chunk_bytes and max(chunks) > 1:
+        largest = chunks.index(max(chunks))
+        chunks[largest] = math.ceil(chunks[largest] / 2)
+    # Extend the other dimensions, innermost first, if a chunk is too small
+    for i in reversed(range(len(dims))):
+        if contiguous[i]:
+            continue
+        per_unit = chunk_bytes() // chunks[i]
+        chunks[i] = max(1, min(shape[i], target_chunk_bytes // per_unit))
+        if chunks[i] < shape[i]:
+            # Even out the chunks, so that the last one is not mostly empty
+            chunks[i] = math.ceil(shape[i] / math.ceil(shape[i] / chunks[i]))
+            break
+    return tuple(chunks)
+
+
 def open_result_as_xarray_dictionary(
     result: Any,
     context: Context = Context(),
@@ -377,3 +377,54 @@ def implement_embargo(
         cacheable = False
 
     return out_requests, cacheable
+
+
+def seconds_until_embargo_changes(
+    embargo: dict[str, Any], now: datetime | None = None
+) -> float:
+    """
+    Number of seconds before the outcome of implement_embargo may change for a
+    given request, i.e. until the embargo datetime reaches the next full hour.
+    The embargo dictionary is not modified.
+    """
+    if now is None:
+        now = datetime.now(UTC)
+    delta = {
+        key: value
+        for key, value in embargo.items()
+        if key not in ("months", "error_time_format", "filter_timesteps")
+    }
+    delta["days"] = delta.get("days", 0) + months_to_days(embargo.get("months", 0), now)
+    embargo_datetime = now - timedelta(**delta)
+    next_hour = embargo_datetime.replace(minute=0, second=0, microsecond=0) + timedelta(
+        hours=1
+    )
+    return (next_hour - embargo_datetime).total_seconds()
+
+
+# MARS-style dates relative to today, e.g. "0" or "-1"
+re_mars_offset = re.compile(r"\s*(0|-[0-9]+)\s*")
+
+
+def has_relative_dates(request: dict[str, Any]) -> bool:
+    """
+    Whether any date of the request is relative to the current date, i.e. "current",
+    "current+-N" or a MARS-style offset such as "-1". Keys containing "date" are
+    checked, including both ends of "start/end" ranges.
+    """
+    for key, values in request.items():
+        if "date" not in key:
+            continue
+        for value in values if isinstance(values, (list, tuple)) else [values]:
+            for date in str(value).split(separator):
+                if "current" in date or re_mars_offset.fullmatch(date):
+                    return True
+    return False
+
+
+def seconds_until_next_utc_midnight(now: datetime | None = None) -> float:
+    """Number of seconds before relative dates resolve to another day."""
+    if now is None:
+        now = datetime.now(UTC)
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return (midnight + timedelta(days=1) - now).total_seconds()
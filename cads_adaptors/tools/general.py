@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import calendar
+import functools
+import itertools
 import os
-from collections import defaultdict
+import threading
+import time
+from collections import OrderedDict, defaultdict
 from datetime import datetime
-from typing import Any
+from typing import Any, Hashable, Iterator
 
 from cryptography.fernet import Fernet, InvalidToken
 
@@ -17,10 +22,109 @@ def ensure_list(input_item: Any) -> list:
     return [input_item]
 
 
+class TTLCache:
+    """A small thread-safe, size-bounded cache whose entries expire after a time-to-live.
+
+    Entries are evicted in least-recently-used order when ``maxsize`` is exceeded.
+    ``hits`` and ``misses`` are kept so that callers can report the cache efficiency.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            # Not cached, nor is any previous value of the key
+            self.pop(key)
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and item[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            for key in [key for key, item in self._data.items() if item[0] <= now]:
+                del self._data[key]
+            return len(self._data)
+
+
 SPLIT_BY_MONTH_KEY = "__split_by_month"
 
+ISO_DATE_FORMAT = "%Y-%m-%d"
+
+
+@functools.lru_cache(maxsize=4096)
+def _days_in_month(year: int, month: int) -> int:
+    return calendar.monthrange(year, month)[1]
+
+
+def iso_month_ordinal(value: Any) -> int | None:
+    """Month ordinal (12 * year + month - 1) of a valid YYYY-MM-DD date, else None."""
+    if not (
+        isinstance(value, str)
+        and len(value) == 10
+        and value.isascii()
+        and value[4] == value[7] == "-"
+        and value[:4].isdigit()
+        and value[5:7].isdigit()
+        and value[8:].isdigit()
+    ):
+        return None
+    year, month, day = int(value[:4]), int(value[5:7]), int(value[8:])
+    if not (1 <= month <= 12 and 1 <= day <= _days_in_month(year, month)):
+        return None
+    return 12 * year + month - 1
+
 
 def group_by_month(values, date_format):
+    if date_format == ISO_DATE_FORMAT:
+        # Dates already in the format are grouped without parsing them
+        ordinals = [iso_month_ordinal(value) for value in values]
+        if None not in ordinals:
+            groups: dict[int | None, list[str]] = {}
+            for ordinal, value in zip(ordinals, values):
+                groups.setdefault(ordinal, []).append(value)
+            return list(groups.values())
     dates = [datetime.strptime(val, date_format) for val in values]
     months = defaultdict(list)
     for date in dates:
@@ -29,6 +133,80 @@ def group_by_month(values, date_format):
     return list(months.values())
 
 
+def _split_by_month_formats(
+    split_on_keys: list[str], context=None, mapping: dict[str, Any] = dict()
+) -> dict[str, str]:
+    """Date formats of the keys whose values are split by month, by key."""
+    import cads_adaptors.mapping as mapping_module
+
+    if SPLIT_BY_MONTH_KEY not in split_on_keys:
+        return {}
+    mapping_options = mapping.get("options", {})
+    if not mapping_options.get("wants_dates", False):
+        if context:
+            context.error(
+                "For the time being, split-by-month is only supported for wants_dates=True!"
+            )
+        return {}
+
+    date_keyword_configs = mapping_options.get(
+        "date_keyword_config", mapping_module.DATE_KEYWORD_CONFIGS
+    )
+    if isinstance(date_keyword_configs, dict):
+        date_keyword_configs = [date_keyword_configs]
+    date_formats: dict[str, str] = {}
+    for date_keyword_config in date_keyword_configs:
+        date_key = date_keyword_config.get("date_keyword", "date")
+        format_key = date_keyword_config.get("format_keyword", "date_format")
+        date_formats.setdefault(
+            date_key, mapping_options.get(format_key, ISO_DATE_FORMAT)
+        )
+    return date_formats
+
+
+def iter_split_requests(
+    requests: list[dict[str, Any]],
+    split_on_keys: list[str],
+    context=None,
+    mapping: dict[str, Any] = dict(),
+) -> Iterator[dict[str, Any]]:
+    """Split requests on keys, yielding the split requests one at a time.
+
+    Each request is split on all the keys in one pass, in the order of
+    ``split_on_keys`` (the first key varies slowest). Requests which are not split
+    are yielded as they are.
+    """
+    date_formats = _split_by_month_formats(split_on_keys, context, mapping)
+    keys = list(dict.fromkeys(split_on_keys))
+    for request in requests:
+        # (key, value) items of the outer keys, and the values of the innermost key
+        outer = []
+        inner_key, inner_values = None, []
+        for key in keys:
+            if key not in request:
+                continue
+            values = ensure_list(request[key])
+            if len(values) == 1:
+                continue
+            if key in date_formats:
+                values = group_by_month(values, date_formats[key])
+            if inner_key is not None:
+                outer.append([(inner_key, value) for value in inner_values])
+            inner_key, inner_values = key, values
+        if inner_key is None:
+            yield request
+            continue
+        for items in itertools.product(*outer):
+            base = request
+            if items:
+                base = request.copy()
+                base.update(items)
+            for value in inner_values:
+                new_request = base.copy()
+                new_request[inner_key] = value
+                yield new_request
+
+
 def split_requests_on_keys(
     requests: list[dict[str, Any]],
     split_on_keys: list[str],
@@ -36,54 +214,9 @@ def split_requests_on_keys(
     mapping: dict[str, Any] = dict(),
 ) -> list[dict]:
     """Split a request on keys, returning a list of requests."""
-    import cads_adaptors.mapping as mapping_module
-
     if len(split_on_keys) == 0:
         return requests
-
-    split_by_month = SPLIT_BY_MONTH_KEY in split_on_keys
-    if split_by_month:
-        mapping_options = mapping.get("options", {})
-        if not mapping_options.get("wants_dates", False):
-            split_by_month = False
-            if context:
-                context.error(
-                    "For the time being, split-by-month is only supported for wants_dates=True!"
-                )
-
-    if split_by_month:
-        date_keyword_configs = mapping_options.get(
-            "date_keyword_config", mapping_module.DATE_KEYWORD_CONFIGS
-        )
-        if isinstance(date_keyword_configs, dict):
-            date_keyword_configs = [date_keyword_configs]
-
-    for key in split_on_keys:
-        out_requests = []
-        for request in requests:
-            if key in request:
-                values = ensure_list(request[key])
-                if len(values) == 1:
-                    out_requests.append(request)
-                else:
-                    if split_by_month:
-                        for date_keyword_config in date_keyword_configs:
-                            date_key = date_keyword_config.get("date_keyword", "date")
-                            format_key = date_keyword_config.get(
-                                "format_keyword", "date_format"
-                            )
-                            date_format = mapping_options.get(format_key, "%Y-%m-%d")
-                            if key == date_key:
-                                values = group_by_month(values, date_format)
-                    for value in values:
-                        new_request = request.copy()
-                        new_request[key] = value
-                        out_requests.append(new_request)
-            else:
-                out_requests.append(request)
-        requests = out_requests
-
-    return out_requests
+    return list(iter_split_requests(requests, split_on_keys, context, mapping))
 
 
 def decrypt(
@@ -0,0 +1,225 @@
+"""Message-level processing of GRIB files, without decoding them into xarray.
+
+Messages are scanned one at a time with eccodes. Messages that are kept unchanged are
+copied as byte ranges of the input file, so memory use does not depend on the size of
+the file. Only area selection decodes (and re-encodes) the values of a message.
+"""
+
+import os
+from typing import Any, BinaryIO, Iterator
+
+import numpy as np
+
+from cads_adaptors.adaptors import Context
+from cads_adaptors.exceptions import CdsFormatConversionError, InvalidRequest
+from cads_adaptors.tools.general import ensure_list
+
+# Size of the reads when copying messages
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class MessageIndex:
+    """Byte range and selected keys of a GRIB message."""
+
+    __slots__ = ("offset", "length", "keys")
+
+    def __init__(self, offset: int, length: int, keys: dict[str, Any]) -> None:
+        self.offset = offset
+        self.length = length
+        self.keys = keys
+
+    def __repr__(self) -> str:
+        return f"MessageIndex(offset={self.offset}, length={self.length}, keys={self.keys})"
+
+
+def iter_handles(f: BinaryIO) -> Iterator[Any]:
+    """Yield the eccodes handles of the messages of a file, releasing them after use."""
+    import eccodes
+
+    while (handle := eccodes.codes_grib_new_from_file(f)) is not None:
+        try:
+            yield handle
+        finally:
+            eccodes.codes_release(handle)
+
+
+def get_keys(handle: Any, keys: list[str]) -> dict[str, Any]:
+    import eccodes
+
+    return {
+        key: eccodes.codes_get(handle, key)
+        if eccodes.codes_is_defined(handle, key)
+        else None
+        for key in keys
+    }
+
+
+def scan(path: str, keys: list[str] | None = None) -> list[MessageIndex]:
+    """Index the messages of a GRIB file, reading the values of some keys."""
+    import eccodes
+
+    keys = keys or []
+    with open(path, "rb") as f:
+        return [
+            MessageIndex(
+                eccodes.codes_get_message_offset(handle),
+                eccodes.codes_get_message_size(handle),
+                get_keys(handle, keys),
+            )
+            for handle in iter_handles(f)
+        ]
+
+
+def matches(keys: dict[str, Any], select: dict[str, list[Any]]) -> bool:
+    """Whether the key values are in the selection, compared as strings."""
+    return all(
+        str(keys[key]) in {str(value) for value in values}
+        for key, values in select.items()
+    )
+
+
+def sort_key(keys: dict[str, Any], order_by: list[str]) -> list[tuple[int, Any]]:
+    """Numbers sort numerically, before any other values which sort as strings."""
+    return [
+        (0, keys[key]) if isinstance(keys[key], (int, float)) else (1, str(keys[key]))
+        for key in order_by
+    ]
+
+
+def copy_range(src: BinaryIO, dst: BinaryIO, offset: int, length: int) -> None:
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(length, COPY_BUFFER_SIZE))
+        if not chunk:
+            raise CdsFormatConversionError("Unexpected end of GRIB file")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def area_columns(longitudes: np.ndarray, west: float, east: float) -> np.ndarray:
+    """Indices of the longitudes in [west, east], in order from west, with wrapping."""
+    width = east - west
+    if width >= 360:
+        return np.arange(longitudes.size)
+    offsets = np.mod(longitudes - west, 360)
+    columns = np.flatnonzero(offsets <= width)
+    return columns[np.argsort(offsets[columns], kind="stable")]
+
+
+def select_area(handle: Any, area: list[float | int]) -> bytes:
+    """Encode a copy of a regular_ll message cut to an area [N, W, S, E]."""
+    import eccodes
+
+    grid_type = eccodes.codes_get(handle, "gridType")
+    if grid_type != "regular_ll":
+        raise CdsFormatConversionError(
+            f"Area selection of GRIB messages is not available for {grid_type} grids"
+        )
+    north, west, south, east = area
+    ni = eccodes.codes_get(handle, "Ni")
+    nj = eccodes.codes_get(handle, "Nj")
+    latitudes = eccodes.codes_get_array(handle, "latitudes")[::ni]
+    longitudes = eccodes.codes_get_array(handle, "longitudes")[:ni]
+    rows = np.flatnonzero((latitudes >= south) & (latitudes <= north))
+    columns = area_columns(longitudes, west, east)
+    if rows.size == 0 or columns.size == 0:
+        raise InvalidRequest(
+            "Area selection resulted in a message with no points.\n"
+            "Please ensure that your area selection covers at least one point in the data."
+        )
+    values = eccodes.codes_get_values(handle).reshape(nj, ni)
+    values = values[rows][:, columns]
+
+    first_longitude = float(longitudes[columns[0]])
+    last_longitude = float(longitudes[columns[-1]])
+    if last_longitude < first_longitude:
+        first_longitude -= 360
+    clone = eccodes.codes_clone(handle)
+    try:
+        eccodes.codes_set_key_vals(
+            clone,
+            {
+                "Ni": columns.size,
+                "Nj": rows.size,
+                "latitudeOfFirstGridPointInDegrees": float(latitudes[rows[0]]),
+                "latitudeOfLastGridPointInDegrees": float(latitudes[rows[-1]]),
+                "longitudeOfFirstGridPointInDegrees": first_longitude,
+                "longitudeOfLastGridPointInDegrees": last_longitude,
+            },
+        )
+        eccodes.codes_set_values(clone, values.ravel())
+        return eccodes.codes_get_message(clone)
+    finally:
+        eccodes.codes_release(clone)
+
+
+def process_grib_file(
+    infile: str,
+    outfile: str,
+    select: dict[str, Any] | None = None,
+    area: list[float | int] | None = None,
+    order_by: list[str] | None = None,
+    context: Context = Context(),
+) -> str:
+    """
+    Filter, subset and reorder the messages of a GRIB file into a new GRIB file.
+
+    Parameters
+    ----------
+    select
+        GRIB keys and the values of the messages to keep, e.g. {"shortName": ["2t"]}.
+    area
+        [north, west, south, east] area to cut the (regular_ll) messages to.
+    order_by
+        GRIB keys to sort the messages by. Messages with equal keys keep their order.
+    """
+    select = {key: ensure_list(values) for key, values in (select or {}).items()}
+    order_by = order_by or []
+    index = scan(infile, keys=list(dict.fromkeys([*select, *order_by])))
+    selected = [message for message in index if matches(message.keys, select)]
+    if order_by:
+        selected.sort(key=lambda message: sort_key(message.keys, order_by))
+    context.debug(
+        f"Streaming {len(selected)} of {len(index)} GRIB messages from {infile}"
+    )
+    if not selected:
+        raise InvalidRequest(f"No GRIB messages in {infile} match {select}")
+
+    import eccodes
+
+    with open(infile, "rb") as src, open(outfile, "wb") as dst:
+        for message in selected:
+            if area is None:
+                copy_range(src, dst, message.offset, message.length)
+                continue
+            src.seek(message.offset)
+            handle = eccodes.codes_grib_new_from_file(src)
+            try:
+                dst.write(select_area(handle, area))
+            finally:
+                eccodes.codes_release(handle)
+    return outfile
+
+
+def process_grib_files(
+    result: str | list[str] | dict[str, str],
+    target_dir: str = ".",
+    context: Context = Context(),
+    **kwargs: Any,
+) -> dict[str, str]:
+    """Apply process_grib_file to each GRIB file of a result."""
+    if isinstance(result, str):
+        result = [result]
+    if isinstance(result, list):
+        result = {os.path.splitext(os.path.basename(path))[0]: path for path in result}
+    out_paths = {}
+    for tag, path in result.items():
+        if not isinstance(path, str) or not path.endswith((".grib", ".grib2")):
+            raise CdsFormatConversionError(
+                f"GRIB message processing can only be applied to GRIB files: {path}"
+            )
+        outfile = os.path.join(target_dir, f"{tag}_processed.grib")
+        out_paths[f"{tag}_processed"] = process_grib_file(
+            path, outfile, context=context, **kwargs
+        )
+    return out_paths
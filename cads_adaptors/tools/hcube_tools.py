@@ -264,6 +264,48 @@ def remove_duplicates(reqs, date_field="date"):
         ii += ii_incr
 
 
+def hcubes_deduplicate(reqs, group_keys=[], date_field="date"):
+    """Return a copy of reqs without duplicate fields, and the number of fields
+    removed. Only requests with the same keys and the same values of group_keys
+    (keys which do not index fields, e.g. the area or the grid) are compared. The
+    requests are returned unchanged if there are no duplicates.
+    """
+    groups = odict()
+    for req in reqs:
+        req = {k: list(_ensure_list(v)) for k, v in req.items()}
+        group = (frozenset(req.keys()), repr([req.get(k) for k in group_keys]))
+        groups.setdefault(group, []).append(req)
+
+    output = []
+    nremoved = 0
+    for group in groups.values():
+        if len(group) > 1:
+            # The group keys are shared by the requests of the group, and are set
+            # aside so that their values (e.g. the repeated values of a grid or an
+            # area) are not compared as sets of field values
+            shared = {k: group[0][k] for k in group_keys if k in group[0]}
+            deduplicated = [
+                {k: deepcopy(v) for k, v in req.items() if k not in shared}
+                for req in group
+            ]
+            nfields = count_fields(deduplicated, date_field=date_field)
+            remove_duplicates(deduplicated, date_field=date_field)
+            hcubes_merge(deduplicated)
+            ndeduplicated = count_fields(deduplicated, date_field=date_field)
+            if ndeduplicated < nfields:
+                nremoved += nfields - ndeduplicated
+                key_order = list(group[0].keys())
+                for req in deduplicated:
+                    req.update(deepcopy(shared))
+                    dict_sort_keys(req, key_order.index)
+                group = deduplicated
+        output.extend(group)
+
+    if not nremoved:
+        return deepcopy(reqs), 0
+    return output, nremoved
+
+
 def hcubes_subtract(reqs1, reqs2, date_field="date"):
     """Return a copy of reqs1 with all fields in reqs2 removed."""
     output = []
@@ -0,0 +1,104 @@
+"""Lightweight instrumentation of the retrieve stages (timed spans, counters, byte gauges).
+
+The default is a no-op implementation, so that instrumented code costs a method call
+and nothing more. Set the ``CADS_ADAPTORS_INSTRUMENTATION`` environment variable (or
+pass an ``Instrumentation`` to the ``Context``) to record measurements.
+"""
+
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+_NULL_SPAN: contextlib.AbstractContextManager[None] = contextlib.nullcontext()
+
+
+class NullInstrumentation:
+    """Instrumentation that records nothing."""
+
+    enabled = False
+
+    def span(self, name: str) -> contextlib.AbstractContextManager[None]:
+        return _NULL_SPAN
+
+    def count(self, name: str, value: int | float = 1) -> None:
+        pass
+
+    def gauge_bytes(self, name: str, nbytes: int) -> None:
+        pass
+
+    def summary(self) -> dict[str, Any]:
+        return {}
+
+
+class Instrumentation(NullInstrumentation):
+    """Record nested timed spans, counters and byte gauges.
+
+    Spans opened while another span is active (in the same thread) are recorded
+    under the ``/``-separated path of the enclosing spans, e.g.
+    ``retrieve/post_process/convert_format``. Repeated spans are aggregated.
+    """
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.spans: dict[str, dict[str, Any]] = {}
+        self.counters: dict[str, int | float] = {}
+        self.gauges: dict[str, dict[str, int]] = {}
+
+    def _stack(self) -> list[str]:
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:  # type: ignore[override]
+        stack = self._stack()
+        stack.append(name)
+        path = "/".join(stack)
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - tic
+            stack.pop()
+            with self._lock:
+                stats = self.spans.setdefault(
+                    path, {"count": 0, "total_time": 0.0, "max_time": 0.0}
+                )
+                stats["count"] += 1
+                stats["total_time"] += elapsed
+                stats["max_time"] = max(stats["max_time"], elapsed)
+
+    def count(self, name: str, value: int | float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge_bytes(self, name: str, nbytes: int) -> None:
+        """Record the latest and the peak value of a size in bytes."""
+        with self._lock:
+            gauge = self.gauges.setdefault(name, {"last": 0, "max": 0})
+            gauge["last"] = nbytes
+            gauge["max"] = max(gauge["max"], nbytes)
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": {path: dict(stats) for path, stats in self.spans.items()},
+                "counters": dict(self.counters),
+                "gauges": {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def instrumentation_from_env() -> NullInstrumentation:
+    if os.getenv("CADS_ADAPTORS_INSTRUMENTATION", "").lower() in ("1", "true", "yes"):
+        return Instrumentation()
+    return NULL_INSTRUMENTATION
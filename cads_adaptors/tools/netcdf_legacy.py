@@ -0,0 +1,258 @@
+"""In-process replacement of the ecCodes grib_to_netcdf tool (``grib_to_netcdf -S param``).
+
+GRIB messages are decoded with eccodes and written to a netCDF3 (64-bit offset) file
+with the grib_to_netcdf layout: one variable per parameter, packed into 16-bit integers,
+with dimensions ``(time, [expver], [number], [level], latitude, longitude)``.
+Dimensions other than time are only written if they vary within a parameter.
+"""
+
+import datetime
+from typing import Any, BinaryIO, Iterator
+
+import numpy as np
+
+from cads_adaptors.exceptions import CdsFormatConversionError
+
+TIME_UNITS = "hours since 1900-01-01 00:00:00.0"
+TIME_ORIGIN = datetime.datetime(1900, 1, 1)
+FILL_VALUE = -32767
+# Packed values take all the 16-bit integers but the fill value
+PACKED_MIN = -32766
+PACKED_STEPS = 2**16 - 3
+
+SUPPORTED_GRID_TYPES = ("regular_ll", "regular_gg")
+
+# Dimensions other than time and the grid, in the order of the variables' dimensions
+EXTRA_DIMENSIONS = ("expver", "number", "level")
+
+DIMENSION_ATTRIBUTES: dict[str, dict[str, str]] = {
+    "longitude": {"units": "degrees_east", "long_name": "longitude"},
+    "latitude": {"units": "degrees_north", "long_name": "latitude"},
+    "expver": {"long_name": "expver"},
+    "number": {"long_name": "ensemble_member"},
+    "time": {"units": TIME_UNITS, "long_name": "time", "calendar": "gregorian"},
+}
+LEVEL_ATTRIBUTES: dict[str, dict[str, str]] = {
+    "isobaricInhPa": {"units": "millibars", "long_name": "pressure_level"},
+    "hybrid": {"long_name": "model_level_number"},
+}
+
+DATA_TYPES = {"NC_SHORT": "i2", "NC_FLOAT": "f4", "NC_DOUBLE": "f8"}
+
+
+def iter_fields(f: BinaryIO, describe: bool = True) -> Iterator[dict[str, Any]]:
+    """Decode the GRIB messages in a file, one at a time.
+
+    Fields hold their values and the keys of their position in the hypercube, and
+    with ``describe`` the attributes of their parameter and their grid.
+    """
+    import eccodes
+
+    while (handle := eccodes.codes_grib_new_from_file(f)) is not None:
+        try:
+            grid_type = eccodes.codes_get(handle, "gridType")
+            if grid_type not in SUPPORTED_GRID_TYPES:
+                raise CdsFormatConversionError(
+                    f"Unsupported grid type for netcdf_legacy: {grid_type}"
+                )
+            ni = eccodes.codes_get(handle, "Ni")
+            nj = eccodes.codes_get(handle, "Nj")
+            values = eccodes.codes_get_values(handle).astype("float64")
+            if eccodes.codes_get(handle, "bitmapPresent"):
+                missing_value = eccodes.codes_get_double(handle, "missingValue")
+                values[values == missing_value] = np.nan
+            field = {
+                "name": eccodes.codes_get(handle, "cfVarName"),
+                "time": validity_hours(
+                    eccodes.codes_get(handle, "validityDate"),
+                    eccodes.codes_get(handle, "validityTime"),
+                ),
+                "expver": get_key(handle, "expver", "0001"),
+                "number": get_key(handle, "number", 0, ktype=int),
+                "level": eccodes.codes_get(handle, "level"),
+                "values": values.reshape(nj, ni),
+            }
+            if describe:
+                field["long_name"] = eccodes.codes_get(handle, "name")
+                field["units"] = eccodes.codes_get(handle, "units")
+                field["standard_name"] = eccodes.codes_get(handle, "cfName")
+                field["type_of_level"] = eccodes.codes_get(handle, "typeOfLevel")
+                latitudes = eccodes.codes_get_array(handle, "latitudes")
+                field["latitude"] = latitudes[::ni]
+                field["longitude"] = eccodes.codes_get_array(handle, "longitudes")[:ni]
+        finally:
+            eccodes.codes_release(handle)
+        yield field
+
+
+def get_key(handle: Any, key: str, default: Any, ktype: type | None = None) -> Any:
+    """Value of a GRIB key, or the default if the message does not define it."""
+    import eccodes
+
+    if not eccodes.codes_is_defined(handle, key):
+        return default
+    value = eccodes.codes_get(handle, key, ktype=ktype)
+    return default if value is None else value
+
+
+def expver_number(expver: str) -> int:
+    try:
+        return int(expver)
+    except ValueError:
+        raise CdsFormatConversionError(
+            f"netcdf_legacy cannot convert fields of experiment version {expver}"
+        )
+
+
+def validity_hours(date: int, time: int) -> int:
+    validity = datetime.datetime.strptime(f"{date:08d}{time:04d}", "%Y%m%d%H%M")
+    return int((validity - TIME_ORIGIN).total_seconds() // 3600)
+
+
+def packing(vmin: float, vmax: float) -> tuple[float, float]:
+    """scale_factor and add_offset of 16-bit integers spanning a range of values."""
+    scale_factor = (vmax - vmin) / PACKED_STEPS if vmax > vmin else 1.0
+    return scale_factor, vmin - PACKED_MIN * scale_factor
+
+
+def pack(values: np.ndarray, scale_factor: float, add_offset: float) -> np.ndarray:
+    """Pack values into 16-bit integers, missing values into the fill value."""
+    finite = np.isfinite(values)
+    packed = np.full(values.shape, FILL_VALUE, dtype="i2")
+    packed[finite] = np.round((values[finite] - add_offset) / scale_factor).astype("i2")
+    return packed
+
+
+def grib_to_netcdf_legacy(
+    grib_file: str,
+    out_fname: str,
+    data_type: str = "NC_SHORT",
+    history: str | None = None,
+) -> str:
+    """Convert a GRIB file to a netCDF3 file with the layout of grib_to_netcdf.
+
+    As in grib_to_netcdf, the file is read twice: the first pass collects the axes
+    and the range of values of each parameter, the second one writes each field to
+    its variable as it is decoded. Only one field is held in memory.
+    """
+    import netCDF4
+
+    if data_type not in DATA_TYPES:
+        raise ValueError(f"Invalid data_type: {data_type}. Valid: {list(DATA_TYPES)}")
+    dtype = DATA_TYPES[data_type]
+
+    # First pass: axes, attributes and range of values of each parameter
+    variables: dict[str, dict[str, Any]] = {}
+    axes: dict[str, set[Any]] = {key: set() for key in ("time",) + EXTRA_DIMENSIONS}
+    with open(grib_file, "rb") as f:
+        for field in iter_fields(f):
+            values = field.pop("values")
+            variable = variables.setdefault(
+                field["name"],
+                {"field": field, "min": np.inf, "max": -np.inf}
+                | {key: set() for key in EXTRA_DIMENSIONS},
+            )
+            grid = next(iter(variables.values()))["field"]
+            if not (
+                np.array_equal(field["latitude"], grid["latitude"])
+                and np.array_equal(field["longitude"], grid["longitude"])
+            ):
+                raise CdsFormatConversionError(
+                    "netcdf_legacy cannot convert GRIB fields on different grids"
+                )
+            for key in axes:
+                axes[key].add(field[key])
+            for key in EXTRA_DIMENSIONS:
+                variable[key].add(field[key])
+            finite = values[np.isfinite(values)]
+            if finite.size:
+                variable["min"] = min(variable["min"], float(finite.min()))
+                variable["max"] = max(variable["max"], float(finite.max()))
+    if not variables:
+        raise CdsFormatConversionError(f"No GRIB messages in {grib_file}")
+
+    grid = next(iter(variables.values()))["field"]
+    latitude, longitude = grid["latitude"], grid["longitude"]
+    # e.g. single level parameters do not have a level dimension, even though
+    # 2 metre temperature and mean sea level pressure are on different levels
+    dims = [
+        key
+        for key in EXTRA_DIMENSIONS
+        if any(len(variable[key]) > 1 for variable in variables.values())
+    ]
+    variable_dims = ["time", *dims, "latitude", "longitude"]
+    positions = {
+        dim: {value: i for i, value in enumerate(sorted(axes[dim]))}
+        for dim in variable_dims[:-2]
+    }
+
+    if history is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        history = f"{now:%Y-%m-%d %H:%M:%S} GMT by cads-adaptors grib_to_netcdf_legacy"
+
+    with netCDF4.Dataset(out_fname, "w", format="NETCDF3_64BIT_OFFSET") as nc:
+        for dim, values, coord_dtype in [
+            ("longitude", longitude, "f4"),
+            ("latitude", latitude, "f4"),
+            *[(dim, sorted(axes[dim]), "i4") for dim in reversed(dims)],
+            ("time", sorted(axes["time"]), "i4"),
+        ]:
+            nc.createDimension(dim, len(values))
+            coord = nc.createVariable(dim, coord_dtype, (dim,))
+            if dim == "level":
+                type_of_level = grid["type_of_level"]
+                coord.setncatts(
+                    LEVEL_ATTRIBUTES.get(type_of_level, {"long_name": type_of_level})
+                )
+            else:
+                coord.setncatts(DIMENSION_ATTRIBUTES[dim])
+            coord[:] = np.asarray(
+                [expver_number(v) for v in values] if dim == "expver" else values,
+                dtype=coord_dtype,
+            )
+
+        for name, variable in variables.items():
+            field = variable["field"]
+            attributes: dict[str, Any] = {}
+            if dtype == "i2":
+                fill_value = np.array(FILL_VALUE, dtype=dtype)
+                if variable["min"] <= variable["max"]:
+                    scale_factor, add_offset = packing(variable["min"], variable["max"])
+                else:
+                    scale_factor, add_offset = 1.0, 0.0
+                variable["packing"] = (scale_factor, add_offset)
+                attributes["scale_factor"] = np.float64(scale_factor)
+                attributes["add_offset"] = np.float64(add_offset)
+            else:
+                fill_value = np.array(netCDF4.default_fillvals[dtype], dtype=dtype)
+            variable["fill_value"] = fill_value
+            # Fields missing from the hypercube are left to the fill value
+            nc_variable = nc.createVariable(
+                name, dtype, variable_dims, fill_value=fill_value
+            )
+            attributes["missing_value"] = fill_value
+            attributes["units"] = field["units"]
+            attributes["long_name"] = field["long_name"]
+            if field["standard_name"] not in ("unknown", ""):
+                attributes["standard_name"] = field["standard_name"]
+            nc_variable.setncatts(attributes)
+            # The values are packed already
+            nc_variable.set_auto_maskandscale(False)
+
+        nc.setncatts({"Conventions": "CF-1.6", "history": history})
+
+        # Second pass: write each field as it is decoded
+        with open(grib_file, "rb") as f:
+            for field in iter_fields(f, describe=False):
+                variable = variables[field["name"]]
+                index = tuple(positions[dim][field[dim]] for dim in variable_dims[:-2])
+                if dtype == "i2":
+                    packed = pack(field["values"], *variable["packing"])
+                else:
+                    packed = np.where(
+                        np.isfinite(field["values"]),
+                        field["values"],
+                        variable["fill_value"],
+                    ).astype(dtype)
+                nc.variables[field["name"]][index] = packed
+    return out_fname
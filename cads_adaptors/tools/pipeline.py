@@ -0,0 +1,151 @@
+"""Execution of post-processing steps, with a report of the time and memory of each step.
+
+Results are opened as lazily evaluated, dask-backed, xarray datasets before the first
+step that works on datasets. Most steps add to the task graphs of the datasets without
+computing them, and the graphs of all the steps are optimised together (fusing their
+tasks) at the end, so that the datasets are only computed once, by the output writer.
+Steps which compute their datasets (e.g. the streaming reductions) are reported, and
+their results are left in memory, so that the following steps can work on them
+without the overhead of dask.
+"""
+
+import dataclasses
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable
+
+from cads_adaptors.adaptors import Context
+
+# Interval between the samples of the memory of the process, in seconds
+MEMORY_POLL_INTERVAL = 0.1
+
+
+def current_rss() -> int:
+    """Resident memory of the process in bytes (its peak, where it is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class MemoryMonitor:
+    """Record the peak resident memory of the process while the context is active.
+
+    The memory is sampled by a background thread, so that the peak of a step is
+    measured without changing how the step allocates memory. Without polling, it is
+    only sampled on entry and exit.
+    """
+
+    def __init__(
+        self, interval: float = MEMORY_POLL_INTERVAL, poll: bool = True
+    ) -> None:
+        self.interval = interval
+        self.poll = poll
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self) -> "MemoryMonitor":
+        self.start = self.peak = current_rss()
+        if self.poll:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.peak = max(self.peak, current_rss())
+
+    @property
+    def increase(self) -> int:
+        return self.peak - self.start
+
+
+@dataclasses.dataclass
+class StepReport:
+    name: str
+    wall_time: float
+    peak_memory: int
+    memory_increase: int
+    # Datasets which the step computed, rather than adding to their task graphs
+    computed: list[str] = dataclasses.field(default_factory=list)
+
+
+def run_step(
+    name: str,
+    func: Callable[[Any], Any],
+    result: Any,
+    context: Context = Context(),
+) -> tuple[Any, StepReport]:
+    """Apply a step to a result, measuring its wall time and peak memory.
+
+    The memory is only polled during the step if the instrumentation is enabled.
+    """
+    memory = MemoryMonitor(poll=context.instrumentation.enabled)
+    with context.span(f"post_process.{name}"), memory:
+        tic = time.perf_counter()
+        result = func(result)
+        wall_time = time.perf_counter() - tic
+    report = StepReport(name, wall_time, memory.peak, memory.increase)
+    context.gauge_bytes(f"post_process.{name}.peak_memory", memory.peak)
+    return result, report
+
+
+def log_report(report: StepReport, context: Context = Context()) -> None:
+    context.info(
+        f"Post-process step {report.name}: {report.wall_time:.3f} s, "
+        f"peak memory {report.peak_memory / 2**20:.1f} MiB "
+        f"({report.memory_increase / 2**20:+.1f} MiB)"
+    )
+    if report.computed:
+        context.debug(
+            f"Post-process step {report.name} computed the datasets {report.computed}, "
+            "they are kept in memory until the output is written"
+        )
+
+
+def is_xarray_dict(result: Any) -> bool:
+    import xarray as xr
+
+    return isinstance(result, dict) and all(
+        isinstance(value, xr.Dataset) for value in result.values()
+    )
+
+
+def is_lazy(dataset: Any) -> bool:
+    """Whether all the data variables of a dataset are dask arrays."""
+    return all(variable.chunks is not None for variable in dataset.data_vars.values())
+
+
+def computed_datasets(result: Any) -> list[str]:
+    """Tags of the datasets of a result which are held in memory, not dask-backed."""
+    if not is_xarray_dict(result):
+        return []
+    return [tag for tag, dataset in result.items() if not is_lazy(dataset)]
+
+
+def fuse(result: Any) -> Any:
+    """Optimise the task graphs of the datasets of a result, fusing their steps.
+
+    All the datasets are passed to dask.optimize together, which returns those held
+    in memory (without task graphs) unchanged.
+    """
+    if not is_xarray_dict(result) or not result:
+        return result
+    import dask
+
+    return dict(zip(result, dask.optimize(*result.values())))
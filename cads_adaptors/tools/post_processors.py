@@ -3,6 +3,7 @@ from typing import Any, Callable
 from xarray import Dataset
 
 from cads_adaptors import Context
+from cads_adaptors.tools import streaming_reductions
 
 CONFIG_MAPPING = {
     "daily_mean": {
@@ -72,20 +73,27 @@ def daily_reduce(
     how: str | Callable = "mean",
     **kwargs,
 ) -> dict[str, Dataset]:
-    from earthkit.transforms import temporal
-
     out_xarray_dict = {}
     for in_tag, in_dataset in in_xarray_dict.items():
         out_tag = f"{in_tag}_daily-{how}"
         context.debug(f"Daily reduction: {how} {kwargs}\n{in_dataset}")
-        reduced_data = temporal.daily_reduce(
-            in_dataset,
-            how=how,
-            **kwargs,
-        )
+        if streaming_reductions.can_stream(in_dataset, how, **kwargs):
+            reduced_data = streaming_reductions.daily_reduce(
+                in_dataset, how=str(how), context=context, **kwargs
+            )
+            module = "cads_adaptors.tools.streaming_reductions"
+        else:
+            from earthkit.transforms import temporal
+
+            reduced_data = temporal.daily_reduce(
+                in_dataset,
+                how=how,
+                **kwargs,
+            )
+            module = "earthkit.transforms.temporal"
         out_xarray_dict[out_tag] = update_history(
             reduced_data,
-            f"earthkit.transforms.temporal.daily_reduce({in_tag}, how={how}, **{kwargs})",
+            f"{module}.daily_reduce({in_tag}, how={how}, **{kwargs})",
         )
 
     return out_xarray_dict
@@ -97,20 +105,27 @@ def monthly_reduce(
     how: str | Callable = "mean",
     **kwargs,
 ) -> dict[str, Dataset]:
-    from earthkit.transforms import temporal
-
     out_xarray_dict = {}
     for in_tag, in_dataset in in_xarray_dict.items():
         out_tag = f"{in_tag}_monthly-{how}"
         context.debug(f"Temporal reduction: {how} {kwargs}")
-        reduced_data = temporal.monthly_reduce(
-            in_dataset,
-            how=how,
-            **kwargs,
-        )
+        if streaming_reductions.can_stream(in_dataset, how, **kwargs):
+            reduced_data = streaming_reductions.monthly_reduce(
+                in_dataset, how=str(how), context=context, **kwargs
+            )
+            module = "cads_adaptors.tools.streaming_reductions"
+        else:
+            from earthkit.transforms import temporal
+
+            reduced_data = temporal.monthly_reduce(
+                in_dataset,
+                how=how,
+                **kwargs,
+            )
+            module = "earthkit.transforms.temporal"
         out_xarray_dict[out_tag] = update_history(
             reduced_data,
-            f"earthkit.transforms.temporal.monthly_reduce({in_tag}, how={how}, **{kwargs})",
+            f"{module}.monthly_reduce({in_tag}, how={how}, **{kwargs})",
         )
 
     return out_xarray_dict
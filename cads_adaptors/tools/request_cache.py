@@ -0,0 +1,81 @@
+"""Cache of request-derived values, in memory and optionally in a local directory.
+
+Values must be JSON serialisable, so that they can be shared through the directory
+between processes on the same host (e.g. between the broker and the workers).
+"""
+
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any
+
+from cads_adaptors.tools.general import TTLCache
+
+
+def canonical_digest(obj: Any) -> str:
+    """Digest of a JSON-like object, independent of the order of dictionary keys."""
+    dumped = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=repr)
+    return hashlib.sha256(dumped.encode()).hexdigest()
+
+
+class RequestCache:
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.memory = TTLCache(ttl, maxsize=maxsize)
+
+    def get(self, key: str, directory: str | None = None) -> Any:
+        """Return a copy of the cached value, or None."""
+        value = self.memory.get(key)
+        if value is None and directory:
+            value, expires = self._load(directory, key)
+            if value is not None:
+                self.memory.set(key, value, ttl=expires - time.time())
+        return copy.deepcopy(value)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float | None = None,
+        directory: str | None = None,
+    ) -> None:
+        ttl = self.memory.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self.memory.set(key, copy.deepcopy(value), ttl=ttl)
+        if directory:
+            self._dump(directory, key, value, time.time() + ttl)
+
+    def clear(self) -> None:
+        self.memory.clear()
+
+    @staticmethod
+    def _load(directory: str, key: str) -> tuple[Any, float]:
+        try:
+            with open(os.path.join(directory, f"{key}.json")) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None, 0.0
+        if entry["expires"] <= time.time():
+            return None, 0.0
+        return entry["value"], entry["expires"]
+
+    @staticmethod
+    def _dump(directory: str, key: str, value: Any, expires: float) -> None:
+        # Write to a temporary file first, so that readers never see partial entries.
+        # The directory is only an optimisation: never fail a request because of it.
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"expires": expires, "value": value}, f)
+            os.replace(tmp_path, os.path.join(directory, f"{key}.json"))
+        except (OSError, TypeError, ValueError):
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
@@ -0,0 +1,129 @@
+"""Spatial index of the points of curvilinear and unstructured grids.
+
+The points are binned into regular latitude/longitude boxes, so that an area
+selection only tests the points of the boxes that the area overlaps.
+"""
+
+import math
+
+import numpy as np
+
+# Average number of points per bin
+DEFAULT_POINTS_PER_BIN = 64
+
+
+def normalise_longitudes(longitudes: np.ndarray) -> np.ndarray:
+    """Longitudes in the range [0, 360)."""
+    return np.mod(longitudes, 360.0)
+
+
+class GridIndex:
+    """Points of a grid, flattened and sorted into latitude/longitude bins.
+
+    Parameters
+    ----------
+    latitudes, longitudes
+        Coordinates of the grid points, of any (identical) shape.
+    points_per_bin
+        Average number of points per bin, which sets the resolution of the bins.
+    """
+
+    def __init__(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        points_per_bin: int = DEFAULT_POINTS_PER_BIN,
+    ) -> None:
+        latitudes = np.asarray(latitudes, dtype="float64")
+        longitudes = np.asarray(longitudes, dtype="float64")
+        if latitudes.shape != longitudes.shape:
+            raise ValueError(
+                f"latitudes and longitudes have different shapes: "
+                f"{latitudes.shape} != {longitudes.shape}"
+            )
+        self.shape = latitudes.shape
+        self.latitudes = latitudes.ravel()
+        self.longitudes = normalise_longitudes(longitudes.ravel())
+
+        nbins = max(1, self.latitudes.size // points_per_bin)
+        self.n_lat_bins = max(1, math.isqrt(nbins // 2))
+        self.n_lon_bins = 2 * self.n_lat_bins
+        self.lat_bin_size = 180.0 / self.n_lat_bins
+        self.lon_bin_size = 360.0 / self.n_lon_bins
+
+        # Points with missing coordinates are never selected
+        valid = np.flatnonzero(
+            np.isfinite(self.latitudes) & np.isfinite(self.longitudes)
+        )
+        bins = self._lat_bins(self.latitudes[valid]) * self.n_lon_bins
+        bins += self._lon_bins(self.longitudes[valid])
+        order = np.argsort(bins, kind="stable")
+        self.points = valid[order]
+        self.bin_starts = np.searchsorted(
+            bins[order], np.arange(self.n_lat_bins * self.n_lon_bins + 1)
+        )
+
+    def _lat_bins(self, latitudes: np.ndarray) -> np.ndarray:
+        bins = np.floor((latitudes + 90.0) / self.lat_bin_size).astype("int64")
+        return np.clip(bins, 0, self.n_lat_bins - 1)
+
+    def _lon_bins(self, longitudes: np.ndarray) -> np.ndarray:
+        bins = np.floor(longitudes / self.lon_bin_size).astype("int64")
+        return np.clip(bins, 0, self.n_lon_bins - 1)
+
+    def _candidates(
+        self, north: float, west: float, south: float, width: float
+    ) -> np.ndarray:
+        first_lat, last_lat = self._lat_bins(np.array([south, north]))
+        lat_bins = np.arange(first_lat, last_lat + 1)
+        if width >= 360.0:
+            lon_bins = np.arange(self.n_lon_bins)
+        else:
+            first = int(math.floor(west / self.lon_bin_size))
+            last = int(math.floor((west + width) / self.lon_bin_size))
+            lon_bins = np.unique(np.arange(first, last + 1) % self.n_lon_bins)
+        bins = (lat_bins[:, None] * self.n_lon_bins + lon_bins[None, :]).ravel()
+        return np.concatenate(
+            [self.points[self.bin_starts[b] : self.bin_starts[b + 1]] for b in bins]
+        )
+
+    def query(self, north: float, west: float, south: float, east: float) -> np.ndarray:
+        """Sorted flat indices of the points inside an area.
+
+        Longitudes are in degrees east and the area spans eastwards from ``west``
+        to ``east``, so that areas crossing the dateline or the Greenwich meridian
+        can be given either as, e.g., ``west=170, east=190`` or ``west=-10, east=10``.
+        """
+        width = east - west
+        if north < south or width < 0:
+            return np.array([], dtype="int64")
+        west = float(normalise_longitudes(np.array(west)))
+        candidates = self._candidates(north, west, south, width)
+        latitudes = self.latitudes[candidates]
+        inside = (latitudes >= south) & (latitudes <= north)
+        if width < 360.0:
+            offsets = normalise_longitudes(self.longitudes[candidates] - west)
+            inside &= offsets <= width
+        return np.sort(candidates[inside])
+
+    def mask(self, north: float, west: float, south: float, east: float) -> np.ndarray:
+        """Boolean mask, with the shape of the grid, of the points inside an area."""
+        mask = np.zeros(self.latitudes.size, dtype=bool)
+        mask[self.query(north, west, south, east)] = True
+        return mask.reshape(self.shape)
+
+    def window(
+        self, north: float, west: float, south: float, east: float
+    ) -> tuple[slice, ...] | None:
+        """Smallest index window containing all the points inside an area.
+
+        Returns None when no point is inside the area.
+        """
+        indices = self.query(north, west, south, east)
+        if indices.size == 0:
+            return None
+        positions = np.unravel_index(indices, self.shape)
+        return tuple(
+            slice(int(position.min()), int(position.max()) + 1)
+            for position in positions
+        )
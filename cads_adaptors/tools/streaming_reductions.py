@@ -0,0 +1,277 @@
+"""Daily and monthly reductions that read the time axis of a dataset in chunks.
+
+A running reduction of the current period is carried from chunk to chunk, so that
+only a chunk of the input is in memory at any time, rather than whole periods (or
+the whole dataset, once loaded). The results match the earthkit.transforms temporal
+reductions (``time_shift``, ``remove_partial_periods`` and ``how_label`` included),
+which remain in use for the reductions and the datasets that are not supported here.
+Dask-backed datasets, as opened by the convertors, are read a whole number of dask
+chunks at a time, so that each chunk is computed once.
+"""
+
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from cads_adaptors.adaptors import Context
+
+STREAMING_REDUCTIONS = ("mean", "sum", "min", "max", "count")
+
+# Options of the earthkit reductions which are supported by the streaming reductions
+STREAMING_OPTIONS = ("time_dim", "time_shift", "remove_partial_periods", "how_label")
+
+# Period start frequencies of the daily and monthly reductions
+FREQUENCIES = {"daily": "D", "monthly": "MS"}
+
+# Size of the chunks of the time axis read at once
+DEFAULT_CHUNK_BYTES = 4 * 1024**2
+
+
+def find_time_dim(dataset: xr.Dataset, time_dim: str | None = None) -> str | None:
+    """Name of the datetime dimension of a dataset, if there is exactly one."""
+    if time_dim is not None:
+        return time_dim
+    candidates = [
+        dim
+        for dim in dataset.dims
+        if dim in dataset.coords and np.issubdtype(dataset[dim].dtype, np.datetime64)
+    ]
+    return str(candidates[0]) if len(candidates) == 1 else None
+
+
+def can_stream(dataset: xr.Dataset, how: str | Callable, **kwargs: Any) -> bool:
+    """Whether a reduction of a dataset is supported by the streaming reductions."""
+    if how not in STREAMING_REDUCTIONS or set(kwargs) - set(STREAMING_OPTIONS):
+        return False
+    time_dim = find_time_dim(dataset, kwargs.get("time_dim"))
+    if (
+        time_dim is None
+        or time_dim not in dataset.dims
+        or time_dim not in dataset.coords
+    ):
+        return False
+    times = dataset.indexes[time_dim]
+    return (
+        isinstance(times, pd.DatetimeIndex)
+        and times.size > 0
+        and times.is_monotonic_increasing
+        # earthkit broadcasts the variables without a time dimension
+        and all(time_dim in variable.dims for variable in dataset.data_vars.values())
+        and all(
+            np.issubdtype(variable.dtype, np.number)
+            for variable in dataset.data_vars.values()
+        )
+    )
+
+
+def period_starts(times: pd.DatetimeIndex, frequency: str) -> pd.DatetimeIndex:
+    if frequency == "MS":
+        return times.to_period("M").to_timestamp()
+    return times.floor(frequency)
+
+
+def steps_per_chunk(variable: xr.DataArray, time_dim: str, chunk_bytes: int) -> int:
+    n_steps = variable.sizes[time_dim]
+    step_bytes = variable.dtype.itemsize * variable.size // max(n_steps, 1)
+    return max(1, chunk_bytes // max(step_bytes, 1))
+
+
+def time_chunks(variable: xr.DataArray, time_dim: str, chunk_bytes: int) -> list[slice]:
+    """Slices of the time axis read at once, of about ``chunk_bytes``.
+
+    The slices of dask arrays hold whole dask chunks, at least one.
+    """
+    size = steps_per_chunk(variable, time_dim, chunk_bytes)
+    if variable.chunks is None:
+        return [
+            slice(start, start + size)
+            for start in range(0, variable.sizes[time_dim], size)
+        ]
+    slices = []
+    start = stop = 0
+    for length in variable.chunksizes[time_dim]:
+        if stop > start and stop + length - start > size:
+            slices.append(slice(start, stop))
+            start = stop
+        stop += length
+    slices.append(slice(start, stop))
+    return slices
+
+
+def result_dtype(how: str, dtype: np.dtype, missing_periods: bool) -> np.dtype:
+    """Data type of a reduction, as computed by xarray."""
+    if how == "count":
+        dtype = np.dtype("int64")
+    elif how == "mean" and not np.issubdtype(dtype, np.floating):
+        dtype = np.dtype("float64")
+    elif how == "sum":
+        dtype = np.add.reduce(np.zeros(1, dtype)).dtype
+    if missing_periods and not np.issubdtype(dtype, np.floating):
+        # Periods without time steps are missing, which promotes integers
+        return np.dtype("float64")
+    return dtype
+
+
+class PeriodReducer:
+    """Reduce the time steps of a variable to periods, one chunk of time steps at a time.
+
+    The partial reduction of the last period of a chunk is carried over to the next
+    chunk, and the periods are written to the result as soon as they are complete.
+    """
+
+    def __init__(self, how: str, dtype: np.dtype, result: np.ndarray) -> None:
+        self.how = how
+        self.is_float = np.issubdtype(dtype, np.floating)
+        self.result = result
+        self.carry: tuple[int, tuple[np.ndarray, ...]] | None = None
+
+    def partials(
+        self, data: np.ndarray, starts: np.ndarray
+    ) -> list[tuple[np.ndarray, ...]]:
+        """Partial reductions of the runs of time steps beginning at ``starts``."""
+        bounds = list(zip(starts, [*starts[1:], data.shape[0]]))
+        if self.how in ("min", "max"):
+            ufunc = np.fmin if self.how == "min" else np.fmax
+            return [(ufunc.reduce(data[a:b], axis=0),) for a, b in bounds]
+        if not self.is_float:
+            return [(data[a:b].sum(axis=0), np.array(b - a)) for a, b in bounds]
+        valid = ~np.isnan(data)
+        data = np.where(valid, data, 0)
+        # Floats are summed in double precision
+        return [
+            (data[a:b].sum(axis=0, dtype="float64"), valid[a:b].sum(axis=0))
+            for a, b in bounds
+        ]
+
+    def combine(
+        self, first: tuple[np.ndarray, ...], second: tuple[np.ndarray, ...]
+    ) -> tuple[np.ndarray, ...]:
+        if self.how in ("min", "max"):
+            ufunc = np.fmin if self.how == "min" else np.fmax
+            return (ufunc(first[0], second[0]),)
+        return first[0] + second[0], first[1] + second[1]
+
+    def finalise(self, partials: tuple[np.ndarray, ...]) -> np.ndarray:
+        if self.how in ("min", "max"):
+            return partials[0]
+        sums, counts = partials
+        if self.how == "count":
+            return counts
+        if self.how == "sum":
+            return sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return sums / counts
+
+    def update(self, data: np.ndarray, periods: np.ndarray) -> None:
+        """Reduce a chunk of data, ordered by time along its first axis."""
+        starts = np.flatnonzero(np.diff(periods, prepend=-1))
+        periods = periods[starts]
+        partials = self.partials(data, starts)
+        if self.carry is not None:
+            period, carried = self.carry
+            if period == periods[0]:
+                partials[0] = self.combine(carried, partials[0])
+            else:
+                self.result[period] = self.finalise(carried)
+        for period, partial in zip(periods[:-1], partials[:-1]):
+            self.result[period] = self.finalise(partial)
+        self.carry = (periods[-1], partials[-1])
+
+    def close(self) -> np.ndarray:
+        if self.carry is not None:
+            period, carried = self.carry
+            self.result[period] = self.finalise(carried)
+        return self.result
+
+
+def reduce_variable(
+    variable: xr.DataArray,
+    time_dim: str,
+    period_index: np.ndarray,
+    n_periods: int,
+    how: str,
+    chunk_bytes: int,
+) -> np.ndarray:
+    """Reduce a variable with its time dimension first, chunk by chunk."""
+    variable = variable.transpose(time_dim, ...)
+    missing = np.bincount(period_index, minlength=n_periods) == 0
+    result = np.empty(
+        (n_periods, *variable.shape[1:]),
+        dtype=result_dtype(how, variable.dtype, missing.any()),
+    )
+    if missing.any():
+        result[missing] = np.nan
+    reducer = PeriodReducer(how, variable.dtype, result)
+    for chunk in time_chunks(variable, time_dim, chunk_bytes):
+        reducer.update(
+            np.asarray(variable.isel({time_dim: chunk}).values), period_index[chunk]
+        )
+    return reducer.close()
+
+
+def reduce(
+    dataset: xr.Dataset,
+    frequency: str,
+    how: str = "mean",
+    time_dim: str | None = None,
+    time_shift: dict[str, Any] | str | pd.Timedelta | None = None,
+    remove_partial_periods: bool = False,
+    how_label: str | None = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    context: Context = Context(),
+) -> xr.Dataset:
+    """Reduce a dataset to periods of a frequency, e.g. "D" or "MS" (see can_stream)."""
+    time_dim = find_time_dim(dataset, time_dim)
+    assert time_dim is not None
+    times = dataset.indexes[time_dim]
+    time_attrs = dict(dataset[time_dim].attrs)
+    if time_shift is not None:
+        time_shift = (
+            pd.Timedelta(**time_shift)
+            if isinstance(time_shift, dict)
+            else pd.Timedelta(time_shift)
+        )
+        times = times + time_shift
+        time_attrs["time_shift"] = f"{time_shift}"
+
+    starts = period_starts(times, frequency)
+    # As resampling, all the periods between the first and the last are returned
+    periods = pd.date_range(starts[0], starts[-1], freq=frequency).as_unit(starts.unit)
+    period_index = periods.get_indexer(starts)
+    context.debug(
+        f"Streaming {how} reduction of {times.size} time steps to {periods.size} periods"
+    )
+
+    data_vars = {}
+    for name, variable in dataset.data_vars.items():
+        values = reduce_variable(
+            variable, time_dim, period_index, periods.size, how, chunk_bytes
+        )
+        # As resampling, the time dimension comes first
+        dims = (time_dim, *[dim for dim in variable.dims if dim != time_dim])
+        data_vars[name] = xr.DataArray(values, dims=dims, attrs=variable.attrs)
+
+    coords = {
+        name: coord
+        for name, coord in dataset.coords.items()
+        if time_dim not in coord.dims
+    }
+    coords[time_dim] = xr.Variable(time_dim, periods.values, time_attrs)
+    result = xr.Dataset(data_vars, coords=coords, attrs=dataset.attrs)
+    if how_label is not None:
+        result = result.rename(
+            {name: f"{name}_{how_label}" for name in result.data_vars}
+        )
+    if remove_partial_periods and time_shift:
+        result = result.isel({time_dim: slice(1, -1)})
+    return result
+
+
+def daily_reduce(dataset: xr.Dataset, how: str = "mean", **kwargs: Any) -> xr.Dataset:
+    return reduce(dataset, FREQUENCIES["daily"], how=how, **kwargs)
+
+
+def monthly_reduce(dataset: xr.Dataset, how: str = "mean", **kwargs: Any) -> xr.Dataset:
+    return reduce(dataset, FREQUENCIES["monthly"], how=how, **kwargs)
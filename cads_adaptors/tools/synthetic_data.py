@@ -0,0 +1,311 @@
+"""Deterministic synthetic GRIB and netCDF data, for load testing.
+
+The dummy adaptors write files of random bytes, which exercise none of the GRIB and
+netCDF paths (post-processing, format conversion, area selection, archiving). This
+module generates valid files of fields on regular lat-lon grids, with the parameters,
+pressure levels, dates, times, grid and area of a MARS-like request, or with a grid
+chosen to reach a target size. Values are a large-scale pattern (per parameter, moving
+with the time of day) plus noise, drawn from a generator seeded by the seed and the
+coordinates of each field, so that a request always produces the same values, in GRIB
+and in netCDF. Files are written field by field, so that files larger than the memory
+can be generated.
+"""
+
+import dataclasses
+import datetime
+import math
+from typing import Any, Iterator
+
+import numpy as np
+
+from cads_adaptors.tools.date_tools import expand_dates_list
+from cads_adaptors.tools.general import ensure_list
+
+# Level type, mean and amplitude of the supported parameters, by GRIB short name
+PARAMETERS: dict[str, tuple[str, float, float]] = {
+    "2t": ("sfc", 285.0, 20.0),
+    "msl": ("sfc", 101325.0, 1500.0),
+    "sp": ("sfc", 98000.0, 3000.0),
+    "10u": ("sfc", 0.0, 8.0),
+    "10v": ("sfc", 0.0, 8.0),
+    "tcc": ("sfc", 0.5, 0.4),
+    "t": ("pl", 250.0, 20.0),
+    "u": ("pl", 5.0, 15.0),
+    "v": ("pl", 0.0, 10.0),
+    "z": ("pl", 50000.0, 5000.0),
+    "q": ("pl", 0.005, 0.004),
+}
+# Names of the variables in netCDF, as decoded by cfgrib
+NETCDF_NAMES = {"2t": "t2m", "10u": "u10", "10v": "v10"}
+
+GLOBAL_AREA = (90.0, 0.0, -90.0, 359.0)
+DEFAULT_LEVELS = [500]
+# Bits per value of the GRIB packing, used to choose the grid of a target size
+BITS_PER_VALUE = 16
+# Largest number of points of the fields of the grids chosen for a target size (that
+# of a global 0.1 degree grid), as each field is held in memory while it is written
+MAX_POINTS_PER_FIELD = 3600 * 1801
+
+Field = tuple[str, int | None, datetime.date, int]
+
+
+def _short_name(name: str) -> str:
+    """Supported short name of a parameter (unknown ones are mapped deterministically)."""
+    if name in PARAMETERS:
+        return name
+    names = list(PARAMETERS)
+    return names[sum(name.encode()) % len(names)]
+
+
+def _dates(values: Any) -> list[datetime.date]:
+    dates: list[datetime.date] = []
+    for value in ensure_list(values):
+        value = str(value).replace("/to/", "/")
+        dates.extend(day.date() for day in expand_dates_list(value, as_datetime=True))
+    return dates
+
+
+def _times(values: Any) -> list[int]:
+    """Times as HHMM integers, from e.g. "06:00", "0600" or 6."""
+    times: list[int] = []
+    for value in ensure_list(values):
+        value = str(value).replace(":", "")
+        times.append(int(value) * (100 if len(value) <= 2 else 1))
+    return times
+
+
+@dataclasses.dataclass
+class SyntheticSpec:
+    params: list[str] = dataclasses.field(default_factory=lambda: ["2t"])
+    # Pressure levels (hPa) of the pressure-level parameters
+    levels: list[int] = dataclasses.field(default_factory=lambda: list(DEFAULT_LEVELS))
+    dates: list[datetime.date] = dataclasses.field(
+        default_factory=lambda: [datetime.date(2000, 1, 1)]
+    )
+    times: list[int] = dataclasses.field(default_factory=lambda: [0])
+    # Increments in longitude and latitude, in degrees
+    grid: tuple[float, float] = (1.0, 1.0)
+    # North, west, south, east
+    area: tuple[float, float, float, float] = GLOBAL_AREA
+    seed: int = 0
+
+    @classmethod
+    def from_request(
+        cls, request: dict[str, Any], size: int | None = None
+    ) -> "SyntheticSpec":
+        """Spec of a MARS-like (or CDS-like) request.
+
+        Without a grid in the request and with a target size (in bytes), the grid
+        increment is chosen so that the GRIB file is about that size.
+        """
+        spec = cls(seed=int(ensure_list(request.get("seed", 0))[0]))
+        params = request.get("param", request.get("variable"))
+        if params is not None:
+            spec.params = [_short_name(str(param)) for param in ensure_list(params)]
+        levels = request.get("levelist", request.get("pressure_level"))
+        if levels is not None:
+            spec.levels = [int(level) for level in ensure_list(levels)]
+        if "date" in request:
+            spec.dates = _dates(request["date"])
+        if "time" in request:
+            spec.times = _times(request["time"])
+        if "area" in request:
+            area = [float(value) for value in ensure_list(request["area"])]
+            if len(area) == 1:
+                area = [float(value) for value in str(request["area"]).split("/")]
+            north, west, south, east = area
+            spec.area = (north, west, south, east)
+        if "grid" in request:
+            grid = ensure_list(request["grid"])
+            if len(grid) == 1:
+                grid = str(grid[0]).split("/")
+            spec.grid = (float(grid[0]), float(grid[-1]))
+        elif size:
+            spec.grid = (spec.increment_for_size(size),) * 2
+        return spec
+
+    def fields(self) -> Iterator[Field]:
+        for param in self.params:
+            levels: list[int | None] = list(self.levels)
+            if PARAMETERS[param][0] == "sfc":
+                levels = [None]
+            for level in levels:
+                for date in self.dates:
+                    for time in self.times:
+                        yield param, level, date, time
+
+    @property
+    def count(self) -> int:
+        return sum(1 for _ in self.fields())
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        _, west, _, east = self.area
+        if east < west:
+            east += 360
+        count = int(round((east - west) / self.grid[0])) + 1
+        return west + self.grid[0] * np.arange(count)
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        north, _, south, _ = self.area
+        count = int(round((north - south) / self.grid[1])) + 1
+        return north - self.grid[1] * np.arange(count)
+
+    def increment_for_size(self, size: int) -> float:
+        """Grid increment of a GRIB file of about size bytes.
+
+        Fields have at most MAX_POINTS_PER_FIELD points, so that larger sizes need
+        more fields (parameters, levels, dates or times).
+        """
+        north, west, south, east = self.area
+        width = (east - west) % 360 or 360
+        points = size * 8 / BITS_PER_VALUE / max(self.count, 1)
+        points = max(min(points, MAX_POINTS_PER_FIELD), 1)
+        increment = math.sqrt(width * (north - south) / points)
+        # Rounded up, so that the number of points stays under the cap
+        return max(math.ceil(increment * 100) / 100, 0.01)
+
+    def values(self, field: Field) -> np.ndarray:
+        """Values of a field, as float32 of shape (latitudes, longitudes)."""
+        param, level, date, time = field
+        _, mean, amplitude = PARAMETERS[param]
+        latitudes = np.deg2rad(self.latitudes)
+        longitudes = np.deg2rad(self.longitudes)
+        # Pattern moving with the time of day: sin(longitude + phase) by latitude
+        phase = 2 * np.pi * (time // 100 + time % 100 / 60) / 24
+        phase += date.toordinal() * 0.1
+        zonal = np.sin(longitudes) * np.cos(phase) + np.cos(longitudes) * np.sin(phase)
+        pattern = np.outer(np.cos(latitudes), zonal).astype("float32")
+        rng = np.random.default_rng(
+            [
+                self.seed,
+                list(PARAMETERS).index(param),
+                level or 0,
+                date.toordinal(),
+                time,
+            ]
+        )
+        noise = rng.standard_normal(pattern.shape, dtype="float32")
+        scale = amplitude * (level / 1000 if level else 1)
+        return mean + scale * pattern + 0.1 * amplitude * noise
+
+
+def write_grib(spec: SyntheticSpec, path: str, mode: str = "wb") -> str:
+    """Write the fields of a spec to a GRIB2 file (appended to it with mode "ab")."""
+    import eccodes
+
+    longitudes = spec.longitudes
+    latitudes = spec.latitudes
+    templates: dict[str, Any] = {}
+    try:
+        for sample in ["sfc", "pl"]:
+            handle = eccodes.codes_grib_new_from_samples(f"regular_ll_{sample}_grib2")
+            eccodes.codes_set_key_vals(
+                handle,
+                {
+                    "Ni": len(longitudes),
+                    "Nj": len(latitudes),
+                    "latitudeOfFirstGridPointInDegrees": float(latitudes[0]),
+                    "longitudeOfFirstGridPointInDegrees": float(longitudes[0] % 360),
+                    "latitudeOfLastGridPointInDegrees": float(latitudes[-1]),
+                    "longitudeOfLastGridPointInDegrees": float(longitudes[-1] % 360),
+                    "iDirectionIncrementInDegrees": spec.grid[0],
+                    "jDirectionIncrementInDegrees": spec.grid[1],
+                    "bitsPerValue": BITS_PER_VALUE,
+                },
+            )
+            templates[sample] = handle
+        with open(path, mode) as f:
+            for field in spec.fields():
+                param, level, date, time = field
+                handle = eccodes.codes_clone(templates[PARAMETERS[param][0]])
+                try:
+                    keys: dict[str, Any] = {
+                        "shortName": param,
+                        "dataDate": int(date.strftime("%Y%m%d")),
+                        "dataTime": time,
+                    }
+                    if level is not None:
+                        keys["level"] = level
+                    eccodes.codes_set_key_vals(handle, keys)
+                    eccodes.codes_set_values(
+                        handle, spec.values(field).ravel().astype("float64")
+                    )
+                    eccodes.codes_write(handle, f)
+                finally:
+                    eccodes.codes_release(handle)
+    finally:
+        for handle in templates.values():
+            eccodes.codes_release(handle)
+    return path
+
+
+def write_netcdf(spec: SyntheticSpec, path: str) -> str:
+    """Write the fields of a spec to a netCDF4 file, with the dimensions of cfgrib."""
+    import h5netcdf
+
+    times = sorted(
+        {
+            datetime.datetime.combine(date, datetime.time(time // 100, time % 100))
+            for date in spec.dates
+            for time in spec.times
+        }
+    )
+    epoch = datetime.datetime(1970, 1, 1)
+    time_index = {value: index for index, value in enumerate(times)}
+    levels = sorted(set(spec.levels), reverse=True)
+    with h5netcdf.File(path, "w") as f:
+        f.dimensions = {
+            "valid_time": len(times),
+            "pressure_level": len(levels),
+            "latitude": len(spec.latitudes),
+            "longitude": len(spec.longitudes),
+        }
+        coords: dict[str, tuple[Any, dict[str, str]]] = {
+            "valid_time": (
+                np.array([(t - epoch).total_seconds() for t in times], dtype="int64"),
+                {
+                    "units": "seconds since 1970-01-01",
+                    "calendar": "proleptic_gregorian",
+                },
+            ),
+            "pressure_level": (np.array(levels, "float64"), {"units": "hPa"}),
+            "latitude": (spec.latitudes, {"units": "degrees_north"}),
+            "longitude": (spec.longitudes, {"units": "degrees_east"}),
+        }
+        for name, (values, attrs) in coords.items():
+            variable = f.create_variable(name, (name,), data=values)
+            variable.attrs.update(attrs)
+        variables = {}
+        for param in spec.params:
+            dims: tuple[str, ...] = ("valid_time", "latitude", "longitude")
+            if PARAMETERS[param][0] == "pl":
+                dims = ("valid_time", "pressure_level", "latitude", "longitude")
+            chunks = tuple(
+                1 if dim in dims[:-2] else f.dimensions[dim].size for dim in dims
+            )
+            variables[param] = f.create_variable(
+                NETCDF_NAMES.get(param, param),
+                dims,
+                dtype="float32",
+                chunks=chunks,
+                fillvalue=np.float32(np.nan),
+            )
+            variables[param].attrs["GRIB_shortName"] = param
+        for field in spec.fields():
+            param, level, date, time = field
+            value_time = datetime.datetime.combine(
+                date, datetime.time(time // 100, time % 100)
+            )
+            index: tuple[int, ...] = (time_index[value_time],)
+            if level is not None:
+                index += (levels.index(level),)
+            variables[param][index] = spec.values(field)
+    return path
+
+
+def write(spec: SyntheticSpec, path: str, data_format: str = "grib") -> str:
+    if data_format == "netcdf":
+        return write_netcdf(spec, path)
+    return write_grib(spec, path)
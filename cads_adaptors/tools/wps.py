@@ -0,0 +1,175 @@
+"""Client of asynchronous jobs of OGC WPS 1.0.0 services.
+
+Jobs are executed with storeExecuteResponse="true", and their ExecuteResponse document
+is then polled at its statusLocation with an adaptive delay: the delay grows while the
+job makes no progress, and follows the estimated remaining time of the job when it
+reports its progress. Services which answer synchronously return a completed status
+to the Execute request, which is not polled.
+"""
+
+import dataclasses
+import logging
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterator
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+WPS_NAMESPACE = "http://www.opengis.net/wps/1.0.0"
+OWS_NAMESPACE = "http://www.opengis.net/ows/1.1"
+NAMESPACES = {"wps": WPS_NAMESPACE, "ows": OWS_NAMESPACE}
+
+RUNNING = {"ProcessAccepted", "ProcessStarted", "ProcessPaused"}
+
+# Number of consecutive failed status requests after which a job is given up
+MAX_POLL_ERRORS = 5
+
+
+@dataclasses.dataclass(frozen=True)
+class PollingPolicy:
+    """Delays between the status requests of a job, in seconds."""
+
+    initial: float = 1.0
+    factor: float = 1.5
+    maximum: float = 30.0
+    # Time after which a job is given up, if any
+    timeout: float | None = None
+
+    def next_delay(self, delay: float, remaining: float | None = None) -> float:
+        """Delay after a status request, given the remaining time of the job if known."""
+        delay = delay * self.factor
+        if remaining is not None:
+            delay = min(delay, remaining)
+        return max(self.initial, min(delay, self.maximum))
+
+
+@dataclasses.dataclass
+class JobError:
+    """Exception of an ExceptionReport."""
+
+    code: str | None
+    locator: str | None
+    text: str
+
+
+@dataclasses.dataclass
+class JobStatus:
+    status: str
+    percent: int | None = None
+    message: str = ""
+    status_location: str | None = None
+    # References (or data) of the outputs, in the order of the response
+    outputs: list[str] = dataclasses.field(default_factory=list)
+    errors: list[JobError] = dataclasses.field(default_factory=list)
+
+    @property
+    def running(self) -> bool:
+        return self.status in RUNNING
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "ProcessSucceeded"
+
+
+def parse_execute_response(content: bytes) -> JobStatus:
+    """Status, and outputs or errors, of an ExecuteResponse document.
+
+    ExceptionReport documents are parsed as a failed status. Raises ValueError for
+    other documents.
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError as exc:
+        raise ValueError(f"Invalid response of the WPS service: {exc}")
+    if root.tag == f"{{{OWS_NAMESPACE}}}ExceptionReport":
+        return JobStatus("ProcessFailed", errors=job_errors(root))
+    element = root.find("wps:Status/*", NAMESPACES)
+    if element is None:
+        raise ValueError("Response of the WPS service without status")
+    percent = element.get("percentCompleted")
+    job_status = JobStatus(
+        status=element.tag.split("}")[-1],
+        percent=int(percent) if percent is not None else None,
+        message=(element.text or "").strip(),
+        status_location=root.get("statusLocation"),
+    )
+    if job_status.status == "ProcessFailed":
+        job_status.errors = job_errors(element)
+    for output in root.iterfind("wps:ProcessOutputs/wps:Output", NAMESPACES):
+        reference = output.find("wps:Reference", NAMESPACES)
+        if reference is not None:
+            job_status.outputs.append(reference.get("href", ""))
+        else:
+            data = output.find("wps:Data/*", NAMESPACES)
+            job_status.outputs.append("" if data is None else (data.text or "").strip())
+    return job_status
+
+
+def job_errors(element: ET.Element) -> list[JobError]:
+    """Exceptions of the ExceptionReport in an element."""
+    return [
+        JobError(
+            code=exception.get("exceptionCode"),
+            locator=exception.get("locator"),
+            text="\n".join(
+                (text.text or "").strip()
+                for text in exception.iterfind("ows:ExceptionText", NAMESPACES)
+            ),
+        )
+        for exception in element.iter(f"{{{OWS_NAMESPACE}}}Exception")
+    ]
+
+
+def poll(
+    job_status: JobStatus,
+    session: requests.Session,
+    policy: PollingPolicy = PollingPolicy(),
+    sleep: Callable[[float], None] = time.sleep,
+    timeout: float | None = 60,
+) -> Iterator[JobStatus]:
+    """Yield the statuses of a running job, until it completes.
+
+    Raises TimeoutError when the job is not completed within the timeout of the
+    policy, and the error of the last status request after MAX_POLL_ERRORS
+    consecutive failed ones (requests.RequestException or ValueError). timeout is
+    the timeout of each status request.
+    """
+    if not job_status.running:
+        return
+    if job_status.status_location is None:
+        raise ValueError("Asynchronous job of the WPS service without status")
+    status_location = job_status.status_location
+    started = time.monotonic()
+    delay = policy.initial
+    progress: tuple[float, int] | None = None
+    errors = 0
+    while job_status.running:
+        elapsed = time.monotonic() - started
+        if policy.timeout is not None and elapsed >= policy.timeout:
+            raise TimeoutError(f"Job not completed after {policy.timeout} seconds")
+        sleep(delay)
+        try:
+            response = session.get(status_location, timeout=timeout)
+            response.raise_for_status()
+            job_status = parse_execute_response(response.content)
+        except (requests.RequestException, ValueError) as exc:
+            errors += 1
+            if errors >= MAX_POLL_ERRORS:
+                raise
+            logger.debug(f"Status request of {status_location} failed: {exc}")
+            delay = policy.next_delay(delay)
+            continue
+        errors = 0
+        yield job_status
+        # Estimate the remaining time from the progress since it was first reported
+        remaining = None
+        now = time.monotonic()
+        if job_status.percent:
+            if progress is None:
+                progress = (now, job_status.percent)
+            elif job_status.percent > progress[1]:
+                rate = (job_status.percent - progress[1]) / (now - progress[0])
+                remaining = (100 - job_status.percent) / rate
+        delay = policy.next_delay(delay, remaining)
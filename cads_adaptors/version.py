@@ -0,0 +1,2 @@
+# Do not change! Do not track in version control!
+__version__ = "1000.dev1+gd332247db"
@@ -1,7 +1,8 @@
 import pathlib
-from collections.abc import Generator
+from collections.abc import Callable, Generator
 
 import cacholote
+import numpy as np
 import pytest
 
 
@@ -16,3 +17,98 @@ def set_cache(
         use_cache=False,
     ):
         yield
+
+
+@pytest.fixture(autouse=True)
+def clear_caching_args_cache() -> Generator[None, None, None]:
+    from cads_adaptors.adaptors import cds
+
+    cds.clear_caching_args_cache()
+    yield
+    cds.clear_caching_args_cache()
+
+
+def _write_grib(path, params, times, levels=(None,), numbers=(None,), resolution=30.0):
+    """Write a small GRIB2 file of deterministic fields on a global lat-lon grid."""
+    import eccodes
+
+    ni = int(360 / resolution)
+    nj = int(180 / resolution) + 1
+    sample = "regular_ll_pl_grib2" if levels[0] is not None else "regular_ll_sfc_grib2"
+    with open(path, "wb") as f:
+        for i, param in enumerate(params):
+            for time in times:
+                for level in levels:
+                    for number in numbers:
+                        handle = eccodes.codes_grib_new_from_samples(sample)
+                        keys = {
+                            "Ni": ni,
+                            "Nj": nj,
+                            "latitudeOfFirstGridPointInDegrees": 90.0,
+                            "longitudeOfFirstGridPointInDegrees": 0.0,
+                            "latitudeOfLastGridPointInDegrees": -90.0,
+                            "longitudeOfLastGridPointInDegrees": 360.0 - resolution,
+                            "iDirectionIncrementInDegrees": resolution,
+                            "jDirectionIncrementInDegrees": resolution,
+                            "dataDate": 20240101,
+                            "dataTime": time,
+                            "shortName": param,
+                        }
+                        if level is not None:
+                            keys["level"] = level
+                        if number is not None:
+                            keys["productDefinitionTemplateNumber"] = 1
+                            keys["number"] = number
+                        eccodes.codes_set_key_vals(handle, keys)
+                        values = 250.0 + 10 * i + np.arange(ni * nj) / 8
+                        values += time / 100 + (level or 0) / 10 + (number or 0)
+                        eccodes.codes_set_values(handle, values)
+                        eccodes.codes_write(handle, f)
+                        eccodes.codes_release(handle)
+    return path
+
+
+@pytest.fixture
+def write_grib() -> Callable[..., pathlib.Path]:
+    return _write_grib
+
+
+def _write_obs_asset(path, size=200, stations=5, seed=0, chunk_size=None):
+    """Write a small observations asset (CDM lite layout) of random observations."""
+    import h5netcdf
+
+    rng = np.random.default_rng(seed)
+    station = np.sort(rng.integers(0, stations, size))
+    station_ids = np.array([f"S{i:03d}".encode() for i in range(stations)])
+    variables = {
+        "primary_station_id": station_ids[station].view("S1").reshape(size, -1),
+        # Seconds since 1900-01-01 in 2024
+        "report_timestamp": 3913056000 + rng.integers(0, 366 * 86400, size),
+        "latitude|header_table": rng.uniform(-90, 90, size).astype("float32"),
+        "longitude|header_table": rng.uniform(-180, 180, size).astype("float32"),
+        "observed_variable": rng.choice(np.array([85, 95], dtype="int32"), size),
+        "report_type": rng.integers(0, 3, size).astype("int32"),
+        "observation_value": rng.normal(280, 10, size).astype("float32"),
+    }
+    with h5netcdf.File(path, "w") as f:
+        f.dimensions["observation_id"] = size
+        for name, values in variables.items():
+            dims: tuple[str, ...] = ("observation_id",)
+            chunks = (chunk_size, *values.shape[1:]) if chunk_size else True
+            if values.ndim == 2:
+                f.dimensions[f"{name}_stringdim"] = values.shape[1]
+                dims += (f"{name}_stringdim",)
+            f.create_variable(name, dims, data=values, chunks=chunks)
+        f.variables["report_timestamp"].attrs["units"] = (
+            "seconds since 1900-01-01 00:00:00"
+        )
+        f.variables["observed_variable"].attrs["codes"] = np.array([85, 95])
+        f.variables["observed_variable"].attrs["labels"] = np.array(
+            ["air_temperature", "humidity"], dtype=object
+        )
+    return path
+
+
+@pytest.fixture
+def write_obs_asset() -> Callable[..., pathlib.Path]:
+    return _write_obs_asset
@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import cads_adaptors
+
+# Modules only needed by some adaptors at retrieve time; they must not be pulled in
+# by importing the package (e.g. by the broker, for costing and constraints).
+HEAVY_MODULES = [
+    "boto3",
+    "cacholote",
+    "cfgrib",
+    "dask",
+    "earthkit",
+    "numpy",
+    "owslib",
+    "pandas",
+    "requests",
+    "xarray",
+]
+
+
+def loaded_heavy_modules(statement: str) -> list[str]:
+    code = (
+        "import json, sys\n"
+        f"{statement}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], text=True)
+    return json.loads(output.splitlines()[-1])
+
+
+def test_import_is_lazy() -> None:
+    assert loaded_heavy_modules("import cads_adaptors") == []
+    assert loaded_heavy_modules("from cads_adaptors import AbstractCdsAdaptor") == []
+
+
+def test_public_names() -> None:
+    for name in cads_adaptors.__all__:
+        assert getattr(cads_adaptors, name) is not None
+    assert set(cads_adaptors.__all__) <= set(dir(cads_adaptors))
+
+    assert cads_adaptors.get_adaptor_class("cads_adaptors:DummyCdsAdaptor") is getattr(
+        cads_adaptors, "DummyCdsAdaptor"
+    )
+
+    with pytest.raises(AttributeError):
+        cads_adaptors.NotAnAdaptor  # type: ignore[attr-defined]
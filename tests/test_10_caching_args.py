@@ -0,0 +1,142 @@
+import pathlib
+from typing import Any
+
+import pytest
+
+from cads_adaptors import Context, DummyCdsAdaptor
+from cads_adaptors.adaptors import Request
+from cads_adaptors.adaptors.cds import ProcessingKwargs, clear_caching_args_cache
+from cads_adaptors.tools import date_tools, instrumentation
+
+
+class CountingAdaptor(DummyCdsAdaptor):
+    calls = 0
+
+    def normalise_request(self, request: Request) -> Request:
+        type(self).calls += 1
+        return super().normalise_request(request)
+
+
+class WarningAdaptor(CountingAdaptor):
+    def pre_mapping_modifications(
+        self, request: dict[str, Any]
+    ) -> tuple[Request, ProcessingKwargs]:
+        self.context.add_user_visible_log("WARNING: deprecated key")
+        return super().pre_mapping_modifications(request)
+
+
+class ReferenceWarningAdaptor(CountingAdaptor):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.warn = self.context.add_user_visible_log
+
+    def normalise_request(self, request: Request) -> Request:
+        self.warn("WARNING: deprecated key")
+        return super().normalise_request(request)
+
+
+class WorkerContext(Context):
+    """Context which records the messages, as the one of the workers."""
+
+    def __init__(self) -> None:
+        super().__init__(instrumentation=instrumentation.Instrumentation())
+        self.messages: list[str] = []
+
+    def add_user_visible_log(self, message: str, session: Any | None = None) -> None:
+        super().add_user_visible_log(message, session)
+        self.messages.append(message)
+
+    def add_stdout(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.messages.append(message)
+
+
+@pytest.fixture(autouse=True)
+def reset_calls() -> None:
+    CountingAdaptor.calls = 0
+    WarningAdaptor.calls = 0
+    ReferenceWarningAdaptor.calls = 0
+
+
+def make_adaptor(cls: type[CountingAdaptor] = CountingAdaptor, **config: Any) -> Any:
+    config.setdefault("mapping", {"rename": {"variable": "param"}})
+    return cls(form=None, **config)
+
+
+def test_get_caching_args_memoised() -> None:
+    adaptor = make_adaptor()
+    request = {"variable": ["t2m"], "date": ["2024-01-01"]}
+
+    args = adaptor.get_caching_args(request)
+    assert args.mapped_requests == [{"date": ["2024-01-01"], "param": ["t2m"]}]
+    args.mapped_requests[0]["param"] = ["modified"]
+
+    # Same request with a different key order, on a new adaptor instance
+    cached = make_adaptor().get_caching_args(
+        {"date": ["2024-01-01"], "variable": ["t2m"]}
+    )
+    assert cached.mapped_requests == [{"date": ["2024-01-01"], "param": ["t2m"]}]
+    assert CountingAdaptor.calls == 1
+
+    # Cache hits are logged and counted as computed results
+    context = WorkerContext()
+    make_adaptor(context=context).get_caching_args(request)
+    assert CountingAdaptor.calls == 1
+    assert context.messages[-1].startswith("Request mapped to")
+    summary = context.instrumentation.summary()
+    assert summary["counters"] == {"caching_args_cache.hits": 1, "mapped_requests": 1}
+    assert "apply_mapping" in summary["spans"]
+
+    # Different requests and configurations are different entries
+    make_adaptor().get_caching_args({"variable": ["msl"], "date": ["2024-01-01"]})
+    make_adaptor(mapping={}).get_caching_args(request)
+    assert CountingAdaptor.calls == 3
+
+
+def test_get_caching_args_not_memoised(monkeypatch: pytest.MonkeyPatch) -> None:
+    request = {"variable": ["t2m"]}
+
+    # Results which produced user-visible messages are recomputed
+    for _ in range(2):
+        make_adaptor(WarningAdaptor).get_caching_args(request)
+    assert WarningAdaptor.calls == 2
+
+    # Also when emitted by a context subclass, through a reference to it
+    context = WorkerContext()
+    for _ in range(2):
+        make_adaptor(ReferenceWarningAdaptor, context=context).get_caching_args(request)
+    assert context.messages.count("WARNING: deprecated key") == 2
+    assert ReferenceWarningAdaptor.calls == 2
+    # Messages of subclasses calling the base class are counted once
+    assert context.user_visible_messages == 2
+
+    monkeypatch.setenv("CADS_ADAPTORS_CACHING_ARGS_TTL", "0")
+    for _ in range(2):
+        make_adaptor().get_caching_args(request)
+    assert CountingAdaptor.calls == 2
+
+
+def test_get_caching_args_cache_dir(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("CADS_ADAPTORS_CACHING_ARGS_CACHE_DIR", str(tmp_path))
+    request = {"variable": ["t2m"], "download_format": "zip"}
+
+    expected = make_adaptor().get_caching_args(request)
+    assert len(list(tmp_path.glob("*.json"))) == 1
+
+    # Simulate another process on the same host
+    clear_caching_args_cache()
+    assert make_adaptor().get_caching_args(request) == expected
+    assert CountingAdaptor.calls == 1
+
+
+def test_get_caching_args_relative_dates(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Relative dates are only cached until the next UTC midnight
+    monkeypatch.setattr(date_tools, "seconds_until_next_utc_midnight", lambda: 0)
+    for _ in range(2):
+        make_adaptor().get_caching_args({"variable": ["t2m"], "date": ["-1"]})
+    assert CountingAdaptor.calls == 2
+
+    for _ in range(2):
+        make_adaptor().get_caching_args({"variable": ["t2m"], "date": ["2024-01-01"]})
+    assert CountingAdaptor.calls == 3
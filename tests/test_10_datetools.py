@@ -6,7 +6,12 @@ import pytest
 from cads_adaptors.exceptions import InvalidRequest
 
 # Assuming the function is in a module named `embargo_handler`
-from cads_adaptors.tools.date_tools import implement_embargo
+from cads_adaptors.tools.date_tools import (
+    has_relative_dates,
+    implement_embargo,
+    seconds_until_embargo_changes,
+    seconds_until_next_utc_midnight,
+)
 
 
 def test_implement_embargo_no_embargo():
@@ -67,3 +72,27 @@ def test_implement_embargo_filter_timesteps():
         "time": ["00:00", "12:00"],
     }
     assert cacheable is True
+
+
+def test_seconds_until_embargo_changes():
+    now = datetime(2025, 3, 2, 16, 45, tzinfo=UTC)
+    embargo = {"days": 5, "hours": 6, "error_time_format": "%Y-%m-%d"}
+    assert seconds_until_embargo_changes(embargo, now=now) == 15 * 60
+    assert seconds_until_embargo_changes({"minutes": 50}, now=now) == 5 * 60
+    assert seconds_until_embargo_changes({"months": 1}, now=now) == 15 * 60
+    # The embargo configuration is not modified
+    assert embargo == {"days": 5, "hours": 6, "error_time_format": "%Y-%m-%d"}
+
+
+def test_has_relative_dates():
+    assert has_relative_dates({"date": ["-1"]})
+    assert has_relative_dates({"date": "0", "param": "2t"})
+    assert has_relative_dates({"date": ["2024-01-01/current-2"]})
+    assert has_relative_dates({"hdate": [-7]})
+    assert not has_relative_dates({"date": ["2024-01-01/2024-01-31", 20240201]})
+    assert not has_relative_dates({"step": ["-1"], "date": ["2024-01-01"]})
+
+
+def test_seconds_until_next_utc_midnight():
+    now = datetime(2025, 3, 2, 23, 55, tzinfo=UTC)
+    assert seconds_until_next_utc_midnight(now=now) == 5 * 60
@@ -38,3 +38,62 @@ def test_dummy_adaptor_zip(tmp_path: pathlib.Path) -> None:
     assert os.path.getsize(unzipped_path / "dummy_0.grib") == 2
     assert os.path.getsize(unzipped_path / "dummy_1.grib") == 1
     assert grib_file.read() == (unzipped_path / "dummy_1.grib").read_bytes()
+
+
+def test_dummy_adaptor_synthetic(tmp_path: pathlib.Path) -> None:
+    import xarray as xr
+
+    dummy_adaptor = cads_adaptors.DummyAdaptor(None, cache_tmp_path=tmp_path)
+    synthetic = {"param": ["2t", "t"], "levelist": [500, 850], "time": [0, 12]}
+    grib_file = dummy_adaptor.retrieve({"size": 100_000, "synthetic": synthetic})
+    with xr.open_dataset(
+        grib_file.name, engine="cfgrib", backend_kwargs={"indexpath": ""}
+    ) as ds:
+        assert ds.t2m.shape[0] == 2
+    assert 80_000 < os.path.getsize(grib_file.name) < 120_000
+
+    netcdf_file = dummy_adaptor.retrieve(
+        {"size": 100_000, "synthetic": synthetic, "format": "netcdf"}
+    )
+    with xr.open_dataset(netcdf_file.name) as ds:
+        assert ds.t.dims == ("valid_time", "pressure_level", "latitude", "longitude")
+
+
+def test_dummy_mars_cds_adaptor(tmp_path: pathlib.Path) -> None:
+    import xarray as xr
+
+    dummy_adaptor = cads_adaptors.DummyMarsCdsAdaptor(
+        None, cache_tmp_path=tmp_path, synthetic={"grid": [1, 1], "seed": 1}
+    )
+    request = {
+        "param": "2t",
+        "date": "2024-01-01",
+        "time": ["00:00", "06:00"],
+        "data_format": "netcdf",
+    }
+    paths = dummy_adaptor.retrieve_list_of_results(
+        [dict(request)],
+        {"download_format": "as_source", "area": [], "post_process_steps": []},
+    )
+    assert len(paths) == 1 and paths[0].endswith(".nc")
+    with xr.open_dataset(paths[0]) as ds:
+        assert ds.t2m.shape == (2, 181, 360)
+
+    # The synthetic data go through the GRIB processing of the MARS adaptor
+    dummy_adaptor.post_process_reports = []
+    paths = dummy_adaptor.retrieve_list_of_results(
+        [dict(request)],
+        {
+            "download_format": "as_source",
+            "area": [],
+            "post_process_steps": [
+                {"method": "process_grib_messages", "area": [60, -10, 30, 20]}
+            ],
+        },
+    )
+    with xr.open_dataset(paths[0]) as ds:
+        assert ds.t2m.shape == (2, 31, 31)
+    assert [report.name for report in dummy_adaptor.post_process_reports] == [
+        "process_grib_messages",
+        "convert_format",
+    ]
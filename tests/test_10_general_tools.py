@@ -1,4 +1,5 @@
 import contextlib
+import time
 
 import pytest
 from cryptography.fernet import InvalidToken
@@ -123,6 +124,45 @@ def test_general_split_requests_on_keys(requests, split_on_keys, expected_output
     assert general.split_requests_on_keys(requests, split_on_keys) == expected_output
 
 
+@pytest.mark.parametrize("date_format", ["%Y-%m-%d", "%Y%m%d"])
+def test_general_split_requests_on_keys_by_month(date_format: str) -> None:
+    dates = ["2024-02-28", "2024-01-31", "2024-02-29", "2024-03-01", "2024-01-01"]
+    if date_format == "%Y%m%d":
+        dates = [date.replace("-", "") for date in dates]
+    requests = [{"date": dates, "param": ["a", "b"], "time": "00:00"}]
+    mapping = {"options": {"wants_dates": True, "date_format": date_format}}
+
+    split = general.split_requests_on_keys(
+        requests, ["param", "date", general.SPLIT_BY_MONTH_KEY], mapping=mapping
+    )
+    # Months are in the order of their first date, and dates keep their order
+    months = [[dates[0], dates[2]], [dates[1], dates[4]], [dates[3]]]
+    assert split == [
+        {"date": month, "param": param, "time": "00:00"}
+        for param in ["a", "b"]
+        for month in months
+    ]
+    assert (
+        list(
+            general.iter_split_requests(
+                requests, ["param", "date", general.SPLIT_BY_MONTH_KEY], mapping=mapping
+            )
+        )
+        == split
+    )
+
+
+@pytest.mark.parametrize("date", ["2023-02-29", "2024-13-01", "2024-01-32", "x"])
+def test_general_split_requests_on_keys_by_month_invalid(date: str) -> None:
+    requests = [{"date": ["2024-01-01", date]}]
+    with pytest.raises(ValueError):
+        general.split_requests_on_keys(
+            requests,
+            ["date", general.SPLIT_BY_MONTH_KEY],
+            mapping={"options": {"wants_dates": True}},
+        )
+
+
 def test_decrypt(monkeypatch: pytest.MonkeyPatch) -> None:
     key = "ZYG9zAgLeW1FPIwcoRifFpbXgv3oCVcVi5z4AUDB0aE="  # gitleaks:allow
     token = (
@@ -205,3 +245,35 @@ def test_decrypt_recursive(monkeypatch: pytest.MonkeyPatch):
         "int": 456,
     }
     assert general.decrypt_recursive(mixed, ignore_errors=True) == expected_mixed
+
+
+def test_ttl_cache() -> None:
+    cache = general.TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" is now the least recently used entry
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b", "missing") == "missing"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.set("d", 4, ttl=0)
+    assert "d" not in cache
+    cache.set("e", 5, ttl=-1)
+    assert cache.get("e") is None
+    assert cache.pop("a") == 1
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+    # Setting with no time-to-live drops the previous value
+    cache.set("a", 1)
+    cache.set("a", 2, ttl=0)
+    assert cache.get("a") is None
+    # Expired entries are not counted
+    cache.set("b", 1, ttl=1e-6)
+    time.sleep(1e-3)
+    assert len(cache) == 0
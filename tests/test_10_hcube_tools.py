@@ -44,3 +44,49 @@ def test_non_comparable_values():
     # Non-comparable values should be kept as they are and concatenated as a list
     assert result["a"][0] == 1
     assert np.array_equal(result["a"][1], np.array([1, 2]))
+
+
+def test_hcubes_deduplicate():
+    requests = [
+        {"param": ["t", "z"], "date": "2024-01-01/2024-01-10", "area": [60, 0, 30, 20]},
+        {"param": ["t", "q"], "date": "2024-01-05/2024-01-20", "area": [60, 0, 30, 20]},
+        # Same fields, on another area
+        {"param": ["t"], "date": "2024-01-01", "area": [50, 0, 30, 20]},
+    ]
+    deduplicated, nremoved = hcube_tools.hcubes_deduplicate(
+        requests, group_keys=["area"]
+    )
+    # The 6 days of t requested twice
+    assert nremoved == 6
+    assert hcube_tools.count_fields(deduplicated, ignore=["area"]) == 47
+    assert all(list(request) == ["param", "date", "area"] for request in deduplicated)
+    fields = [
+        (field["param"], field["date"], tuple(request["area"]))
+        for request in deduplicated
+        for field in hcube_tools.unfactorise({**request, "area": [None]})
+    ]
+    assert len(fields) == len(set(fields)) == 47
+
+    # Requests without duplicates are unchanged
+    assert hcube_tools.hcubes_deduplicate(requests[1:], group_keys=["area"]) == (
+        requests[1:],
+        0,
+    )
+
+    # Values of the group keys are kept as they are, repeated values and order too
+    requests = [
+        {"param": ["t", "z"], "grid": ["0.25", "0.25"], "area": [10, 0, 10, 5]},
+        {"param": ["t", "q"], "grid": ["0.25", "0.25"], "area": [10, 0, 10, 5]},
+    ]
+    deduplicated, nremoved = hcube_tools.hcubes_deduplicate(
+        requests, group_keys=["grid", "area"]
+    )
+    assert nremoved == 1
+    assert sorted(p for request in deduplicated for p in request["param"]) == [
+        "q",
+        "t",
+        "z",
+    ]
+    for request in deduplicated:
+        assert request["grid"] == ["0.25", "0.25"]
+        assert request["area"] == [10, 0, 10, 5]
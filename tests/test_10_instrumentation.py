@@ -0,0 +1,80 @@
+import pathlib
+from typing import Any
+
+import pytest
+
+from cads_adaptors import Context, DummyCdsAdaptor
+from cads_adaptors.tools import instrumentation
+
+
+class RecordingContext(Context):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.records: list[dict[str, Any]] = []
+
+    def add_stdout(self, message: str, *args: Any, **kwargs: Any) -> None:
+        self.records.append({"message": message, **kwargs})
+
+
+def test_null_instrumentation(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("CADS_ADAPTORS_INSTRUMENTATION", raising=False)
+    context = RecordingContext()
+    assert context.instrumentation is instrumentation.NULL_INSTRUMENTATION
+
+    with context.span("stage"):
+        context.count("counter")
+        context.gauge_bytes("gauge", 1)
+    context.log_instrumentation_summary()
+    assert context.instrumentation.summary() == {}
+    assert context.records == []
+
+
+def test_instrumentation() -> None:
+    recorder = instrumentation.Instrumentation()
+    context = Context(instrumentation=recorder)
+
+    for _ in range(2):
+        with context.span("outer"):
+            with context.span("inner"):
+                context.count("fields", 5)
+    with pytest.raises(ValueError):
+        with context.span("failing"):
+            raise ValueError
+    context.gauge_bytes("result", 10)
+    context.gauge_bytes("result", 4)
+
+    summary = recorder.summary()
+    assert set(summary["spans"]) == {"outer", "outer/inner", "failing"}
+    assert summary["spans"]["outer"]["count"] == 2
+    assert (
+        summary["spans"]["outer"]["total_time"]
+        >= summary["spans"]["outer/inner"]["total_time"]
+    )
+    assert summary["spans"]["failing"]["count"] == 1
+    assert summary["counters"] == {"fields": 10}
+    assert summary["gauges"] == {"result": {"last": 4, "max": 10}}
+
+
+def test_instrumentation_from_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CADS_ADAPTORS_INSTRUMENTATION", "1")
+    assert isinstance(Context().instrumentation, instrumentation.Instrumentation)
+
+
+def test_instrumented_retrieve(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    context = RecordingContext(instrumentation=instrumentation.Instrumentation())
+    adaptor = DummyCdsAdaptor(form=None, context=context, cache_tmp_path=tmp_path)
+    args = adaptor.get_caching_args({"foo": "bar"})
+    adaptor.uncached_retrieve(args.mapped_requests, args.kwargs)
+
+    summary = context.records[-1]["instrumentation"]
+    assert {
+        "normalise_request",
+        "apply_mapping",
+        "retrieve",
+        "retrieve/make_download_object",
+    } <= set(summary["spans"])
+    assert summary["counters"]["mapped_requests"] == 1
+    assert summary["gauges"]["download_object"]["last"] > 0
@@ -1,4 +1,5 @@
 import json
+from collections.abc import Generator
 from typing import Any
 
 import pytest
@@ -14,6 +15,60 @@ OPTIONS: dict[str, Any] = {}
 REQUEST: dict[str, Any] = {}
 
 
+@pytest.fixture(autouse=True)
+def clear_geoserver_cache() -> Generator[None, None, None]:
+    mapping.clear_geoserver_cache()
+    yield
+    mapping.clear_geoserver_cache()
+
+
+class StubGeoServer:
+    """Local stand-in for the GeoServer WMS/WFS services, counting the calls."""
+
+    def __init__(self, features: list[dict[str, Any]]) -> None:
+        self.features = features
+        self.connections = {"wms": 0, "wfs": 0}
+        self.requests = {"wms": 0, "wfs": 0}
+
+    def wms(self, *args: Any, **kwargs: Any) -> Any:
+        self.connections["wms"] += 1
+        server = self
+
+        class Response:
+            def read(self) -> bytes:
+                return json.dumps({"features": server.features}).encode()
+
+        class WMS:
+            def getfeatureinfo(self, **kwargs: Any) -> Response:
+                server.requests["wms"] += 1
+                return Response()
+
+        return WMS()
+
+    def wfs(self, *args: Any, **kwargs: Any) -> Any:
+        self.connections["wfs"] += 1
+        server = self
+
+        class Response:
+            def getvalue(self) -> bytes:
+                return json.dumps({"features": server.features}).encode()
+
+        class WFS:
+            def getfeature(self, **kwargs: Any) -> Response:
+                server.requests["wfs"] += 1
+                return Response()
+
+        return WFS()
+
+
+@pytest.fixture
+def geoserver(monkeypatch: pytest.MonkeyPatch) -> StubGeoServer:
+    server = StubGeoServer([{"id": 1, "properties": {"name": "Feature1"}}])
+    monkeypatch.setattr("owslib.wms.WebMapService", server.wms)
+    monkeypatch.setattr("owslib.wfs.WebFeatureService", server.wfs)
+    return server
+
+
 def test_expand_date() -> None:
     # This used to fail because of different treatment for single dates and date
     # ranges
@@ -522,3 +577,47 @@ def test_get_features_in_request_no_location_or_area() -> None:
     result = mapping.get_features_in_request(request, layer)
     expected: list[str] = []
     assert result == expected
+
+
+def test_get_features_cached(geoserver: StubGeoServer) -> None:
+    point_request = {"location": {"latitude": 10.0, "longitude": 20.0}}
+    area_request = {"area": [40.0, -10.0, 50.0, 10.0]}
+    for _ in range(3):
+        assert mapping.get_features_in_request(point_request, "layer") == (
+            geoserver.features
+        )
+        assert mapping.get_features_in_request(area_request, "layer") == (
+            geoserver.features
+        )
+    assert geoserver.connections == {"wms": 1, "wfs": 1}
+    assert geoserver.requests == {"wms": 1, "wfs": 1}
+
+    # Different queries reuse the connections but are not answered from the cache
+    mapping.get_features_in_request(point_request, "other_layer")
+    mapping.get_features_in_request({"area": [45.0, -10.0, 50.0, 10.0]}, "layer")
+    assert geoserver.connections == {"wms": 1, "wfs": 1}
+    assert geoserver.requests == {"wms": 2, "wfs": 2}
+
+    # Cached features are copies, so they can be safely modified by the caller
+    features = mapping.get_features_in_request(point_request, "layer")
+    features[0]["id"] = 2
+    assert mapping.get_features_in_request(point_request, "layer") == (
+        geoserver.features
+    )
+
+
+def test_get_features_cache_ttl(
+    geoserver: StubGeoServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("GEOSERVER_FEATURES_TTL", "0")
+    request = {"location": {"latitude": 10.0, "longitude": 20.0}}
+    mapping.get_features_in_request(request, "layer")
+    mapping.get_features_in_request(request, "layer")
+    assert geoserver.connections["wms"] == 1
+    assert geoserver.requests["wms"] == 2
+
+    monkeypatch.setenv("GEOSERVER_CAPABILITIES_TTL", "0")
+    mapping.clear_geoserver_cache()
+    mapping.get_features_in_request(request, "layer")
+    mapping.get_features_in_request(request, "layer")
+    assert geoserver.connections["wms"] == 3
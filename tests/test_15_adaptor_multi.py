@@ -5,6 +5,7 @@ import requests
 
 from cads_adaptors import AbstractAdaptor
 from cads_adaptors.adaptors import multi
+from cads_adaptors.tools import hcube_tools
 
 TEST_GRIB_FILE = "https://sites.ecmwf.int/repository/earthkit-data/test-data/era5-levels-members.grib"
 
@@ -360,3 +361,78 @@ def test_uid_metadata_handling():
         assert adaptor.config.get("collection_id") == multi_adaptor.config.get(
             "collection_id"
         )
+
+
+def test_multi_mars_adaptor_deduplicate_fields(tmp_path, monkeypatch):
+    from cads_adaptors import Context
+    from cads_adaptors.adaptors import mars
+    from cads_adaptors.tools import instrumentation
+
+    executed = []
+
+    def execute_mars(requests, target_dir, **kwargs):
+        executed.append(requests)
+        target = tmp_path / "data.grib"
+        target.write_bytes(b"GRIB")
+        return str(target)
+
+    monkeypatch.setattr(mars, "execute_mars", execute_mars)
+    get_adaptor = multi.adaptor_tools.get_adaptor
+    calls = []
+
+    def mocked_get_adaptor(*args, **kwargs):
+        calls.append(args)
+        return get_adaptor(*args, **kwargs)
+
+    monkeypatch.setattr(multi.adaptor_tools, "get_adaptor", mocked_get_adaptor)
+    multi._SUB_ADAPTOR_PLANS.clear()
+
+    # Two streams of the same dataset, which share a parameter
+    mapping = {"force": {"stream": ["oper"]}, "rename": {"variable": "param"}}
+    config = {
+        "extract_subrequest_kwargs": {"dont_split_keys": ["date"]},
+        "adaptors": {
+            "an": {
+                "entry_point": "cads_adaptors:MarsCdsAdaptor",
+                "values": {"variable": ["t", "z"]},
+                "mapping": mapping,
+            },
+            "fc": {
+                "entry_point": "cads_adaptors:MarsCdsAdaptor",
+                "values": {"variable": ["t", "q"]},
+                "mapping": mapping,
+            },
+        },
+    }
+    request = {
+        "variable": ["t", "z", "q"],
+        "date": ["2024-01-01/2024-01-02"],
+        "data_format": ["grib"],
+    }
+    processing_kwargs = {"download_format": "as_source", "post_process_steps": []}
+    for _ in range(2):
+        recorder = instrumentation.Instrumentation()
+        adaptor = multi.MultiMarsCdsAdaptor(
+            {},
+            cache_tmp_path=tmp_path,
+            context=Context(instrumentation=recorder),
+            **config,
+        )
+        adaptor.retrieve_list_of_results([dict(request)], processing_kwargs)
+        assert recorder.counters == {"multi_mars.fields.deduplicated": 2}
+
+    # The sub-adaptors are only instantiated once
+    assert len(calls) == 2
+    for mars_requests in executed:
+        fields = [
+            (field["param"], field["date"])
+            for field in hcube_tools.unfactorise(mars_requests)
+        ]
+        assert sorted(fields) == sorted(set(fields))
+        assert len(fields) == 6
+
+    adaptor = multi.MultiMarsCdsAdaptor(
+        {}, cache_tmp_path=tmp_path, deduplicate_fields=False, **config
+    )
+    adaptor.retrieve_list_of_results([dict(request)], processing_kwargs)
+    assert len(list(hcube_tools.unfactorise(executed[-1]))) == 8
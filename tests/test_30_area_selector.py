@@ -7,15 +7,22 @@ import requests
 import xarray as xr
 
 from cads_adaptors.exceptions import InvalidRequest
+from cads_adaptors.tools import area_selector as area_selector_module
 from cads_adaptors.tools.area_selector import (
     area_selector,
     area_selector_path,
     area_selector_paths,
     get_dim_slices,
+    streaming_chunks,
     wrap_longitudes,
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_slice_plan_cache():
+    area_selector_module.clear_slice_plan_cache()
+
+
 # class TestWrapLongitudes(unittest.TestCase):
 def test_wrap_longitudes():
     dim_key = "test_dim"
@@ -264,6 +271,244 @@ def test_area_selector_zero_length_dim():
             area_selector_path(test_file, area=[50.4, -10.6, 50.3, -10.5])
 
 
+TEST_DS_0_360 = xr.Dataset(
+    {
+        "temperature": (
+            ("time", "latitude", "longitude"),
+            np.random.rand(2, 181, 360),
+            {"units": "K"},
+        )
+    },
+    coords={
+        "time": np.arange(2),
+        "latitude": np.arange(90, -91, -1.0),
+        "longitude": np.arange(0, 360, 1.0),
+    },
+    attrs={"title": "global grid"},
+)
+
+
+def sel_and_concat(ds, area):
+    """Label-based selection, as done before slice plans were introduced."""
+    area = area_selector_module.area_to_checked_dictionary(area)
+    lon_slices = get_dim_slices(
+        ds, "longitude", area["east"], area["west"], longitude=True
+    )
+    lat_slice = get_dim_slices(ds, "latitude", area["south"], area["north"])[0]
+    return xr.concat(
+        [ds.sel(latitude=lat_slice, longitude=lon_slice) for lon_slice in lon_slices],
+        dim="longitude",
+        data_vars="minimal",
+        coords="minimal",
+    )
+
+
+@pytest.mark.parametrize(
+    "ds, area, expected_longitudes",
+    [
+        # Crossing the Greenwich meridian on a 0/360 grid
+        (TEST_DS_0_360, [60, -10, 30, 10], [*range(350, 360), *range(0, 11)]),
+        # Crossing the dateline on a -180/180 grid
+        (
+            TEST_DS_2,
+            [10, 170, -10, 190],
+            [*np.arange(170.5, 180), *np.arange(-179.5, -170)],
+        ),
+        # Fully shifted areas
+        (TEST_DS_0_360, [60, -40, 30, -20], [*range(320, 341)]),
+        (TEST_DS_2, [10, 190, -10, 200], [*np.arange(-169.5, -160)]),
+    ],
+)
+def test_area_selector_dateline(ds, area, expected_longitudes):
+    result = area_selector(ds, area=area)
+    xr.testing.assert_identical(result, sel_and_concat(ds, area))
+    np.testing.assert_array_equal(result.longitude, expected_longitudes)
+
+    # The same grid and area reuses the plan
+    hits = area_selector_module._SLICE_PLANS.hits
+    xr.testing.assert_identical(area_selector(ds.copy(deep=True), area=area), result)
+    assert area_selector_module._SLICE_PLANS.hits == hits + 1
+
+
+def test_area_selector_slice_plan_cache():
+    area = [60, -10, 30, 10]
+    area_selector(TEST_DS_0_360, area=area)
+    assert len(area_selector_module._SLICE_PLANS) == 1
+
+    # Other times share the plan, other grids and areas do not
+    area_selector(TEST_DS_0_360.assign_coords(time=[10, 11]), area=area)
+    assert len(area_selector_module._SLICE_PLANS) == 1
+    area_selector(TEST_DS_0_360.isel(latitude=slice(1, None)), area=area)
+    area_selector(TEST_DS_0_360, area=[60, -10, 30, 20])
+    assert len(area_selector_module._SLICE_PLANS) == 3
+
+    # Errors are not cached
+    for _ in range(2):
+        with pytest.raises(InvalidRequest):
+            area_selector(TEST_DS_3, area=[20, -40, 10, -30])
+    assert len(area_selector_module._SLICE_PLANS) == 3
+
+
+def curvilinear_dataset(ny=60, nx=80):
+    """A sheared grid crossing the dateline, with 2-D latitudes and longitudes."""
+    j, i = np.meshgrid(np.arange(ny), np.arange(nx), indexing="ij")
+    longitude = (150 + 0.5 * i + 0.1 * j + 180) % 360 - 180
+    latitude = 20 + 0.5 * j - 0.05 * i
+    return xr.Dataset(
+        {"t2m": (("time", "y", "x"), np.random.rand(2, ny, nx))},
+        coords={
+            "time": [0, 1],
+            "latitude": (("y", "x"), latitude),
+            "longitude": (("y", "x"), longitude),
+        },
+    )
+
+
+def unstructured_dataset(n=5000):
+    """Randomly distributed points, with longitudes in [0, 360)."""
+    rng = np.random.default_rng(0)
+    return xr.Dataset(
+        {"t2m": (("time", "values"), rng.random((2, n)))},
+        coords={
+            "time": [0, 1],
+            "latitude": ("values", np.degrees(np.arcsin(rng.uniform(-1, 1, n)))),
+            "longitude": ("values", rng.uniform(0, 360, n)),
+        },
+    )
+
+
+def points_inside_area(ds, area):
+    north, west, south, east = area
+    return (
+        (ds.latitude >= south)
+        & (ds.latitude <= north)
+        & (((ds.longitude - west) % 360) <= east - west)
+    )
+
+
+@pytest.mark.parametrize("area", [[30, 170, 25, 190], [40, -175, 30, -165]])
+def test_area_selector_curvilinear(area):
+    ds = curvilinear_dataset()
+    result = area_selector(ds, area=area)
+
+    # The smallest window containing all the points inside the area
+    inside = points_inside_area(ds, area)
+    rows, cols = np.nonzero(inside.values)
+    expected = ds.isel(
+        y=slice(rows.min(), rows.max() + 1), x=slice(cols.min(), cols.max() + 1)
+    )
+    xr.testing.assert_identical(result, expected)
+    assert result.sizes["y"] < ds.sizes["y"] and result.sizes["x"] < ds.sizes["x"]
+
+
+@pytest.mark.parametrize("area", [[10, -10, -10, 10], [60, 170, 20, 190]])
+def test_area_selector_unstructured(area):
+    ds = unstructured_dataset()
+    result = area_selector(ds, area=area)
+    expected = ds.isel(values=np.flatnonzero(points_inside_area(ds, area).values))
+    xr.testing.assert_identical(result, expected)
+
+
+def test_area_selector_irregular_cache():
+    ds = unstructured_dataset()
+    area_selector(ds, area=[10, -10, -10, 10])
+    area_selector(ds, area=[20, -10, -10, 10])
+    assert len(area_selector_module._GRID_INDEXES) == 1
+    assert len(area_selector_module._SLICE_PLANS) == 2
+
+    # Files on the same grid reuse the spatial index and the plans
+    hits = area_selector_module._SLICE_PLANS.hits
+    area_selector(ds.assign(t2m=ds.t2m * 2), area=[10, -10, -10, 10])
+    assert area_selector_module._SLICE_PLANS.hits == hits + 1
+    assert len(area_selector_module._GRID_INDEXES) == 1
+
+
+@pytest.mark.parametrize("ds", [curvilinear_dataset(), unstructured_dataset()])
+def test_area_selector_irregular_no_points(ds):
+    with pytest.raises(InvalidRequest):
+        area_selector(ds, area=[-80, 0, -85, 1])
+
+
+def test_streaming_chunks():
+    assert streaming_chunks(TEST_DS_2, 10**9) == {
+        "longitude": 360,
+        "latitude": 180,
+        "time": 5,
+    }
+    # float64: one time step is 518400 bytes
+    assert streaming_chunks(TEST_DS_2, 2 * 518400) == {
+        "longitude": 360,
+        "latitude": 180,
+        "time": 2,
+    }
+    assert streaming_chunks(TEST_DS_2, 100 * 8) == {
+        "longitude": 100,
+        "latitude": 1,
+        "time": 1,
+    }
+
+
+@pytest.mark.parametrize("precompute", [True, False])
+def test_area_selector_path_streaming(tmp_path, precompute):
+    test_file = str(tmp_path / TEMP_FILENAME)
+    TEST_DS_2.to_netcdf(test_file)
+    (tmp_path / "expected").mkdir()
+    area = [80, -170, -80, 170]
+    (expected,) = area_selector_path(
+        test_file,
+        area=area,
+        target_dir=str(tmp_path / "expected"),
+        area_selector_kwargs={"precompute": precompute},
+    )
+    (result,) = area_selector_path(
+        test_file,
+        area=area,
+        target_dir=str(tmp_path),
+        area_selector_kwargs={"stream_chunk_bytes": 518400},
+    )
+    xr.testing.assert_identical(xr.open_dataset(result), xr.open_dataset(expected))
+
+
+def test_area_selector_paths_parallel(tmp_path):
+    paths = []
+    for i, ds in enumerate([TEST_DS_2, TEST_DS_3, TEST_DS_2.isel(time=[0])]):
+        paths.append(str(tmp_path / f"test-{i}.nc"))
+        ds.to_netcdf(paths[-1])
+    # Files that cannot be opened are returned as they are, in the same position
+    paths.insert(1, str(tmp_path / "test.txt"))
+    with open(paths[1], "w") as f:
+        f.write("DUMMY")
+
+    area = [50, -10, 40, 10]
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "parallel").mkdir()
+    expected = area_selector_paths(
+        paths, area, max_workers=1, target_dir=str(tmp_path / "serial")
+    )
+    result = area_selector_paths(
+        paths, area, max_workers=2, target_dir=str(tmp_path / "parallel")
+    )
+    assert [os.path.basename(path) for path in result] == [
+        os.path.basename(path) for path in expected
+    ]
+    assert result[1] == paths[1]
+    for result_path, expected_path in zip(result, expected):
+        if result_path.endswith(".nc"):
+            xr.testing.assert_identical(
+                xr.open_dataset(result_path), xr.open_dataset(expected_path)
+            )
+
+    with pytest.raises(InvalidRequest):
+        area_selector_paths(paths, [20, -40, 10, -30], max_workers=2)
+
+
+def test_default_max_workers(monkeypatch):
+    monkeypatch.delenv("CADS_ADAPTORS_AREA_SELECTOR_MAX_WORKERS", raising=False)
+    assert area_selector_module.default_max_workers() == 1
+    monkeypatch.setenv("CADS_ADAPTORS_AREA_SELECTOR_MAX_WORKERS", "4")
+    assert area_selector_module.default_max_workers() == 4
+
+
 TEST_DATA_BASE_URL = "https://sites.ecmwf.int/repository/data-store-service/"
 
 
@@ -1,8 +1,10 @@
 import os
 import tempfile
 
+import numpy as np
 import pytest
 import requests
+import xarray as xr
 
 from cads_adaptors.tools import convertors
 
@@ -217,6 +219,195 @@ def test_convert_format_to_netcdf_legacy(
         assert "/test_subdir/" in converted_files[0]
 
 
+def synthetic_datasets():
+    rng = np.random.default_rng(0)
+    coords = {
+        "time": np.arange(24),
+        "latitude": np.linspace(90, -90, 73),
+        "longitude": np.arange(0, 360, 2.5),
+    }
+    return {
+        f"test_{i}": xr.Dataset(
+            {
+                name: (
+                    ("time", "latitude", "longitude"),
+                    rng.random((24, 73, 144), dtype="float32"),
+                )
+                for name in ["t2m", "msl", "tp"]
+            },
+            coords=coords,
+        )
+        for i in range(3)
+    }
+
+
+@pytest.mark.parametrize(
+    "dims, shape, access_pattern, expected",
+    [
+        # A chunk per map at 0.25 degrees, larger maps are tiled
+        (("time", "latitude", "longitude"), (24, 721, 1440), "spatial", (1, 721, 1440)),
+        (("time", "latitude", "longitude"), (24, 1441, 2880), "spatial", (1, 721, 1440)),
+        # Smaller maps are stacked up to 4 MiB
+        (("time", "latitude", "longitude"), (24, 73, 144), "spatial", (24, 73, 144)),
+        (("time", "latitude", "longitude"), (2400, 73, 144), "spatial", (96, 73, 144)),
+        (("time", "values"), (24, 2_000_000), "spatial", (1, 1_000_000)),
+        (("time", "latitude", "longitude"), (8760, 721, 1440), "timeseries", (8760, 1, 111)),
+        (("time", "station"), (100, 20), "spatial", (100, 20)),
+        (("time", "latitude", "longitude"), (24, 73, 144), None, None),
+        ((), (), "spatial", None),
+    ],
+)  # fmt: skip
+def test_access_pattern_chunksizes(dims, shape, access_pattern, expected):
+    variable = xr.DataArray(np.broadcast_to(np.float32(0), shape), dims=dims)
+    assert convertors.access_pattern_chunksizes(variable, access_pattern) == expected
+
+
+def test_access_pattern_chunksizes_unknown():
+    with pytest.raises(ValueError):
+        convertors.access_pattern_chunksizes(xr.DataArray([1.0]), "diagonal")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_xarray_dict_to_netcdf(tmp_path, max_workers):
+    datasets = synthetic_datasets()
+    out_nc_files = convertors.xarray_dict_to_netcdf(
+        datasets,
+        target_dir=str(tmp_path),
+        out_fname_prefix="prefix_",
+        max_workers=max_workers,
+    )
+    assert out_nc_files == [
+        str(tmp_path / f"prefix_test_{i}.nc") for i in range(len(datasets))
+    ]
+    for out_nc_file, dataset in zip(out_nc_files, datasets.values()):
+        with xr.open_dataset(out_nc_file) as result:
+            xr.testing.assert_identical(result, dataset)
+            assert result["t2m"].encoding["zlib"]
+    # The presets are not modified
+    assert convertors.STANDARD_COMPRESSION_OPTIONS["default"]["engine"] == "netcdf4"
+
+
+def test_xarray_dict_to_netcdf_access_pattern(tmp_path):
+    latitude = np.linspace(90, -90, 181)
+    longitude = np.arange(0, 360, 1.0)
+    dataset = xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), np.zeros((24, 181, 360), "f4"))},
+        coords={"time": range(24), "latitude": latitude, "longitude": longitude},
+    )
+    expected = convertors.access_pattern_chunksizes(dataset["t2m"], "spatial")
+    assert expected == (12, 181, 360)
+
+    # The netCDF library chunking is kept by default
+    (out_nc_file,) = convertors.convert_format(
+        dataset, "netcdf", target_dir=str(tmp_path)
+    )
+    with xr.open_dataset(out_nc_file) as result:
+        assert result["t2m"].encoding["chunksizes"] != expected
+
+    # Datasets opt in through their config
+    to_netcdf_kwargs = {"access_pattern": "spatial"}
+    config = {"post_processing_kwargs": {"to_netcdf_kwargs": to_netcdf_kwargs}}
+    (out_nc_file,) = convertors.convert_format(
+        dataset, "netcdf", config=config, target_dir=str(tmp_path)
+    )
+    with xr.open_dataset(out_nc_file) as result:
+        assert result["t2m"].encoding["chunksizes"] == expected
+
+
+def test_xarray_dict_to_netcdf_report(tmp_path):
+    class RecordingContext(convertors.Context):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def info(self, message, **kwargs):
+            self.messages.append((message, kwargs))
+
+    context = RecordingContext()
+    convertors.xarray_dict_to_netcdf(
+        synthetic_datasets(), context=context, target_dir=str(tmp_path)
+    )
+    *per_file, (total, total_kwargs) = context.messages
+    assert len(per_file) == 3
+    for message, kwargs in per_file:
+        assert "compression ratio=" in message and "throughput=" in message
+        assert kwargs["filesize"] > 0
+    assert total_kwargs["filesize"] == sum(kwargs["filesize"] for _, kwargs in per_file)
+
+
+def test_resolve_compression_options():
+    base, variables = convertors.resolve_compression_options(
+        {
+            "preset": "zstd",
+            "complevel": 5,
+            "variables": {"tp": "default-lossy", "t2m": {"significant_digits": 3}},
+        }
+    )
+    assert base == {**convertors.STANDARD_COMPRESSION_OPTIONS["zstd"], "complevel": 5}
+    default_lossy = dict(convertors.STANDARD_COMPRESSION_OPTIONS["default-lossy"])
+    default_lossy.pop("engine")
+    assert variables["tp"] == default_lossy
+    assert variables["t2m"]["compression"] == "zstd"
+    assert variables["t2m"]["complevel"] == 5
+    assert variables["t2m"]["significant_digits"] == 3
+
+    # Plain options and preset names are still supported
+    assert convertors.resolve_compression_options({"zlib": True}) == (
+        {"zlib": True},
+        {},
+    )
+    assert convertors.resolve_compression_options("default") == (
+        convertors.STANDARD_COMPRESSION_OPTIONS["default"],
+        {},
+    )
+    assert convertors.resolve_compression_options("unknown") == ({}, {})
+
+
+def test_resolve_compression_options_unavailable_filter(monkeypatch):
+    import netCDF4
+
+    monkeypatch.setattr(netCDF4, "__has_zstandard_support__", 0)
+    base, variables = convertors.resolve_compression_options(
+        {"preset": "zstd-lossy", "variables": {"tp": {"compression": "zlib"}}}
+    )
+    assert base == {
+        **convertors.STANDARD_COMPRESSION_OPTIONS["default"],
+        "significant_digits": 4,
+        "quantize_mode": "BitGroom",
+    }
+    assert variables["tp"]["compression"] == "zlib"
+
+
+def test_xarray_dict_to_netcdf_compression_policy(tmp_path):
+    dataset = synthetic_datasets()["test_0"]
+    dataset["mask"] = dataset["t2m"] > 0.5
+    out_nc_file, *_ = convertors.xarray_dict_to_netcdf(
+        {"test": dataset},
+        compression_options={
+            "preset": "zstd",
+            "variables": {"tp": "uncompressed", "mask": "default-lossy"},
+        },
+        target_dir=str(tmp_path),
+    )
+    with xr.open_dataset(out_nc_file) as result:
+        assert result["t2m"].encoding["zstd"]
+        assert not result["tp"].encoding["zlib"] and not result["tp"].encoding["zstd"]
+        # Quantisation is only applied to floating point variables
+        assert result["mask"].encoding["zlib"]
+        assert "significant_digits" not in result["mask"].encoding
+        xr.testing.assert_identical(result, dataset)
+
+    out_nc_file, *_ = convertors.xarray_dict_to_netcdf(
+        {"test": dataset},
+        compression_options="default-lossy",
+        target_dir=str(tmp_path),
+    )
+    with xr.open_dataset(out_nc_file) as result:
+        np.testing.assert_allclose(result["t2m"], dataset["t2m"], rtol=1e-3)
+        assert not (result["t2m"] == dataset["t2m"]).all()
+        xr.testing.assert_identical(result["mask"], dataset["mask"])
+
+
 def test_safely_rename_variable():
     import xarray as xr
 
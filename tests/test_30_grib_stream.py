@@ -0,0 +1,140 @@
+import eccodes
+import numpy as np
+import pytest
+import xarray as xr
+
+from cads_adaptors.adaptors.mars import MarsCdsAdaptor
+from cads_adaptors.exceptions import CdsFormatConversionError, InvalidRequest
+from cads_adaptors.tools import grib_stream
+
+
+def read_messages(path):
+    messages = []
+    with open(path, "rb") as f:
+        for handle in grib_stream.iter_handles(f):
+            messages.append(
+                {
+                    "shortName": eccodes.codes_get(handle, "shortName"),
+                    "dataTime": eccodes.codes_get(handle, "dataTime"),
+                    "level": eccodes.codes_get(handle, "level"),
+                    "message": eccodes.codes_get_message(handle),
+                }
+            )
+    return messages
+
+
+def test_scan(tmp_path, write_grib):
+    grib_file = write_grib(
+        tmp_path / "test.grib", params=["2t", "msl"], times=[0, 1200]
+    )
+    index = grib_stream.scan(str(grib_file), keys=["shortName", "unknownKey"])
+    assert [message.keys["shortName"] for message in index] == [
+        "2t",
+        "2t",
+        "msl",
+        "msl",
+    ]
+    assert all(message.keys["unknownKey"] is None for message in index)
+    assert index[0].offset == 0
+    assert sum(message.length for message in index) == grib_file.stat().st_size
+
+
+def test_process_grib_file_select_and_order(tmp_path, write_grib):
+    grib_file = write_grib(
+        tmp_path / "test.grib", params=["t", "z"], times=[0, 1200], levels=[850, 500]
+    )
+    out = grib_stream.process_grib_file(
+        str(grib_file),
+        str(tmp_path / "out.grib"),
+        select={"shortName": "t", "dataTime": [1200, "0"]},
+        order_by=["level", "dataTime"],
+    )
+    result = read_messages(out)
+    assert [(m["level"], m["dataTime"]) for m in result] == [
+        (500, 0),
+        (500, 1200),
+        (850, 0),
+        (850, 1200),
+    ]
+    assert {m["shortName"] for m in result} == {"t"}
+
+    # Messages are copied byte for byte
+    source = {
+        (m["shortName"], m["dataTime"], m["level"]): m["message"]
+        for m in read_messages(grib_file)
+    }
+    for m in result:
+        assert m["message"] == source[(m["shortName"], m["dataTime"], m["level"])]
+
+
+@pytest.mark.parametrize(
+    "area", [[30, -40, -30, 40], [60, 150, 0, 210], [90, 0, -90, 360]]
+)
+def test_process_grib_file_area(tmp_path, write_grib, area):
+    grib_file = write_grib(
+        tmp_path / "test.grib", params=["2t"], times=[0, 1200], resolution=10.0
+    )
+    out = grib_stream.process_grib_file(
+        str(grib_file), str(tmp_path / "out.grib"), area=area
+    )
+    north, west, south, east = area
+    expected = xr.open_dataset(grib_file, engine="cfgrib").t2m
+    expected = expected.sel(latitude=slice(north, south))
+    offsets = (expected.longitude - west) % 360
+    expected = expected.isel(
+        longitude=np.argsort(offsets.values)[: int((offsets <= east - west).sum())]
+    )
+    with xr.open_dataset(out, engine="cfgrib") as result:
+        assert result.t2m.shape == expected.shape
+        np.testing.assert_allclose(result.t2m.values, expected.values, atol=1e-3)
+        np.testing.assert_allclose(
+            result.longitude.values % 360, expected.longitude.values % 360
+        )
+
+
+def test_process_grib_file_errors(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "test.grib", params=["2t"], times=[0])
+    with pytest.raises(InvalidRequest):
+        grib_stream.process_grib_file(
+            str(grib_file), str(tmp_path / "out.grib"), select={"shortName": "msl"}
+        )
+    with pytest.raises(InvalidRequest):
+        grib_stream.process_grib_file(
+            str(grib_file), str(tmp_path / "out.grib"), area=[10, 5, 5, 10]
+        )
+    with pytest.raises(CdsFormatConversionError):
+        grib_stream.process_grib_files(
+            {"data": str(tmp_path / "data.nc")}, target_dir=str(tmp_path)
+        )
+
+
+def test_mars_process_grib_messages(tmp_path, write_grib, monkeypatch):
+    from cads_adaptors.tools import convertors
+
+    grib_file = write_grib(
+        tmp_path / "data.grib", params=["2t", "msl"], times=[0, 1200]
+    )
+    opened = []
+    open_result = convertors.open_result_as_xarray_dictionary
+    monkeypatch.setattr(
+        convertors,
+        "open_result_as_xarray_dictionary",
+        lambda *args, **kwargs: opened.append(args) or open_result(*args, **kwargs),
+    )
+
+    adaptor = MarsCdsAdaptor(form=None, cache_tmp_path=tmp_path)
+    step = {"method": "process_grib_messages", "select": {"shortName": "2t"}}
+    result = adaptor.post_process(str(grib_file), [step])
+    assert result == {"data_processed": str(tmp_path / "data_processed.grib")}
+    assert [m["shortName"] for m in read_messages(result["data_processed"])] == [
+        "2t",
+        "2t",
+    ]
+    assert opened == []
+
+    # The files are opened as xarray for the following post-processors
+    result = adaptor.post_process(
+        str(grib_file), [dict(step), {"method": "daily_reduce", "how": "mean"}]
+    )
+    assert len(opened) == 1
+    assert all(isinstance(ds, xr.Dataset) for ds in result.values())
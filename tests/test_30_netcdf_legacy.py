@@ -0,0 +1,231 @@
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+
+import netCDF4
+import numpy as np
+import pytest
+import xarray as xr
+
+from cads_adaptors.exceptions import CdsFormatConversionError
+from cads_adaptors.tools import convertors, netcdf_legacy
+
+# Structure and packed content of the netCDF files written by grib_to_netcdf for the
+# CASES. Run the tests with CADS_ADAPTORS_REGENERATE_GOLDENS=1 where grib_to_netcdf is
+# installed to write them; the comparisons of the missing ones are skipped.
+GOLDEN_DIR = pathlib.Path(__file__).parent / "data" / "netcdf_legacy"
+
+CASES = {
+    "single_levels": {"params": ["2t", "msl"], "times": [0, 1200]},
+    "pressure_levels": {"params": ["t", "z"], "times": [0], "levels": [500, 850]},
+    "ensemble": {"params": ["2t"], "times": [0, 600], "numbers": [0, 1, 2]},
+}
+
+
+def load_golden(case):
+    path = GOLDEN_DIR / f"{case}.json"
+    if not path.exists():
+        pytest.skip(f"{path} is not generated, see GOLDEN_DIR")
+    with open(path) as f:
+        return json.load(f)
+
+
+def to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def describe(path):
+    """The structure and raw (packed) content of a netCDF file."""
+    with netCDF4.Dataset(path) as nc:
+        nc.set_auto_maskandscale(False)
+        return {
+            "format": nc.data_model,
+            "dimensions": {name: len(dim) for name, dim in nc.dimensions.items()},
+            "variables": {
+                name: {
+                    "dtype": variable.dtype.str,
+                    "dimensions": list(variable.dimensions),
+                    "attributes": {
+                        key: to_json(variable.getncattr(key))
+                        for key in variable.ncattrs()
+                    },
+                    "data": variable[:].ravel().tolist(),
+                }
+                for name, variable in nc.variables.items()
+            },
+            "attributes": {
+                key: to_json(nc.getncattr(key))
+                for key in nc.ncattrs()
+                if key != "history"
+            },
+        }
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_grib_to_netcdf_legacy_golden(tmp_path, write_grib, case):
+    grib_file = write_grib(tmp_path / f"{case}.grib", **CASES[case])
+    out_fname = netcdf_legacy.grib_to_netcdf_legacy(
+        str(grib_file), str(tmp_path / f"{case}.nc")
+    )
+    assert describe(out_fname) == load_golden(case)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_grib_to_netcdf_legacy_values(tmp_path, write_grib, case):
+    grib_file = write_grib(tmp_path / f"{case}.grib", **CASES[case])
+    out_fname = netcdf_legacy.grib_to_netcdf_legacy(
+        str(grib_file), str(tmp_path / f"{case}.nc")
+    )
+    expected = xr.open_dataset(grib_file, engine="cfgrib")
+    with xr.open_dataset(out_fname) as result:
+        for name, variable in result.data_vars.items():
+            scale_factor = variable.encoding["scale_factor"]
+            expected_variable = expected[name].rename(
+                {dim: "level" for dim in expected[name].dims if dim == "isobaricInhPa"}
+            )
+            if "level" in expected_variable.dims:
+                expected_variable = expected_variable.sortby("level")
+            np.testing.assert_allclose(
+                variable.squeeze().transpose(*expected_variable.dims).values,
+                expected_variable.values,
+                atol=scale_factor,
+            )
+
+
+@pytest.mark.skipif(
+    shutil.which("grib_to_netcdf") is None, reason="grib_to_netcdf is not installed"
+)
+@pytest.mark.parametrize("case", CASES)
+def test_grib_to_netcdf_golden(tmp_path, write_grib, case):
+    grib_file = write_grib(tmp_path / f"{case}.grib", **CASES[case])
+    out_fname = str(tmp_path / f"{case}.nc")
+    subprocess.run(
+        ["grib_to_netcdf", "-S", "param", "-o", out_fname, str(grib_file)], check=True
+    )
+    description = describe(out_fname)
+    if os.getenv("CADS_ADAPTORS_REGENERATE_GOLDENS"):
+        GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+        with open(GOLDEN_DIR / f"{case}.json", "w") as f:
+            json.dump(description, f, indent=1)
+            f.write("\n")
+    # The in-process conversion matches the reference tool
+    legacy_fname = netcdf_legacy.grib_to_netcdf_legacy(
+        str(grib_file), str(tmp_path / f"{case}_legacy.nc")
+    )
+    assert describe(legacy_fname) == description
+    assert description == load_golden(case)
+
+
+def test_grib_to_netcdf_legacy_missing_values(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "test.grib", params=["2t"], times=[0])
+    # Remove one of the two times of one parameter
+    grib_file_2 = write_grib(tmp_path / "test2.grib", params=["2t", "msl"], times=[600])
+    with open(tmp_path / "merged.grib", "wb") as f:
+        f.write(grib_file.read_bytes() + grib_file_2.read_bytes())
+    out_fname = netcdf_legacy.grib_to_netcdf_legacy(
+        str(tmp_path / "merged.grib"), str(tmp_path / "merged.nc")
+    )
+    with xr.open_dataset(out_fname) as result:
+        assert result["msl"].isel(time=0).isnull().all()
+        assert result["msl"].isel(time=1).notnull().all()
+        assert result["t2m"].notnull().all()
+
+
+def test_grib_to_netcdf_legacy_data_type(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "test.grib", params=["2t"], times=[0])
+    out_fname = netcdf_legacy.grib_to_netcdf_legacy(
+        str(grib_file), str(tmp_path / "test.nc"), data_type="NC_FLOAT"
+    )
+    with xr.open_dataset(out_fname) as result:
+        assert result["t2m"].encoding["dtype"] == np.float32
+        assert "scale_factor" not in result["t2m"].encoding
+    with pytest.raises(ValueError):
+        netcdf_legacy.grib_to_netcdf_legacy(
+            str(grib_file), str(tmp_path / "test.nc"), data_type="NC_BYTE"
+        )
+
+
+def test_grib_to_netcdf_legacy_different_grids(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "test.grib", params=["2t"], times=[0])
+    grib_file_2 = write_grib(
+        tmp_path / "test2.grib", params=["2t"], times=[600], resolution=10.0
+    )
+    with open(tmp_path / "merged.grib", "wb") as f:
+        f.write(grib_file.read_bytes() + grib_file_2.read_bytes())
+    with pytest.raises(CdsFormatConversionError):
+        netcdf_legacy.grib_to_netcdf_legacy(
+            str(tmp_path / "merged.grib"), str(tmp_path / "merged.nc")
+        )
+
+
+def test_convert_format_to_netcdf_legacy_in_process(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "test.grib", **CASES["single_levels"])
+    target_dir = tmp_path / "out"
+    target_dir.mkdir()
+    cwd = os.getcwd()
+    config = {
+        "post_processing_kwargs": {"to_netcdf_legacy_kwargs": {"in_process": True}}
+    }
+    converted_files = convertors.convert_format(
+        str(grib_file),
+        target_format="netcdf_legacy",
+        config=config,
+        target_dir=str(target_dir),
+    )
+    assert converted_files == [str(target_dir / "test.nc")]
+    assert os.getcwd() == cwd
+    with netCDF4.Dataset(converted_files[0]) as nc:
+        assert nc.data_model == "NETCDF3_64BIT_OFFSET"
+
+
+def test_convert_format_to_netcdf_legacy_command(tmp_path, monkeypatch):
+    commands = []
+
+    def run(command, **kwargs):
+        commands.append(command)
+        return subprocess.CompletedProcess(command, 0)
+
+    monkeypatch.setattr(subprocess, "run", run)
+    (tmp_path / "test.grib").touch()
+    converted_files = convertors.convert_format(
+        str(tmp_path / "test.grib"), target_format="netcdf_legacy", target_dir="out"
+    )
+    assert converted_files == [os.path.join("out", "test.nc")]
+    assert commands == [
+        [
+            "grib_to_netcdf",
+            "-S",
+            "param",
+            "-o",
+            "out/test.nc",
+            str(tmp_path / "test.grib"),
+        ]
+    ]
+
+    # Failures of the command are raised
+    def fail(command, **kwargs):
+        return subprocess.CompletedProcess(command, 1)
+
+    monkeypatch.setattr(subprocess, "run", fail)
+    with pytest.raises(CdsFormatConversionError):
+        convertors.convert_format(
+            str(tmp_path / "test.grib"), target_format="netcdf_legacy"
+        )
+    to_netcdf_legacy_kwargs = {"command": "not_grib_to_netcdf -S param"}
+    monkeypatch.undo()
+    with pytest.raises(CdsFormatConversionError):
+        convertors.convert_format(
+            str(tmp_path / "test.grib"),
+            target_format="netcdf_legacy",
+            config={
+                "post_processing_kwargs": {
+                    "to_netcdf_legacy_kwargs": to_netcdf_legacy_kwargs
+                }
+            },
+        )
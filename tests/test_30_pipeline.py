@@ -0,0 +1,104 @@
+import numpy as np
+import xarray as xr
+
+from cads_adaptors.adaptors import Context
+from cads_adaptors.adaptors.mars import MarsCdsAdaptor
+from cads_adaptors.tools import instrumentation, pipeline
+
+
+def test_memory_monitor():
+    with pipeline.MemoryMonitor(interval=0.001) as memory:
+        data = np.ones(2**25, dtype="uint8")
+        del data
+    assert memory.peak >= memory.start > 0
+    assert memory.increase >= 2**24
+
+
+def test_run_step():
+    result, report = pipeline.run_step("double", lambda value: 2 * value, 21)
+    assert result == 42
+    assert report.name == "double"
+    assert report.wall_time >= 0
+    assert report.peak_memory > 0
+    assert report.computed == []
+
+
+def test_run_step_polling(monkeypatch):
+    threads = []
+    thread = pipeline.threading.Thread
+
+    def record_thread(*args, **kwargs):
+        threads.append(thread(*args, **kwargs))
+        return threads[-1]
+
+    monkeypatch.setattr(pipeline.threading, "Thread", record_thread)
+    # Memory is only polled when the instrumentation is enabled
+    _, report = pipeline.run_step("double", lambda value: 2 * value, 21)
+    assert report.peak_memory > 0
+    assert threads == []
+    context = Context(instrumentation=instrumentation.Instrumentation())
+    _, report = pipeline.run_step("double", lambda value: 2 * value, 21, context)
+    assert report.peak_memory > 0
+    assert len(threads) == 1 and not threads[0].is_alive()
+
+
+def test_computed_datasets_and_fuse():
+    lazy = xr.Dataset({"a": ("x", np.arange(10.0))}).chunk(x=5)
+    computed = xr.Dataset({"a": ("x", np.arange(10.0))})
+    result = {"lazy": lazy + 1, "computed": computed}
+    assert pipeline.computed_datasets(result) == ["computed"]
+
+    fused = pipeline.fuse({"lazy": (lazy + 1) * 2})
+    assert pipeline.is_lazy(fused["lazy"])
+    assert len(fused["lazy"].__dask_graph__()) < len(((lazy + 1) * 2).__dask_graph__())
+    np.testing.assert_array_equal(fused["lazy"].a.values, (np.arange(10.0) + 1) * 2)
+
+    # Computed datasets are left in memory
+    fused = pipeline.fuse(result)
+    assert pipeline.is_lazy(fused["lazy"])
+    assert fused["computed"].a.chunks is None
+
+    # Other results are left alone
+    assert pipeline.computed_datasets(["file.grib"]) == []
+    assert pipeline.fuse(["file.grib"]) == ["file.grib"]
+
+
+class LoadingAdaptor(MarsCdsAdaptor):
+    def load(self, xarray_dict, **kwargs):
+        return {tag: dataset.load() for tag, dataset in xarray_dict.items()}
+
+
+def test_post_process_pipeline(tmp_path, write_grib):
+    grib_file = write_grib(tmp_path / "data.grib", params=["2t"], times=[0, 1200])
+    adaptor = LoadingAdaptor(form=None, cache_tmp_path=tmp_path)
+
+    # Reductions which are not streamed add to the task graphs
+    result = adaptor.post_process(
+        str(grib_file), [{"method": "daily_reduce", "how": "median"}]
+    )
+    (tag,) = result
+    assert tag.endswith("_daily-median")
+    assert pipeline.is_lazy(result[tag])
+    reports = adaptor.post_process_reports
+    assert [report.name for report in reports] == ["open_result", "daily_reduce"]
+    assert all(report.computed == [] for report in reports)
+
+    # Computed datasets are reported, and left in memory for the following steps
+    adaptor.post_process_reports = []
+    result = adaptor.post_process(
+        str(grib_file), [{"method": "load"}, {"method": "daily_max"}]
+    )
+    (tag,) = result
+    assert not pipeline.is_lazy(result[tag])
+    reports = adaptor.post_process_reports
+    assert [report.name for report in reports] == [
+        "open_result",
+        "load",
+        "daily_reduce",
+    ]
+    assert all(len(report.computed) == 1 for report in reports[1:])
+
+    paths = adaptor.convert_format(result, "netcdf", target_dir=str(tmp_path))
+    assert adaptor.post_process_reports[-1].name == "convert_format"
+    with xr.open_dataset(paths[0]) as ds:
+        assert float(ds.t2m.max()) == float(result[tag].t2m.max())
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from cads_adaptors.tools.spatial_index import GridIndex
+
+RNG = np.random.default_rng(0)
+LATITUDES = np.degrees(np.arcsin(RNG.uniform(-1, 1, 20_000)))
+LONGITUDES = RNG.uniform(-180, 180, 20_000)
+
+
+def brute_force(latitudes, longitudes, north, west, south, east):
+    inside = (latitudes >= south) & (latitudes <= north)
+    if east - west < 360:
+        inside &= np.mod(longitudes - west, 360) <= east - west
+    return np.flatnonzero(inside)
+
+
+@pytest.mark.parametrize(
+    "area",
+    [
+        [60, -30, 20, 40],
+        [10, 170, -10, 190],  # across the dateline
+        [10, -190, -10, -170],
+        [10, 350, -10, 370],  # across the Greenwich meridian
+        [90, -180, -90, 180],
+        [-80, 0, -90, 360],
+        [0.5, 10, 0, 10.5],
+    ],
+)
+def test_grid_index_query(area):
+    north, west, south, east = area
+    grid_index = GridIndex(LATITUDES, LONGITUDES)
+    np.testing.assert_array_equal(
+        grid_index.query(north, west, south, east),
+        brute_force(LATITUDES, LONGITUDES, north, west, south, east),
+    )
+
+
+def test_grid_index_empty():
+    grid_index = GridIndex(LATITUDES, LONGITUDES)
+    assert grid_index.query(10, 20, 30, 40).size == 0  # south of north
+    assert grid_index.query(30, 40, 10, 20).size == 0  # east of west
+    assert grid_index.window(30, 40, 10, 20) is None
+
+
+def test_grid_index_missing_coordinates():
+    latitudes = np.array([[0.0, np.nan], [1.0, 2.0]])
+    longitudes = np.array([[0.0, 1.0], [np.nan, 2.0]])
+    grid_index = GridIndex(latitudes, longitudes)
+    np.testing.assert_array_equal(grid_index.query(90, -180, -90, 180), [0, 3])
+
+
+def test_grid_index_mask_and_window():
+    j, i = np.meshgrid(np.arange(50), np.arange(40), indexing="ij")
+    latitudes = -10 + 0.5 * j - 0.1 * i
+    longitudes = 170 + 0.5 * i + 0.1 * j
+    grid_index = GridIndex(latitudes, longitudes, points_per_bin=4)
+
+    mask = grid_index.mask(5, 175, 0, 185)
+    expected = (
+        (latitudes >= 0) & (latitudes <= 5) & (longitudes >= 175) & (longitudes <= 185)
+    )
+    np.testing.assert_array_equal(mask, expected)
+
+    rows, cols = np.nonzero(expected)
+    assert grid_index.window(5, 175, 0, 185) == (
+        slice(rows.min(), rows.max() + 1),
+        slice(cols.min(), cols.max() + 1),
+    )
+    # The same area with longitudes in [-180, 180)
+    assert grid_index.window(5, 175, 0, -175 + 360) == grid_index.window(
+        5, -185, 0, -175
+    )
+
+
+def test_grid_index_shape_mismatch():
+    with pytest.raises(ValueError):
+        GridIndex(np.zeros(3), np.zeros(4))
@@ -0,0 +1,92 @@
+import datetime
+import os
+import pathlib
+from typing import Any
+
+import numpy as np
+import xarray as xr
+
+from cads_adaptors.tools import synthetic_data
+
+REQUEST = {
+    "param": ["2t", "t"],
+    "levelist": ["850", "500"],
+    "date": "2024-01-01/to/2024-01-02",
+    "time": ["00:00", "12:00"],
+    "area": [60, -10, 30, 20],
+    "grid": "0.5/0.5",
+    "seed": 1,
+}
+
+
+def test_spec_from_request() -> None:
+    spec = synthetic_data.SyntheticSpec.from_request(REQUEST)
+    assert spec.params == ["2t", "t"]
+    assert spec.levels == [850, 500]
+    assert spec.dates == [datetime.date(2024, 1, 1), datetime.date(2024, 1, 2)]
+    assert spec.times == [0, 1200]
+    assert spec.grid == (0.5, 0.5)
+    # 4 fields at the surface and 8 on pressure levels
+    assert spec.count == 12
+    assert spec.latitudes.shape == (61,) and spec.longitudes.shape == (61,)
+
+    # Unknown parameters are mapped to supported ones
+    spec = synthetic_data.SyntheticSpec.from_request({"variable": "foo"})
+    assert spec.params[0] in synthetic_data.PARAMETERS
+
+
+def test_values_deterministic() -> None:
+    spec = synthetic_data.SyntheticSpec.from_request(REQUEST)
+    field = next(spec.fields())
+    np.testing.assert_array_equal(spec.values(field), spec.values(field))
+    other_seed = synthetic_data.SyntheticSpec.from_request({**REQUEST, "seed": 2})
+    assert not np.array_equal(spec.values(field), other_seed.values(field))
+
+
+def test_write_grib_and_netcdf(tmp_path: pathlib.Path) -> None:
+    spec = synthetic_data.SyntheticSpec.from_request(REQUEST)
+    grib_path = synthetic_data.write_grib(spec, str(tmp_path / "data.grib"))
+    netcdf_path = synthetic_data.write_netcdf(spec, str(tmp_path / "data.nc"))
+
+    # The same values, in both formats
+    open_kwargs: dict[str, Any] = {
+        "engine": "cfgrib",
+        "backend_kwargs": {"indexpath": ""},
+    }
+    with (
+        xr.open_dataset(
+            grib_path, filter_by_keys={"typeOfLevel": "isobaricInhPa"}, **open_kwargs
+        ) as grib,
+        xr.open_dataset(netcdf_path) as netcdf,
+    ):
+        assert netcdf.t.dims == (
+            "valid_time",
+            "pressure_level",
+            "latitude",
+            "longitude",
+        )
+        assert netcdf.t2m.dims == ("valid_time", "latitude", "longitude")
+        assert list(netcdf.pressure_level.values) == [850, 500]
+        np.testing.assert_allclose(grib.t.values, netcdf.t.values, atol=0.01)
+        np.testing.assert_array_equal(grib.latitude.values, netcdf.latitude.values)
+
+    # Identical files from the same spec
+    synthetic_data.write_grib(spec, str(tmp_path / "again.grib"))
+    assert (tmp_path / "again.grib").read_bytes() == (
+        tmp_path / "data.grib"
+    ).read_bytes()
+
+
+def test_target_size(tmp_path: pathlib.Path) -> None:
+    size = 2_000_000
+    spec = synthetic_data.SyntheticSpec.from_request(
+        {"param": ["2t", "msl"], "time": ["0", "12"]}, size=size
+    )
+    path = synthetic_data.write_grib(spec, str(tmp_path / "data.grib"))
+    assert 0.8 * size < os.path.getsize(path) < 1.2 * size
+
+    # Fields of large targets are capped
+    spec = synthetic_data.SyntheticSpec.from_request({"param": "2t"}, size=10**11)
+    assert spec.latitudes.size * spec.longitudes.size <= (
+        synthetic_data.MAX_POINTS_PER_FIELD
+    )
@@ -1,9 +1,12 @@
 import os
 
+import numpy as np
+import pandas as pd
 import pytest
 import requests
 import xarray as xr
 
+from cads_adaptors.adaptors.mars import MarsCdsAdaptor
 from cads_adaptors.tools import convertors, post_processors
 
 TEST_FILE_1 = (
@@ -63,6 +66,47 @@ def test_monthly_reduce(tmp_path, monkeypatch):
     assert isinstance(out_xarray_dict["test_0_monthly-mean"].attrs["history"], str)
 
 
+@pytest.mark.parametrize(
+    "how, module",
+    [
+        ("mean", "cads_adaptors.tools.streaming_reductions"),
+        ("median", "earthkit.transforms.temporal"),
+    ],
+)
+def test_daily_reduce_streaming(how, module):
+    times = pd.date_range("2024-01-01", periods=96, freq="h")
+    ds = xr.Dataset(
+        {"t2m": (("time", "latitude"), np.arange(192.0).reshape(96, 2))},
+        coords={"time": times, "latitude": [1.0, 2.0]},
+    )
+    out_xarray_dict = post_processors.daily_reduce({"test": ds}, how=how)
+    reduced = out_xarray_dict[f"test_daily-{how}"]
+    assert reduced.t2m.shape == (4, 2)
+    np.testing.assert_allclose(reduced.t2m.values[:, 0], [23, 71, 119, 167])
+    assert (
+        reduced.attrs["history"]
+        .splitlines()[-1]
+        .startswith(f"{module}.daily_reduce(test")
+    )
+
+
+def test_daily_reduce_streaming_post_process(tmp_path, write_grib):
+    # As opened by the convertors, the datasets are dask-backed
+    grib_file = write_grib(tmp_path / "data.grib", params=["2t"], times=[0, 600, 1200])
+    adaptor = MarsCdsAdaptor(form=None, cache_tmp_path=tmp_path)
+    result = adaptor.post_process(str(grib_file), [{"method": "daily_mean"}])
+    (reduced,) = result.values()
+    assert (
+        reduced.attrs["history"]
+        .splitlines()[-1]
+        .startswith("cads_adaptors.tools.streaming_reductions.daily_reduce(")
+    )
+    with xr.open_dataset(grib_file, engine="cfgrib") as expected:
+        np.testing.assert_allclose(
+            reduced.t2m.squeeze().values, expected.t2m.mean("time").values, rtol=1e-6
+        )
+
+
 def test_update_history():
     in_xarray = xr.Dataset(
         {
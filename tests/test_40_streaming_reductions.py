@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from earthkit.transforms import temporal
+
+from cads_adaptors.tools import streaming_reductions
+
+
+def hourly_dataset(dtype="float64", gaps=False, time_first=True):
+    times = pd.date_range("2024-01-30 03:00", periods=24 * 40, freq="h")
+    if gaps:
+        times = times.delete(slice(100, 300))
+    rng = np.random.default_rng(0)
+    data = 10 * rng.normal(size=(times.size, 3, 4))
+    if np.issubdtype(np.dtype(dtype), np.floating):
+        data[rng.random(data.shape) < 0.1] = np.nan
+        # A day of missing values
+        data[400:424] = np.nan
+    data = np.nan_to_num(data).astype(dtype) if "int" in dtype else data.astype(dtype)
+    ds = xr.Dataset(
+        {"t2m": (("time", "latitude", "longitude"), data, {"units": "K"})},
+        coords={
+            "time": ("time", times, {"long_name": "initial time"}),
+            "latitude": [10.0, 0.0, -10.0],
+            "longitude": [0.0, 90.0, 180.0, 270.0],
+            "step": np.timedelta64(0, "ns"),
+            "valid_time": ("time", times),
+        },
+        attrs={"Conventions": "CF-1.7"},
+    )
+    return ds if time_first else ds.transpose("latitude", "time", "longitude")
+
+
+def assert_same_reduction(expected, actual):
+    xr.testing.assert_allclose(expected, actual, rtol=1e-5, atol=1e-5)
+    assert expected.attrs == actual.attrs
+    assert set(expected.coords) == set(actual.coords)
+    for name, coord in expected.coords.items():
+        assert coord.attrs == actual[name].attrs
+        assert coord.dtype == actual[name].dtype
+    for name, variable in expected.data_vars.items():
+        assert variable.dims == actual[name].dims
+        assert variable.dtype == actual[name].dtype
+        assert variable.attrs == actual[name].attrs
+
+
+@pytest.mark.parametrize("how", streaming_reductions.STREAMING_REDUCTIONS)
+@pytest.mark.parametrize("period", ["daily", "monthly"])
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {},
+        {"time_shift": {"hours": 5}},
+        {"time_shift": "-3h", "remove_partial_periods": True},
+        {"how_label": "reduced"},
+    ],
+)
+def test_reduce_like_earthkit(how, period, kwargs):
+    ds = hourly_dataset()
+    assert streaming_reductions.can_stream(ds, how, **kwargs)
+    expected = getattr(temporal, f"{period}_reduce")(ds, how=how, **kwargs)
+    # Chunks of 10 time steps, which do not align with the periods
+    actual = getattr(streaming_reductions, f"{period}_reduce")(
+        ds, how=how, chunk_bytes=10 * 12 * 8, **kwargs
+    )
+    assert_same_reduction(expected, actual)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int32", "int64"])
+@pytest.mark.parametrize("how", streaming_reductions.STREAMING_REDUCTIONS)
+def test_reduce_dtypes_and_gaps(dtype, how):
+    ds = hourly_dataset(dtype, gaps=True, time_first=False)
+    expected = temporal.daily_reduce(ds, how=how)
+    actual = streaming_reductions.daily_reduce(ds, how=how, chunk_bytes=1000)
+    assert_same_reduction(expected, actual)
+
+
+def test_can_stream():
+    ds = hourly_dataset()
+    assert not streaming_reductions.can_stream(ds, "median")
+    assert not streaming_reductions.can_stream(ds, np.nanmean)
+    assert not streaming_reductions.can_stream(ds, "mean", extra_reduce_dims="latitude")
+    assert not streaming_reductions.can_stream(
+        ds.isel(time=slice(None, None, -1)), "mean"
+    )
+    assert not streaming_reductions.can_stream(
+        ds.assign(lsm=ds.t2m.isel(time=0)), "mean"
+    )
+    assert streaming_reductions.can_stream(ds.chunk(time=24), "mean")
+    assert streaming_reductions.can_stream(ds, "mean", time_dim="time")
+
+
+@pytest.mark.parametrize("how", ["mean", "max"])
+@pytest.mark.parametrize("chunks", [{"time": 7}, {"time": 100, "latitude": 1}])
+def test_reduce_dask_like_earthkit(how, chunks):
+    ds = hourly_dataset(time_first=False).chunk(chunks)
+    expected = temporal.daily_reduce(ds, how=how).compute()
+    actual = streaming_reductions.daily_reduce(ds, how=how, chunk_bytes=1000)
+    assert_same_reduction(expected, actual)
+
+
+def test_time_chunks():
+    variable = hourly_dataset().t2m
+    # 10 time steps of 12 values of 8 bytes
+    chunk_bytes = 10 * 12 * 8
+    assert streaming_reductions.time_chunks(variable[:25], "time", chunk_bytes) == [
+        slice(0, 10),
+        slice(10, 20),
+        slice(20, 30),
+    ]
+    # Whole dask chunks, at least one
+    chunked = variable[:25].chunk(time=4)
+    assert streaming_reductions.time_chunks(chunked, "time", chunk_bytes) == [
+        slice(0, 8),
+        slice(8, 16),
+        slice(16, 25),
+    ]
+    chunked = variable[:25].chunk(time=12)
+    assert streaming_reductions.time_chunks(chunked, "time", chunk_bytes) == [
+        slice(0, 12),
+        slice(12, 24),
+        slice(24, 25),
+    ]
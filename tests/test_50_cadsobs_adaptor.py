@@ -252,7 +252,7 @@ class ClientErrorMockerCadsobsApiClient(MockerCadsobsApiClient):
 
 
 class BackendErrorCadsobsApiClient(CadsobsApiClient):
-    def _send_request(self, endpoint, method, payload):
+    def _send_request(self, endpoint, method, payload, headers=None):
         response = self.requests.Response()
         response.code = "expired"
         response.error_type = "expired"
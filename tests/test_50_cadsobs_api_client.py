@@ -0,0 +1,148 @@
+import http.server
+import json
+import threading
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+
+from cads_adaptors import Context
+from cads_adaptors.adaptors.cadsobs import api_client
+from cads_adaptors.exceptions import CadsObsConnectionError
+from cads_adaptors.tools import instrumentation
+
+LITE_VARIABLES = {"mandatory": ["observation_id"], "optional": [], "attributes": {}}
+ETAG = '"lite-variables-1"'
+
+
+class StandInApi(http.server.ThreadingHTTPServer):
+    """Local stand-in for the observations API, recording the requests it receives."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInApiHandler)
+        self.requests: list[tuple[str, str | None]] = []
+        self.connections: set[int] = set()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInApiHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInApi
+
+    def send_json(self, status: int, body: Any, headers: dict[str, str] = {}) -> None:
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        path = self.path.lstrip("/")
+        etag = self.headers.get("If-None-Match")
+        self.server.requests.append((path, etag))
+        self.server.connections.add(self.client_address[1])
+        if path == "cdm/lite_variables":
+            if etag == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_json(200, LITE_VARIABLES, {"ETag": ETAG})
+        elif path == "dataset/service_definition":
+            self.send_json(200, {"global_attributes": {}})
+        elif path == "dataset/source/disabled_fields":
+            self.send_json(200, ["report_type"])
+        else:
+            self.send_json(
+                500, {"detail": {"message": "Not found", "traceback": "traceback"}}
+            )
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def stand_in_api() -> Generator[StandInApi, None, None]:
+    server = StandInApi()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api_client.clear_cache()
+    yield server
+    api_client.clear_cache()
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(url: str) -> tuple[api_client.CadsobsApiClient, dict[str, Any]]:
+    recorder = instrumentation.Instrumentation()
+    client = api_client.CadsobsApiClient(url, Context(instrumentation=recorder))
+    return client, recorder.counters
+
+
+def test_metadata_cache(stand_in_api: StandInApi) -> None:
+    client, counters = make_client(stand_in_api.url)
+    for _ in range(2):
+        assert client.get_cdm_lite_variables() == LITE_VARIABLES
+        assert client.get_service_definition("dataset") == {"global_attributes": {}}
+        assert client.get_disabled_fields("dataset", "source") == ["report_type"]
+    # Cached responses are shared by the clients, and are copies
+    other_client, other_counters = make_client(stand_in_api.url)
+    other_client.get_cdm_lite_variables()["mandatory"].append("modified")
+
+    assert [path for path, _ in stand_in_api.requests] == [
+        "cdm/lite_variables",
+        "dataset/service_definition",
+        "dataset/source/disabled_fields",
+    ]
+    assert counters == {"cadsobs_api.cache.misses": 3, "cadsobs_api.cache.hits": 3}
+    assert other_counters == {"cadsobs_api.cache.hits": 1}
+    assert client.get_cdm_lite_variables() == LITE_VARIABLES
+
+
+def test_metadata_cache_revalidation(
+    stand_in_api: StandInApi, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("CADSOBS_API_CACHE_TTL", "0")
+    client, counters = make_client(stand_in_api.url)
+    for _ in range(3):
+        assert client.get_cdm_lite_variables() == LITE_VARIABLES
+        assert client.get_service_definition("dataset") == {"global_attributes": {}}
+
+    # Responses with an ETag are revalidated, the others fetched again
+    assert stand_in_api.requests == [
+        ("cdm/lite_variables", None),
+        ("dataset/service_definition", None),
+        *[("cdm/lite_variables", ETAG), ("dataset/service_definition", None)] * 2,
+    ]
+    assert counters == {
+        "cadsobs_api.cache.misses": 6,
+        "cadsobs_api.cache.revalidated": 2,
+    }
+
+
+def test_pooled_session(stand_in_api: StandInApi) -> None:
+    for dataset in ["a", "b", "c"]:
+        client, _ = make_client(stand_in_api.url)
+        with pytest.raises(CadsObsConnectionError, match="Not found"):
+            client.get_service_definition(dataset)
+    # The connection is kept alive and reused by all the clients
+    assert len(stand_in_api.requests) == 3
+    assert len(stand_in_api.connections) == 1
+    assert api_client.get_session(stand_in_api.url) is api_client.get_session(
+        stand_in_api.url
+    )
+
+
+def test_errors_are_not_cached(stand_in_api: StandInApi) -> None:
+    client, counters = make_client(stand_in_api.url)
+    for _ in range(2):
+        assert client.get_disabled_fields("unknown", "source") == []
+    assert len(stand_in_api.requests) == 2
+    assert counters == {"cadsobs_api.cache.misses": 2}
@@ -0,0 +1,171 @@
+import datetime
+import json
+import os
+import pathlib
+from collections.abc import Generator
+from typing import Callable
+
+import fsspec
+import h5netcdf
+import pytest
+
+from cads_adaptors import Context
+from cads_adaptors.adaptors.cadsobs import asset_index, retrieve
+from cads_adaptors.adaptors.cadsobs.models import RetrieveParams
+from cads_adaptors.tools import instrumentation
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Generator[None, None, None]:
+    asset_index.clear_cache()
+    yield
+    asset_index.clear_cache()
+
+
+def test_summarize_asset(
+    tmp_path: pathlib.Path, write_obs_asset: Callable[..., pathlib.Path]
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc", size=100, stations=3)
+    with h5netcdf.File(path, "r") as incobj:
+        summary = asset_index.summarize_asset(incobj)
+        timestamps = incobj.variables["report_timestamp"][:]
+        latitudes = incobj.variables["latitude|header_table"][:]
+    assert summary.stations == ["S000", "S001", "S002"]
+    assert summary.time_bounds == (timestamps.min(), timestamps.max())
+    assert summary.time_units == "seconds since 1900-01-01 00:00:00"
+    assert summary.latitude_bounds == (latitudes.min(), latitudes.max())
+
+    index_path = asset_index.write_asset_index(path)
+    assert index_path == f"{path}{asset_index.INDEX_SUFFIX}"
+    with open(index_path) as f:
+        assert asset_index.AssetSummary.from_dict(json.load(f)) == summary
+
+
+def test_matches() -> None:
+    summary = asset_index.AssetSummary(
+        stations=["A", "B"],
+        # 2024-01-01 to 2024-01-02
+        time_bounds=(3913056000, 3913142400),
+        time_units="seconds since 1900-01-01 00:00:00",
+        latitude_bounds=(10, 20),
+        longitude_bounds=(-5, 5),
+    )
+
+    def matches(**params) -> bool:
+        return asset_index.matches(
+            summary, RetrieveParams(dataset_source="source", **params)
+        )
+
+    assert matches()
+    assert matches(stations=["B", "C"])
+    assert not matches(stations=["C"])
+    # Coverages select start <= value < end
+    day = datetime.datetime(2024, 1, 2)
+    assert matches(time_coverage=(day, day + datetime.timedelta(days=1)))
+    assert not matches(
+        time_coverage=(day - datetime.timedelta(days=2), day.replace(day=1))
+    )
+    assert matches(latitude_coverage=(20, 30), longitude_coverage=(-10, -4))
+    assert not matches(latitude_coverage=(0, 10))
+    assert not matches(longitude_coverage=(5.5, 10))
+
+
+def test_prune_assets(
+    tmp_path: pathlib.Path,
+    write_obs_asset: Callable[..., pathlib.Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("CADS_ADAPTORS_CADSOBS_ASSET_INDEX_DIR", str(tmp_path / "cache"))
+    os.makedirs(tmp_path / "cache")
+    urls = [
+        str(write_obs_asset(tmp_path / f"{name}.nc", stations=stations))
+        for name, stations in [("two", 2), ("five", 5), ("unindexed", 2)]
+    ]
+    for url in urls[:2]:
+        asset_index.write_asset_index(url)
+    fs = fsspec.filesystem("file")
+
+    def prune(**params) -> tuple[list[str], dict[str, int | float]]:
+        recorder = instrumentation.Instrumentation()
+        kept = asset_index.prune_assets(
+            fs,
+            urls,
+            RetrieveParams(dataset_source="source", **params),
+            Context(instrumentation=recorder),
+        )
+        return kept, recorder.counters
+
+    # Assets without an index are kept, and requests without stations nor coverages
+    # do not load the indices
+    assert prune() == (urls, {})
+    assert prune(stations=["S004"]) == (
+        urls[1:],
+        {"cadsobs.asset_index.misses": 3, "cadsobs.assets.pruned": 1},
+    )
+    time_coverage = (datetime.datetime(2025, 1, 1), datetime.datetime(2026, 1, 1))
+    assert prune(time_coverage=time_coverage) == (
+        urls[2:],
+        {"cadsobs.asset_index.hits": 3, "cadsobs.assets.pruned": 2},
+    )
+
+    # Indices, and missing ones, are cached in the directory
+    asset_index.clear_cache()
+    for url in urls:
+        with open(f"{url}{asset_index.INDEX_SUFFIX}", "w") as f:
+            f.write("{}")
+    assert prune(stations=["S004"]) == (
+        urls[1:],
+        {"cadsobs.asset_index.hits": 3, "cadsobs.assets.pruned": 1},
+    )
+
+    # Without caching (a time-to-live of 0), the indices are read each time, while the
+    # missing ones are still cached
+    monkeypatch.setenv("CADS_ADAPTORS_CADSOBS_ASSET_INDEX_TTL", "0")
+    monkeypatch.delenv("CADS_ADAPTORS_CADSOBS_ASSET_INDEX_DIR")
+    asset_index.clear_cache()
+    for url in urls[:2]:
+        asset_index.write_asset_index(url)
+    assert prune(stations=["S004"]) == (
+        urls[1:],
+        {"cadsobs.asset_index.misses": 3, "cadsobs.assets.pruned": 1},
+    )
+    assert prune(stations=["S004"]) == (
+        urls[1:],
+        {
+            "cadsobs.asset_index.hits": 1,
+            "cadsobs.asset_index.misses": 2,
+            "cadsobs.assets.pruned": 1,
+        },
+    )
+
+
+@pytest.mark.parametrize("use_asset_index", [False, True])
+def test_retrieve_data_asset_index(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch, use_asset_index: bool
+) -> None:
+    pruned: list[list[str]] = []
+
+    def prune_assets(fs, object_urls, params, context):  # type: ignore[no-untyped-def]
+        pruned.append(object_urls)
+        return object_urls
+
+    def get_char_sizes(fs, object_urls):  # type: ignore[no-untyped-def]
+        raise StopIteration
+
+    monkeypatch.setattr(retrieve, "prune_assets", prune_assets)
+    monkeypatch.setattr(retrieve, "get_char_sizes", get_char_sizes)
+    kwargs = {"use_asset_index": True} if use_asset_index else {}
+    with pytest.raises(StopIteration):
+        retrieve.retrieve_data(
+            "dataset",
+            {"dataset_source": "source", "stations": ["S004"]},
+            tmp_path,
+            ["https://host/asset.nc"],
+            [],
+            {},
+            {},
+            Context(),
+            **kwargs,
+        )
+    # The sidecars are only requested when the dataset opts in
+    assert pruned == ([["https://host/asset.nc"]] if use_asset_index else [])
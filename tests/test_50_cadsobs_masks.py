@@ -0,0 +1,117 @@
+import datetime
+import logging
+import pathlib
+from typing import Any, Callable
+
+import h5netcdf
+import numpy as np
+import pandas as pd
+import pytest
+
+from cads_adaptors.adaptors.cadsobs import filter, masks
+from cads_adaptors.adaptors.cadsobs.models import RetrieveParams
+from cads_adaptors.exceptions import CadsObsRuntimeError
+
+PARAMS: list[dict[str, Any]] = [
+    {},
+    {"stations": ["S001", "S003", "unknown"]},
+    {"variables": ["humidity", "unknown"]},
+    {"latitude_coverage": (-30, 60), "longitude_coverage": (0, 180)},
+    {"time_coverage": (datetime.datetime(2024, 3, 1), datetime.datetime(2024, 9, 1))},
+    {"day": [1, 15, 29, 30, 31]},
+    {"extra_filters": {"report_type": [0, 2]}},
+    {"extra_filters": {"report_type": 1}},
+    {
+        "stations": ["S000", "S002", "S004"],
+        "variables": ["air_temperature"],
+        "latitude_coverage": (-45, 45),
+        "time_coverage": (
+            datetime.datetime(2024, 2, 10),
+            datetime.datetime(2024, 12, 1),
+        ),
+        "day": list(range(1, 32, 2)),
+        "extra_filters": {"report_type": [1, 2]},
+    },
+    {"stations": ["unknown"], "day": [1]},
+]
+
+
+def expected_mask(data: dict[str, np.ndarray], params: dict[str, Any]) -> np.ndarray:
+    """Mask computed from the decoded variables of the asset."""
+    mask = np.ones(data["report_timestamp"].size, dtype="bool")
+    times = pd.to_datetime(data["report_timestamp"], unit="s", origin="1900-01-01")
+    if "stations" in params:
+        mask &= np.isin(data["primary_station_id"], params["stations"])
+    if "variables" in params:
+        codes = {"air_temperature": 85, "humidity": 95}
+        asked = [codes[v] for v in params["variables"] if v in codes]
+        mask &= np.isin(data["observed_variable"], asked)
+    for coord in ["latitude", "longitude"]:
+        if (bounds := params.get(f"{coord}_coverage")) is not None:
+            values = data[f"{coord}|header_table"]
+            mask &= (values >= bounds[0]) & (values < bounds[1])
+    if (bounds := params.get("time_coverage")) is not None:
+        mask &= (times >= bounds[0]) & (times < bounds[1])
+    if "day" in params:
+        mask &= times.day.isin(params["day"])
+    for field, values in params.get("extra_filters", {}).items():
+        mask &= np.isin(data[field], values)
+    return mask
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("chunk_size", [7, masks.MASK_CHUNK_SIZE])
+def test_compute_mask(
+    tmp_path: pathlib.Path,
+    write_obs_asset: Callable[..., pathlib.Path],
+    params: dict[str, Any],
+    chunk_size: int,
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc")
+    retrieve_params = RetrieveParams(dataset_source="source", **params)
+    with h5netcdf.File(path, "r") as incobj:
+        data = {name: variable[:] for name, variable in incobj.variables.items()}
+        data["primary_station_id"] = (
+            data["primary_station_id"].view("S4").ravel().astype(str)
+        )
+        predicates = masks.get_predicates(incobj, retrieve_params)
+        mask = masks.compute_mask(incobj, predicates, chunk_size=chunk_size)
+
+    expected = expected_mask(data, params)
+    assert expected.any() or "unknown" in str(params)
+    np.testing.assert_array_equal(mask, expected)
+
+
+def test_compute_mask_selectivity(
+    tmp_path: pathlib.Path,
+    write_obs_asset: Callable[..., pathlib.Path],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc", size=1000, stations=10)
+    retrieve_params = RetrieveParams(
+        dataset_source="source", day=list(range(1, 32)), stations=["S005"]
+    )
+    with h5netcdf.File(path, "r") as incobj:
+        predicates = masks.get_predicates(incobj, retrieve_params)
+        masks.compute_mask(incobj, predicates, chunk_size=100)
+        with caplog.at_level(logging.DEBUG, logger=masks.__name__):
+            mask = filter._get_mask(incobj, retrieve_params)
+
+    # Once measured, the most selective predicate is evaluated first
+    assert [predicate.name for predicate in predicates] == ["stations", "day"]
+    stations, day = predicates
+    assert stations.evaluated == 1000
+    assert day.evaluated == day.selected == stations.selected == mask.sum()
+    assert "Filter stations selected" in caplog.text
+
+
+def test_compute_mask_unknown_extra_filter(
+    tmp_path: pathlib.Path, write_obs_asset: Callable[..., pathlib.Path]
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc")
+    retrieve_params = RetrieveParams(
+        dataset_source="source", extra_filters={"unknown": 1}
+    )
+    with h5netcdf.File(path, "r") as incobj:
+        with pytest.raises(CadsObsRuntimeError, match="unknown"):
+            masks.get_predicates(incobj, retrieve_params)
@@ -0,0 +1,167 @@
+import http.server
+import logging
+import os
+import pathlib
+import re
+import threading
+from collections.abc import Generator
+from typing import Any, Callable
+
+import fsspec
+import h5netcdf
+import numpy as np
+import pytest
+
+from cads_adaptors.adaptors.cadsobs import filter, read_planner
+from cads_adaptors.adaptors.cadsobs.models import RetrieveArgs, RetrieveParams
+
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serve byte ranges of the files of a directory, as object stores do."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        path = os.path.join(self.server.directory, self.path.lstrip("/"))  # type: ignore[attr-defined]
+        size = os.path.getsize(path)
+        start, end = 0, size
+        if match := re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", "")):
+            start = int(match[1])
+            end = min(int(match[2]) + 1, size) if match[2] else size
+        with open(path, "rb") as f:
+            f.seek(start)
+            content = f.read(end - start)
+        self.server.ranges.append((start, end))  # type: ignore[attr-defined]
+        self.send_response(206 if match else 200)
+        self.send_header("Content-Length", str(len(content)))
+        if match:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def range_server(tmp_path: pathlib.Path) -> Generator[Any, None, None]:
+    server: Any = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    server.directory = str(tmp_path)
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_merge_ranges() -> None:
+    ranges = [(0, 10), (15, 20), (100, 110), (112, 300), (301, 302)]
+    assert read_planner.merge_ranges(ranges, max_gap=5, max_size=1000) == [
+        (0, 20),
+        (100, 302),
+    ]
+    assert read_planner.merge_ranges(ranges, max_gap=5, max_size=200) == [
+        (0, 20),
+        (100, 300),
+        (301, 302),
+    ]
+    assert read_planner.merge_ranges(ranges, max_gap=0, max_size=1000) == ranges
+
+
+def test_plan_reads(
+    tmp_path: pathlib.Path, write_obs_asset: Callable[..., pathlib.Path]
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc", size=1000, stations=20, chunk_size=50)
+    with h5netcdf.File(path, "r") as incobj:
+        stations = incobj.variables["primary_station_id"][:].view("S4").ravel()
+        mask = np.isin(stations, [b"S003", b"S015"])
+        for name in ["primary_station_id", "observation_value"]:
+            variable = incobj.variables[name]
+            plan = read_planner.plan_reads(variable, mask)
+
+            chunks = {start // 50 for start in np.flatnonzero(mask)}
+            assert len(plan.byte_ranges) == len(chunks)
+            assert sum(b - a for a, b in plan.row_spans) == 50 * len(chunks)
+            assert all(a % 50 == 0 for a, _ in plan.row_spans)
+            np.testing.assert_array_equal(
+                read_planner.read_rows(variable, mask, plan.row_spans),
+                variable[:][mask],
+            )
+
+        # Dense selections are read sequentially
+        plan = read_planner.plan_reads(incobj.variables["report_type"], ~mask)
+        assert plan.row_spans == [(0, 1000)]
+        assert plan.byte_ranges == []
+
+
+def test_plan_reads_fallback(
+    tmp_path: pathlib.Path,
+    write_obs_asset: Callable[..., pathlib.Path],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    path = write_obs_asset(tmp_path / "asset.nc", size=1000, stations=20, chunk_size=50)
+    with h5netcdf.File(path, "r") as incobj:
+        variable = incobj.variables["observation_value"]
+        mask = np.zeros(1000, dtype="bool")
+        mask[120:130] = True
+
+        # Without the chunk index, the selected chunks are read without prefetching
+        monkeypatch.setattr(read_planner, "chunk_index", lambda dataset: None)
+        plan = read_planner.plan_reads(variable, mask)
+        assert plan.row_spans == [(100, 150)]
+        assert plan.byte_ranges == []
+
+        # Without the h5py dataset, the variable is read with a plain masked read
+        monkeypatch.setattr(read_planner, "h5py_dataset", lambda variable: None)
+        plan = read_planner.plan_reads(variable, mask)
+        assert plan.row_spans == [(0, 1000)]
+        assert plan.byte_ranges == []
+        np.testing.assert_array_equal(
+            read_planner.read_rows(variable, mask, plan.row_spans), variable[:][mask]
+        )
+
+
+def test_filter_asset_and_save_http(
+    tmp_path: pathlib.Path,
+    write_obs_asset: Callable[..., pathlib.Path],
+    range_server: Any,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.DEBUG, logger=read_planner.__name__)
+    write_obs_asset(tmp_path / "asset.nc", size=5000, stations=50, chunk_size=100)
+    retrieve_args = RetrieveArgs(
+        dataset="dataset",
+        params=RetrieveParams(dataset_source="source", stations=["S007", "S030"]),
+    )
+    char_sizes = {"primary_station_id": 4, "observed_variable": 15}
+    variables = ["primary_station_id", "report_timestamp", "observation_value"]
+    variables += ["observed_variable", "latitude", "longitude"]
+    port = range_server.server_address[1]
+    outputs = {}
+    for fs, url in [
+        (fsspec.filesystem("file"), str(tmp_path / "asset.nc")),
+        (
+            fsspec.filesystem("http", cache_type="background", block_size=2**16),
+            f"http://127.0.0.1:{port}/asset.nc",
+        ),
+    ]:
+        with h5netcdf.File(tmp_path / "output.nc", "w") as oncobj:
+            oncobj.dimensions["index"] = None
+            filter.filter_asset_and_save(
+                fs, oncobj, retrieve_args, url, char_sizes, variables
+            )
+            outputs[fs.protocol] = {
+                name: variable[:] for name, variable in oncobj.variables.items()
+            }
+
+    local, remote = outputs.values()
+    assert set(local) == set(remote) == {*variables}
+    for name in variables:
+        np.testing.assert_array_equal(local[name], remote[name])
+    stations = set(local["primary_station_id"].view("S4").ravel().tolist())
+    assert stations == {b"S007", b"S030"}
+    # The chunks of the selection are fetched in one merged range
+    assert "with 1 requests" in caplog.text
+    assert len(range_server.ranges) < 20
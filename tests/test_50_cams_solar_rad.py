@@ -0,0 +1,298 @@
+import datetime
+import http.server
+import pathlib
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from collections.abc import Generator
+from typing import Any
+
+import pytest
+import xarray as xr
+
+from cads_adaptors.adaptors.cams_solar_rad import functions, sharding
+from cads_adaptors.tools.wps import NAMESPACES
+
+WPS = 'xmlns:wps="http://www.opengis.net/wps/1.0.0"'
+OWS = 'xmlns:ows="http://www.opengis.net/ows/1.1"'
+
+# First day of the data of the stand-in service
+FIRST_DAY = datetime.date(2004, 2, 1)
+
+
+class StandInWps(http.server.ThreadingHTTPServer):
+    """Local stand-in for the WPS service of the CAMS solar radiation data.
+
+    It executes the requests of functions.template_xml, which return hourly series
+    of a GHI that depends on the time only. Asynchronous executions succeed at their
+    second status request.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInWpsHandler)
+        self.lock = threading.Lock()
+        self.outputs: dict[str, tuple[bytes, str]] = {}
+        self.polls: dict[str, int] = {}
+        # Periods of the executed requests
+        self.executions: list[tuple[str, str]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def series(begin: datetime.date, end: datetime.date, mimetype: str) -> bytes:
+    start = datetime.datetime.combine(begin, datetime.time())
+    hours = ((end - begin).days + 1) * 24
+    times = [start + datetime.timedelta(hours=hour) for hour in range(hours)]
+    values = [time.hour * 10 + time.day for time in times]
+    if mimetype == "application/x-netcdf":
+        dataset = xr.Dataset(
+            {"GHI": ("time", values, {"units": "Wh m-2"})},
+            coords={"time": times},
+            attrs={"title": "stand-in"},
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = f"{tmpdir}/series.nc"
+            dataset.to_netcdf(path)
+            return pathlib.Path(path).read_bytes()
+    end_time = start + datetime.timedelta(hours=hours)
+    lines = [
+        "# Title: stand-in",
+        f"# Date begin (ISO 8601): {start.isoformat()}.0",
+        f"# Date end (ISO 8601): {end_time.isoformat()}.0",
+        "# Summarization (ISO 8601): PT01H",
+        "# Observation period;GHI",
+    ] + [
+        f"{time.isoformat()}.0/{(time + datetime.timedelta(hours=1)).isoformat()}.0"
+        f";{value}"
+        for time, value in zip(times, values)
+    ]
+    return ("\r\n".join(lines) + "\r\n").encode()
+
+
+class StandInWpsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInWps
+
+    def send(self, body: bytes, content_type: str = "text/xml") -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def execute_response(self, job_id: str, status: str) -> bytes:
+        outputs = ""
+        if status == "<wps:ProcessSucceeded/>":
+            outputs = (
+                "<wps:ProcessOutputs><wps:Output>"
+                "<ows:Identifier>irradiation</ows:Identifier>"
+                f'<wps:Reference href="{self.server.url}/outputs/{job_id}"/>'
+                "</wps:Output></wps:ProcessOutputs>"
+            )
+        return (
+            f'<wps:ExecuteResponse {WPS} {OWS} statusLocation="{self.server.url}'
+            f'/status/{job_id}"><wps:Status>{status}</wps:Status>{outputs}'
+            "</wps:ExecuteResponse>"
+        ).encode()
+
+    def failure(self, text: str) -> bytes:
+        return self.execute_response(
+            "failed",
+            "<wps:ProcessFailed><ows:ExceptionReport><ows:Exception>"
+            f"<ows:ExceptionText>{text}</ows:ExceptionText>"
+            "</ows:Exception></ows:ExceptionReport></wps:ProcessFailed>",
+        )
+
+    def do_POST(self) -> None:
+        root = ET.fromstring(self.rfile.read(int(self.headers["Content-Length"])))
+        inputs = {
+            element.findtext("ows:Identifier", namespaces=NAMESPACES): (
+                element.findtext("wps:Data/wps:LiteralData", namespaces=NAMESPACES)
+                or ""
+            ).strip()
+            for element in root.iterfind(".//wps:Input", NAMESPACES)
+        }
+        document = root.find(".//wps:ResponseDocument", NAMESPACES)
+        assert document is not None
+        output = document.find("wps:Output", NAMESPACES)
+        assert output is not None
+        assert functions.verify(inputs["username"])
+        with self.server.lock:
+            self.server.executions.append((inputs["date_begin"], inputs["date_end"]))
+            job_id = str(len(self.server.executions))
+        begin = datetime.date.fromisoformat(inputs["date_begin"])
+        end = datetime.date.fromisoformat(inputs["date_end"])
+        if float(inputs["latitude"]) > 70:
+            self.send(
+                self.failure("Process error: outside of the satellite field of view")
+            )
+            return
+        if end < FIRST_DAY:
+            self.send(self.failure("Error: no data available for the period"))
+            return
+        begin = max(begin, FIRST_DAY)
+        mimetype = output.get("mimeType", "")
+        self.server.outputs[job_id] = (series(begin, end, mimetype), mimetype)
+        if document.get("storeExecuteResponse") == "true":
+            self.server.polls[job_id] = 0
+            self.send(self.execute_response(job_id, "<wps:ProcessAccepted/>"))
+        else:
+            self.send(self.execute_response(job_id, "<wps:ProcessSucceeded/>"))
+
+    def do_GET(self) -> None:
+        _, kind, job_id = self.path.split("/")
+        if kind == "status":
+            self.server.polls[job_id] += 1
+            if self.server.polls[job_id] < 2:
+                status = '<wps:ProcessStarted percentCompleted="50"/>'
+            else:
+                status = "<wps:ProcessSucceeded/>"
+            self.send(self.execute_response(job_id, status))
+        else:
+            self.send(*self.server.outputs[job_id])
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def stand_in_wps(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[StandInWps, None, None]:
+    monkeypatch.setenv("CAMS_SOLAR_SECRET_STRING", "secret")
+    monkeypatch.setattr(functions, "POLLING", functions.wps.PollingPolicy(initial=0.01))
+    server = StandInWps()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_request(**kwargs: Any) -> dict[str, Any]:
+    return {
+        "altitude": "-999",
+        "date": "2023-01-01/2023-03-31",
+        "location": {"latitude": 45.0, "longitude": 8.0},
+        "sky_type": "get_cams_radiation",
+        "time_reference": "UT",
+        "time_step": "PT01H",
+        "data_format": "csv",
+        **kwargs,
+    }
+
+
+def test_shard_date_range() -> None:
+    assert sharding.steps_per_day("PT01M") == 1440
+    assert sharding.steps_per_day("PT15M") == 96
+    assert sharding.steps_per_day("P01D") == 1
+    assert sharding.steps_per_day("unknown") is None
+
+    assert sharding.shard_date_range("2023-01-01/2023-01-10", "PT01H", 4, 24) == [
+        "2023-01-01/2023-01-03",
+        "2023-01-04/2023-01-06",
+        "2023-01-07/2023-01-09",
+        "2023-01-10/2023-01-10",
+    ]
+    # Shards have at least min_shard_rows rows
+    assert sharding.shard_date_range("2023-01-01/2023-01-10", "PT01H", 4, 24 * 5) == [
+        "2023-01-01/2023-01-05",
+        "2023-01-06/2023-01-10",
+    ]
+    assert sharding.shard_date_range("2023-01-01", "PT01M", 4, 1) == ["2023-01-01"]
+    assert sharding.shard_date_range("2000-01-01/2023-01-01", "P01M", 4, 1) == [
+        "2000-01-01/2023-01-01"
+    ]
+    # Five years of one-minute series are split into max_shards shards
+    shards = sharding.shard_date_range("2019-01-01/2023-12-31", "PT01M", 8)
+    assert len(shards) == 8
+    # Series are not sharded by default
+    assert sharding.shard_date_range("2019-01-01/2023-12-31", "PT01M") == [
+        "2019-01-01/2023-12-31"
+    ]
+
+
+@pytest.mark.parametrize("data_format", ["csv", "netcdf"])
+@pytest.mark.parametrize("wps_async", [False, True])
+def test_solar_rad_retrieve_sharded(
+    stand_in_wps: StandInWps,
+    tmp_path: pathlib.Path,
+    data_format: str,
+    wps_async: bool,
+) -> None:
+    def retrieve(outfile: pathlib.Path, max_shards: int) -> None:
+        functions.solar_rad_retrieve(
+            make_request(data_format=data_format),
+            str(outfile),
+            ntries=1,
+            urls=[f"{stand_in_wps.url}/wps"],
+            wps_async=wps_async,
+            max_shards=max_shards,
+            min_shard_rows=24 * 10,
+        )
+
+    retrieve(tmp_path / "whole", max_shards=1)
+    assert stand_in_wps.executions == [("2023-01-01", "2023-03-31")]
+    retrieve(tmp_path / "sharded", max_shards=4)
+    assert sorted(stand_in_wps.executions[1:]) == [
+        ("2023-01-01", "2023-01-23"),
+        ("2023-01-24", "2023-02-15"),
+        ("2023-02-16", "2023-03-10"),
+        ("2023-03-11", "2023-03-31"),
+    ]
+    if wps_async:
+        assert set(stand_in_wps.polls.values()) == {2}
+    assert not list(tmp_path.glob("*.part"))
+
+    if data_format == "csv":
+        assert (tmp_path / "sharded").read_bytes() == (tmp_path / "whole").read_bytes()
+    else:
+        with (
+            xr.open_dataset(tmp_path / "sharded") as sharded,
+            xr.open_dataset(tmp_path / "whole") as whole,
+        ):
+            xr.testing.assert_identical(sharded, whole)
+
+
+def test_solar_rad_retrieve_errors(
+    stand_in_wps: StandInWps, tmp_path: pathlib.Path
+) -> None:
+    urls = [f"{stand_in_wps.url}/wps"]
+    # The first shard is before the data, which starts within the time range
+    outfile = tmp_path / "result.csv"
+    functions.solar_rad_retrieve(
+        make_request(date="2004-01-01/2004-02-29"),
+        str(outfile),
+        ntries=1,
+        urls=urls,
+        max_shards=2,
+        min_shard_rows=1,
+    )
+    assert stand_in_wps.executions[-1] == ("2004-01-01", "2004-02-29")
+    assert outfile.read_text().count("2004-02-01T00:00:00.0/") == 1
+    assert not list(tmp_path.glob("*.part"))
+
+    with pytest.raises(functions.NoData, match="no data available"):
+        functions.solar_rad_retrieve(
+            make_request(date="2003-01-01/2003-01-02"), ntries=3, urls=urls
+        )
+    with pytest.raises(functions.BadRequest, match="outside of the satellite"):
+        functions.solar_rad_retrieve(
+            make_request(location={"latitude": 80.0, "longitude": 0.0}),
+            ntries=3,
+            urls=urls,
+        )
+    # Bad requests are not retried over the whole time range
+    executions = len(stand_in_wps.executions)
+    with pytest.raises(functions.BadRequest, match="outside of the satellite"):
+        functions.solar_rad_retrieve(
+            make_request(location={"latitude": 80.0, "longitude": 0.0}),
+            str(outfile),
+            ntries=1,
+            urls=urls,
+            max_shards=2,
+            min_shard_rows=1,
+        )
+    assert ("2023-01-01", "2023-03-31") not in stand_in_wps.executions[executions:]
+    assert not list(tmp_path.glob("*.part"))
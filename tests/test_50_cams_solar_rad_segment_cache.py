@@ -0,0 +1,167 @@
+import datetime
+import pathlib
+from typing import Any
+
+import pytest
+
+from cads_adaptors import Context
+from cads_adaptors.adaptors.cams_solar_rad import segment_cache
+from cads_adaptors.adaptors.cams_solar_rad.functions import NoData
+from cads_adaptors.tools import instrumentation
+
+# First day of the data of the stand-in service
+FIRST_DAY = datetime.date(2004, 1, 1)
+STEPS = {"PT01H": datetime.timedelta(hours=1), "P01D": datetime.timedelta(days=1)}
+
+
+class StandInRetrieve:
+    """Local stand-in for solar_rad_retrieve, which records the fetched periods."""
+
+    def __init__(self) -> None:
+        self.dates: list[str] = []
+
+    def __call__(self, request: dict[str, Any], outfile: str) -> None:
+        self.dates.append(request["date"])
+        begin, end = segment_cache.date_range(request["date"])
+        if end < FIRST_DAY:
+            raise NoData("Error: no data available for the period")
+        begin = max(begin, FIRST_DAY)
+        step = STEPS[request["time_step"]]
+        time = datetime.datetime.combine(begin, datetime.time())
+        end_time = datetime.datetime.combine(end, datetime.time()) + STEPS["P01D"]
+        lines = [
+            "# Title: stand-in",
+            f"# Date begin (ISO 8601): {time.isoformat()}.0",
+            f"# Date end (ISO 8601): {end_time.isoformat()}.0",
+            f"# Latitude: {request['location']['latitude']}",
+            "# Observation period;GHI",
+        ]
+        while time < end_time:
+            lines.append(
+                f"{time.isoformat()}.0/{(time + step).isoformat()}.0;{time.day}"
+            )
+            time += step
+        with open(outfile, "w") as f:
+            f.write("\r\n".join(lines) + "\r\n")
+
+
+def make_request(date: str, **kwargs: Any) -> dict[str, Any]:
+    return {
+        "altitude": "-999",
+        "date": date,
+        "location": {"latitude": 45.0, "longitude": 8.0},
+        "sky_type": "get_cams_radiation",
+        "time_reference": "UT",
+        "time_step": "PT01H",
+        "data_format": "csv",
+        **kwargs,
+    }
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> segment_cache.SegmentCache:
+    return segment_cache.SegmentCache(str(tmp_path / "segments"))
+
+
+def check_retrieve(
+    cache: segment_cache.SegmentCache,
+    tmp_path: pathlib.Path,
+    request: dict[str, Any],
+) -> tuple[list[str], dict[str, int | float]]:
+    """Fetched periods and counters of a request, checking its result."""
+    fetch = StandInRetrieve()
+    recorder = instrumentation.Instrumentation()
+    outfile = tmp_path / "result.csv"
+    cache.retrieve(request, str(outfile), fetch, Context(instrumentation=recorder))
+    StandInRetrieve()(request, str(tmp_path / "expected.csv"))
+    assert outfile.read_bytes() == (tmp_path / "expected.csv").read_bytes()
+    return fetch.dates, recorder.counters
+
+
+def test_segment_cache_days(
+    cache: segment_cache.SegmentCache, tmp_path: pathlib.Path
+) -> None:
+    assert check_retrieve(cache, tmp_path, make_request("2023-01-01/2023-01-10")) == (
+        ["2023-01-01/2023-01-10"],
+        {"cams_solar_rad.segments.misses": 10},
+    )
+    # Only the gaps are fetched
+    assert check_retrieve(cache, tmp_path, make_request("2022-12-30/2023-01-15")) == (
+        ["2022-12-30/2022-12-31", "2023-01-11/2023-01-15"],
+        {"cams_solar_rad.segments.hits": 10, "cams_solar_rad.segments.misses": 7},
+    )
+    assert check_retrieve(cache, tmp_path, make_request("2023-01-03/2023-01-12")) == (
+        [],
+        {"cams_solar_rad.segments.hits": 10},
+    )
+    # Series of other locations, and of netCDF, are not shared
+    other = make_request(
+        "2023-01-03/2023-01-04", location={"latitude": 0, "longitude": 0}
+    )
+    assert check_retrieve(cache, tmp_path, other)[0] == ["2023-01-03/2023-01-04"]
+    fetch = StandInRetrieve()
+    for _ in range(2):
+        cache.retrieve(
+            make_request("2023-01-03/2023-01-04", data_format="netcdf"),
+            str(tmp_path / "result.nc"),
+            fetch,
+            Context(),
+        )
+    assert fetch.dates == ["2023-01-03/2023-01-04"] * 2
+
+
+def test_segment_cache_months(
+    cache: segment_cache.SegmentCache, tmp_path: pathlib.Path
+) -> None:
+    daily = {"time_step": "P01D"}
+    # Whole months are fetched, and the result is cut to the request
+    assert check_retrieve(
+        cache, tmp_path, make_request("2023-01-15/2023-03-10", **daily)
+    ) == (["2023-01-01/2023-03-31"], {"cams_solar_rad.segments.misses": 3})
+    assert check_retrieve(
+        cache, tmp_path, make_request("2023-02-01/2023-04-20", **daily)
+    ) == (
+        ["2023-04-01/2023-04-30"],
+        {"cams_solar_rad.segments.hits": 2, "cams_solar_rad.segments.misses": 1},
+    )
+
+    # Segments which are not final are fetched up to the end of the request, and are
+    # not cached
+    today = datetime.date.today()
+    month = today.replace(day=1)
+    cache.min_age = today.day
+    request = make_request(f"{month - datetime.timedelta(days=1)}/{today}", **daily)
+    previous_month = (month - datetime.timedelta(days=1)).replace(day=1)
+    assert check_retrieve(cache, tmp_path, request)[0] == [f"{previous_month}/{today}"]
+    assert check_retrieve(cache, tmp_path, request)[0] == [f"{month}/{today}"]
+
+
+def test_segment_cache_no_data(
+    cache: segment_cache.SegmentCache, tmp_path: pathlib.Path
+) -> None:
+    check_retrieve(cache, tmp_path, make_request("2004-01-01/2004-01-03"))
+    # The gap before the data is not fetched by the request with the data
+    request = make_request("2003-12-30/2004-01-03")
+    assert check_retrieve(cache, tmp_path, request)[0] == ["2003-12-30/2003-12-31"]
+    with pytest.raises(NoData):
+        cache.retrieve(
+            make_request("2003-12-01/2003-12-02"),
+            str(tmp_path / "result.csv"),
+            StandInRetrieve(),
+            Context(),
+        )
+
+
+def test_rewrite_dates() -> None:
+    header = [
+        b"# Date begin (ISO 8601): 2023-01-01T00:00:00.0\r\n",
+        b"# Date end (ISO 8601): 2023-01-11T00:00:00.0\r\n",
+        b"# Observation period;GHI\r\n",
+    ]
+    old = (datetime.date(2023, 1, 1), datetime.date(2023, 1, 10))
+    new = (datetime.date(2023, 1, 5), datetime.date(2023, 1, 5))
+    assert segment_cache.rewrite_dates(header, old, new) == [
+        b"# Date begin (ISO 8601): 2023-01-05T00:00:00.0\r\n",
+        b"# Date end (ISO 8601): 2023-01-06T00:00:00.0\r\n",
+        b"# Observation period;GHI\r\n",
+    ]
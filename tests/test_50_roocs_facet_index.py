@@ -0,0 +1,132 @@
+import itertools
+import random
+import re
+from typing import Any
+
+import pytest
+
+from cads_adaptors.adaptors import Context
+from cads_adaptors.adaptors.roocs import RoocsCdsAdaptor, facet_index
+from cads_adaptors.exceptions import RoocsValueError
+
+FACETS_ORDER = ["project", "source_id", "experiment_id", "member_id", "table_id"]
+FACET_GROUPS = {"table_id": {"monthly": ["Amon", "Omon"], "daily": ["day"]}}
+FACET_SEARCH = {"member_id": "^r{member_id}i1p1f\\d+$"}
+
+
+def make_facets(seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    facets = []
+    for source_id, experiment_id, member, table_id in itertools.product(
+        ["model-a", "model-b", "model-c"],
+        ["historical", "ssp245", "ssp585"],
+        range(1, 4),
+        ["Amon", "Omon", "day", "fx"],
+    ):
+        if rng.random() < 0.8:
+            facets.append(
+                {
+                    "project": "c3s-cmip6",
+                    "source_id": source_id,
+                    "experiment_id": experiment_id,
+                    "member_id": f"r{member}i1p1f{rng.randint(1, 2)}",
+                    "table_id": table_id,
+                }
+            )
+    return facets
+
+
+def scan_facets(
+    facets: list[dict[str, Any]], request: dict[str, Any], regex_facets: dict
+) -> list[dict[str, Any]]:
+    """Rows of the request, found by scanning the facets."""
+    matched = []
+    for raw_candidate in facets:
+        candidate = raw_candidate.copy()
+        for key, groups in FACET_GROUPS.items():
+            for group in groups:
+                if candidate[key] in groups[group]:
+                    candidate[key] = group
+        if candidate.items() >= request.items() and all(
+            re.search(value, candidate[key]) for key, value in regex_facets.items()
+        ):
+            matched.append(raw_candidate)
+    return matched
+
+
+@pytest.fixture
+def adaptor() -> RoocsCdsAdaptor:
+    facet_index.clear_facet_index_cache()
+    return RoocsCdsAdaptor(
+        form=[],
+        context=Context(),
+        facets=make_facets(),
+        facet_groups=FACET_GROUPS,
+        facets_order=FACETS_ORDER,
+        facet_search=FACET_SEARCH,
+    )
+
+
+def test_find_facets(adaptor: RoocsCdsAdaptor) -> None:
+    facets = adaptor.facets
+    found = 0
+    for source_id, experiment_id, member, table_id in itertools.product(
+        ["model-a", "model-b"],
+        ["historical", "ssp585"],
+        ["1", "3"],
+        ["monthly", "daily", "fx", "Amon"],
+    ):
+        request = {
+            "source_id": [source_id],
+            "experiment_id": experiment_id,
+            "member_id": member,
+            "table_id": table_id,
+            "unknown": "ignored",
+        }
+        regex_facets = {"member_id": FACET_SEARCH["member_id"].format(member_id=member)}
+        expected = scan_facets(
+            facets,
+            {
+                "source_id": source_id,
+                "experiment_id": experiment_id,
+                "table_id": table_id,
+            },
+            regex_facets,
+        )
+        if not expected:
+            with pytest.raises(RoocsValueError):
+                adaptor.find_facets(request)
+            continue
+        assert adaptor.find_facets(request) == [
+            {key: facet[key] for key in FACETS_ORDER} for facet in expected
+        ]
+        found += 1
+    assert found
+
+
+def test_facet_index() -> None:
+    facets = [
+        {"a": "x", "b": "1"},
+        {"a": "y", "b": "2"},
+        {"a": "z", "b": "10"},
+    ]
+    index = facet_index.FacetIndex(facets, {"a": {"xy": ["x", "y"], "xyz": ["xy"]}})
+    # Groups are applied in order, as a group of groups
+    assert index.search({"a": "xyz"}) == [0, 1]
+    assert index.search({"a": "z"}) == [2]
+    assert index.search({"a": "x"}) == []
+    assert index.search({}) == [0, 1, 2]
+    assert index.search({}, {"b": "^1"}) == [0, 2]
+    assert index.search({"a": "xyz"}, {"b": "^1"}) == [0]
+    assert index.search({"a": ["unhashable"]}) == []
+    assert index.search({"missing": "x"}) == []
+
+
+def test_facet_index_cache() -> None:
+    facet_index.clear_facet_index_cache()
+    adaptors = [
+        RoocsCdsAdaptor(form=[], context=Context(), facets=make_facets(seed))
+        for seed in [0, 0, 1]
+    ]
+    assert adaptors[0].facet_index is adaptors[1].facet_index
+    assert adaptors[0].facet_index is not adaptors[2].facet_index
@@ -0,0 +1,223 @@
+import http.server
+import json
+import re
+import threading
+import time
+from collections.abc import Generator
+from typing import Any
+from xml.sax.saxutils import unescape
+
+import pytest
+
+from cads_adaptors import Context
+from cads_adaptors.adaptors.roocs import RoocsCdsAdaptor, orchestration
+from cads_adaptors.exceptions import RoocsRuntimeError
+from cads_adaptors.tools import instrumentation, url_tools
+
+WPS = 'xmlns:wps="http://www.opengis.net/wps/1.0.0"'
+OWS = 'xmlns:ows="http://www.opengis.net/ows/1.1"'
+
+
+class StandInWps(http.server.ThreadingHTTPServer):
+    """Local stand-in for the WPS service of rook.
+
+    Jobs run the datasets of their workflow input: they succeed after as many status
+    requests as the number in the dataset id (e.g. "c3s.dataset.3"), or fail for the
+    dataset "fail".
+    """
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StandInWpsHandler)
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        # Paths of the requests, with the time they were received
+        self.requests: list[tuple[float, str]] = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInWpsHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: StandInWps
+
+    def send(self, content: str, content_type: str = "text/xml") -> None:
+        body = content.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def execute_response(self, job_id: str, status: str) -> str:
+        url = self.server.url
+        outputs = ""
+        if status.startswith("<wps:ProcessSucceeded"):
+            outputs = "<wps:ProcessOutputs>" + "".join(
+                f"<wps:Output><ows:Identifier>{name}</ows:Identifier>"
+                f'<wps:Reference href="{url}/outputs/{job_id}/{name}"/></wps:Output>'
+                for name in ["output", "prov", "prov_plot"]
+            )
+            outputs += "</wps:ProcessOutputs>"
+        return (
+            f'<wps:ExecuteResponse {WPS} {OWS} statusLocation="{url}/status/{job_id}">'
+            f"<wps:Status>{status}</wps:Status>{outputs}</wps:ExecuteResponse>"
+        )
+
+    def do_POST(self) -> None:
+        self.record()
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        match = re.search(r"<wps:ComplexData[^>]*>(.*)</wps:ComplexData>", body)
+        assert match and "<ows:Identifier>orchestrate</ows:Identifier>" in body
+        workflow = json.loads(unescape(match[1]))
+        (datasets,) = workflow["inputs"].values()
+        # Jobs are named after their first dataset
+        job_id = datasets[0]
+        self.server.jobs[job_id] = {"datasets": datasets, "polls": 0}
+        self.send(self.execute_response(job_id, "<wps:ProcessAccepted/>"))
+
+    def do_GET(self) -> None:
+        self.record()
+        _, kind, job_id, *name = self.path.split("/")
+        job = self.server.jobs[job_id]
+        if kind == "status":
+            job["polls"] += 1
+            datasets = job["datasets"]
+            if "fail" in datasets:
+                status = (
+                    "<wps:ProcessFailed><ows:ExceptionReport><ows:Exception>"
+                    "<ows:ExceptionText>No such dataset</ows:ExceptionText>"
+                    "</ows:Exception></ows:ExceptionReport></wps:ProcessFailed>"
+                )
+            elif job["polls"] < max(int(dataset[-1]) for dataset in datasets):
+                status = f'<wps:ProcessStarted percentCompleted="{job["polls"]}"/>'
+            else:
+                status = "<wps:ProcessSucceeded/>"
+            self.send(self.execute_response(job_id, status))
+        elif name == ["output"]:
+            files = "".join(
+                f'<file name="{dataset}.nc"><metaurl>'
+                f"{self.server.url}/outputs/{job_id}/{dataset}.nc</metaurl></file>"
+                for dataset in job["datasets"]
+            )
+            self.send(
+                f'<metalink xmlns="urn:ietf:params:xml:ns:metalink">{files}</metalink>'
+            )
+        else:
+            self.send(f"{job_id}/{name[0]}", "application/octet-stream")
+
+    def record(self) -> None:
+        with self.server.lock:
+            self.server.requests.append((time.monotonic(), self.path))
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def stand_in_wps() -> Generator[StandInWps, None, None]:
+    server = StandInWps()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def workflow(*datasets: str) -> str:
+    return json.dumps(
+        {"inputs": {"tas": list(datasets)}, "steps": {}, "outputs": {}, "doc": "w"}
+    )
+
+
+def test_polling_policy() -> None:
+    policy = orchestration.PollingPolicy(initial=1, factor=2, maximum=5)
+    assert policy.next_delay(1) == 2
+    assert policy.next_delay(4) == 5
+    # The delay follows the remaining time of the job, within the bounds
+    assert policy.next_delay(2, remaining=3) == 3
+    assert policy.next_delay(2, remaining=0.1) == 1
+
+
+def test_orchestrate(
+    stand_in_wps: StandInWps,
+    tmp_path: Any,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    recorder = instrumentation.Instrumentation()
+    context = Context(instrumentation=recorder)
+    downloaded: list[tuple[float, list[str]]] = []
+
+    def download(urls: list[str]) -> list[str]:
+        downloaded.append((time.monotonic(), urls))
+        return url_tools.try_download(urls, context=context)
+
+    paths = orchestration.orchestrate(
+        f"{stand_in_wps.url}/wps",
+        [workflow("c3s.a.1", "c3s.b.1"), workflow("c3s.c.8")],
+        download,
+        context,
+        policy=orchestration.PollingPolicy(initial=0.01, maximum=0.05),
+    )
+
+    # Files and provenance of each workflow, in the order of the workflows
+    assert paths == [
+        "outputs/c3s.a.1/c3s.a.1.nc",
+        "outputs/c3s.a.1/c3s.b.1.nc",
+        "outputs/c3s.a.1/prov",
+        "outputs/c3s.a.1/prov_plot",
+        "outputs/c3s.c.8/c3s.c.8.nc",
+        "outputs/c3s.c.8/prov",
+        "outputs/c3s.c.8/prov_plot",
+    ]
+    content = (tmp_path / "outputs/c3s.a.1/c3s.a.1.nc").read_text()
+    assert content == "c3s.a.1/c3s.a.1.nc"
+    assert recorder.counters["roocs.orchestration.polls"] == 1 + 8
+    # The outputs of the first workflow are downloaded while the second one runs
+    requests = stand_in_wps.requests
+    last_poll = max(t for t, path in requests if path == "/status/c3s.c.8")
+    first_download = min(
+        t for t, path in requests if path == "/outputs/c3s.a.1/c3s.a.1.nc"
+    )
+    assert first_download < last_poll
+    assert len(downloaded) == 2
+
+
+def test_orchestrate_failure(stand_in_wps: StandInWps) -> None:
+    with pytest.raises(RoocsRuntimeError, match="No such dataset"):
+        orchestration.orchestrate(
+            f"{stand_in_wps.url}/wps",
+            [workflow("fail")],
+            lambda urls: urls,
+            Context(),
+            policy=orchestration.PollingPolicy(initial=0.01),
+        )
+
+
+def test_orchestrate_timeout(stand_in_wps: StandInWps) -> None:
+    delays: list[float] = []
+    with pytest.raises(RoocsRuntimeError, match="not completed"):
+        orchestration.orchestrate(
+            f"{stand_in_wps.url}/wps",
+            [workflow("c3s.a.9")],
+            lambda urls: urls,
+            Context(),
+            policy=orchestration.PollingPolicy(initial=0.01, timeout=0),
+            sleep=delays.append,
+        )
+    assert delays == []
+
+
+def test_split_datasets() -> None:
+    datasets = ["c3s.a.1", "c3s.b.1"]
+    # Requests are processed by one workflow by default
+    adaptor = RoocsCdsAdaptor(form=[], context=Context())
+    assert adaptor.split_datasets(datasets) == [datasets]
+    adaptor = RoocsCdsAdaptor(form=[], context=Context(), split_workflows=True)
+    assert adaptor.split_datasets(datasets) == [["c3s.a.1"], ["c3s.b.1"]]
+    # Combined datasets are processed by one workflow
+    adaptor = RoocsCdsAdaptor(
+        form=[], context=Context(), split_workflows=True, operators={"Concat": {}}
+    )
+    assert adaptor.split_datasets(datasets) == [datasets]